@@ -0,0 +1,294 @@
+"""
+Benchmarks for the strategy core functions and the lfs_utils parsers.
+
+Each case times one function on a real workbook from assets/ (scale 1) or on
+a copy whose body rows are repeated 10x/100x (--scale). Results are appended
+to .benchmarks/history.jsonl and compared with the previous runs on the same
+machine; the exit status is 1 when a case is slower than its baseline by
+more than --threshold.
+
+    python benchmark.py                     # fast cases, real assets
+    python benchmark.py --scale 1 10        # also on 10x inputs
+    python benchmark.py -k hicp -k bla      # cases whose name contains hicp or bla
+    python benchmark.py --slow              # include the minute-long LFS annual sheet parsers
+    python benchmark.py --synthetic --scale 1 100   # generated workbooks, outputs checked against their truth
+    python benchmark.py --list
+
+main() benchmarks and the LFS sheet parsers run inside a temporary directory
+that links the inputs, so nothing under assets/prepared is overwritten.
+"""
+from pathlib import Path
+from typing import Callable, List, Sequence
+import argparse
+import contextlib
+import importlib
+import io
+import logging
+import os
+import sys
+
+import pandas as pd
+from loguru import logger
+
+from lfs_utils import bench
+from lfs_utils.bench import Case
+
+# The LFS sheet parsers import their helpers as top-level modules
+sys.path.insert(0, str(Path(__file__).resolve().parent / "lfs_utils"))
+
+SHARED = {"metadata": "metadata"}          # read by the strategies next to their inputs
+LFS_AN = "assets/LFS/A0101_SJO03_TS_AN_00_1981_00_2024_{:02d}_F_EN.xlsx"
+
+def _target(spec: str) -> Callable:
+    module, name = spec.split(":")
+    obj = importlib.import_module(module)
+    for part in name.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+def _first_sheet(path: Path) -> pd.DataFrame:
+    xl = pd.ExcelFile(path)
+    return xl.parse(xl.sheet_names[0], header=None)
+
+# ---------- Setups (input path → callable to time) ----------
+
+def sheet_fn(spec: str, prepare: Callable[[pd.DataFrame], pd.DataFrame] = lambda s: s):
+    """fn(first sheet, header=None), the sheet read once outside the timing."""
+    def setup(path: Path):
+        fn, sheet = _target(spec), prepare(_first_sheet(path))
+        return lambda: fn(sheet.copy())
+    return setup
+
+def file_fn(spec: str):
+    def setup(path: Path):
+        fn = _target(spec)
+        return lambda: fn(path)
+    return setup
+
+def file_parser(spec: str):
+    """Class(file_path).parse()"""
+    def setup(path: Path):
+        cls = _target(spec)
+        return lambda: cls(str(path)).parse()
+    return setup
+
+def sheet_parser(spec: str, sheet: str, analyzed: bool = True):
+    """Class().parse_sheet(analysis); the AdvancedSheetAnalyzer pass runs in setup."""
+    def setup(path: Path):
+        cls = _target(spec)
+        if analyzed:
+            from advanced_sheet_analyzer import AdvancedSheetAnalyzer
+            with contextlib.redirect_stdout(io.StringIO()):
+                analysis = AdvancedSheetAnalyzer().analyze_sheet(str(path), sheet)
+        else:
+            analysis = {"file_path": str(path.resolve()), "sheet_name": sheet}
+
+        def run():
+            with bench.sandbox({}):            # the parsers save into assets/prepared
+                return cls().parse_sheet(analysis)
+        return run
+    return setup
+
+def analyzer(spec: str, sheet: str):
+    def setup(path: Path):
+        cls = _target(spec)
+        return lambda: cls().analyze_sheet(str(path), sheet)
+    return setup
+
+def strategy_main(spec: str, folder: str, also: Sequence[str] = (), **kwargs):
+    """
+    main(**kwargs) in a sandbox where `folder` is the (possibly scaled) input
+    directory; `also` are repository files the strategy expects next to it.
+    """
+    def setup(directory: Path):
+        fn = _target(spec)
+        links = {**SHARED, **{f: f for f in also}, folder: directory}
+
+        def run():
+            with bench.sandbox(links):
+                return fn(**kwargs)
+        return run
+    return setup
+
+def cci_prepare(sheet: pd.DataFrame) -> pd.DataFrame:
+    """The preprocessing strategy_cci.main applies before parsing."""
+    sheet.iloc[:, 0] = sheet.iloc[:, 0].ffill()
+    sheet.iloc[:, 1] = sheet.iloc[:, 1].ffill()
+    return sheet.astype(str)
+
+def nfg_core(path: Path):
+    import strategy_nfg as nfg
+    sheets = nfg.load_excel_sheets(str(path))
+    return lambda: nfg.merge_and_finalize(nfg.clean_df1(sheets["sheet1"].copy()),
+                                          nfg.clean_df2(sheets["sheet2"].copy()))
+
+def bla_overall_core(directory: Path):
+    """process_dataframe on the merge of the three BLA strategies' outputs, built in setup."""
+    import strategy_bla, strategy_bla_04, strategy_bla_16
+    import strategy_bla_overall as overall
+    with bench.sandbox({**SHARED, "assets/BLA": directory}), contextlib.redirect_stdout(io.StringIO()):
+        for strategy in (strategy_bla, strategy_bla_04, strategy_bla_16):
+            strategy.main()
+        merged = overall.load_and_merge_data()
+    return lambda: overall.process_dataframe(merged.copy())
+
+def edd_extract(domain: str):
+    def setup(path: Path):
+        from lfs_utils.sdmx_edd import load_edd, read_grid
+        mapping = load_edd(domain)
+        return lambda: mapping.extract(read_grid(path, mapping.worksheet))
+    return setup
+
+def registry_parse(directory: Path):
+    from lfs_utils.sdmx_registry import load_registry
+    return lambda: load_registry(directory.parent, cache_dir=None, refresh=True)
+
+# ---------- Cases ----------
+
+def _lfs_sheet_cases() -> List[Case]:
+    analyzed = [("popul_status_parser:POPULStatusParser", 1, "POPUL-Status"),
+                ("data_parser:LFSDataParser", 1, "POPUL-Regio"),
+                ("educ_sexage_parser:EDUCSexAgeParser", 1, "EDUC-SexAge"),
+                ("educ_regio_parser:EDUCRegioParser", 1, "EDUC-Regio"),
+                ("educ_status_parser:EDUCStatusParser", 1, "EDUC-Status"),
+                ("status_sexage_parser:STATUSSexAgeParser", 1, "STATUS-SexAge"),
+                ("status_regio_parser:STATUSRegioParser", 1, "STATUS-Regio")]
+    direct = [("job_sexage_parser:JOBSexAgeParser", 2, "JOB-SexAge"),
+              ("job_regio_parser:JOBRegioParser", 2, "JOB-Regio"),
+              ("job_occup_parser:JOBOccupParser", 2, "JOB-Occup"),
+              ("job_sector_parser:JOBSectorParser", 2, "JOB-Sector"),
+              ("occup_demo_parser:OCCUPDemoParser", 2, "OCCUP-Demo"),
+              ("sector_demo_parser:SECTORDemoParser", 2, "SECTOR-Demo"),
+              ("emp_sexage_parser:EMPSexAgeParser", 2, "EMP-SexAge"),
+              ("emp_regio_parser:EMPRegioParser", 2, "EMP-Regio"),
+              ("une_sexage_parser:UNESexAgeParser", 3, "UNE-SexAge"),
+              ("une_regio_parser:UNERegioParser", 3, "UNE-Regio")]
+    synthetic = {"JOB-SexAge": ("lfs_job_sexage",)}          # sheets synthetic.py can generate
+    cases = [Case(f"lfs_utils.{spec.split(':')[0]}", sheet_parser(spec, sheet), LFS_AN.format(n), "lfs_utils")
+             for spec, n, sheet in analyzed]
+    cases += [Case(f"lfs_utils.{spec.split(':')[0]}", sheet_parser(spec, sheet, analyzed=False),
+                   LFS_AN.format(n), "lfs_utils", slow=True, layouts=synthetic.get(sheet, ()),
+                   check=sheet in synthetic)
+              for spec, n, sheet in direct]
+    return cases
+
+CASES: List[Case] = [
+    # strategies: core functions
+    Case("mci.excel_to_tidy", file_fn("strategy_mci:excel_to_tidy"), "assets/MCI/*02_F_EN.xlsx", "strategy",
+         layouts=("mci_v1",), check=True),
+    Case("mci.excel_to_tidy[v2]", file_fn("strategy_mci:excel_to_tidy"), "assets/MCI/*03_F_EN.xlsx", "strategy",
+         layouts=("mci_v2",), check=True),
+    Case("hicp.parse_mci_sheet", sheet_fn("strategy_hicp:parse_mci_sheet"), "assets/HICP/*02_F_EN.xlsx", "strategy"),
+    Case("hicp.parse_hicp_sheet", sheet_fn("strategy_hicp:parse_hicp_sheet"), "assets/HICP/*03_F_EN.xlsx", "strategy"),
+    Case("cci.parse_cci_sheet_dynamic", sheet_fn("strategy_cci:parse_cci_sheet_dynamic", cci_prepare),
+         "assets/CCI/*04_F_EN.xlsx", "strategy", layouts=("cci",), check=True),
+    Case("bla.parse_bla_sheet", sheet_fn("strategy_bla:parse_bla_sheet"), "assets/BLA/*TS_MM*01_F_B*.xlsx", "strategy",
+         layouts=("bla",), check=True),
+    Case("bla_04.parse_bla_details_sheet", sheet_fn("strategy_bla_04:parse_bla_details_sheet"),
+         "assets/BLA/*04_F_BI.xlsx", "strategy"),
+    Case("bla_16.parse_bla_16_sheet", sheet_fn("strategy_bla_16:parse_bla_16_sheet"),
+         "assets/BLA/*16_F_BI.xlsx", "strategy"),
+    # Repeated body rows repeat the periods the three BLA tables are merged on, so
+    # scaled copies would time a many-to-many merge: real inputs only.
+    Case("bla_overall.process_dataframe", bla_overall_core, "assets/BLA/*.xlsx", "strategy", directory=True,
+         scalable=False),
+    Case("nfg.clean_and_merge", nfg_core, "assets/NFG/*_BI.xlsx", "strategy", layouts=("nfg",), check=True),
+    Case("lfs.parse_lfs_file_enhanced", file_fn("strategy_LFS:parse_lfs_file_enhanced"),
+         "assets/LFS/*_TS_QQ_01_2001_01_2025_2A_F_EN.xlsx", "strategy"),
+
+    # strategies: main() end to end
+    Case("mci.main", strategy_main("strategy_mci:main", "assets/MCI"), "assets/MCI/*_TS_*.xlsx", "main", directory=True,
+         layouts=("mci_v1", "mci_v2")),
+    Case("hicp.main", strategy_main("strategy_hicp:main", "assets/HICP"), "assets/HICP/*_TS_*.xlsx", "main",
+         directory=True),
+    Case("cci.main", strategy_main("strategy_cci:main", "assets/CCI"), "assets/CCI/*.xlsx", "main", directory=True,
+         layouts=("cci",)),
+    Case("edp.main", strategy_main("strategy_edp:main", "assets/EDP"), "assets/EDP/*.xlsx", "main", directory=True),
+    Case("nfg.main", strategy_main("strategy_nfg:main", "assets/NFG"), "assets/NFG/*.xlsx", "main", directory=True,
+         layouts=("nfg",)),
+    Case("bla.main", strategy_main("strategy_bla:main", "assets/BLA"), "assets/BLA/*.xlsx", "main", directory=True,
+         layouts=("bla",)),
+    Case("bla_04.main", strategy_main("strategy_bla_04:main", "assets/BLA"), "assets/BLA/*.xlsx", "main",
+         directory=True),
+    Case("bla_16.main", strategy_main("strategy_bla_16:main", "assets/BLA"), "assets/BLA/*.xlsx", "main",
+         directory=True),
+    Case("bla_overall.main", strategy_main("strategy_bla_overall:main", "assets/BLA",
+                                                also=["strategy_bla.py", "strategy_bla_04.py", "strategy_bla_16.py"]),
+         "assets/BLA/*.xlsx", "main", directory=True, scalable=False),
+    Case("lfs.main", strategy_main("strategy_LFS:main", "assets/LFS"), "assets/LFS/*.xlsx", "main",
+         directory=True, slow=True),
+    Case("lfs_annually.main", strategy_main("strategy_LFS_annually:main", "assets/LFS"), "assets/LFS/*TS_AN*.xlsx",
+         "main", directory=True, slow=True),
+
+    # lfs_utils parsers
+    Case("lfs_utils.advanced_sheet_analyzer", analyzer("advanced_sheet_analyzer:AdvancedSheetAnalyzer", "POPUL-Status"),
+         LFS_AN.format(1), "lfs_utils"),
+    Case("lfs_utils.sheet_analyzer", analyzer("sheet_analyzer:SheetAnalyzer", "POPUL-Status"),
+         LFS_AN.format(1), "lfs_utils"),
+    *_lfs_sheet_cases(),
+    Case("lfs_utils.ts_mm_01a_parser", file_parser("ts_mm_01a_parser:TS_MM_01A_Parser"),
+         "assets/LFS/*_TS_MM_01_2004_05_2025_01A_F_EN.xlsx", "lfs_utils"),
+    Case("lfs_utils.ts_qq_2a_parser", file_parser("ts_qq_2a_parser:TS_QQ_2A_Parser"),
+         "assets/LFS/*_TS_QQ_01_2001_01_2025_2A_F_EN.xlsx", "lfs_utils"),
+    *[Case(f"lfs_utils.ts_qq_{n}_parser", file_parser(f"ts_qq_{n}_parser:TS_QQ_{n}_Parser"),
+           f"assets/LFS/*_TS_QQ_01_2001_01_2025_{n}_F_EN.xlsx", "lfs_utils") for n in ("03", "05", "06", "07")],
+    Case("lfs_utils.sdmx_edd.extract[HICP]", edd_extract("HICP"), "assets/prepared/HICP.xlsx", "lfs_utils"),
+    Case("lfs_utils.sdmx_registry.load_registry", registry_parse, "metadata/*/dsd.xml", "lfs_utils",
+         directory=True, scalable=False),
+]
+
+def select(cases: List[Case], patterns: List[str], slow: bool, synthetic: bool = False) -> List[Case]:
+    if synthetic:
+        cases = [c for c in cases if c.layouts]
+    if patterns:
+        return [c for c in cases if any(p in c.name for p in patterns)]
+    return [c for c in cases if slow or not c.slow]
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the strategies and lfs_utils parsers.")
+    parser.add_argument("-k", dest="patterns", action="append", default=[], help="run cases whose name contains this")
+    parser.add_argument("--scale", type=int, nargs="+", default=[1], help="input scale factors (default: 1)")
+    parser.add_argument("--rounds", type=int, default=3, help="timed calls per case")
+    parser.add_argument("--slow", action="store_true", help="include cases that take minutes")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="generated workbooks of --scale x the real size instead of the assets (checked cases "
+                             "also compare their output with the generated truth)")
+    parser.add_argument("--threshold", type=float, default=bench.DEFAULT_THRESHOLD,
+                        help="relative slow-down that counts as a regression")
+    parser.add_argument("--no-save", action="store_true", help="do not append the results to the history")
+    parser.add_argument("--list", action="store_true")
+    parser.add_argument("-v", "--verbose", action="store_true", help="keep the strategies' log output")
+    args = parser.parse_args(argv)
+
+    cases = select(CASES, args.patterns, args.slow, args.synthetic)
+    if args.list:
+        for c in cases:
+            print(f"{c.group:9s} {c.name:42s} {c.inputs}{'  (slow)' if c.slow else ''}")
+        return 0
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR,
+                        format="%(levelname)s %(message)s")
+    logging.getLogger(bench.__name__).setLevel(logging.INFO)
+    if not args.verbose:
+        logger.remove()
+    os.environ["LFS_BUILD_CACHE"] = "0"      # time the parsers, not the partial cache
+
+    results = []
+    for scale in args.scale:
+        for case in cases:
+            if scale != 1 and not case.scalable and not args.synthetic:
+                continue
+            logging.getLogger(bench.__name__).info("%s (x%d)", case.name, scale)
+            results.append(bench.run_case(case, scale, args.rounds, synthetic=args.synthetic))
+
+    comparisons = bench.compare(results, bench.load_history(), args.threshold)
+    text = bench.report(comparisons)
+    print(text)
+    bench.BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    (bench.BENCH_DIR / "latest.md").write_text(text, encoding="utf-8")
+    if not args.no_save:
+        bench.save_results(results)
+    return 1 if any(c.regressed for c in comparisons) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,7 +5,11 @@ import os
 from urllib.parse import urljoin, urlparse, parse_qs, unquote
 from typing import List
 
+from lfs_utils import metrics
+from lfs_utils.tracing import traced
 
+
+@traced("crawl")
 def find_xlsx_links_in_html(url: str, positions: List[int] = [2]) -> List[str]:
     """
     Given a URL, fetch the HTML and return a list of Excel file download links (absolute URLs) at the specified positions (1-based).
@@ -36,12 +40,14 @@ def find_xlsx_links_in_html(url: str, positions: List[int] = [2]) -> List[str]:
                 selected.append(matches[pos-1])
             else:
                 logger.warning(f"Requested position {pos} is out of range (found {len(matches)} links).")
+                metrics.FILES_SKIPPED.inc(reason="no_link")
         return selected
     except Exception as e:
         logger.error(f"Error fetching or parsing HTML: {e}")
         return []
 
 
+@traced("crawl")
 def download_xlsx_file(xlsx_url: str, subfolder: str = "downloads") -> str | None:
     """
     Download the .xlsx file from the given URL to the specified subfolder in the assets directory.
@@ -77,12 +83,17 @@ def download_xlsx_file(xlsx_url: str, subfolder: str = "downloads") -> str | Non
         assets_dir = os.path.join(os.path.dirname(__file__), 'assets', subfolder)
         os.makedirs(assets_dir, exist_ok=True)
         file_path = os.path.join(assets_dir, filename)
+        size = 0
         with open(file_path, 'wb') as f:
             for chunk in response.iter_content(chunk_size=8192):
                 if chunk:
                     f.write(chunk)
+                    size += len(chunk)
         logger.success(f"File downloaded to {file_path}")
+        metrics.FILES_DOWNLOADED.inc()
+        metrics.DOWNLOAD_BYTES.inc(size)
         return file_path
     except Exception as e:
         logger.error(f"Failed to download xlsx file: {e}")
+        metrics.FILES_SKIPPED.inc(reason="download_failed")
         return None
@@ -8,6 +8,15 @@ import numpy as np
 from typing import Dict, List, Tuple, Any, Optional
 import logging
 
+try:
+    from . import metrics
+    from .sheet_analyzer import data_bounds, numeric_mask
+    from .tracing import traced
+except ImportError:                      # imported as a top-level module (lfs_utils on sys.path)
+    import metrics
+    from sheet_analyzer import data_bounds, numeric_mask
+    from tracing import traced
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -19,6 +28,7 @@ class AdvancedSheetAnalyzer:
         self.dimensions = {}
         self.data_structure = {}
         
+    @traced("read")
     def analyze_sheet(self, file_path: str, sheet_name: str) -> Dict[str, Any]:
         """
         Analyze a specific sheet with advanced pattern recognition
@@ -35,6 +45,7 @@ class AdvancedSheetAnalyzer:
             
             # Read the sheet
             df = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
+            metrics.sheet_read(df)
             logger.info(f"Sheet loaded: {df.shape[0]} rows x {df.shape[1]} columns")
             
             # Analyze the structure
@@ -145,6 +156,7 @@ class AdvancedSheetAnalyzer:
         """Analyze the data structure and layout"""
         structure = {
             'header_rows': [],
+            'label_columns': [],
             'data_start_row': None,
             'data_end_row': None,
             'data_start_col': None,
@@ -153,83 +165,65 @@ class AdvancedSheetAnalyzer:
             'row_structure': []
         }
         
-        # Find where data starts (first row with numeric values)
-        for row_idx in range(len(df)):
-            row_has_numeric = False
-            for col_idx in range(df.shape[1]):
-                cell_value = df.iloc[row_idx, col_idx]
-                if pd.notna(cell_value) and self._is_numeric(str(cell_value)):
-                    row_has_numeric = True
-                    if structure['data_start_row'] is None:
-                        structure['data_start_row'] = row_idx
-                        structure['data_start_col'] = col_idx
-                    structure['data_end_row'] = row_idx
-                    structure['data_end_col'] = max(structure['data_end_col'] or col_idx, col_idx)
-            
-            if row_has_numeric:
-                structure['data_end_row'] = row_idx
+        # One numeric mask for the whole grid; everything below is reductions over it
+        mask = numeric_mask(df)
+        present = df.notna().to_numpy()
+        values = df.to_numpy(dtype=object)
+        
+        # Data starts at the first row with numeric values
+        start_row, start_col, end_row = data_bounds(mask)
+        if start_row is None:
+            return structure
+        structure.update(data_start_row=start_row, data_start_col=start_col, data_end_row=end_row,
+                         data_end_col=int(np.flatnonzero(mask.any(axis=0))[-1]))
+        
+        # Header rows: non-empty rows above the data; label columns: text but no numbers in the data rows
+        structure['header_rows'] = np.flatnonzero(present[:start_row].any(axis=1)).tolist()
+        block_present, block_numeric = present[start_row:end_row + 1], mask[start_row:end_row + 1]
+        structure['label_columns'] = np.flatnonzero(block_present.any(axis=0) & ~block_numeric.any(axis=0)).tolist()
         
         # Analyze column structure
-        if structure['data_start_row'] is not None:
-            structure['column_structure'] = self._analyze_columns(df, structure['data_start_row'])
-            structure['row_structure'] = self._analyze_rows(df, structure['data_start_row'])
+        structure['column_structure'] = self._analyze_columns(values, present, mask, start_row)
+        structure['row_structure'] = self._analyze_rows(values, present, mask, start_row)
         
         return structure
     
-    def _analyze_columns(self, df: pd.DataFrame, data_start_row: int) -> List[Dict[str, Any]]:
+    def _analyze_columns(self, values: np.ndarray, present: np.ndarray, mask: np.ndarray,
+                         data_start_row: int) -> List[Dict[str, Any]]:
         """Analyze the structure of columns"""
         columns = []
+        sample = slice(data_start_row, data_start_row + 10)
+        has_sample = present[sample].any(axis=0)
+        all_numeric = (mask[sample] | ~present[sample]).all(axis=0)
         
-        for col_idx in range(df.shape[1]):
+        for col_idx in range(values.shape[1]):
+            header = values[:data_start_row, col_idx][present[:data_start_row, col_idx]]
             col_info = {
                 'column_index': col_idx,
-                'header_values': [],
+                'header_values': [text for text in (str(v).strip() for v in header) if text],
                 'data_type': 'unknown',
-                'sample_values': []
+                'sample_values': values[sample, col_idx][present[sample, col_idx]].tolist()
             }
             
-            # Get header values from rows above data
-            for row_idx in range(data_start_row):
-                cell_value = df.iloc[row_idx, col_idx]
-                if pd.notna(cell_value) and str(cell_value).strip():
-                    col_info['header_values'].append(str(cell_value).strip())
-            
-            # Get sample data values
-            for row_idx in range(data_start_row, min(data_start_row + 10, len(df))):
-                cell_value = df.iloc[row_idx, col_idx]
-                if pd.notna(cell_value):
-                    col_info['sample_values'].append(cell_value)
-            
             # Determine data type
-            if col_info['sample_values']:
-                if all(self._is_numeric(str(val)) for val in col_info['sample_values']):
-                    col_info['data_type'] = 'numeric'
-                else:
-                    col_info['data_type'] = 'categorical'
+            if has_sample[col_idx]:
+                col_info['data_type'] = 'numeric' if all_numeric[col_idx] else 'categorical'
             
             columns.append(col_info)
         
         return columns
     
-    def _analyze_rows(self, df: pd.DataFrame, data_start_row: int) -> List[Dict[str, Any]]:
+    def _analyze_rows(self, values: np.ndarray, present: np.ndarray, mask: np.ndarray,
+                      data_start_row: int) -> List[Dict[str, Any]]:
         """Analyze the structure of rows"""
         rows = []
         
-        for row_idx in range(data_start_row, min(data_start_row + 20, len(df))):
-            row_info = {
+        for row_idx in range(data_start_row, min(data_start_row + 20, len(values))):
+            rows.append({
                 'row_index': row_idx,
-                'sample_values': [],
-                'has_numeric': False
-            }
-            
-            for col_idx in range(df.shape[1]):
-                cell_value = df.iloc[row_idx, col_idx]
-                if pd.notna(cell_value):
-                    row_info['sample_values'].append(cell_value)
-                    if self._is_numeric(str(cell_value)):
-                        row_info['has_numeric'] = True
-            
-            rows.append(row_info)
+                'sample_values': values[row_idx][present[row_idx]].tolist(),
+                'has_numeric': bool(mask[row_idx].any())
+            })
         
         return rows
     
@@ -0,0 +1,294 @@
+# bench.py
+"""
+Micro-benchmark harness with a results history.
+
+A Case names a setup function that receives the input (a real workbook or
+directory, or its scaled copy) and returns the zero-argument callable to
+time, so reading fixtures stays outside the measurement. Every run appends
+one record per case to .benchmarks/history.jsonl (machine, commit, scale,
+timings) and compare() flags cases whose median is slower than the median
+of the previous runs on the same machine by more than the threshold.
+
+Scaled inputs are copies of the real workbooks whose body rows (everything
+from the first row holding a number) are repeated `scale` times, written
+with xlsxwriter in constant-memory mode:
+
+    scaled_copy("assets/BLA/x.xlsx", 10, ".benchmarks/inputs")
+
+Cases that name synthetic layouts (see synthetic.py) can instead run on
+generated workbooks of `scale` times the real size (synthetic=True); when
+the case also sets check, its last output is compared with the generated
+ground truth and the number of mismatching observations is reported next
+to the timings.
+
+The cases themselves live in benchmark.py at the repository root.
+"""
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import contextlib
+import datetime as dt
+import glob
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BENCH_DIR = Path(os.environ.get("LFS_BENCH_DIR", ".benchmarks"))
+HISTORY = BENCH_DIR / "history.jsonl"
+DEFAULT_THRESHOLD = 0.25                     # 25% slower than the baseline median
+BASELINE_RUNS = 5                            # previous runs the baseline is taken over
+
+PathLike = Union[str, Path]
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    setup: Callable[[Path], Callable[[], Any]]   # input path → callable to time
+    inputs: str                                  # glob of the real input(s); the first match is used
+    group: str = ""
+    directory: bool = False                      # input is the directory holding the matches
+    slow: bool = False                           # minutes per call; only run when asked for
+    scalable: bool = True                        # inputs are workbooks scaled_copy() can grow
+    layouts: Tuple[str, ...] = ()                # synthetic layouts that stand in for the input
+    check: bool = False                          # compare the output with the synthetic truth
+
+@dataclass
+class BenchResult:
+    case: str
+    group: str
+    scale: int
+    rounds: int
+    median: float
+    best: float
+    mean: float
+    rows: Optional[int] = None
+    error: Optional[str] = None
+    input: str = "real"                          # or "synthetic"
+    mismatches: Optional[int] = None             # observations differing from the truth (checked cases)
+    machine: str = ""
+    commit: str = ""
+    timestamp: str = ""
+
+# ---------- Inputs ----------
+
+def _body_start(rows: List[tuple]) -> int:
+    """Index of the first row holding a number (header rows are kept once)."""
+    for i, row in enumerate(rows):
+        if any(isinstance(v, (int, float)) and not isinstance(v, bool) for v in row):
+            return i
+    return len(rows)
+
+def scaled_copy(path: PathLike, scale: int, out_dir: PathLike = BENCH_DIR / "inputs") -> Path:
+    """
+    Workbook with every sheet's body rows repeated `scale` times, at
+    out_dir/x{scale}/<source folder>/<name> (reused while newer than the source).
+    """
+    import openpyxl
+    import xlsxwriter
+
+    path = Path(path)
+    out = Path(out_dir) / f"x{scale}" / path.parent.name / path.name
+    if out.exists() and out.stat().st_mtime >= path.stat().st_mtime:
+        return out
+    out.parent.mkdir(parents=True, exist_ok=True)
+    source = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    tmp = out.with_suffix(".tmp.xlsx")
+    book = xlsxwriter.Workbook(str(tmp), {"constant_memory": True, "nan_inf_to_errors": True})
+    for ws in source.worksheets:
+        rows = [tuple(r) for r in ws.iter_rows(values_only=True)]
+        start = _body_start(rows)
+        sheet = book.add_worksheet(ws.title)
+        r = 0
+        for block in [rows[:start]] + [rows[start:]] * scale:
+            for row in block:
+                for c, value in enumerate(row):
+                    if value is not None:
+                        sheet.write(r, c, value)
+                r += 1
+    book.close()
+    source.close()
+    tmp.replace(out)
+    return out
+
+def scaled_dir(pattern: str, scale: int, out_dir: PathLike = BENCH_DIR / "inputs") -> Path:
+    """Directory holding the scaled copies of every workbook matching `pattern` (and nothing else)."""
+    files = sorted(glob.glob(pattern))
+    for f in files:
+        scaled_copy(f, scale, out_dir)
+    return Path(out_dir) / f"x{scale}" / Path(files[0]).parent.name
+
+def synthetic_input(case: Case, scale: int, out_dir: PathLike = BENCH_DIR / "inputs") -> Path:
+    """Generated workbook (or, for directory cases, the folder of every layout) at `scale`."""
+    from .synthetic import generate
+    folder = Path(out_dir) / f"x{scale}" / "synthetic" / "+".join(case.layouts)
+    books = [generate(layout, folder, scale=scale) for layout in case.layouts]
+    return folder if case.directory else books[0].path
+
+def resolve_input(case: Case, scale: int) -> Path:
+    matches = sorted(glob.glob(case.inputs))
+    if not matches:
+        raise FileNotFoundError(f"no input matches {case.inputs}")
+    if case.directory:
+        return Path(matches[0]).parent if scale == 1 else scaled_dir(case.inputs, scale)
+    return Path(matches[0]) if scale == 1 else scaled_copy(matches[0], scale)
+
+@contextlib.contextmanager
+def sandbox(links: Dict[str, PathLike], copies: Iterable[PathLike] = ()):
+    """
+    Run inside a temporary working directory where `links` (relative path →
+    real path) are symlinked and `copies` copied, so a strategy's main() can
+    write assets/prepared without touching the repository.
+    """
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        for rel, target in links.items():
+            dst = Path(tmp) / rel
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            dst.symlink_to(Path(target).resolve(), target_is_directory=Path(target).is_dir())
+        for rel in copies:
+            dst = Path(tmp) / rel
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(Path(cwd) / rel, dst)
+        (Path(tmp) / "assets" / "prepared").mkdir(parents=True, exist_ok=True)
+        os.chdir(tmp)
+        try:
+            yield Path(tmp)
+        finally:
+            os.chdir(cwd)
+
+# ---------- Measuring ----------
+
+def machine_id() -> str:
+    return f"{platform.node()}|{platform.machine()}|{os.cpu_count()}cpu|py{platform.python_version()}"
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+def _rows(result: Any) -> Optional[int]:
+    if isinstance(result, tuple) and result and hasattr(result[0], "shape"):
+        result = result[0]                        # (data, header rows) from the Excel-bound steps
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+def measure(fn: Callable[[], Any], rounds: int = 3, min_time: float = 0.0,
+            quiet: bool = True) -> Dict[str, Any]:
+    """
+    Time fn() `rounds` times (more while the total is under min_time); stdout
+    is muted when quiet. The last call's return value is under "result".
+    """
+    times: List[float] = []
+    result = None
+    while len(times) < rounds or sum(times) < min_time:
+        sink = io.StringIO() if quiet else None
+        with contextlib.redirect_stdout(sink) if quiet else contextlib.nullcontext():
+            t0 = time.perf_counter()
+            result = fn()
+            times.append(time.perf_counter() - t0)
+    return {"rounds": len(times), "median": statistics.median(times), "best": min(times),
+            "mean": statistics.fmean(times), "rows": _rows(result), "result": result}
+
+def _mismatches(case: Case, path: Path, output: Any) -> int:
+    """Observations of `output` that differ from the truth written next to the (file) input."""
+    from .synthetic import check_output, load_truth
+    result = check_output(case.layouts[0], output, load_truth(path))
+    if not result.ok:
+        logger.warning("%s", result.summary())
+    return result.errors
+
+def run_case(case: Case, scale: int = 1, rounds: int = 3, min_time: float = 0.0,
+             synthetic: bool = False) -> BenchResult:
+    synthetic = synthetic and bool(case.layouts)
+    base = dict(case=case.name, group=case.group, scale=scale, input="synthetic" if synthetic else "real",
+                machine=machine_id(), commit=current_commit(),
+                timestamp=dt.datetime.now().isoformat(timespec="seconds"))
+    try:
+        path = synthetic_input(case, scale) if synthetic else resolve_input(case, scale)
+        stats = measure(case.setup(path), rounds, min_time)
+        output = stats.pop("result")
+        mismatches = _mismatches(case, path, output) if synthetic and case.check else None
+        return BenchResult(**base, **stats, mismatches=mismatches)
+    except Exception as exc:
+        logger.error("%s (x%d): %s", case.name, scale, exc)
+        return BenchResult(**base, rounds=0, median=float("nan"), best=float("nan"),
+                           mean=float("nan"), error=f"{type(exc).__name__}: {exc}")
+
+# ---------- History ----------
+
+def load_history(path: PathLike = HISTORY) -> List[Dict[str, Any]]:
+    path = Path(path)
+    if not path.exists():
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def save_results(results: Sequence[BenchResult], path: PathLike = HISTORY) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        for r in results:
+            if r.error is None:
+                f.write(json.dumps(asdict(r)) + "\n")
+
+@dataclass
+class Comparison:
+    result: BenchResult
+    baseline: Optional[float]
+    threshold: float
+
+    @property
+    def change(self) -> Optional[float]:
+        if self.baseline is None or not self.baseline or np.isnan(self.result.median):
+            return None
+        return self.result.median / self.baseline - 1
+
+    @property
+    def regressed(self) -> bool:
+        return self.change is not None and self.change > self.threshold
+
+def compare(results: Sequence[BenchResult], history: Sequence[Dict[str, Any]],
+            threshold: float = DEFAULT_THRESHOLD, runs: int = BASELINE_RUNS) -> List[Comparison]:
+    """Baseline per case: median of its last `runs` medians at the same scale on this machine."""
+    out = []
+    for r in results:
+        past = [h["median"] for h in history
+                if h["case"] == r.case and h["scale"] == r.scale and h["machine"] == r.machine
+                and h.get("input", "real") == r.input]
+        out.append(Comparison(r, statistics.median(past[-runs:]) if past else None, threshold))
+    return out
+
+def report(comparisons: Sequence[Comparison]) -> str:
+    lines = ["| Case | Scale | Rows | Median (s) | Best (s) | Baseline (s) | Change | Truth | |",
+             "|---|---|---|---|---|---|---|---|---|"]
+    for c in comparisons:
+        r = c.result
+        scale = f"x{r.scale}" + (" synthetic" if r.input == "synthetic" else "")
+        if r.error:
+            lines.append(f"| {r.case} | {scale} | | | | | | | ✗ {r.error.splitlines()[0]} |")
+            continue
+        base = f"{c.baseline:.3f}" if c.baseline is not None else "-"
+        change = f"{c.change:+.1%}" if c.change is not None else "new"
+        truth = "" if r.mismatches is None else "✓" if r.mismatches == 0 else f"{r.mismatches:,} off"
+        flag = "⚠ regression" if c.regressed else ""
+        lines.append(f"| {r.case} | {scale} | {r.rows if r.rows is not None else ''} | {r.median:.3f} "
+                     f"| {r.best:.3f} | {base} | {change} | {truth} | {flag} |")
+    regressions = [c.result.case for c in comparisons if c.regressed]
+    if regressions:
+        lines += ["", f"Regressions (> {comparisons[0].threshold:.0%} slower): {', '.join(regressions)}"]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,313 @@
+# build_cache.py
+"""
+Content-addressed incremental rebuilds.
+
+DigestIndex   sha256 per file, re-hashed only when its size or mtime changed.
+PartialCache  per-input-file results of a strategy's parse function (tidy
+              frames), stored as Parquet under a key of (file content, code,
+              parameters); reruns parse only new or changed files and
+              concatenate the cached partials for the rest.
+BuildState    per pipeline node, the input digests, code fingerprint and
+              parameters of its last successful run; plan() says which nodes
+              would rebuild and why (pipeline.py --dry-run).
+
+    partials = PartialCache("mci_tidy", excel_to_tidy, deps=[strategy_module])
+    frames = [partials.load_or_compute(f) for f in files]
+    partials.save()
+
+Set LFS_BUILD_CACHE=0 to always recompute the partials.
+"""
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import ast
+import glob
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import pickle
+
+import pandas as pd
+
+from .dag import Node, _prune, build_graph, topological_order
+from .stage_cache import code_fingerprint, file_digest, fingerprint
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUILD_DIR = Path(os.environ.get("LFS_BUILD_DIR", ".cache/build"))
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+PathLike = Union[str, Path]
+
+def _write_json(path: Path, data: Any) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(data, indent=1, sort_keys=True), encoding="utf-8")
+    tmp.replace(path)
+
+def _read_json(path: Path) -> Dict[str, Any]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+def _names(paths: Iterable[str], limit: int = 3) -> str:
+    paths = sorted(paths)
+    shown = ", ".join(Path(p).name for p in paths[:limit])
+    return shown + (f" (+{len(paths) - limit} more)" if len(paths) > limit else "")
+
+class DigestIndex:
+    """File → sha256, persisted with the (size, mtime) it was computed for."""
+
+    def __init__(self, path: PathLike):
+        self.path = Path(path)
+        self._entries = _read_json(self.path)
+        self._dirty = False
+
+    def digest(self, file: PathLike) -> str:
+        st = os.stat(file)
+        key = str(file)
+        entry = self._entries.get(key)
+        if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            return entry[2]
+        digest = file_digest(Path(file))
+        self._entries[key] = [st.st_size, st.st_mtime_ns, digest]
+        self._dirty = True
+        return digest
+
+    def save(self) -> None:
+        if self._dirty:
+            _write_json(self.path, self._entries)
+            self._dirty = False
+
+# ---------- Code fingerprints ----------
+
+def _module_file(name: str) -> Optional[Path]:
+    try:
+        spec = importlib.util.find_spec(name)
+    except (ImportError, ValueError):
+        return None
+    if spec is None or not spec.origin or not spec.origin.endswith(".py"):
+        return None
+    path = Path(spec.origin).resolve()
+    if REPO_ROOT not in path.parents or "site-packages" in path.parts:
+        return None
+    return path
+
+def _local_imports(path: Path, module: str) -> List[str]:
+    """Modules imported anywhere in the file (relative imports resolved)."""
+    tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+    package = module if path.name == "__init__.py" else module.rpartition(".")[0]
+    names = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ""
+            if node.level:
+                parent = package.rsplit(".", node.level - 1)[0] if node.level > 1 else package
+                base = f"{parent}.{base}" if base else parent
+            names.append(base)
+            names += [f"{base}.{alias.name}" for alias in node.names]
+    return names
+
+def source_fingerprint(module: str) -> str:
+    """Hash of a module's source and of every repo-local module it imports, transitively."""
+    seen: Dict[str, Path] = {}
+    stack = [module]
+    while stack:
+        name = stack.pop()
+        if name in seen:
+            continue
+        path = _module_file(name)
+        if path is None:
+            continue
+        seen[name] = path
+        stack += _local_imports(path, name)
+    h = hashlib.sha256()
+    for name in sorted(seen):
+        h.update(name.encode())
+        h.update(seen[name].read_bytes())
+    return h.hexdigest()
+
+# ---------- Per-file partials ----------
+
+class PartialCache:
+    """
+    Results of func(path) for each input file, one Parquet file per key
+    (pickle when the frame has columns Arrow cannot store). The manifest
+    remembers which key each input had, so plan() can tell new, changed and
+    code-invalidated files apart.
+    """
+
+    def __init__(self, name: str, func: Callable[[Path], pd.DataFrame], deps: Iterable[Any] = (),
+                 params: Any = None, root: PathLike = DEFAULT_BUILD_DIR / "partials",
+                 enabled: Optional[bool] = None):
+        self.name = name
+        self.func = func
+        self.dir = Path(root) / name
+        if enabled is None:
+            enabled = os.environ.get("LFS_BUILD_CACHE", "1") != "0"
+        self.enabled = enabled
+        self._code_key = fingerprint(code_fingerprint(func, deps), params)
+        self._digests = DigestIndex(Path(root) / "digests.json")
+        self._manifest = _read_json(self.dir / "manifest.json")
+        self._seen: Dict[str, Dict[str, str]] = {}
+
+    def key(self, path: PathLike) -> str:
+        return fingerprint(self._code_key, self._digests.digest(path))
+
+    def _stored(self, key: str) -> Optional[Path]:
+        for suffix in (".parquet", ".pkl"):
+            file = self.dir / f"{key}{suffix}"
+            if file.exists():
+                return file
+        return None
+
+    def plan(self, files: Sequence[PathLike]) -> List[Tuple[str, str]]:
+        """(file, reason) for each input: cached | new file | content changed | code or parameters changed."""
+        out = []
+        for path in files:
+            previous = self._manifest.get(str(path))
+            if self.enabled and self._stored(self.key(path)):
+                reason = "cached"
+            elif previous is None:
+                reason = "new file"
+            elif previous["digest"] != self._digests.digest(path):
+                reason = "content changed"
+            else:
+                reason = "code or parameters changed"
+            out.append((str(path), reason))
+        return out
+
+    def removed(self, files: Sequence[PathLike]) -> List[str]:
+        """Inputs of the previous run that are gone from `files`."""
+        current = {str(f) for f in files}
+        return sorted(p for p in self._manifest if p not in current)
+
+    def _load(self, file: Path) -> pd.DataFrame:
+        if file.suffix == ".parquet":
+            return pd.read_parquet(file)
+        with open(file, "rb") as f:
+            return pickle.load(f)
+
+    def _store(self, key: str, frame: pd.DataFrame) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.dir / f"{key}.{os.getpid()}.tmp"
+        try:
+            frame.to_parquet(tmp, index=True)
+            suffix = ".parquet"
+        except (ImportError, ValueError, TypeError) as exc:
+            logger.debug("%s: storing %s as pickle (%s)", self.name, key[:12], exc)
+            with open(tmp, "wb") as f:
+                pickle.dump(frame, f, protocol=pickle.HIGHEST_PROTOCOL)
+            suffix = ".pkl"
+        tmp.replace(self.dir / f"{key}{suffix}")
+
+    def load_or_compute(self, path: PathLike) -> pd.DataFrame:
+        """func(path), from the cache when this file content was parsed by this code before."""
+        if not self.enabled:
+            return self.func(path)
+        key = self.key(path)
+        stored = self._stored(key)
+        if stored is not None:
+            logger.info("%s: cached  %s", self.name, Path(path).name)
+            frame = self._load(stored)
+        else:
+            logger.info("%s: parsing %s", self.name, Path(path).name)
+            frame = self.func(path)
+            self._store(key, frame)
+        self._seen[str(path)] = {"digest": self._digests.digest(path), "key": key}
+        return frame
+
+    def save(self) -> None:
+        """Persist the manifest of this run's inputs and drop partials no input refers to."""
+        if not self.enabled:
+            return
+        self._digests.save()
+        _write_json(self.dir / "manifest.json", self._seen)
+        live = {entry["key"] for entry in self._seen.values()}
+        for file in self.dir.glob("*"):
+            if file.suffix in (".parquet", ".pkl") and file.stem not in live:
+                file.unlink()
+        self._manifest = dict(self._seen)
+
+# ---------- Pipeline nodes ----------
+
+@dataclass
+class NodeState:
+    inputs: Dict[str, str]                   # path → sha256
+    code: str
+    params: str
+
+class BuildState:
+    """What each node last built from; nodes whose inputs, code and parameters are unchanged are up to date."""
+
+    def __init__(self, root: PathLike = DEFAULT_BUILD_DIR / "nodes"):
+        self.root = Path(root)
+        self._digests = DigestIndex(self.root / "digests.json")
+        self._code: Dict[str, str] = {}
+
+    def snapshot(self, node: Node) -> NodeState:
+        files = sorted({f for pattern in node.inputs for f in glob.glob(pattern)})
+        module = node.target.split(":")[0]
+        if module not in self._code:
+            self._code[module] = source_fingerprint(module)
+        return NodeState(inputs={f: self._digests.digest(f) for f in files},
+                         code=self._code[module],
+                         params=fingerprint(node.target, node.args, node.kwargs))
+
+    def load(self, name: str) -> Optional[NodeState]:
+        data = _read_json(self.root / f"{name}.json")
+        return NodeState(**data) if data else None
+
+    def record(self, node: Node) -> None:
+        _write_json(self.root / f"{node.name}.json", asdict(self.snapshot(node)))
+        self._digests.save()
+
+    def reasons(self, node: Node, upstream: Iterable[str] = ()) -> List[str]:
+        """Why `node` must run (empty when it is up to date); `upstream` are rebuilding dependencies."""
+        if not node.inputs:
+            return ["no declared inputs (always runs)"]
+        previous = self.load(node.name)
+        if previous is None:
+            return ["no previous build"]
+        current = self.snapshot(node)
+        reasons = []
+        new = current.inputs.keys() - previous.inputs.keys()
+        gone = previous.inputs.keys() - current.inputs.keys()
+        changed = [f for f in current.inputs.keys() & previous.inputs.keys()
+                   if current.inputs[f] != previous.inputs[f]]
+        if new:
+            reasons.append(f"new inputs: {_names(new)}")
+        if changed:
+            reasons.append(f"changed inputs: {_names(changed)}")
+        if gone:
+            reasons.append(f"removed inputs: {_names(gone)}")
+        if current.code != previous.code:
+            reasons.append("code changed")
+        if current.params != previous.params:
+            reasons.append("parameters changed")
+        missing = [p for p in node.outputs if not glob.glob(p)]
+        if missing:
+            reasons.append(f"missing outputs: {', '.join(missing)}")
+        upstream = sorted(upstream)
+        if upstream:
+            reasons.append(f"upstream rebuilds: {', '.join(upstream)}")
+        return reasons
+
+    def plan(self, nodes: Sequence[Node], targets: Optional[Iterable[str]] = None,
+             force: bool = False) -> Dict[str, List[str]]:
+        """node → rebuild reasons, in run order, for `targets` and their upstream nodes."""
+        by_name = {n.name: n for n in nodes}
+        graph = _prune(build_graph(nodes), targets)
+        plan: Dict[str, List[str]] = {}
+        for name in topological_order(graph):
+            if force:
+                plan[name] = ["forced"]
+                continue
+            plan[name] = self.reasons(by_name[name], [u for u in graph[name] if plan.get(u)])
+        self._digests.save()
+        return plan
@@ -0,0 +1,376 @@
+# columnar.py
+"""
+Typed Parquet twins of the prepared workbooks.
+
+Every prepared .xlsx also gets a Parquet dataset next to it, partitioned by
+domain (the workbook name) and FREQ:
+
+    assets/prepared/MCI.xlsx
+    assets/prepared/parquet/MCI/FREQ=M/part-0.parquet
+    assets/prepared/parquet/MCI/_meta.json        # column order, header rows, source mtime
+
+Dimensions are stored as categoricals and numbers as float64 (integer
+columns such as years stay int64). Object columns mixing numbers and text
+(e.g. a Value column with ':' markers) are split into a float64 column and
+a categorical "<name>__text" column, and put back together on read. SDMX
+header blocks (see xlsx_writer) go to _meta.json, not into the data.
+
+Consumers call read_table() with the workbook path: it reads the Parquet
+twin when it exists and is at least as new as the workbook, and falls back
+to pd.read_excel otherwise (no pyarrow, twin missing or stale), returning
+the same layout either way. _meta.json records the dtypes read_excel infers
+for each column (with and without the header block), and twin reads are
+cast back to them, so e.g. whole-number year columns come back int64 and
+text columns str:
+
+    write_parquet(df, "assets/prepared/HICP.xlsx", header_rows=[suffixes])
+    df = read_table("assets/prepared/HICP.xlsx")                  # header row first, as in the workbook
+    data = read_table("assets/prepared/HICP.xlsx", header_rows=False, categorical=True)
+
+Set LFS_PARQUET=0 to write and read the workbooks only. Workbooks written
+before the twins existed (or by hand) are backfilled with
+
+    python -m lfs_utils.columnar assets/prepared/*.xlsx
+
+which pipeline.py runs over the parsed LFS workbooks as its "twins" node.
+"""
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+import argparse
+import json
+import logging
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .tracing import traced
+except ImportError:                               # imported as a top-level module (lfs_utils on sys.path)
+    from tracing import traced
+
+logger = logging.getLogger(__name__)
+
+ENV = "LFS_PARQUET"
+PARQUET_DIR = "parquet"                           # under the workbook's directory
+PARTITION = "FREQ"
+ROW = "__row"                                     # original row order across partitions
+TEXT_SUFFIX = "__text"
+META = "_meta.json"
+
+PathLike = Union[str, Path]
+
+def enabled() -> bool:
+    return os.environ.get(ENV, "1") != "0"
+
+def parquet_path(path: PathLike) -> Path:
+    """Dataset directory of the Parquet twin of workbook `path`."""
+    path = Path(path)
+    return path.parent / PARQUET_DIR / path.stem
+
+def excel_column_names(header: Sequence[Any]) -> List[str]:
+    """Column names as pd.read_excel gives them: blanks → "Unnamed: i", repeats → "X.1"."""
+    columns, seen = [], {}
+    for i, h in enumerate(header):
+        name = f"Unnamed: {i}" if h is None or _missing(h) else h
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
+
+# ---------- Typing ----------
+
+def _numeric_mask(values: pd.Series) -> np.ndarray:
+    return np.fromiter((isinstance(v, (int, float, np.number)) and not isinstance(v, (bool, np.bool_))
+                        for v in values), dtype=bool, count=len(values))
+
+def typed(df: pd.DataFrame) -> tuple:
+    """
+    (frame with categorical dimensions and float64 values, names of the
+    columns split into number and text parts).
+    """
+    out: Dict[str, pd.Series] = {}
+    split: List[str] = []
+    for name in df.columns:
+        s = df[name]
+        key = str(name)
+        if pd.api.types.is_bool_dtype(s) or pd.api.types.is_datetime64_any_dtype(s) or isinstance(s.dtype, pd.CategoricalDtype):
+            out[key] = s
+        elif pd.api.types.is_integer_dtype(s) and not s.isna().any():
+            out[key] = s.astype("int64")
+        elif pd.api.types.is_numeric_dtype(s):
+            out[key] = s.astype("float64")
+        elif s.dtype != object:                   # pandas str dtype: all text
+            out[key] = s.astype("category")
+        else:
+            present = s.notna().to_numpy()
+            numeric = _numeric_mask(s) & present
+            text = present & ~numeric
+            if numeric.any() and not text.any():
+                out[key] = pd.to_numeric(s, errors="coerce").astype("float64")
+            elif numeric.any():
+                out[key] = pd.to_numeric(s.where(numeric), errors="coerce").astype("float64")
+                out[key + TEXT_SUFFIX] = s.where(text).astype("string").astype("category")
+                split.append(key)
+            else:
+                out[key] = s.where(present).astype("string").astype("category")
+    return pd.DataFrame(out, index=df.index), split
+
+def _plain(df: pd.DataFrame, split: Sequence[str], categorical: bool) -> pd.DataFrame:
+    """
+    Put split columns back together (whole numbers as ints, as read_excel
+    gives them in a mixed column); categoricals back to text unless
+    `categorical`.
+    """
+    for key in split:
+        text = df.pop(key + TEXT_SUFFIX).to_numpy(dtype=object, na_value=None)
+        merged = _excel_objects(df[[key]])[key].to_numpy(dtype=object, copy=True)
+        has_text = pd.notna(text)
+        merged[has_text] = text[has_text]
+        df[key] = merged
+    if not categorical:
+        for name in df.columns:
+            if isinstance(df[name].dtype, pd.CategoricalDtype):
+                df[name] = df[name].astype("str")
+    return df
+
+# ---------- Writing ----------
+
+def write_parquet(df: pd.DataFrame, path: PathLike, header_rows: Sequence[Sequence[Any]] = ()) -> Optional[Path]:
+    """
+    Write the Parquet twin of workbook `path` (call it right after the
+    workbook, so the twin counts as fresh). Returns the dataset directory,
+    or None when Parquet is off or the frame cannot be stored; readers then
+    fall back to the workbook.
+    """
+    if not enabled():
+        return None
+    target = parquet_path(path)
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        df = df.set_axis(excel_column_names(df.columns), axis=1)     # the names a workbook read gives
+        if len(set(map(str, df.columns))) != df.shape[1]:
+            raise ValueError("duplicate column names")
+        data, split = typed(df)
+        dtypes = _excel_dtypes(data, split)
+        header_dtypes = _excel_dtypes(data, split, header_rows) if len(header_rows) else None
+        data[ROW] = np.arange(len(data), dtype="int64")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+
+        if PARTITION in data.columns:
+            keys = data[PARTITION].astype(object).where(data[PARTITION].notna(), "_")
+            groups = [(f"{PARTITION}={value}", part) for value, part in data.groupby(keys.to_numpy(), sort=True)]
+        else:
+            groups = [("", data)]
+        for sub, part in groups:
+            directory = tmp / sub if sub else tmp
+            directory.mkdir(parents=True, exist_ok=True)
+            table = pa.Table.from_pandas(part.reset_index(drop=True), preserve_index=False)
+            pq.write_table(table, directory / "part-0.parquet", row_group_size=100_000)
+
+        source = Path(path)
+        meta = {
+            "source": source.name,
+            "source_mtime": source.stat().st_mtime if source.exists() else None,
+            "columns": [_json_value(c) for c in df.columns],      # as read_excel names them (2021, not "2021")
+            "split": split,
+            "header_rows": [[None if _missing(v) else _json_value(v) for v in row] for row in header_rows],
+            "rows": len(df),
+            "dtypes": dtypes,
+            "header_dtypes": header_dtypes,
+            "partitions": [sub for sub, _ in groups if sub],
+        }
+        (tmp / META).write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+
+        old = target.with_name(f"{target.name}.{os.getpid()}.old")
+        if target.exists():
+            target.replace(old)
+        tmp.replace(target)
+        shutil.rmtree(old, ignore_errors=True)
+    except (ImportError, ValueError, TypeError, NotImplementedError, OSError) as exc:   # Arrow errors subclass these
+        logger.warning("%s: no Parquet twin (%s); readers use the workbook", path, exc)
+        shutil.rmtree(tmp, ignore_errors=True)
+        return None
+    logger.info("Wrote Parquet twin %s (%d rows, %d partitions)", target, len(df), max(len(groups), 1))
+    return target
+
+def _excel_dtypes(data: pd.DataFrame, split: Sequence[str],
+                  header_rows: Sequence[Sequence[Any]] = ()) -> Dict[str, str]:
+    """The dtype read_excel infers for each column of the workbook, below `header_rows` if any."""
+    cells = _excel_objects(_plain(data.copy(), split, categorical=False))
+    if len(header_rows):
+        top = pd.DataFrame([[None if _missing(v) else v for v in row] for row in header_rows],
+                           columns=cells.columns, dtype=object)
+        cells = pd.concat([top, cells], ignore_index=True)
+    return {str(name): str(dtype) for name, dtype in cells.infer_objects().dtypes.items()}
+
+def _missing(value: Any) -> bool:
+    try:
+        return bool(pd.isna(value))
+    except (TypeError, ValueError):
+        return False
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    return value if isinstance(value, (str, int, float, bool)) else str(value)
+
+# ---------- Reading ----------
+
+def _fresh_meta(path: PathLike) -> Optional[Dict[str, Any]]:
+    """_meta.json of the twin of `path` if it can be used instead of the workbook."""
+    if not enabled():
+        return None
+    meta_file = parquet_path(path) / META
+    try:
+        meta = json.loads(meta_file.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    source = Path(path)
+    if source.exists() and (meta.get("source_mtime") is None or source.stat().st_mtime > meta["source_mtime"] + 1e-3):
+        logger.debug("%s: Parquet twin is older than the workbook", path)
+        return None
+    return meta
+
+def has_twin(path: PathLike) -> bool:
+    return _fresh_meta(path) is not None
+
+def _read_parts(directory: Path, meta: Dict[str, Any], freq: Optional[str]) -> pd.DataFrame:
+    import pyarrow.parquet as pq
+
+    if freq is not None and meta["partitions"]:
+        files = sorted((directory / f"{PARTITION}={freq}").glob("*.parquet"))
+    else:
+        files = sorted(directory.rglob("*.parquet"))
+    frames = [pq.read_table(f).to_pandas() for f in files]
+    if not frames:
+        return pd.DataFrame(columns=[str(c) for c in meta["columns"]])
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    if freq is not None and not meta["partitions"] and PARTITION in df.columns:
+        df = df[df[PARTITION].astype(object) == freq]
+    return df.sort_values(ROW, kind="stable").drop(columns=ROW).reset_index(drop=True)
+
+def _as_excel(df: pd.DataFrame, dtypes: Optional[Dict[str, str]]) -> pd.DataFrame:
+    """Cast columns to the dtypes recorded by write_parquet (categoricals stay as they are)."""
+    for name in df.columns:
+        want = (dtypes or {}).get(str(name))
+        col = df[name]
+        if want is None or str(col.dtype) == want or isinstance(col.dtype, pd.CategoricalDtype):
+            continue
+        df[name] = _excel_objects(df[[name]])[name] if want == "object" else col.astype(want)
+    return df
+
+def _excel_objects(df: pd.DataFrame) -> pd.DataFrame:
+    """What read_excel(dtype=object) gives: integral floats as ints, missing as NaN."""
+    out = df.astype(object)
+    for name in df.columns:
+        if pd.api.types.is_float_dtype(df[name]):
+            values = df[name].to_numpy()
+            whole = np.isfinite(values) & (values == np.floor(values))
+            if whole.any():
+                col = out[name].to_numpy(copy=True)
+                col[whole] = [int(v) for v in values[whole]]
+                out[name] = col
+    return out.where(df.notna(), np.nan)
+
+@traced("read")
+def read_table(path: PathLike, header_rows: bool = True, categorical: bool = False,
+               freq: Optional[str] = None, dtype: Any = None) -> pd.DataFrame:
+    """
+    The first sheet of workbook `path`, from its Parquet twin when fresh.
+
+    header_rows  keep the SDMX header block as the first rows (the workbook
+                 layout) or drop it
+    categorical  leave dimensions as categoricals (Parquet only)
+    freq         only rows of this FREQ
+    dtype        object: cells as read_excel(dtype=object) gives them
+    """
+    meta = _fresh_meta(path)
+    if meta is not None:
+        try:
+            df = _read_parts(parquet_path(path), meta, freq)
+        except (ImportError, ValueError, TypeError, KeyError, OSError) as exc:
+            logger.warning("%s: cannot read Parquet twin (%s); reading the workbook", path, exc)
+        else:
+            df = _plain(df, meta["split"], categorical and dtype is None)[[str(c) for c in meta["columns"]]]
+            df.columns = meta["columns"]
+            if header_rows and meta["header_rows"]:
+                top = pd.DataFrame(meta["header_rows"], columns=df.columns, dtype=object)
+                df = pd.concat([top, _excel_objects(df)], ignore_index=True)
+                return df if dtype is object else _as_excel(df, meta.get("header_dtypes"))
+            return _excel_objects(df) if dtype is object else _as_excel(df, meta.get("dtypes"))
+
+    df = pd.read_excel(path, dtype=dtype)
+    if not header_rows:
+        skip = len((meta or _any_meta(path) or {}).get("header_rows", []))
+        if skip:
+            # as read_excel would type the data block on its own
+            df = df.iloc[skip:].reset_index(drop=True)
+            df = df if dtype is object else df.infer_objects()
+    if freq is not None and PARTITION in df.columns:
+        df = df[df[PARTITION] == freq].reset_index(drop=True)
+    return df
+
+def _any_meta(path: PathLike) -> Optional[Dict[str, Any]]:
+    """The twin's _meta.json even when stale (for its header row count)."""
+    try:
+        return json.loads((parquet_path(path) / META).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+def iter_chunks(path: PathLike, chunk_size: int = 50_000) -> Iterator[pd.DataFrame]:
+    """
+    Row chunks of the first sheet (header rows included), one FREQ
+    partition at a time from the Parquet twin when fresh, else streamed
+    from the workbook. Partitions are not interleaved back into workbook
+    row order.
+    """
+    meta = _fresh_meta(path)
+    if meta is None:
+        from .io_utils import iter_excel_chunks
+        yield from iter_excel_chunks(Path(path), chunk_size=chunk_size)
+        return
+    directory = parquet_path(path)
+    if meta["header_rows"]:
+        yield pd.DataFrame(meta["header_rows"], columns=meta["columns"], dtype=object)
+    for freq in [p.split("=", 1)[1] for p in meta["partitions"]] or [None]:
+        part = _plain(_read_parts(directory, meta, freq), meta["split"], False)[meta["columns"]]
+        for start in range(0, len(part), chunk_size):
+            yield part.iloc[start:start + chunk_size]
+
+def backfill(workbooks: Sequence[PathLike], force: bool = False) -> str:
+    """
+    Write the twins of workbooks that lack a fresh one (the pipeline's
+    "twins" node, for workbooks no strategy writes through write_excel).
+    """
+    written, fresh, failed = [], [], []
+    for path in workbooks:
+        if has_twin(path) and not force:
+            fresh.append(path)
+            continue
+        # Header blocks of a workbook written elsewhere are unknown; they stay data rows
+        target = write_parquet(pd.read_excel(path), path)
+        (written if target else failed).append(path)
+        logger.info("%s: %s", path, target or "failed")
+    summary = f"{len(written)} written, {len(fresh)} fresh"
+    return summary + (f", failed: {', '.join(map(str, failed))}" if failed else "")
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Write Parquet twins of prepared workbooks.")
+    parser.add_argument("workbooks", nargs="+")
+    parser.add_argument("--force", action="store_true", help="rewrite twins that are already fresh")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    print(backfill(args.workbooks, force=args.force))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,313 @@
+# consistency.py
+"""
+Aggregate consistency: parts must add up to their totals.
+
+    python -m lfs_utils.consistency                         # every dataset in CATALOGUE
+    python -m lfs_utils.consistency lfs_ts_qq_03 BLA --show 20
+    python -m lfs_utils.consistency --report reports/consistency.md
+    python pipeline.py consistency                          # as the "consistency" node
+
+A Rule names a dimension, its total code and the codes of the parts, e.g.
+regions up to COUNTRY TOTAL, Males + Females up to Total, age bands up to
+all ages, NACE branches up to sectors, BLA urban/semi-urban/rural up to
+ALL. Every other column of the dataset (less the descriptive ones in
+`ignore`) identifies the cell, so within a dataset each rule is checked for
+every combination at once: the parts are summed with one groupby over
+those columns and joined to the totals on the same key. A discrepancy is a
+cell where
+
+    |sum(parts) - total| > atol * (n_parts + 1) + rtol * |total|
+
+atol allows for the rounding of published figures: half a unit of the last
+decimal for each of the n_parts summed values and for the total. Cells
+where the total or all the parts are missing are not compared (nor, for a
+`complete` rule, cells lacking any part: the regional tables switch
+divisions in 1988, so the NUTS 2 rule must not sum the three regions the
+old division shares with it); missing or repeated part codes are listed
+with each discrepancy, since they are the usual trace of a parser shifting
+rows (two "I" rows and no "L" in a NACE block, say).
+
+A dimension can also be a tuple of columns, for tables where the total sits
+on a different combination (Sex "YEAR TOTAL" with Age "Total" is
+"Males/Total Males" + "Females/Total Females"). Datasets are prepared
+workbooks (read through columnar.read_table, so the Parquet twin when
+fresh) or SDMX domains (sdmx_service.build_flow: codes, TIME_PERIOD,
+OBS_VALUE).
+"""
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+import argparse
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from .columnar import read_table
+from .sdmx_validate import LAYOUTS, PREPARED_DIR
+from .tracing import traced
+
+logger = logging.getLogger(__name__)
+
+REPORT_PATH = Path("reports/consistency.md")
+SEP = " / "                                       # joins the columns of a tuple dimension
+SHOW = 10                                         # discrepancies listed per rule
+
+Code = Union[str, Tuple[str, ...]]
+Where = Tuple[Tuple[str, Tuple], ...]             # ((column, (allowed values...)), ...)
+
+@dataclass(frozen=True)
+class Rule:
+    dimension: Union[str, Tuple[str, ...]]
+    total: Code
+    parts: Tuple[Code, ...]
+    where: Where = ()
+    name: str = ""
+    complete: bool = False                        # compare only cells where every part is present
+
+    @property
+    def label(self) -> str:
+        return self.name or f"{_join(self.dimension)}: {_join(self.total)}"
+
+@dataclass(frozen=True)
+class Dataset:
+    name: str
+    source: str                                   # workbook under assets/prepared, or an SDMX domain
+    rules: Tuple[Rule, ...]
+    value: str = "Value"
+    ignore: Tuple[str, ...] = ()                  # descriptive columns, not part of a cell's key
+    where: Where = ()
+    rtol: float = 1e-3
+    atol: float = 0.05                            # per summed value
+
+    @property
+    def domain(self) -> bool:
+        return self.source in LAYOUTS
+
+@dataclass
+class RuleResult:
+    dataset: str
+    rule: str
+    compared: int = 0
+    discrepancies: pd.DataFrame = field(default_factory=pd.DataFrame)
+
+    @property
+    def max_diff(self) -> float:
+        return float(self.discrepancies["diff"].abs().max()) if len(self.discrepancies) else 0.0
+
+def _join(code) -> str:
+    return SEP.join(code) if isinstance(code, tuple) else str(code)
+
+def _filter(df: pd.DataFrame, where: Where) -> pd.DataFrame:
+    for column, allowed in where:
+        df = df[df[column].isin(allowed)]
+    return df
+
+# ---------- engine ----------
+
+def check_rule(df: pd.DataFrame, keys: Sequence[str], value: str, rule: Rule,
+               rtol: float = 1e-3, atol: float = 0.05) -> Tuple[int, pd.DataFrame]:
+    """
+    Compare sum(parts) with the total for every combination of the other
+    key columns. Returns (cells compared, discrepancies) with the key
+    columns, total, parts_sum, diff, n_parts and missing/repeated parts.
+    """
+    df = _filter(df, rule.where)
+    dims = list(rule.dimension) if isinstance(rule.dimension, tuple) else [rule.dimension]
+    other = [k for k in keys if k not in dims]
+    if isinstance(rule.dimension, tuple):
+        code = df[dims[0]].astype(str)
+        for column in dims[1:]:
+            code = code + SEP + df[column].astype(str)
+    else:
+        code = df[rule.dimension].astype(str)
+    parts = [_join(p) for p in rule.parts]
+    is_part, is_total = code.isin(parts).to_numpy(), (code == _join(rule.total)).to_numpy()
+    if not is_part.any() or not is_total.any():
+        return 0, pd.DataFrame()
+
+    part_rows = df.loc[is_part, other].assign(_code=code[is_part].to_numpy(), _value=df.loc[is_part, value])
+    grouped = part_rows.groupby(other, dropna=False, sort=False)
+    sums = pd.DataFrame({"parts_sum": grouped["_value"].sum(min_count=1), "n_parts": grouped["_value"].count()})
+    totals = (df.loc[is_total, other].assign(total=df.loc[is_total, value])
+              .groupby(other, dropna=False, sort=False)["total"].first())
+    cells = sums.join(totals, how="inner").dropna(subset=["total", "parts_sum"])
+    if rule.complete:
+        cells = cells[cells["n_parts"] >= len(parts)]
+    diff = cells["parts_sum"] - cells["total"]
+    bad = diff.abs() > atol * (cells["n_parts"] + 1) + rtol * cells["total"].abs()
+    out = cells[bad].assign(diff=diff[bad])
+    if len(out):
+        # part codes present per flagged cell (flagged cells only, so this stays small)
+        flagged = part_rows.merge(out.index.to_frame(index=False), on=other, how="inner")
+        seen = flagged.groupby(other, dropna=False, sort=False)["_code"].agg(list)
+        out = out.join(seen.rename("_seen"))
+        out["missing"] = [", ".join(p for p in parts if p not in s) for s in out["_seen"]]
+        out["repeated"] = [", ".join(sorted({c for c in s if s.count(c) > 1})) for s in out["_seen"]]
+        out = out.drop(columns="_seen").reset_index()
+    return len(cells), out
+
+def load(dataset: Dataset, prepared_dir: Path = PREPARED_DIR) -> Tuple[pd.DataFrame, List[str]]:
+    """Rows of a dataset (value numeric) and its key columns."""
+    if dataset.domain:
+        from .sdmx_service import build_flow
+
+        flow = build_flow(dataset.source, prepared_dir=prepared_dir)
+        df = flow.frame(np.arange(len(flow)))
+    else:
+        df = read_table(Path(prepared_dir) / dataset.source, header_rows=False)
+    df = _filter(df, dataset.where)
+    df = df.assign(**{dataset.value: pd.to_numeric(df[dataset.value], errors="coerce")})
+    keys = [c for c in df.columns if c != dataset.value and c not in dataset.ignore]
+    return df, keys
+
+@traced("validate")
+def check_dataset(dataset: Dataset, prepared_dir: Path = PREPARED_DIR) -> List[RuleResult]:
+    df, keys = load(dataset, prepared_dir)
+    results = []
+    for rule in dataset.rules:
+        compared, bad = check_rule(df, keys, dataset.value, rule, dataset.rtol, dataset.atol)
+        results.append(RuleResult(dataset.name, rule.label, compared, bad))
+    return results
+
+# ---------- catalogue ----------
+
+NUTS2 = ("Anatoliki Makedonia-Thraki", "Kentriki Makedonia", "Dytiki Makedonia", "Ipeiros", "Thessalia",
+         "Ionia Nissia", "Dytiki Ellada", "Sterea Ellada", "Attiki", "Peloponnisos", "Voreio Aigaio",
+         "Notio Aigaio", "Kriti")
+REGIONS_1981 = ("Anatoliki Sterea & Nissia", "Kentriki & Dytiki Makedonia", "Peloponissos & Dytiki Sterea",
+                "Thessalia", "Anatoliki Makedonia", "Kriti", "Ipeiros", "Thraki", "Nissia Anatolikou Aigaiou")
+NUTS2_CODES = ("EL30", "EL11", "EL12", "EL13", "EL21", "EL14", "EL24", "EL22", "EL23", "EL25", "EL41", "EL42", "EL43")
+AGE_BANDS = ("15-19", "20-24", "25-29", "30-44", "45-64", "65+")
+NACE2_SECTORS = {"Primary sector": ("A",), "Secondary sector": ("B", "C", "D", "E", "F"),
+                 "Tertiary sector": ("G", "H", "I", "J", "K", "L", "M", "N", "O", "P", "Q", "R", "S", "T", "U")}
+NACE1_SECTORS = {"Primary sector": ("A", "B"), "Secondary sector": ("C", "D", "E", "F"),
+                 "Tertiary sector": ("G", "H", "I", "J", "K", "L", "M", "N", "O", "P", "Q")}
+TS_ATTRIBUTES = ("YEAR", "QUARTER", "QUARTER_NUM", "OBS_STATUS", "UNIT_MULT", "DECIMALS", "UNIT", "FREQ")
+
+REGIONS = (
+    Rule("Region", "COUNTRY TOTAL", NUTS2, complete=True, name="Region: NUTS 2 → COUNTRY TOTAL"),
+    Rule("Region", "COUNTRY TOTAL", REGIONS_1981, complete=True, name="Region: 1981 division → COUNTRY TOTAL"),
+)
+
+def _sex_age(sex: str, age: str, males: str, females: str) -> Tuple[Rule, ...]:
+    """Sex × age tables: bands up to each sex's total, and the sexes up to the overall total."""
+    bands = ("14",) + AGE_BANDS                   # "14" only in the years the survey started at 14
+    return (
+        Rule(age, "Total Males", bands, where=((sex, (males,)),), name=f"{age}: bands → Total {males}"),
+        Rule(age, "Total Females", bands, where=((sex, (females,)),), name=f"{age}: bands → Total {females}"),
+        Rule((sex, age), ("YEAR TOTAL", "Total"), ((males, "Total Males"), (females, "Total Females")),
+             name=f"{sex}: {males} + {females} → YEAR TOTAL"),
+    )
+
+CATALOGUE: Tuple[Dataset, ...] = (
+    Dataset("lfs_popul_regio", "lfs_popul_regio_parsed.xlsx", (
+        *REGIONS,
+        Rule("Sex", "Total", ("Males", "Females")),
+        Rule("Age_Group", "_Z", ("0-14",) + AGE_BANDS),
+        Rule("Nationality", "_Z", ("Greek", "EU country", "Other")),
+        Rule("Marital_Status", "_Z", ("Single", "Married", "Widowed, divorced      or legally separated")),
+    )),
+    Dataset("lfs_status_sexage", "lfs_status_sexage_parsed.xlsx", _sex_age("Sex", "Age_Group", "Males", "Females"),
+            where=(("Unit_of_Measure", ("persons",)),)),
+    Dataset("lfs_educ_sexage", "lfs_educ_sexage_parsed.xlsx", _sex_age("Sex", "Age_Group", "Males", "Females")),
+    Dataset("lfs_emp_sexage", "lfs_emp_sexage_parsed.xlsx", _sex_age("Sex", "Age", "Men", "Women")),
+    Dataset("lfs_job_sexage", "lfs_job_sexage_parsed.xlsx", _sex_age("Sex", "Age_Group", "Men", "Women")),
+    Dataset("lfs_une_sexage", "lfs_une_sexage_parsed.xlsx", _sex_age("Sex", "Age", "Males", "Females")),
+    Dataset("lfs_educ_regio", "lfs_educ_regio_parsed.xlsx", REGIONS),
+    Dataset("lfs_emp_regio", "lfs_emp_regio_parsed.xlsx", REGIONS),
+    Dataset("lfs_job_regio", "lfs_job_regio_parsed.xlsx", REGIONS),
+    Dataset("lfs_une_regio", "lfs_une_regio_parsed.xlsx", REGIONS),
+    Dataset("lfs_ts_qq_2a", "lfs_ts_qq_2a_parsed.xlsx", (
+        Rule("SEX_CODE", "TOT", ("M", "F")),
+        Rule("AGE", "TOTAL", ("15-19", "20-24", "25-29", "30-44", "45-64", "65 +")),
+        Rule("INDICATOR_CODE", "LF", ("EMP", "UNE")),
+        Rule("INDICATOR_CODE", "POP", ("LF", "INACT")),
+    ), value="OBS_VALUE", ignore=TS_ATTRIBUTES + ("AGE_CODE", "SEX")),
+    Dataset("lfs_ts_qq_03", "lfs_ts_qq_03_parsed.xlsx", (
+        Rule("ACTIVITY_CODE", "Total employed", ("Primary sector", "Secondary sector", "Tertiary sector"),
+             where=(("SECTOR_TYPE_CODE", ("AGG",)),), name="sectors → Total employed"),
+        *[Rule("ACTIVITY_CODE", "Total employed", tuple(c for codes in sectors.values() for c in codes),
+               where=(("SECTOR_TYPE_CODE", ("BRANCH",)), ("NACE_VERSION_CODE", (version,))),
+               name=f"{version} branches → Total employed")
+          for version, sectors in (("NACE1", NACE1_SECTORS), ("NACE2", NACE2_SECTORS))],
+        *[Rule("ACTIVITY_CODE", sector, branches, where=(("NACE_VERSION_CODE", (version,)),),
+               name=f"{version} branches → {sector}")
+          for version, sectors in (("NACE1", NACE1_SECTORS), ("NACE2", NACE2_SECTORS))
+          for sector, branches in sectors.items()],
+    ), value="OBS_VALUE", ignore=TS_ATTRIBUTES + ("ACTIVITY_CODE_SDMX", "ACTIVITY_NAME", "NACE_VERSION",
+                                                  "SECTOR_TYPE", "SECTOR_TYPE_CODE")),
+    Dataset("lfs_ts_qq_05", "lfs_ts_qq_05_parsed.xlsx", (
+        Rule("OCCUPATIONAL_STATUS_CODE", "TOT", ("EMP", "OAW", "SAL", "UFW")),
+    ), value="OBS_VALUE", ignore=TS_ATTRIBUTES + ("OCCUPATIONAL_STATUS", "OCCUPATIONAL_STATUS_NAME", "DATA_TYPE"),
+       where=(("DATA_TYPE_CODE", ("ABS",)),)),
+    Dataset("BLA", "BLA", (
+        Rule("URBAN_STATUS", "ALL", ("URBAN", "SEMI_URBAN", "RURAL")),
+        Rule("REGION", "EL", NUTS2_CODES, where=(("REGIONAL_UNIT", ("_Z",)),)),
+    ), value="OBS_VALUE"),
+)
+
+# ---------- report ----------
+
+def format_report(results: Sequence[RuleResult], show: int = SHOW) -> str:
+    lines = ["# Aggregate consistency", "",
+             "| dataset | rule | cells | discrepancies | max abs diff |", "|---|---|---:|---:|---:|"]
+    for r in results:
+        lines.append(f"| {r.dataset} | {r.rule} | {r.compared:,} | {len(r.discrepancies):,} | {r.max_diff:,.2f} |")
+    for r in results:
+        if not len(r.discrepancies):
+            continue
+        worst = r.discrepancies.reindex(r.discrepancies["diff"].abs().sort_values(ascending=False).index)
+        lines += ["", f"## {r.dataset} — {r.rule}", "", "```", worst.head(show).to_string(index=False), "```"]
+        if len(worst) > show:
+            lines.append(f"... and {len(worst) - show:,} more")
+    return "\n".join(lines) + "\n"
+
+def run(names: Optional[Sequence[str]] = None, prepared_dir: Path = PREPARED_DIR) -> List[RuleResult]:
+    wanted = {n.lower() for n in names or ()}
+    results = []
+    for dataset in CATALOGUE:
+        if wanted and dataset.name.lower() not in wanted:
+            continue
+        try:
+            results.extend(check_dataset(dataset, prepared_dir))
+        except (OSError, KeyError, LookupError) as e:
+            logger.warning("%s: not checked (%s)", dataset.name, e)
+    return results
+
+def report(path: Path = REPORT_PATH) -> str:
+    """Check the whole catalogue and write the Markdown report; returns a one-line summary."""
+    results = run()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(format_report(results), encoding="utf-8")
+    failing = sorted({r.dataset for r in results if len(r.discrepancies)})
+    return f"discrepancies in {', '.join(failing)}" if failing else "all totals consistent"
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check that parts add up to totals in the prepared outputs.")
+    parser.add_argument("datasets", nargs="*", help=f"datasets (default: all of {', '.join(d.name for d in CATALOGUE)})")
+    parser.add_argument("--report", help="write the Markdown report here")
+    parser.add_argument("--show", type=int, default=3, help="discrepancies printed per rule")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    started = time.perf_counter()
+    results = run(args.datasets)
+    for r in results:
+        mark = "xx" if len(r.discrepancies) else "ok"
+        print(f"{mark} {r.dataset:18s} {r.rule:45s} {r.compared:>7,} cells  {len(r.discrepancies):>6,} discrepancies")
+        if len(r.discrepancies) and args.show:
+            worst = r.discrepancies.reindex(r.discrepancies["diff"].abs().sort_values(ascending=False).index)
+            for line in worst.head(args.show).to_string(index=False).splitlines():
+                print(f"     {line[:160]}")
+    bad = sum(len(r.discrepancies) for r in results)
+    print(f"{len(results)} rules, {sum(r.compared for r in results):,} cells, {bad:,} discrepancies "
+          f"({time.perf_counter() - started:.1f}s)")
+    if args.report:
+        Path(args.report).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.report).write_text(format_report(results), encoding="utf-8")
+    return 1 if bad else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
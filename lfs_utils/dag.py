@@ -0,0 +1,241 @@
+# dag.py
+"""
+Dependency-aware parallel runner for pipeline steps.
+
+Each Node names an importable target ("module:function"), the files it reads
+(`inputs`, glob patterns) and the files it writes (`outputs`). Edges are the
+explicit `deps` plus every producer whose outputs overlap a node's inputs.
+Ready nodes are submitted to a process pool as soon as their dependencies
+finish, so independent steps run side by side; the dependents of a failed
+node are skipped, and nodes passed as `done` (up to date, see
+build_cache.BuildState) are reported as cached without running. run_dag()
+returns one NodeResult per node and timing_report() renders them (wall time,
+busy time, parallel speed-up and the critical path).
+"""
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass
+from fnmatch import fnmatch
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import glob
+import importlib
+import logging
+import os
+import time
+import traceback
+
+from . import metrics, tracing
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class Node:
+    name: str
+    target: str                              # "module:function"
+    inputs: Tuple[str, ...] = ()             # glob patterns
+    outputs: Tuple[str, ...] = ()            # paths (or patterns) written
+    deps: Tuple[str, ...] = ()               # explicit upstream nodes
+    args: Tuple[Any, ...] = ()
+    kwargs: Tuple[Tuple[str, Any], ...] = ()
+
+@dataclass
+class NodeResult:
+    name: str
+    status: str                              # ok | cached | failed | skipped
+    seconds: float = 0.0
+    start: float = 0.0                       # offset from the run start
+    pid: Optional[int] = None
+    error: Optional[str] = None
+    detail: Optional[str] = None
+
+# ---------- Graph ----------
+
+def _overlaps(a: str, b: str) -> bool:
+    return a == b or fnmatch(a, b) or fnmatch(b, a)
+
+def build_graph(nodes: Sequence[Node]) -> Dict[str, Set[str]]:
+    """name → upstream node names (explicit deps + output/input overlaps)."""
+    by_name = {n.name: n for n in nodes}
+    if len(by_name) != len(nodes):
+        raise ValueError("duplicate node names")
+    graph: Dict[str, Set[str]] = {}
+    for node in nodes:
+        unknown = [d for d in node.deps if d not in by_name]
+        if unknown:
+            raise ValueError(f"{node.name}: unknown dependencies {unknown}")
+        upstream = set(node.deps)
+        for other in nodes:
+            if other.name != node.name and any(
+                    _overlaps(out, inp) for out in other.outputs for inp in node.inputs):
+                upstream.add(other.name)
+        graph[node.name] = upstream
+    return graph
+
+def topological_order(graph: Dict[str, Set[str]]) -> List[str]:
+    order: List[str] = []
+    state: Dict[str, int] = {}
+
+    def visit(name: str, path: Tuple[str, ...]) -> None:
+        if state.get(name) == 2:
+            return
+        if state.get(name) == 1:
+            raise ValueError(f"dependency cycle: {' -> '.join(path + (name,))}")
+        state[name] = 1
+        for up in sorted(graph[name]):
+            visit(up, path + (name,))
+        state[name] = 2
+        order.append(name)
+
+    for name in graph:
+        visit(name, ())
+    return order
+
+def _prune(graph: Dict[str, Set[str]], start: Optional[Iterable[str]]) -> Dict[str, Set[str]]:
+    """Sub-graph of `start` and everything upstream of it."""
+    if start is None:
+        return graph
+    keep: Set[str] = set()
+    stack = list(start)
+    while stack:
+        name = stack.pop()
+        if name not in graph:
+            raise KeyError(f"unknown node {name!r}")
+        if name not in keep:
+            keep.add(name)
+            stack.extend(graph[name])
+    return {n: graph[n] & keep for n in graph if n in keep}
+
+def missing_inputs(node: Node, upstream: Iterable[Node]) -> List[str]:
+    """Input patterns matching no file and produced by no upstream node."""
+    produced = [out for up in upstream for out in up.outputs]
+    return [p for p in node.inputs
+            if not glob.glob(p) and not any(_overlaps(out, p) for out in produced)]
+
+# ---------- Execution ----------
+
+def _execute(node: Node) -> Tuple[float, float, int, Optional[str], Optional[str]]:
+    """Worker: import and call the node's target; (start time, seconds, pid, error, detail)."""
+    started = time.time()
+    t0 = time.perf_counter()
+    error = detail = None
+    try:
+        module, func = node.target.split(":")
+        with metrics.domain(node.name), tracing.stage("node", node.name):
+            result = getattr(importlib.import_module(module), func)(*node.args, **dict(node.kwargs))
+        if result is False:
+            error = "returned False"
+        elif isinstance(result, str):
+            detail = result
+    except BaseException as exc:   # strategies may sys.exit()
+        error = f"{type(exc).__name__}: {exc}\n{traceback.format_exc(limit=5)}"
+    if tracing.enabled():
+        tracing.flush()            # pool workers exit without running atexit handlers
+    metrics.flush()
+    return started, time.perf_counter() - t0, os.getpid(), error, detail
+
+def _missing_outputs(node: Node) -> List[str]:
+    """
+    Output patterns matching no file. An output older than the run is fine:
+    memoized stages and no-op ingests legitimately leave theirs untouched.
+    """
+    return [pattern for pattern in node.outputs if not glob.glob(pattern)]
+
+def run_dag(nodes: Sequence[Node], targets: Optional[Iterable[str]] = None,
+            max_workers: Optional[int] = None, done: Iterable[str] = (),
+            on_success: Optional[Callable[[Node], None]] = None) -> List[NodeResult]:
+    """
+    Run `targets` (default: all nodes) and their upstream nodes, in parallel
+    where possible. Nodes in `done` are not run; on_success(node) is called
+    in this process after each node that completes.
+    """
+    by_name = {n.name: n for n in nodes}
+    graph = _prune(build_graph(nodes), targets)
+    order = topological_order(graph)
+    done = set(done)
+    pending = {name: set(graph[name]) for name in order}
+    results: Dict[str, NodeResult] = {}
+    running: Dict[Future, str] = {}
+    t_run = time.time()
+
+    def skip_downstream(failed: str) -> None:
+        for name in order:
+            if name not in results and failed in graph[name]:
+                results[name] = NodeResult(name, "skipped", error=f"upstream {failed} failed")
+                pending.pop(name, None)
+                skip_downstream(name)
+
+    workers = max_workers or os.cpu_count() or 1
+    logger.info("Running %d nodes with %d workers", len(order), workers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            for name in [n for n in order if n in pending and not pending[n]]:
+                del pending[name]
+                node = by_name[name]
+                if name in done:
+                    results[name] = NodeResult(name, "cached", detail="up to date")
+                    for deps in pending.values():
+                        deps.discard(name)
+                    continue
+                missing = missing_inputs(node, [by_name[u] for u in graph[name]])
+                if missing:
+                    results[name] = NodeResult(name, "failed", error=f"no input matches {missing}")
+                    skip_downstream(name)
+                    continue
+                logger.info("▶ %s", name)
+                running[pool.submit(_execute, node)] = name
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                started, seconds, pid, error, detail = future.result()
+                missing = _missing_outputs(by_name[name]) if error is None else []
+                if missing:
+                    error = f"outputs missing: {missing}"
+                status = "failed" if error else "ok"
+                results[name] = NodeResult(name, status, seconds, started - t_run, pid, error, detail)
+                logger.info("%s %s (%.1fs)", "✓" if status == "ok" else "✗", name, seconds)
+                if error:
+                    logger.error("%s: %s", name, error.splitlines()[0])
+                    skip_downstream(name)
+                elif on_success is not None:
+                    on_success(by_name[name])
+                for deps in pending.values():
+                    deps.discard(name)
+    return [results[name] for name in order]
+
+# ---------- Reporting ----------
+
+def critical_path(results: Sequence[NodeResult], graph: Dict[str, Set[str]]) -> Tuple[float, List[str]]:
+    """Longest chain of node durations through the graph."""
+    seconds = {r.name: r.seconds for r in results}
+    best: Dict[str, Tuple[float, List[str]]] = {}
+    for name in topological_order({n: graph[n] & set(seconds) for n in seconds}):
+        up = max((best[u] for u in graph[name] if u in best), default=(0.0, []), key=lambda b: b[0])
+        best[name] = (up[0] + seconds[name], up[1] + [name])
+    return max(best.values(), default=(0.0, []), key=lambda b: b[0])
+
+def timing_report(results: Sequence[NodeResult], nodes: Sequence[Node], wall: float) -> str:
+    graph = build_graph(nodes)
+    busy = sum(r.seconds for r in results)
+    length, path = critical_path([r for r in results if r.status == "ok"], graph)
+    cached = [r.name for r in results if r.status == "cached"]
+    lines = [
+        "| Node | Status | Start (s) | Duration (s) | Worker | Note |",
+        "|---|---|---|---|---|---|",
+    ]
+    for r in sorted(results, key=lambda r: (r.status == "skipped", r.start)):
+        note = (r.error or r.detail or "").splitlines()[0] if (r.error or r.detail) else ""
+        lines.append(f"| {r.name} | {r.status} | {r.start:.1f} | {r.seconds:.1f} | {r.pid or ''} | {note} |")
+    lines += [
+        "",
+        f"- Wall time: {wall:.1f}s",
+        f"- Busy time (sum of nodes): {busy:.1f}s",
+        f"- Parallel speed-up: {busy / wall:.2f}x" if wall else "- Parallel speed-up: n/a",
+        f"- Critical path ({length:.1f}s): {' → '.join(path)}",
+    ]
+    if cached:
+        lines.append(f"- Up to date (not run): {', '.join(cached)}")
+    return "\n".join(lines) + "\n"
+
+def results_to_dicts(results: Sequence[NodeResult]) -> List[Dict[str, Any]]:
+    return [asdict(r) for r in results]
@@ -0,0 +1,114 @@
+# dedup.py
+"""
+Hash-based deduplication shared by all pipelines.
+
+Every row (or its key subset) is hashed to a 64-bit key once; duplicate
+counts, example rows, group sizes and the deduped frame are all derived from
+those keys in linear time, instead of separate duplicated()/groupby()/
+drop_duplicates() passes over the data.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .tracing import traced
+
+logger = logging.getLogger(__name__)
+
+KEEP_POLICIES = ("first", "last", "non_null")
+
+def row_hashes(df: pd.DataFrame, subset: Optional[Sequence[str]] = None) -> np.ndarray:
+    """64-bit hash per row of df[subset] (all columns when subset is None)."""
+    cols = df if subset is None else df[list(subset)]
+    return pd.util.hash_pandas_object(cols, index=False).to_numpy()
+
+@dataclass
+class DedupResult:
+    df: pd.DataFrame
+    input_rows: int
+    dropped_rows: int
+    duplicate_groups: int
+    rows_in_duplicate_groups: int
+    examples: pd.DataFrame
+    group_sizes: pd.DataFrame = field(repr=False)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "input_rows": self.input_rows,
+            "dropped_dupe_rows": self.dropped_rows,
+            "duplicate_groups": self.duplicate_groups,
+            "rows_in_duplicate_groups": self.rows_in_duplicate_groups,
+        }
+
+@traced("transform")
+def dedup(
+    df: pd.DataFrame,
+    subset: Optional[Sequence[str]] = None,
+    keep: str = "first",
+    value_col: Optional[str] = None,
+    header_rows: int = 0,
+    n_examples: int = 10,
+) -> DedupResult:
+    """
+    Drop rows whose `subset` key (default: all columns) repeats.
+
+    keep: "first" / "last" occurrence, or "non_null" — the first row of each
+          group whose `value_col` is not null (first row if all are null).
+    header_rows: leading rows (e.g. SDMX header blocks) kept untouched and
+          excluded from the key space.
+    """
+    if keep not in KEEP_POLICIES:
+        raise ValueError(f"keep must be one of {KEEP_POLICIES}, got {keep!r}")
+    if keep == "non_null" and value_col is None:
+        raise ValueError("keep='non_null' needs value_col")
+
+    body = df.iloc[header_rows:] if header_rows else df
+    n = len(body)
+    subset = list(subset) if subset is not None else list(body.columns)
+
+    # One hash pass, one factorize pass: group id per row, in order of first appearance
+    groups, _ = pd.factorize(row_hashes(body, subset))
+    counts = np.bincount(groups) if n else np.zeros(0, dtype=np.int64)
+    n_groups = len(counts)
+    pos = np.arange(n)
+
+    if keep == "last":
+        chosen = np.full(n_groups, -1, dtype=np.int64)
+        np.maximum.at(chosen, groups, pos)
+    else:
+        chosen = np.full(n_groups, n, dtype=np.int64)
+        np.minimum.at(chosen, groups, pos)
+        if keep == "non_null":
+            notnull = body[value_col].notna().to_numpy()
+            first_valid = np.full(n_groups, n, dtype=np.int64)
+            np.minimum.at(first_valid, groups[notnull], pos[notnull])
+            chosen = np.where(first_valid < n, first_valid, chosen)
+
+    keep_mask = np.zeros(n, dtype=bool)
+    keep_mask[chosen] = True
+    in_dup_group = counts[groups] > 1
+
+    out = body[keep_mask]
+    if header_rows:
+        out = pd.concat([df.iloc[:header_rows], out], ignore_index=True)
+
+    dup_ids = np.flatnonzero(counts > 1)
+    top = dup_ids[np.argsort(-counts[dup_ids], kind="stable")][:n_examples]
+    group_sizes = body.iloc[chosen[top]][subset].assign(count=counts[top]).reset_index(drop=True)
+
+    result = DedupResult(
+        df=out,
+        input_rows=n,
+        dropped_rows=n - int(keep_mask.sum()),
+        duplicate_groups=len(dup_ids),
+        rows_in_duplicate_groups=int(in_dup_group.sum()),
+        examples=body[in_dup_group].head(n_examples),
+        group_sizes=group_sizes,
+    )
+    logger.info("Dedup on %d key columns: %d rows, %d groups duplicated, dropped %d (keep=%s)",
+                len(subset), n, result.duplicate_groups, result.dropped_rows, keep)
+    return result
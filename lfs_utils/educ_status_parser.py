@@ -8,6 +8,11 @@ import numpy as np
 from typing import Dict, List, Tuple, Any, Optional
 import logging
 
+try:
+    from .tracing import traced
+except ImportError:                      # imported as a top-level module (lfs_utils on sys.path)
+    from tracing import traced
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -19,6 +24,7 @@ class EDUCStatusParser:
         self.dimensions = {}
         self.data_records = []
         
+    @traced("parse")
     def parse_sheet(self, analysis: Dict[str, Any]) -> pd.DataFrame:
         """
         Parse EDUC-Status sheet into wide SDMX format
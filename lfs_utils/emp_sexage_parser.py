@@ -18,6 +18,15 @@ import logging
 from typing import Dict, List, Tuple
 from advanced_sheet_analyzer import AdvancedSheetAnalyzer
 
+try:
+    from . import metrics
+    from .columnar import write_parquet
+    from .tracing import traced
+except ImportError:                      # imported as a top-level module (lfs_utils on sys.path)
+    import metrics
+    from columnar import write_parquet
+    from tracing import traced
+
 class EMPSexAgeParser:
     """
     Parser for EMP-SexAge sheet with employment characteristics organization.
@@ -29,6 +38,7 @@ class EMPSexAgeParser:
         self.logger = logging.getLogger(__name__)
         self.analyzer = AdvancedSheetAnalyzer()
 
+    @traced("parse")
     def parse_sheet(self, analysis: Dict) -> pd.DataFrame:
         """
         Parse the EMP-SexAge sheet into SDMX wide format
@@ -50,6 +60,7 @@ class EMPSexAgeParser:
 
         # Read the Excel file
         df = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
+        metrics.sheet_read(df)
 
         # Extract the three levels correctly (same as JOB-SexAge, JOB-Regio, JOB-Occup, JOB-Sector, OCCUP-Demo, and SECTOR-Demo)
         row0_categories = df.iloc[0]
@@ -232,6 +243,7 @@ class EMPSexAgeParser:
 
         return parsed_df
 
+    @traced("transform")
     def transform_to_sdmx_wide_format(self, df):
         """
         Transform the parsed data to SDMX wide format with proper column structure.
@@ -325,6 +337,7 @@ class EMPSexAgeParser:
 
         return wide_df
 
+    @traced("write")
     def _save_parsed_data(self, parsed_df: pd.DataFrame, wide_df: pd.DataFrame, analysis: Dict):
         """Save the parsed data to Excel files"""
         file_path = analysis['file_path']
@@ -338,6 +351,7 @@ class EMPSexAgeParser:
         with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
             wide_df.to_excel(writer, sheet_name='Sheet1', index=False)  # Primary sheet with wide format
             parsed_df.to_excel(writer, sheet_name='Parsed_Data', index=False)  # Long format as secondary sheet
+        write_parquet(wide_df, output_path)  # typed twin of Sheet1
 
         print(f"Saved parsed data to: {output_path}")
         print(f"  - Parsed data: {len(parsed_df)} records")
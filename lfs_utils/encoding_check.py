@@ -0,0 +1,345 @@
+# encoding_check.py
+"""
+Non-ASCII text check over the prepared outputs.
+
+    python -m lfs_utils.encoding_check                         # assets/prepared/*.xlsx + *.csv
+    python -m lfs_utils.encoding_check assets/prepared/LFS.xlsx -j 4 --report reports/encoding.md
+
+Every text cell of every sheet is checked, column names included, and each
+offending cell is reported by its workbook coordinates (sheet!C17) with the
+characters at fault, e.g. the Greek capital Mu in "Postgraduate degrees
+(Μaster / PhD)" or a "Σύνολο" total that slipped through a translation map.
+
+Workbooks are not loaded into frames. The shared strings are checked once
+per workbook (str.isascii over the distinct values); a sheet whose XML
+bytes are pure ASCII and which uses no failing shared string is skipped
+unparsed, and otherwise only the suspect cells are parsed: those enclosing
+a non-ASCII byte (inline strings) and those referencing a failing shared
+string. Their text is factorized, so each distinct failing value is
+scanned character by character once and its cells are located through the
+factorized codes.
+CSV files go through pd.read_csv and the same per-column scan
+(scan_frame). Files are checked in parallel, one process each.
+
+Exit status is 1 when any non-ASCII text is found.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import argparse
+import io
+import logging
+import os
+import re
+import time
+import zipfile
+
+import numpy as np
+import pandas as pd
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+PREPARED_DIR = Path("assets/prepared")
+PATTERNS = ("*.xlsx", "*.csv")
+SHOW = 5                                          # issues printed per file
+TEXT_KINDS = {"string", "mixed", "mixed-integer", "empty"}
+MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+CHAR_REF = re.compile(rb"&#(x[0-9a-fA-F]+|[0-9]+);")
+
+Char = Tuple[int, str, str]                       # position, character, U+XXXX
+
+def non_ascii_chars(text: str) -> List[Char]:
+    """Position, character and code point of each non-ASCII character."""
+    return [(i, ch, f"U+{ord(ch):04X}") for i, ch in enumerate(text) if ord(ch) > 127]
+
+def column_letter(index: int) -> str:
+    """0-based column index → spreadsheet letters (0 → A, 27 → AB)."""
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+@dataclass
+class Issue:
+    sheet: str
+    row: int                                      # 1-based spreadsheet row
+    col: int                                      # 0-based column index
+    column: str
+    value: str
+    chars: List[Char]
+
+    @property
+    def cell(self) -> str:
+        return f"{column_letter(self.col)}{self.row}"
+
+    def describe(self) -> str:
+        found = ", ".join(f"{ch!r} {code} at {pos}" for pos, ch, code in self.chars)
+        return f"{self.sheet}!{self.cell} [{self.column}] {self.value!r}: {found}"
+
+@dataclass
+class FileReport:
+    path: str
+    sheets: int = 0
+    cells: int = 0
+    issues: List[Issue] = field(default_factory=list)
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.issues
+
+def _failing(uniques) -> np.ndarray:
+    """Positions of the distinct values that are text and not pure ASCII."""
+    values = pd.Series(np.asarray(uniques, dtype=object), dtype=object)
+    if pd.api.types.infer_dtype(values, skipna=True) not in TEXT_KINDS:
+        return np.empty(0, dtype=np.int64)
+    return np.flatnonzero(values.str.isascii().eq(False).to_numpy())
+
+def _locate(codes: np.ndarray, bad: np.ndarray) -> Iterator[Tuple[int, int]]:
+    """(unique position, row) of every cell holding a failing value."""
+    hit = np.flatnonzero(np.isin(codes, bad))
+    return zip(codes[hit].tolist(), hit.tolist())
+
+def scan_frame(df: pd.DataFrame, sheet: str, first_row: int = 2) -> List[Issue]:
+    """
+    Non-ASCII cells of one sheet read with its column names as header:
+    names are row 1 and df row i is spreadsheet row first_row + i.
+    """
+    issues = []
+    for j, name in enumerate(df.columns):
+        label = str(name)
+        if not label.isascii():
+            issues.append(Issue(sheet, 1, j, label, label, non_ascii_chars(label)))
+    for j, name in enumerate(df.columns):
+        column = df.iloc[:, j]
+        if pd.api.types.is_numeric_dtype(column.dtype) or pd.api.types.is_datetime64_any_dtype(column.dtype):
+            continue
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            codes, uniques = column.cat.codes.to_numpy(), column.cat.categories
+        else:
+            codes, uniques = pd.factorize(column)
+        bad = _failing(uniques)
+        chars = {u: non_ascii_chars(str(uniques[u])) for u in bad.tolist()}
+        for u, i in _locate(codes, bad):
+            issues.append(Issue(sheet, first_row + i, j, str(name), str(uniques[u]), chars[u]))
+    issues.sort(key=lambda issue: (issue.row, issue.col))
+    return issues
+
+# ---------- .xlsx: text cells straight from the sheet XML ----------
+
+def _split_ref(ref: str) -> Tuple[int, int]:
+    """'AB12' → (12, 27): 1-based row, 0-based column."""
+    letters = ref.rstrip("0123456789")
+    col = 0
+    for ch in letters:
+        col = col * 26 + ord(ch) - 64
+    return int(ref[len(letters):]), col - 1
+
+def _sheet_parts(book: zipfile.ZipFile) -> List[Tuple[str, str]]:
+    """(sheet name, zip member) in workbook order."""
+    workbook = etree.fromstring(book.read("xl/workbook.xml"))
+    rels = etree.fromstring(book.read("xl/_rels/workbook.xml.rels"))
+    targets = {rel.get("Id"): rel.get("Target") for rel in rels}
+    parts = []
+    for sheet in workbook.iter(f"{MAIN_NS}sheet"):
+        target = targets[sheet.get(f"{REL_NS}id")]
+        parts.append((sheet.get("name"), target.lstrip("/") if target.startswith("/") else f"xl/{target}"))
+    return parts
+
+def _text(el) -> str:
+    return "".join(t.text or "" for t in el.iter(f"{MAIN_NS}t"))
+
+def _shared_strings(book: zipfile.ZipFile) -> List[str]:
+    try:
+        stream = book.open("xl/sharedStrings.xml")
+    except KeyError:
+        return []
+    strings = []
+    with stream:
+        for _, si in etree.iterparse(stream, tag=f"{MAIN_NS}si"):
+            strings.append(_text(si))
+            si.clear()
+    return strings
+
+def _cell_text(el, strings: Sequence[str]) -> Optional[str]:
+    kind = el.get("t")
+    if kind == "s":
+        return strings[int(el.findtext(f"{MAIN_NS}v"))]
+    if kind == "inlineStr":
+        return _text(el)
+    if kind == "str":
+        return el.findtext(f"{MAIN_NS}v") or ""
+    return None
+
+def _fragment(raw: bytes, start: int) -> Optional[bytes]:
+    """The <c>...</c> element starting at `start`, with the sheet's namespace (None if empty)."""
+    close = raw.find(b">", start)
+    if raw[close - 1:close] == b"/":
+        return None
+    end = raw.find(b"</c>", close)
+    return b'<c xmlns="%s"' % MAIN_NS[1:-1].encode() + raw[start + 2:end + 4]
+
+def _non_ascii_offsets(raw: bytes) -> np.ndarray:
+    """
+    Offsets of the non-ASCII bytes (first of each run) and of character
+    references above U+007F (openpyxl writes &#924; for 'Μ').
+    """
+    offsets = []
+    if not raw.isascii():
+        high = np.frombuffer(raw, dtype=np.uint8) >= 0x80
+        offsets.append(np.flatnonzero(high & ~np.concatenate(([False], high[:-1]))))
+    if b"&#" in raw:
+        offsets.append(np.array([m.start() for m in CHAR_REF.finditer(raw)
+                                 if (int(m.group(1)[1:], 16) if m.group(1)[:1] == b"x" else int(m.group(1))) > 127],
+                                dtype=np.int64))
+    return np.concatenate(offsets) if offsets else np.empty(0, dtype=np.int64)
+
+def _suspect_cells(raw: bytes, strings: Sequence[str], bad_shared: np.ndarray) -> List[Tuple[str, str]]:
+    """
+    (ref, text) of the cells that can hold non-ASCII text, found in the raw
+    bytes without parsing the sheet: cells enclosing a non-ASCII byte or
+    character reference (inline and formula strings) and cells referencing
+    a failing shared string.
+    """
+    starts = set()
+    for offset in _non_ascii_offsets(raw).tolist():
+        start = raw.rfind(b"<c ", 0, offset)
+        if start >= 0:
+            starts.add(start)
+    indices = np.flatnonzero(bad_shared)
+    if len(indices):
+        pattern = re.compile(rb'<c [^>]*\bt="s"[^>]*>\s*<v>(?:%s)</v>' % b"|".join(str(i).encode() for i in indices))
+        starts.update(m.start() for m in pattern.finditer(raw))
+    cells = []
+    for start in sorted(starts):
+        fragment = _fragment(raw, start)
+        if fragment is None:
+            continue
+        el = etree.fromstring(fragment)
+        text = _cell_text(el, strings)
+        if text is not None:
+            cells.append((el.get("r"), text))
+    return cells
+
+def _header(raw: bytes, strings: Sequence[str]) -> Dict[int, str]:
+    """Column index → text of row 1 (the column names)."""
+    start = raw.find(b"<row ")
+    end = raw.find(b"</row>", start)
+    if start < 0 or end < 0:
+        return {}
+    row = etree.fromstring(b'<row xmlns="%s"' % MAIN_NS[1:-1].encode() + raw[start + 4:end + 6])
+    if row.get("r") not in (None, "1"):
+        return {}
+    names = {}
+    for el in row.iter(f"{MAIN_NS}c"):
+        text = _cell_text(el, strings)
+        if text is not None:
+            names[_split_ref(el.get("r"))[1]] = text
+    return names
+
+def scan_xlsx(path: Path, report: "FileReport") -> None:
+    """Non-ASCII text cells of every sheet of a workbook, added to `report`."""
+    with zipfile.ZipFile(path) as book:
+        strings = _shared_strings(book)
+        bad_shared = np.zeros(len(strings), dtype=bool)
+        bad_shared[_failing(strings)] = True
+        for sheet, part in _sheet_parts(book):
+            raw = book.read(part)
+            report.sheets += 1
+            report.cells += raw.count(b"<c ")
+            if raw.isascii() and b"&#" not in raw and not bad_shared.any():
+                continue
+            cells = _suspect_cells(raw, strings, bad_shared)
+            if not cells:
+                continue
+            codes, uniques = pd.factorize(np.asarray([text for _, text in cells], dtype=object))
+            bad = _failing(uniques)
+            if not len(bad):
+                continue
+            header = _header(raw, strings)
+            chars = {u: non_ascii_chars(uniques[u]) for u in bad.tolist()}
+            found = []
+            for u, i in _locate(codes, bad):
+                row, col = _split_ref(cells[i][0])
+                found.append(Issue(sheet, row, col, header.get(col, column_letter(col)), uniques[u], chars[u]))
+            found.sort(key=lambda issue: (issue.row, issue.col))
+            report.issues.extend(found)
+
+def check_file(path) -> FileReport:
+    """All non-ASCII text cells of one workbook or CSV file."""
+    path = Path(path)
+    report = FileReport(str(path))
+    started = time.perf_counter()
+    try:
+        if path.suffix.lower() == ".csv":
+            df = pd.read_csv(path, dtype=object, keep_default_na=False, encoding="utf-8")
+            report.sheets, report.cells = 1, df.size
+            report.issues = scan_frame(df, path.stem)
+        else:
+            scan_xlsx(path, report)
+    except Exception as e:
+        report.error = f"{type(e).__name__}: {e}"
+    report.seconds = time.perf_counter() - started
+    return report
+
+def check_files(paths: Sequence, workers: Optional[int] = None) -> List[FileReport]:
+    """check_file over `paths`, in a process pool when there is more than one worker; input order kept."""
+    paths = [Path(p) for p in paths]
+    workers = min(workers or os.cpu_count() or 1, len(paths) or 1)
+    if workers == 1:
+        return [check_file(p) for p in paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(check_file, paths))
+
+def prepared_files(root: Path = PREPARED_DIR) -> List[Path]:
+    return sorted(p for pattern in PATTERNS for p in Path(root).glob(pattern) if not p.name.startswith("~$"))
+
+def format_report(reports: Sequence[FileReport]) -> str:
+    """Markdown: one summary table, then every offending cell per file."""
+    lines = ["# Encoding check", "", "| file | sheets | cells | non-ASCII | seconds |", "|---|---:|---:|---:|---:|"]
+    for r in reports:
+        status = r.error or str(len(r.issues))
+        lines.append(f"| {r.path} | {r.sheets} | {r.cells:,} | {status} | {r.seconds:.2f} |")
+    for r in reports:
+        if r.issues:
+            lines += ["", f"## {r.path}", ""] + [f"- {issue.describe()}" for issue in r.issues]
+    return "\n".join(lines) + "\n"
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Report non-ASCII text cells in the prepared outputs.")
+    parser.add_argument("files", nargs="*", help="workbooks/CSV files (default: assets/prepared/*.xlsx, *.csv)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="processes (default: CPU count)")
+    parser.add_argument("--report", help="write the full Markdown report here")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    started = time.perf_counter()
+    reports = check_files(args.files or prepared_files(), args.workers)
+    for r in reports:
+        if r.error:
+            print(f"!! {r.path}: {r.error}")
+        elif r.issues:
+            print(f"xx {r.path}: {len(r.issues)} non-ASCII cells")
+            for issue in r.issues[:SHOW]:
+                print(f"     {issue.describe()}")
+            if len(r.issues) > SHOW:
+                print(f"     ... and {len(r.issues) - SHOW} more")
+        else:
+            print(f"ok {r.path} ({r.cells:,} cells)")
+    bad = [r for r in reports if not r.ok]
+    print(f"{len(reports)} files, {sum(r.cells for r in reports):,} cells, "
+          f"{sum(len(r.issues) for r in reports):,} non-ASCII cells in {len(bad)} files "
+          f"({time.perf_counter() - started:.1f}s)")
+    if args.report:
+        Path(args.report).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.report).write_text(format_report(reports), encoding="utf-8")
+    return 1 if bad else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
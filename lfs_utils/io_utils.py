@@ -1,5 +1,36 @@
 from pathlib import Path
+from typing import Iterator
 import pandas as pd
 
+from .columnar import excel_column_names
+from .tracing import traced
+
+@traced("read")
 def read_excel(path: Path) -> pd.DataFrame:
     return pd.read_excel(path)
+
+def iter_excel_chunks(path: Path, chunk_size: int = 50_000, sheet_name=0) -> Iterator[pd.DataFrame]:
+    """
+    Stream a worksheet as DataFrames of at most chunk_size rows (first row is
+    the header), without materializing the whole sheet.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[sheet_name] if isinstance(sheet_name, int) else wb[sheet_name]
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = excel_column_names(header)
+        buf = []
+        for row in rows:
+            buf.append(row)
+            if len(buf) >= chunk_size:
+                yield pd.DataFrame.from_records(buf, columns=columns)
+                buf = []
+        if buf:
+            yield pd.DataFrame.from_records(buf, columns=columns)
+    finally:
+        wb.close()
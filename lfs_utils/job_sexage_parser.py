@@ -7,6 +7,15 @@ import pandas as pd
 import logging
 from typing import Dict, List, Any, Tuple
 
+try:
+    from . import metrics
+    from .columnar import write_parquet
+    from .tracing import traced
+except ImportError:                      # imported as a top-level module (lfs_utils on sys.path)
+    import metrics
+    from columnar import write_parquet
+    from tracing import traced
+
 class JOBSexAgeParser:
     """
     Parser for JOB-SexAge sheet with CORRECT three-level hierarchy mapping
@@ -15,6 +24,7 @@ class JOBSexAgeParser:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         
+    @traced("parse")
     def parse_sheet(self, analysis: Dict[str, Any]) -> pd.DataFrame:
         """
         Parse the JOB-SexAge sheet with CORRECT hierarchy mapping
@@ -26,6 +36,7 @@ class JOBSexAgeParser:
         
         # Read Excel without headers to see actual structure
         df = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
+        metrics.sheet_read(df)
         
         # Extract the three levels correctly
         # Row 0: First Category (main job characteristics)
@@ -307,6 +318,7 @@ class JOBSexAgeParser:
         
         print("\n" + "="*80)
 
+    @traced("transform")
     def transform_to_sdmx_wide_format(self, df):
         """
         Transform the parsed data to SDMX wide format with proper column structure.
@@ -400,6 +412,7 @@ class JOBSexAgeParser:
         
         return wide_df
 
+    @traced("write")
     def _save_parsed_data(self, parsed_df: pd.DataFrame, wide_df: pd.DataFrame, analysis: Dict[str, Any]):
         """
         Save both long and wide format data
@@ -409,11 +422,13 @@ class JOBSexAgeParser:
         # Save long format (original)
         long_file = "assets/prepared/lfs_job_sexage_parsed_long.xlsx"
         parsed_df.to_excel(long_file, index=False)
+        write_parquet(parsed_df, long_file)
         self.logger.info(f"Long format saved: {long_file}")
         
         # Save wide format (SDMX)
         wide_file = "assets/prepared/lfs_job_sexage_parsed.xlsx"
         wide_df.to_excel(wide_file, index=False)
+        write_parquet(wide_df, wide_file)
         self.logger.info(f"Wide format saved: {wide_file}")
         
         # Also save wide format as CSV for easier inspection
@@ -1,19 +1,53 @@
-from typing import Dict, Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
 import logging
+import os
+import time
 import pandas as pd
 
 from .config import Paths, RENAME_MAPS
-from .io_utils import read_excel
-from .transforms import standardize_columns, fill_na, clean_dataframe
-from .merge_utils import outer_merge_on_common, common_columns
+from .columnar import read_table
+from .transforms import standardize_columns, assemble_union
 
 logger = logging.getLogger(__name__)
 
 INVALID = "_Z"
 
+# Input keys of each flow, in output order
+FLOW_INPUTS: Dict[str, List[str]] = {
+    "educ":   ["lfs_educ_regio", "lfs_educ_sexage", "lfs_educ_status"],
+    "emp":    ["lfs_emp_regio", "lfs_emp_sexage"],
+    "job":    ["lfs_job_regio", "lfs_job_sexage", "lfs_job_occup"],
+    "demo":   ["lfs_occup_demo", "lfs_sector_demo"],
+    "popul":  ["lfs_popul_regio", "lfs_popul_status"],
+    "status": ["lfs_status_regio", "lfs_status_sexage"],
+}
+
+# Final, explicit column names (raw header -> name) and order for EMP
+EMP_NAMES: Dict[str, str] = {
+    "Year": "Year",
+    "Region": "Region",
+    "Total employed": "TOT_EMP",
+    "Undermployed part-time workers": "UNDERMP_PT_WORK",
+    "Undermployed part-time workers_subcategory": "UNDERMP_PT_WORK_SUB",
+    "Work for more than current  hours": "WORK_FOR_MORE_HOURS",
+    "Looking for another job and reasons for doing so": "LOOKING_FOR_ANOTHER_JOB",
+    "Have more than one job or business": "HAVE_MORE_THAN_ONE_JOB_OR_BUSINESS",
+    "Work without social security": "WORK_WITHOUT_SSN",
+    "E d u c a t I o n   l e v e l": "Education_Level_Main",
+    "E d u c a t I o n   l e v e l_subcategory": "Education_Level_Sub",
+    "Unit_of_Measure": "Unit_of_Measure",
+    "Value": "Value",
+    "Sex": "Sex",
+    "Age": "Age_Group",
+    "OBS_STATUS": "OBS_STATUS",
+}
+
+PRE_RENAMED = ["lfs_job_regio", "lfs_job_sexage", "lfs_job_occup", "lfs_occup_demo", "lfs_sector_demo"]
+
 def load_raw(paths: Paths) -> Dict[str, pd.DataFrame]:
     keys = list(paths.inputs.keys())
-    return {k: read_excel(paths.file(k)) for k in keys}
+    return {k: read_table(paths.file(k)) for k in keys}
 
 def rename_if_needed(df: pd.DataFrame, key: str) -> pd.DataFrame:
     m = RENAME_MAPS.get(key)
@@ -21,27 +55,18 @@ def rename_if_needed(df: pd.DataFrame, key: str) -> pd.DataFrame:
 
 def build_educ(d: Dict[str, pd.DataFrame]) -> Tuple[pd.DataFrame, Dict]:
     dfs = [d["lfs_educ_regio"], d["lfs_educ_sexage"], d["lfs_educ_status"]]
-    merged = outer_merge_on_common(dfs)
-    merged = fill_na(merged, INVALID)
-    cleaned, stats = clean_dataframe(merged, col_to_check="Value", invalid_value=INVALID)
-    return cleaned, stats
+    return assemble_union(dfs, value_col="Value", invalid_value=INVALID)
 
 def build_emp(d: Dict[str, pd.DataFrame]) -> Tuple[pd.DataFrame, Dict]:
-    merged = outer_merge_on_common([d["lfs_emp_regio"], d["lfs_emp_sexage"]])
-    merged = fill_na(merged, INVALID)
-    cleaned, stats = clean_dataframe(merged, col_to_check="Value", invalid_value=INVALID)
-
-    # Final, explicit column order for EMP (matches your list)
-    emp_names = [
-        'Year','Region','TOT_EMP','UNDERMP_PT_WORK','UNDERMP_PT_WORK_SUB','WORK_FOR_MORE_HOURS',
-        'LOOKING_FOR_ANOTHER_JOB','HAVE_MORE_THAN_ONE_JOB_OR_BUSINESS','WORK_WITHOUT_SSN',
-        'Education_Level_Main','Education_Level_Sub','Unit_of_Measure','Value','Sex','Age_Group'
-    ]
-    # Only rename if counts match to avoid silent misalignments
-    if len(cleaned.columns) == len(emp_names):
-        cleaned.columns = emp_names
-    else:
-        logger.warning("EMP column count mismatch: got %d expected %d", len(cleaned.columns), len(emp_names))
+    cleaned, stats = assemble_union([d["lfs_emp_regio"], d["lfs_emp_sexage"]],
+                                    value_col="Value", invalid_value=INVALID)
+
+    # Rename by name, never by position, so a new or missing column fails loudly
+    missing = [c for c in EMP_NAMES if c not in cleaned.columns]
+    extra = [c for c in cleaned.columns if c not in EMP_NAMES]
+    if missing or extra:
+        raise ValueError(f"EMP columns do not match EMP_NAMES: missing {missing}, unexpected {extra}")
+    cleaned = cleaned[list(EMP_NAMES)].rename(columns=EMP_NAMES)
     return cleaned, stats
 
 def build_job(d: Dict[str, pd.DataFrame]) -> Tuple[pd.DataFrame, Dict]:
@@ -50,32 +75,29 @@ def build_job(d: Dict[str, pd.DataFrame]) -> Tuple[pd.DataFrame, Dict]:
     job_sexage = rename_if_needed(d["lfs_job_sexage"], "lfs_job_sexage")
     job_occup = rename_if_needed(d["lfs_job_occup"], "lfs_job_occup")
 
-    merged12 = outer_merge_on_common([job_regio, job_sexage])
-    merged_all = outer_merge_on_common([merged12, job_occup])
-    merged_all = fill_na(merged_all, INVALID)
-
-    cleaned, stats = clean_dataframe(merged_all, col_to_check="Value", invalid_value=INVALID)
-    return cleaned, stats
+    return assemble_union([job_regio, job_sexage, job_occup], value_col="Value", invalid_value=INVALID)
 
 def build_demo(d: Dict[str, pd.DataFrame]) -> Tuple[pd.DataFrame, Dict]:
     occup = rename_if_needed(d["lfs_occup_demo"], "lfs_occup_demo")
     sector = rename_if_needed(d["lfs_sector_demo"], "lfs_sector_demo")
-    merged = outer_merge_on_common([occup, sector])
-    merged = fill_na(merged, INVALID)
-    cleaned, stats = clean_dataframe(merged, col_to_check="Value", invalid_value=INVALID)
-    return cleaned, stats
+    return assemble_union([occup, sector], value_col="Value", invalid_value=INVALID)
 
 def build_popul(d: Dict[str, pd.DataFrame]) -> Tuple[pd.DataFrame, Dict]:
-    merged = outer_merge_on_common([d["lfs_popul_regio"], d["lfs_popul_status"]])
-    merged = fill_na(merged, INVALID)
-    cleaned, stats = clean_dataframe(merged, col_to_check="Value", invalid_value=INVALID)
-    return cleaned, stats
+    return assemble_union([d["lfs_popul_regio"], d["lfs_popul_status"]],
+                          value_col="Value", invalid_value=INVALID)
 
 def build_status(d: Dict[str, pd.DataFrame]) -> Tuple[pd.DataFrame, Dict]:
-    merged = outer_merge_on_common([d["lfs_status_regio"], d["lfs_status_sexage"]])
-    merged = fill_na(merged, INVALID)
-    cleaned, stats = clean_dataframe(merged, col_to_check="Value", invalid_value=INVALID)
-    return cleaned, stats
+    return assemble_union([d["lfs_status_regio"], d["lfs_status_sexage"]],
+                          value_col="Value", invalid_value=INVALID)
+
+FLOW_BUILDERS: Dict[str, Callable[[Dict[str, pd.DataFrame]], Tuple[pd.DataFrame, Dict]]] = {
+    "educ":   build_educ,
+    "emp":    build_emp,
+    "job":    build_job,
+    "demo":   build_demo,
+    "popul":  build_popul,
+    "status": build_status,
+}
 
 def run() -> Dict[str, Tuple[pd.DataFrame, Dict]]:
     """
@@ -86,19 +108,105 @@ def run() -> Dict[str, Tuple[pd.DataFrame, Dict]]:
     raw = load_raw(paths)
 
     # Pre-rename where needed (for flows that rely on names later)
-    for k in ["lfs_job_regio", "lfs_job_sexage", "lfs_job_occup", "lfs_occup_demo", "lfs_sector_demo"]:
+    for k in PRE_RENAMED:
         raw[k] = rename_if_needed(raw[k], k)
 
-    out = {
-        "educ":   build_educ(raw),
-        "emp":    build_emp(raw),
-        "job":    build_job(raw),
-        "demo":   build_demo(raw),
-        "popul":  build_popul(raw),
-        "status": build_status(raw),
-    }
+    out = {name: build(raw) for name, build in FLOW_BUILDERS.items()}
 
     for name, (_, stats) in out.items():
         logging.info("Flow %-7s → dropped dupes=%d, invalid=%d",
                      name, stats["dropped_dupe_rows"], stats["dropped_invalid_rows"])
     return out
+
+def to_ipc(df: pd.DataFrame) -> Tuple[bytes, Dict[str, list]]:
+    """
+    Serialize a frame as an Arrow IPC stream. Categorical columns travel as
+    their integer codes, with the (small) category lists returned alongside,
+    since assembled dimensions mix ints and "_Z" which Arrow cannot type.
+    """
+    import pyarrow as pa
+
+    categories = {}
+    columns = {}
+    for c in df.columns:
+        col = df[c]
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            categories[c] = list(col.cat.categories)
+            columns[c] = col.cat.codes.to_numpy()
+        else:
+            columns[c] = col.to_numpy()
+    table = pa.table({str(c): columns[c] for c in df.columns})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes(), categories
+
+def from_ipc(payload: bytes, categories: Dict[str, list], columns: List) -> pd.DataFrame:
+    import pyarrow as pa
+
+    table = pa.ipc.open_stream(payload).read_all()
+    out = {}
+    for c, arr in zip(columns, table.columns):
+        values = arr.to_numpy()
+        if c in categories:
+            out[c] = pd.Categorical.from_codes(values, categories=pd.Index(categories[c], dtype=object))
+        else:
+            out[c] = values
+    return pd.DataFrame(out, columns=columns)
+
+def _run_flow(name: str, files: Dict[str, str]) -> Tuple[str, object, Dict, Dict[str, float]]:
+    """
+    Worker: load one flow's inputs, build it and return the result as Arrow
+    IPC bytes. Falls back to the DataFrame itself when pyarrow is missing.
+    """
+    t0 = time.perf_counter()
+    raw = {k: read_table(path) for k, path in files.items()}
+    for k in raw:
+        if k in PRE_RENAMED:
+            raw[k] = rename_if_needed(raw[k], k)
+    t1 = time.perf_counter()
+    df, stats = FLOW_BUILDERS[name](raw)
+    t2 = time.perf_counter()
+    try:
+        payload = (*to_ipc(df), list(df.columns))
+    except ImportError:
+        payload = df
+    t3 = time.perf_counter()
+    return name, payload, stats, {"load": t1 - t0, "build": t2 - t1, "serialize": t3 - t2}
+
+def run_parallel(paths: Optional[Paths] = None, max_workers: Optional[int] = None) -> Dict[str, Tuple[pd.DataFrame, Dict]]:
+    """
+    Same result as run(), with each flow loaded and built in its own process.
+
+    Flows share no state, so every worker reads only its own inputs (all
+    loads happen concurrently) and ships its result back as Arrow IPC.
+    Output keeps FLOW_BUILDERS order whatever the completion order; each
+    flow's stats gain a "timings" entry (load/build/serialize/transfer, s).
+    """
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    paths = paths or Paths()
+    max_workers = max_workers or min(len(FLOW_BUILDERS), os.cpu_count() or 1)
+
+    results: Dict[str, Tuple[pd.DataFrame, Dict]] = {}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(_run_flow, name, {k: str(paths.file(k)) for k in FLOW_INPUTS[name]})
+            for name in FLOW_BUILDERS
+        ]
+        for future in as_completed(futures):
+            name, payload, stats, timings = future.result()
+            t0 = time.perf_counter()
+            df = from_ipc(*payload) if isinstance(payload, tuple) else payload
+            timings["transfer"] = time.perf_counter() - t0
+            stats["timings"] = timings
+            results[name] = (df, stats)
+
+    out = {name: results[name] for name in FLOW_BUILDERS}
+    for name, (_, stats) in out.items():
+        t = stats["timings"]
+        logging.info("Flow %-7s → dropped dupes=%d, invalid=%d | load %.2fs build %.2fs ipc %.2fs",
+                     name, stats["dropped_dupe_rows"], stats["dropped_invalid_rows"],
+                     t["load"], t["build"], t["serialize"] + t["transfer"])
+    logging.info("All flows done in %.2fs with %d workers", time.perf_counter() - start, max_workers)
+    return out
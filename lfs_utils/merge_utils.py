@@ -1,13 +1,31 @@
 # merge_utils.py
 from typing import List, Set
+import numpy as np
 import pandas as pd
 
+from .tracing import traced
+
 def common_columns(*dfs: pd.DataFrame) -> Set[str]:
     common = set(dfs[0].columns)
     for d in dfs[1:]:
         common &= set(d.columns)
     return common
 
+def union_columns(*dfs: pd.DataFrame) -> List[str]:
+    """
+    Ordered union of column names: columns of the first frame, then any new
+    columns of the following frames in order of appearance.
+    """
+    cols: List[str] = []
+    seen: Set[str] = set()
+    for d in dfs:
+        for c in d.columns:
+            if c not in seen:
+                seen.add(c)
+                cols.append(c)
+    return cols
+
+@traced("merge")
 def outer_merge_on_common(dfs: List[pd.DataFrame]) -> pd.DataFrame:
     """
     Concatenate DataFrames row-wise on their common columns.
@@ -19,3 +37,53 @@ def outer_merge_on_common(dfs: List[pd.DataFrame]) -> pd.DataFrame:
     cols = list(common_columns(*dfs))
     aligned = [df[cols] for df in dfs]
     return pd.concat(aligned, ignore_index=True)
+
+def _union_categorical(pieces: List[pd.Series], lengths: List[int], fill_value: str) -> pd.Categorical:
+    """
+    Stack one dimension column across frames as a single Categorical.
+    Missing pieces (column absent from a frame) and NaN cells get the fill code.
+    """
+    cats = [pd.Categorical(p) if p is not None else None for p in pieces]
+    uniques = [np.array([fill_value], dtype=object)]
+    uniques += [c.categories.to_numpy(dtype=object) for c in cats if c is not None]
+    categories = pd.Index(np.concatenate(uniques), dtype=object).unique()
+
+    codes = []
+    for c, n in zip(cats, lengths):
+        if c is None:
+            codes.append(np.zeros(n, dtype=np.int64))
+            continue
+        remap = categories.get_indexer(c.categories).astype(np.int64)
+        piece_codes = c.codes.astype(np.int64)
+        # NaN cells have code -1 → fill code 0
+        codes.append(np.where(piece_codes >= 0, remap[piece_codes], 0))
+    return pd.Categorical.from_codes(np.concatenate(codes), categories=categories)
+
+@traced("merge")
+def union_concat(dfs: List[pd.DataFrame], value_col: str = "Value", fill_value: str = "_Z") -> pd.DataFrame:
+    """
+    Align DataFrames to the union of their columns and stack them row-wise.
+
+    Replaces chained outer merges on all shared columns: every row of every
+    input appears once, dimension columns come back as categoricals with
+    missing cells filled with `fill_value` in a single pass, and `value_col`
+    is concatenated untouched (no cast to str is needed to align frames).
+    """
+    if not dfs:
+        raise ValueError("No dataframes provided")
+
+    cols = union_columns(*dfs)
+    lengths = [len(d) for d in dfs]
+
+    out = {}
+    for c in cols:
+        pieces = [d[c] if c in d.columns else None for d in dfs]
+        if c == value_col:
+            out[c] = pd.concat(
+                [p if p is not None else pd.Series(np.nan, index=range(n), dtype=object)
+                 for p, n in zip(pieces, lengths)],
+                ignore_index=True,
+            )
+        else:
+            out[c] = _union_categorical(pieces, lengths, fill_value)
+    return pd.DataFrame(out, columns=cols)
@@ -0,0 +1,347 @@
+# metrics.py
+"""
+Run metrics: counters, gauges and histograms with a Prometheus textfile export.
+
+Metrics are declared once here and updated where the work happens; every
+sample carries a `domain` label (the pipeline node being run, or the script
+name when a strategy runs on its own):
+
+    metrics.FILES_DOWNLOADED.inc(domain="MCI")
+    metrics.sheet_read(sheet)                       # sheets parsed + cells scanned
+    metrics.DUPLICATES_DROPPED.inc(result.dropped_rows)
+
+Stage durations, stage errors and records written come from the stage spans
+of tracing.py, so they need no extra calls. Updating a metric is a dict
+update and always happens; nothing is written unless LFS_METRICS names a
+directory (or enable() is called). Then each process saves its cumulative
+snapshot to <dir>/metrics-<pid>.json (per pipeline node and at exit) and
+export() merges them — counters and histograms add up, the latest gauge
+wins — into a node-exporter textfile and a JSON twin:
+
+    python pipeline.py --metrics                            # → reports/metrics.prom + metrics.json
+    python pipeline.py --metrics /var/lib/node_exporter/textfile/grstats.prom
+    python -m lfs_utils.metrics reports/metrics --out reports/metrics.prom
+"""
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+import argparse
+import atexit
+import bisect
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+
+try:
+    from . import tracing
+except ImportError:                              # imported as a top-level module (lfs_utils on sys.path)
+    import tracing
+
+logger = logging.getLogger(__name__)
+
+ENV = "LFS_METRICS"
+DOMAIN_ENV = "LFS_DOMAIN"
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+PathLike = Union[str, Path]
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# ---------- Metric types ----------
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.samples: Dict[LabelKey, Any] = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(labels: Dict[str, Any]) -> LabelKey:
+        labels.setdefault("domain", current_domain())
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def value(self, **labels) -> Any:
+        return self.samples.get(self.key(labels))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "type": self.kind, "help": self.help,
+                "samples": [{"labels": dict(k), "value": v} for k, v in self.samples.items()]}
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if amount < 0:
+            raise ValueError(f"{self.name}: counters only go up ({amount})")
+        key = self.key(labels)
+        with self.lock:
+            self.samples[key] = self.samples.get(key, 0) + amount
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self.key(labels)
+        with self.lock:
+            self.samples[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self.key(labels)
+        with self.lock:
+            self.samples[key] = self.samples.get(key, 0) + amount
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = DURATION_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self.key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            sample = self.samples.get(key)
+            if sample is None:
+                sample = self.samples[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            sample["counts"][i] += 1                # per bucket, not cumulative; the last one is +Inf
+            sample["sum"] += value
+            sample["count"] += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = super().to_dict()
+        out["buckets"] = list(self.buckets)
+        return out
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, _Metric] = {}
+
+    def _get(self, cls, name: str, help: str, **kwargs) -> Any:
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = cls(name, help, **kwargs)
+        elif not isinstance(metric, cls):
+            raise TypeError(f"{name} is already a {metric.kind}")
+        return metric
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._get(Counter, name, help)
+
+    def gauge(self, name: str, help: str) -> Gauge:
+        return self._get(Gauge, name, help)
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float] = DURATION_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, buckets=buckets)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"pid": os.getpid(), "time": time.time(),
+                "metrics": [m.to_dict() for m in self.metrics.values() if m.samples]}
+
+    def merge(self, snapshot: Dict[str, Any]) -> None:
+        """Add another process's snapshot: counters and histograms add up, its gauges replace ours."""
+        for m in snapshot["metrics"]:
+            if m["type"] == "histogram":
+                metric = self.histogram(m["name"], m["help"], m["buckets"])
+            else:
+                metric = self._get(Counter if m["type"] == "counter" else Gauge, m["name"], m["help"])
+            for sample in m["samples"]:
+                key = tuple(sorted(sample["labels"].items()))
+                value, current = sample["value"], metric.samples.get(key)
+                if current is None or m["type"] == "gauge":
+                    metric.samples[key] = json.loads(json.dumps(value))
+                elif m["type"] == "counter":
+                    metric.samples[key] = current + value
+                else:
+                    current["counts"] = [a + b for a, b in zip(current["counts"], value["counts"])]
+                    current["sum"] += value["sum"]
+                    current["count"] += value["count"]
+
+REGISTRY = Registry()
+
+def counter(name: str, help: str) -> Counter:
+    return REGISTRY.counter(name, help)
+
+def gauge(name: str, help: str) -> Gauge:
+    return REGISTRY.gauge(name, help)
+
+def histogram(name: str, help: str, buckets: Sequence[float] = DURATION_BUCKETS) -> Histogram:
+    return REGISTRY.histogram(name, help, buckets)
+
+# ---------- The pipeline's metrics ----------
+
+FILES_DOWNLOADED = counter("lfs_files_downloaded_total", "Workbooks downloaded by the crawler.")
+FILES_SKIPPED = counter("lfs_files_skipped_total", "Requested workbooks not downloaded, by reason.")
+DOWNLOAD_BYTES = counter("lfs_download_bytes_total", "Bytes downloaded by the crawler.")
+SHEETS_PARSED = counter("lfs_sheets_parsed_total", "Worksheets (or sheet chunks) read into frames.")
+CELLS_SCANNED = counter("lfs_cells_scanned_total", "Cells of the worksheets read.")
+RECORDS_WRITTEN = counter("lfs_records_written_total", "Rows written to output files.")
+OUTPUT_ROWS = gauge("lfs_output_rows", "Rows of each output file at its last write.")
+DUPLICATES_DROPPED = counter("lfs_duplicates_dropped_total", "Duplicate rows dropped.")
+MASK_VALUES = counter("lfs_mask_values_total", "Values passed through codelist masking, by column.")
+MASK_HITS = counter("lfs_mask_hits_total", "Values the codelist masking changed, by column.")
+MASK_HIT_RATIO = gauge("lfs_mask_hit_ratio", "Share of a column's values changed by its last masking.")
+STAGE_SECONDS = histogram("lfs_stage_duration_seconds", "Wall time of traced stages, by stage category.")
+STAGE_ERRORS = counter("lfs_stage_errors_total", "Traced stages that raised, by stage category.")
+NODES = gauge("lfs_pipeline_nodes", "Pipeline nodes of the last run, by status.")
+RUN_SECONDS = gauge("lfs_pipeline_duration_seconds", "Wall time of the last pipeline run.")
+LAST_RUN = gauge("lfs_pipeline_last_run_timestamp_seconds", "When the last pipeline run finished (Unix time).")
+
+def sheet_read(frame: Any, **labels) -> None:
+    """Count one worksheet read and the cells it holds."""
+    SHEETS_PARSED.inc(**labels)
+    CELLS_SCANNED.inc(int(getattr(frame, "size", 0)), **labels)
+
+def masked(column: str, before: Any, after: Any) -> None:
+    """Count how many of a column's values one masking pass changed."""
+    hits = int((after != before).sum())
+    MASK_VALUES.inc(len(after), column=column)
+    MASK_HITS.inc(hits, column=column)
+    MASK_HIT_RATIO.set(hits / len(after) if len(after) else 0.0, column=column)
+
+def _on_span(span: "tracing.Span") -> None:
+    STAGE_SECONDS.observe(span.wall, stage=span.cat)
+    if span.error:
+        STAGE_ERRORS.inc(stage=span.cat)
+    if span.cat == "write" and span.rows_in is not None:
+        RECORDS_WRITTEN.inc(span.rows_in)
+        OUTPUT_ROWS.set(span.rows_in, output=span.name)
+
+# ---------- Domain label ----------
+
+class _State:
+    def __init__(self):
+        self.enabled = False
+        self.directory: Optional[Path] = None
+        self.domain = os.environ.get(DOMAIN_ENV) or Path(sys.argv[0] or "python").stem or "python"
+
+_state = _State()
+
+def current_domain() -> str:
+    return _state.domain
+
+@contextmanager
+def domain(name: str) -> Iterator[None]:
+    """Label the metrics recorded inside the block with domain=name."""
+    previous, _state.domain = _state.domain, name
+    try:
+        yield
+    finally:
+        _state.domain = previous
+
+# ---------- Output ----------
+
+def enable(directory: PathLike = "reports/metrics") -> None:
+    """Save snapshots to `directory` (also exported to child processes via LFS_METRICS)."""
+    _state.directory = Path(directory)
+    _state.directory.mkdir(parents=True, exist_ok=True)
+    os.environ[ENV] = str(_state.directory)
+    _state.enabled = True
+    tracing.observe(_on_span)
+
+def enabled() -> bool:
+    return _state.enabled
+
+def directory() -> Optional[Path]:
+    return _state.directory
+
+def _write_atomic(path: Path, text: str) -> None:
+    """Write via a temporary file and rename, so a scraper never reads half a file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+def flush() -> Optional[Path]:
+    """Save this process's cumulative snapshot to <dir>/metrics-<pid>.json."""
+    if not _state.enabled or _state.directory is None:
+        return None
+    path = _state.directory / f"metrics-{os.getpid()}.json"
+    _write_atomic(path, json.dumps(REGISTRY.snapshot()))
+    return path
+
+def load(directory: PathLike) -> Registry:
+    """Merge every process snapshot under `directory`, oldest first."""
+    snapshots = []
+    for path in Path(directory).glob("metrics-*.json"):
+        with open(path, encoding="utf-8") as f:
+            snapshots.append(json.load(f))
+    registry = Registry()
+    for snapshot in sorted(snapshots, key=lambda s: s["time"]):
+        registry.merge(snapshot)
+    return registry
+
+def clear(directory: PathLike) -> None:
+    for path in Path(directory).glob("metrics-*.json"):
+        path.unlink()
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+def to_prometheus(registry: Registry = REGISTRY) -> str:
+    """Prometheus text exposition format (what node-exporter's textfile collector reads)."""
+    lines: List[str] = []
+    for m in sorted(registry.metrics.values(), key=lambda m: m.name):
+        if not m.samples:
+            continue
+        lines += [f"# HELP {m.name} {_escape(m.help)}", f"# TYPE {m.name} {m.kind}"]
+        for key in sorted(m.samples):
+            sample = m.samples[key]
+            if m.kind != "histogram":
+                lines.append(f"{m.name}{_labels(key)} {_number(sample)}")
+                continue
+            cumulative = 0
+            for le, n in zip(list(m.buckets) + [math.inf], sample["counts"]):
+                cumulative += n
+                lines.append(f"{m.name}_bucket{_labels(key + (('le', _number(float(le))),))} {cumulative}")
+            lines.append(f"{m.name}_sum{_labels(key)} {_number(float(sample['sum']))}")
+            lines.append(f"{m.name}_count{_labels(key)} {sample['count']}")
+    return "\n".join(lines) + "\n"
+
+def export(directory: PathLike, out: PathLike) -> Path:
+    """Merge <directory>/metrics-*.json into the textfile `out` plus a JSON twin next to it."""
+    flush()
+    registry = load(directory)
+    out = Path(out)
+    _write_atomic(out, to_prometheus(registry))
+    _write_atomic(out.with_suffix(".json"), json.dumps(registry.snapshot()["metrics"], indent=2))
+    return out
+
+def _flush_at_exit() -> None:
+    if _state.enabled:
+        flush()
+
+if os.environ.get(ENV):
+    enable(os.environ[ENV])
+atexit.register(_flush_at_exit)
+
+# Imported both as lfs_utils.metrics and (by the LFS sheet parsers) as metrics;
+# both names must share one registry.
+sys.modules.setdefault("metrics", sys.modules[__name__])
+sys.modules.setdefault("lfs_utils.metrics", sys.modules[__name__])
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Merge run metrics into a Prometheus textfile.")
+    parser.add_argument("directory", nargs="?", default=os.environ.get(ENV, "reports/metrics"))
+    parser.add_argument("--out", default="reports/metrics.prom", help="textfile to write (plus a .json twin)")
+    args = parser.parse_args(argv)
+    path = export(args.directory, args.out)
+    print(path.read_text(encoding="utf-8"), end="")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
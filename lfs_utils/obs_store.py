@@ -0,0 +1,268 @@
+# obs_store.py
+"""
+Embedded analytical store of all prepared observations (one SQLite file).
+
+    python -m lfs_utils.obs_store build                    # assets/sdmx/observations.sqlite
+    python -m lfs_utils.obs_store build HICP CCI           # only these domains
+    python -m lfs_utils.obs_store query "SELECT dataflow, COUNT(*) FROM observations GROUP BY dataflow"
+    python pipeline.py store                               # as the "store" node
+
+Every domain in sdmx_validate.LAYOUTS is loaded through the same flow
+indexes as the data endpoint (sdmx_service.build_flow: tidy observations of
+the prepared output, full DSD keys, '_Z' for dimensions the output does not
+carry). Schema:
+
+    dataset       one row per domain: dataflow, agency, version, source file
+    dimension     key dimensions per dataset, DSD position, codelist
+    series        (dataset_id, series_key) — key codes '.'-joined in DSD order
+    series_code   the code of each series on each dimension
+    observation   (dataset_id, series_id, time_period, period_start,
+                  period_end, obs_value), indexed on
+                  (dataset_id, series_id, time_period)
+    codelist      codelists of metadata/ (every domain, deduplicated)
+    code          codes with parent; code_label: label per language
+
+plus the views `observations` (dataflow, series_key, time_period, obs_value)
+and `series_labels` (series codes with their English labels). The file is
+written under a temporary name and renamed into place, so readers never see
+a half-built store. DuckDB would be the natural engine here, but it is not
+a dependency of this repo; sqlite3 ships with Python and is fast enough for
+keyed lookups over the ~10^5 observations.
+"""
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import argparse
+import logging
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from .sdmx_registry import StructureRegistry, load_registry
+from .sdmx_service import FlowIndex, NotFound, build_flow
+from .sdmx_validate import LAYOUTS, PREPARED_DIR
+from .tracing import traced
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = Path("assets/sdmx/observations.sqlite")
+
+SCHEMA = """
+CREATE TABLE codelist (
+    codelist_id INTEGER PRIMARY KEY,
+    agency TEXT NOT NULL, id TEXT NOT NULL, version TEXT NOT NULL, name TEXT,
+    UNIQUE (agency, id, version)
+);
+CREATE TABLE code (
+    codelist_id INTEGER NOT NULL REFERENCES codelist, code TEXT NOT NULL, parent TEXT,
+    PRIMARY KEY (codelist_id, code)
+) WITHOUT ROWID;
+CREATE TABLE code_label (
+    codelist_id INTEGER NOT NULL, code TEXT NOT NULL, lang TEXT NOT NULL, label TEXT NOT NULL,
+    PRIMARY KEY (codelist_id, code, lang)
+) WITHOUT ROWID;
+CREATE TABLE dataset (
+    dataset_id INTEGER PRIMARY KEY,
+    domain TEXT NOT NULL UNIQUE, dataflow TEXT NOT NULL, agency TEXT, version TEXT, name TEXT,
+    source TEXT, observations INTEGER, series INTEGER, loaded_at TEXT
+);
+CREATE TABLE dimension (
+    dimension_id INTEGER PRIMARY KEY,
+    dataset_id INTEGER NOT NULL REFERENCES dataset, position INTEGER NOT NULL, component TEXT NOT NULL,
+    codelist_id INTEGER REFERENCES codelist,
+    UNIQUE (dataset_id, component)
+);
+CREATE TABLE series (
+    series_id INTEGER PRIMARY KEY,
+    dataset_id INTEGER NOT NULL REFERENCES dataset, series_key TEXT NOT NULL,
+    UNIQUE (dataset_id, series_key)
+);
+CREATE TABLE series_code (
+    series_id INTEGER NOT NULL REFERENCES series, dimension_id INTEGER NOT NULL REFERENCES dimension,
+    code TEXT NOT NULL,
+    PRIMARY KEY (series_id, dimension_id)
+) WITHOUT ROWID;
+CREATE TABLE observation (
+    dataset_id INTEGER NOT NULL, series_id INTEGER NOT NULL, time_period TEXT NOT NULL,
+    period_start TEXT, period_end TEXT, obs_value REAL
+);
+"""
+
+INDEXES = """
+CREATE INDEX observation_key ON observation (dataset_id, series_id, time_period);
+CREATE INDEX observation_period ON observation (dataset_id, period_start);
+CREATE INDEX series_code_value ON series_code (dimension_id, code);
+CREATE VIEW observations AS
+    SELECT d.domain, d.dataflow, s.series_key, o.time_period, o.period_start, o.period_end, o.obs_value
+    FROM observation o JOIN series s USING (series_id) JOIN dataset d ON d.dataset_id = o.dataset_id;
+CREATE VIEW series_labels AS
+    SELECT s.series_id, d.domain, s.series_key, m.position, m.component, c.code, l.label
+    FROM series s JOIN dataset d USING (dataset_id)
+    JOIN series_code c USING (series_id) JOIN dimension m USING (dimension_id)
+    LEFT JOIN code_label l ON l.codelist_id = m.codelist_id AND l.code = c.code AND l.lang = 'en';
+"""
+
+def _dates(values: np.ndarray) -> List[Optional[str]]:
+    text = np.datetime_as_string(values, unit="D")
+    return [None if t == "NaT" else t for t in text.tolist()]
+
+class StoreBuilder:
+    """Fill a fresh database: codelists first, then one dataset per flow."""
+
+    def __init__(self, con: sqlite3.Connection, registry: StructureRegistry):
+        self.con = con
+        self.registry = registry
+        self.codelists: Dict[Tuple[str, str], int] = {}       # (agency, id) → codelist_id
+        self.next_series = 1
+
+    def add_codelists(self) -> int:
+        codelists, codes, labels = [], [], []
+        seen = {}
+        for domain in self.registry.domains.values():
+            for cl in domain.codelists.values():
+                if (cl.agency, cl.id, cl.version) in seen:
+                    continue
+                cid = seen[(cl.agency, cl.id, cl.version)] = len(seen) + 1
+                self.codelists.setdefault((cl.agency, cl.id), cid)
+                codelists.append((cid, cl.agency, cl.id, cl.version, cl.names.get("en")))
+                for code in cl.codes.values():
+                    codes.append((cid, code.id, code.parent))
+                    labels.extend((cid, code.id, lang, label) for lang, label in code.names.items())
+        self.con.executemany("INSERT INTO codelist VALUES (?, ?, ?, ?, ?)", codelists)
+        self.con.executemany("INSERT INTO code VALUES (?, ?, ?)", codes)
+        self.con.executemany("INSERT INTO code_label VALUES (?, ?, ?, ?)", labels)
+        return len(codelists)
+
+    def _codelist_id(self, agency: Optional[str], codelist: Optional[str]) -> Optional[int]:
+        if codelist is None:
+            return None
+        if agency is not None:
+            return self.codelists.get((agency, codelist))
+        return next((cid for (_, cl), cid in self.codelists.items() if cl == codelist), None)
+
+    def add_flow(self, dataset_id: int, flow: FlowIndex, source: Path) -> Tuple[int, int]:
+        dom = self.registry.domain(flow.domain)
+        df = dom.dataflow
+        name = df.names.get("en")
+        self.con.execute("INSERT INTO dataset VALUES (?, ?, ?, ?, ?, ?, ?, NULL, NULL, datetime('now'))",
+                         (dataset_id, flow.domain, df.id, df.agency, df.version, name, str(source)))
+
+        dim_ids = []
+        for position, dim in enumerate(flow.dimensions, start=1):
+            comp = dom.dimension(dim)
+            cur = self.con.execute("INSERT INTO dimension (dataset_id, position, component, codelist_id) "
+                                   "VALUES (?, ?, ?, ?)",
+                                   (dataset_id, position, dim,
+                                    self._codelist_id(comp.codelist_agency, comp.codelist) if comp else None))
+            dim_ids.append(cur.lastrowid)
+
+        # a series is a distinct combination of key codes; keys are formatted once per series
+        if len(flow):
+            codes = np.column_stack([flow.index[dim].codes for dim in flow.dimensions])
+            uniques, inverse = np.unique(codes, axis=0, return_inverse=True)
+        else:
+            uniques, inverse = np.empty((0, len(flow.dimensions)), dtype=np.int32), np.empty(0, dtype=np.int64)
+        labels = [np.asarray(flow.index[dim].labels, dtype=object)[uniques[:, j]]
+                  for j, dim in enumerate(flow.dimensions)]
+        first = self.next_series
+        keys = [".".join(parts) for parts in zip(*labels)] if labels else []
+        self.con.executemany("INSERT INTO series VALUES (?, ?, ?)",
+                             ((first + i, dataset_id, key) for i, key in enumerate(keys)))
+        self.con.executemany("INSERT INTO series_code VALUES (?, ?, ?)",
+                             ((first + i, dim_id, code)
+                              for dim_id, column in zip(dim_ids, labels) for i, code in enumerate(column)))
+        self.next_series += len(keys)
+
+        series_ids = (inverse.reshape(-1) + first).tolist()
+        self.con.executemany("INSERT INTO observation VALUES (?, ?, ?, ?, ?, ?)",
+                             zip([dataset_id] * len(flow), series_ids, flow.time.tolist(),
+                                 _dates(flow.time_start), _dates(flow.time_end), flow.values.tolist()))
+        self.con.execute("UPDATE dataset SET observations = ?, series = ? WHERE dataset_id = ?",
+                         (len(flow), len(keys), dataset_id))
+        return len(keys), len(flow)
+
+@traced("write")
+def build(domains: Optional[Iterable[str]] = None, db_path: Path = DB_PATH,
+          registry: Optional[StructureRegistry] = None, prepared_dir: Path = PREPARED_DIR) -> str:
+    """(Re)build the store from the prepared outputs; returns a one-line summary."""
+    registry = registry or load_registry()
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = db_path.with_name(db_path.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+
+    loaded, missing = [], []
+    con = sqlite3.connect(tmp)
+    try:
+        con.execute("PRAGMA journal_mode = OFF")
+        con.execute("PRAGMA synchronous = OFF")
+        con.executescript(SCHEMA)
+        builder = StoreBuilder(con, registry)
+        with con:
+            n_codelists = builder.add_codelists()
+        for dataset_id, domain in enumerate(domains or LAYOUTS, start=1):
+            try:
+                flow = build_flow(domain, registry=registry, prepared_dir=prepared_dir)
+            except NotFound as e:
+                logger.warning("%s", e)
+                missing.append(domain)
+                continue
+            with con:
+                n_series, n_obs = builder.add_flow(dataset_id, flow, Path(prepared_dir) / LAYOUTS[domain].file)
+            logger.info("%s: %d series, %d observations", domain, n_series, n_obs)
+            loaded.append(f"{domain} {n_obs:,}")
+        con.executescript(INDEXES)
+        con.execute("ANALYZE")
+        con.commit()
+    except BaseException:
+        con.close()
+        tmp.unlink(missing_ok=True)
+        raise
+    con.close()
+    os.replace(tmp, db_path)
+    return (f"{db_path}: {n_codelists} codelists; {', '.join(loaded) or 'no datasets'}"
+            + (f"; missing {', '.join(missing)}" if missing else ""))
+
+def connect(db_path: Path = DB_PATH) -> sqlite3.Connection:
+    """Read-only connection to a built store."""
+    db_path = Path(db_path)
+    if not db_path.exists():
+        raise FileNotFoundError(f"{db_path} not found; run `python -m lfs_utils.obs_store build`")
+    return sqlite3.connect(f"file:{db_path.resolve()}?mode=ro", uri=True)
+
+def query(sql: str, params: Sequence = (), db_path: Path = DB_PATH) -> Tuple[List[str], List[tuple]]:
+    """Column names and rows of one SQL statement against the store."""
+    con = connect(db_path)
+    try:
+        cur = con.execute(sql, params)
+        return [c[0] for c in cur.description or ()], cur.fetchall()
+    finally:
+        con.close()
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Embedded analytical store of the prepared observations.")
+    parser.add_argument("--db", default=str(DB_PATH))
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build", help="load the prepared outputs into a fresh store")
+    p.add_argument("domains", nargs="*", help="domains to load (default: all)")
+    p = sub.add_parser("query", help="run one SQL statement and print the rows tab-separated")
+    p.add_argument("sql")
+    p.add_argument("--limit", type=int, default=50, help="rows to print (0: all)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    if args.command == "build":
+        print(build([d.upper() for d in args.domains] or None, Path(args.db)))
+        return 0
+    started = time.perf_counter()
+    columns, rows = query(args.sql, db_path=Path(args.db))
+    elapsed = (time.perf_counter() - started) * 1000
+    print("\t".join(columns))
+    for row in rows[:args.limit or None]:
+        print("\t".join("" if v is None else str(v) for v in row))
+    print(f"-- {len(rows):,} rows in {elapsed:.1f} ms")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,290 @@
+# profiler.py
+"""
+Streaming dataset profiler.
+
+Per column: cardinality, null count, top-k values and codelist coverage for
+the columns carrying a DSD dimension of the dataset's domain (codes from the
+metadata/ registry, see registry_codelists). Each chunk is factorized once (categoricals reuse their codes) and
+only the per-unique counts are folded into the running totals, so profiling
+is one pass over the data and can consume a workbook chunk by chunk.
+
+    python -m lfs_utils.profiler                   # every prepared dataset
+    python -m lfs_utils.profiler assets/prepared/MCI.xlsx --out-dir reports
+    python pipeline.py profile                     # as the "profile" node
+"""
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+import argparse
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .columnar import iter_chunks
+from .sdmx_registry import StructureRegistry, load_registry
+from .sdmx_validate import ALWAYS_VALID, LAYOUTS, STANDARD_CODELISTS, map_columns
+
+logger = logging.getLogger(__name__)
+
+PREPARED_DATASETS: Dict[str, Path] = {
+    name: Path("assets/prepared") / f"{name}.xlsx"
+    for name in ["LFS", "BLA", "MCI", "HICP", "CCI", "NFG", "EDP"]
+}
+
+VALUE_COLUMNS = ("Value", "value", "OBS_VALUE")
+REPORT_DIR = Path("reports/profiles")
+
+def _is_number(v: Any) -> bool:
+    return isinstance(v, (int, float, np.number)) and not isinstance(v, (bool, np.bool_))
+
+class ColumnProfile:
+    """Running counts for one column."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.counts: Counter = Counter()
+        self.nulls = 0
+
+    def update(self, values: pd.Series) -> None:
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes = values.cat.codes.to_numpy()
+            uniques = values.cat.categories
+        else:
+            codes, uniques = pd.factorize(values, use_na_sentinel=True)
+        valid = codes >= 0
+        self.nulls += int((~valid).sum())
+        counts = np.bincount(codes[valid], minlength=len(uniques))
+        for value, count in zip(uniques.tolist(), counts.tolist()):
+            if count:
+                self.counts[value] += count
+
+    def result(self, rows: int, top_k: int, codelist: Optional[Iterable] = None,
+               categorical: bool = False) -> Dict[str, Any]:
+        numeric = not categorical and self.counts and all(_is_number(v) for v in self.counts)
+        kind = "numeric" if numeric else "categorical"
+        out: Dict[str, Any] = {
+            "name": str(self.name),
+            "kind": kind,
+            "unique": len(self.counts),
+            "nulls": self.nulls,
+            "top": [[_jsonable(v), c] for v, c in self.counts.most_common(top_k)],
+        }
+        if kind == "numeric":
+            out["min"] = _jsonable(min(self.counts))
+            out["max"] = _jsonable(max(self.counts))
+        if codelist is not None:
+            codes = {str(c) for c in codelist}
+            unknown = Counter({v: c for v, c in self.counts.items() if str(v) not in codes})
+            non_null = rows - self.nulls
+            out["coverage"] = {
+                "codelist_size": len(codes),
+                "covered_rows": non_null - sum(unknown.values()),
+                "ratio": (non_null - sum(unknown.values())) / non_null if non_null else 1.0,
+                "unknown": [[_jsonable(v), c] for v, c in unknown.most_common(20)],
+            }
+        return out
+
+def _jsonable(v: Any) -> Any:
+    if isinstance(v, np.generic):
+        return v.item()
+    if isinstance(v, (str, int, float, bool)) or v is None:
+        return v
+    return str(v)
+
+class DatasetProfiler:
+    """
+    Incremental profiler: feed row chunks with update(), read result().
+
+    codelists maps column name → allowed codes; those columns also get a
+    coverage entry. Columns in `skip` (the observation value) are ignored.
+    Columns whose values are all numbers are summarized as numeric unless
+    listed in `categorical` (e.g. Year codes).
+    """
+
+    def __init__(self, name: str, top_k: int = 60, codelists: Optional[Mapping[str, Iterable]] = None,
+                 skip: Sequence[str] = VALUE_COLUMNS, categorical: Sequence[str] = ()):
+        self.name = name
+        self.top_k = top_k
+        self.codelists = dict(codelists or {})
+        self.skip = set(skip)
+        self.categorical = set(categorical)
+        self.rows = 0
+        self.columns: Dict[Any, ColumnProfile] = {}
+
+    def update(self, chunk: pd.DataFrame) -> "DatasetProfiler":
+        self.rows += len(chunk)
+        for col in chunk.columns:
+            if col in self.skip:
+                continue
+            if col not in self.columns:
+                # column first seen in a later chunk: earlier rows count as null
+                self.columns[col] = ColumnProfile(col)
+                self.columns[col].nulls = self.rows - len(chunk)
+            self.columns[col].update(chunk[col])
+        for col, prof in self.columns.items():
+            if col not in chunk.columns:
+                prof.nulls += len(chunk)
+        return self
+
+    def result(self) -> Dict[str, Any]:
+        columns = [
+            prof.result(self.rows, self.top_k, self.codelists.get(col), col in self.categorical)
+            for col, prof in self.columns.items()
+        ]
+        return {
+            "dataset": self.name,
+            "generated": pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "rows": self.rows,
+            "top_k": self.top_k,
+            "columns": columns,
+        }
+
+def registry_codelists(domain: str, columns: Iterable, registry: Optional[StructureRegistry] = None
+                       ) -> Dict[Any, List[str]]:
+    """
+    Column → allowed codes, for every column carrying a dimension of the
+    domain's DSD (mapped as the validator does: LAYOUTS, else the upper-cased
+    column name). Empty when the domain has no structures in metadata/.
+    """
+    registry = registry or load_registry()
+    try:
+        dsd = registry.domain(domain).dsd
+    except KeyError:
+        return {}
+    if dsd is None:
+        return {}
+    columns = list(columns)
+    layout = LAYOUTS.get(domain.upper())
+    if layout is not None:
+        mapped, _ = map_columns(columns, dsd, layout)
+    else:
+        mapped = {c: str(c).upper() for c in columns
+                  if str(c).upper() in dsd.by_id and dsd.by_id[str(c).upper()].kind == "dimension"}
+    codelists = {}
+    for col, component_id in mapped.items():
+        comp = dsd.by_id[component_id]
+        if comp.codelist is None:
+            continue
+        codelist = (registry.domain(domain).codelists.get(comp.codelist)
+                    or registry.find_codelist(comp.codelist, comp.codelist_agency))
+        if codelist is not None:
+            codelists[col] = sorted(set(codelist.codes) | ALWAYS_VALID)
+        elif comp.codelist in STANDARD_CODELISTS:
+            codelists[col] = sorted(STANDARD_CODELISTS[comp.codelist] | ALWAYS_VALID)
+    return codelists
+
+def profile_dataframe(df: pd.DataFrame, name: str, chunk_size: Optional[int] = None, **kwargs) -> Dict[str, Any]:
+    profiler = DatasetProfiler(name, **kwargs)
+    if chunk_size is None:
+        return profiler.update(df).result()
+    for start in range(0, len(df), chunk_size):
+        profiler.update(df.iloc[start:start + chunk_size])
+    return profiler.result()
+
+def profile_excel(path: Path, name: Optional[str] = None, chunk_size: int = 50_000,
+                  domain: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+    """
+    Profile a workbook while streaming it (from its Parquet twin when
+    fresh); the sheet is never fully in memory. With `domain`, columns
+    carrying its DSD dimensions get codelist coverage.
+    """
+    path = Path(path)
+    profiler = DatasetProfiler(name or path.stem, **kwargs)
+    for chunk in iter_chunks(path, chunk_size=chunk_size):
+        if domain is not None and not profiler.rows and "codelists" not in kwargs:
+            profiler.codelists = registry_codelists(domain, chunk.columns)
+        profiler.update(chunk)
+    return profiler.result()
+
+def to_markdown(profile: Dict[str, Any]) -> str:
+    rows = profile["rows"]
+    categorical = [c for c in profile["columns"] if c["kind"] == "categorical"]
+    numeric = [c for c in profile["columns"] if c["kind"] == "numeric"]
+
+    lines = [
+        f"# {profile['dataset']} Dataset Report\n",
+        f"Generated on: {profile['generated']}\n",
+        "## Dataset Overview",
+        f"- Total rows: {rows:,}",
+        f"- Profiled columns: {len(profile['columns'])}",
+        f"- Categorical columns: {len(categorical)}\n",
+        "## Categorical Columns Analysis\n",
+    ]
+    for col in categorical:
+        lines.append(f"### {col['name']}")
+        # value_counts(dropna=False) convention: missing counts as one value
+        lines.append(f"- **Total unique values:** {col['unique'] + (1 if col['nulls'] else 0)}")
+        lines.append(f"- **Missing values:** {col['nulls']:,}")
+        if "coverage" in col:
+            cov = col["coverage"]
+            lines.append(f"- **Codelist coverage:** {cov['ratio']:.2%} of non-null rows "
+                         f"({cov['codelist_size']} codes)")
+            if cov["unknown"]:
+                unknown = ", ".join(f"`{v}` ({c:,})" for v, c in cov["unknown"])
+                lines.append(f"- **Not in codelist:** {unknown}")
+        lines.append(f"- **Top {profile['top_k']} values:**")
+        if col["nulls"]:
+            col_top = col["top"] + [[None, col["nulls"]]]
+            col_top.sort(key=lambda vc: -vc[1])
+        else:
+            col_top = col["top"]
+        for i, (value, count) in enumerate(col_top[:profile["top_k"]]):
+            percentage = (count / rows) * 100 if rows else 0.0
+            label = "NULL/Missing" if value is None else str(value)
+            lines.append(f"  {i+1}. `{label}`: {count:,} ({percentage:.2f}%)")
+        lines.append("\n---\n")
+
+    if numeric:
+        lines.append("## Numeric Columns\n")
+        lines.append("| Column | Unique | Missing | Min | Max |")
+        lines.append("|---|---|---|---|---|")
+        for col in numeric:
+            lines.append(f"| {col['name']} | {col['unique']:,} | {col['nulls']:,} | {col['min']} | {col['max']} |")
+        lines.append("")
+    return "\n".join(lines) + "\n"
+
+def write_reports(profile: Dict[str, Any], markdown_path: Path, json_path: Optional[Path] = None) -> None:
+    markdown_path = Path(markdown_path)
+    json_path = Path(json_path) if json_path else markdown_path.with_suffix(".json")
+    markdown_path.parent.mkdir(parents=True, exist_ok=True)
+    markdown_path.write_text(to_markdown(profile), encoding="utf-8")
+    json_path.write_text(json.dumps(profile, ensure_ascii=False, indent=2), encoding="utf-8")
+    logger.info("Profile of %s written to %s and %s", profile["dataset"], markdown_path, json_path)
+
+def profile_all(targets: Optional[Mapping[str, Path]] = None, out_dir: Path = REPORT_DIR,
+                chunk_size: int = 50_000, top_k: int = 60) -> str:
+    """
+    Profile each dataset (default: every prepared one) with coverage against
+    its domain's codelists and write <name>_Report.md/.json; returns a
+    one-line summary (pipeline node).
+    """
+    written, coverage = [], []
+    for name, path in (targets or PREPARED_DATASETS).items():
+        if not Path(path).exists():
+            logger.warning("Skipping %s: %s not found", name, path)
+            continue
+        profile = profile_excel(path, name=name, chunk_size=chunk_size, top_k=top_k, domain=name)
+        write_reports(profile, Path(out_dir) / f"{name}_Report.md")
+        written.append(name)
+        coverage += [(name, col["name"], col["coverage"]["ratio"])
+                     for col in profile["columns"] if "coverage" in col]
+    incomplete = [f"{name}.{col}" for name, col, ratio in coverage if ratio < 1]
+    summary = f"profiled {', '.join(written)}; {len(coverage)} coded columns"
+    return summary + (f", not fully in codelist: {', '.join(incomplete)}" if incomplete else "")
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Profile prepared datasets (Markdown + JSON).")
+    parser.add_argument("files", nargs="*", type=Path, help="workbooks to profile (default: all prepared datasets)")
+    parser.add_argument("--out-dir", type=Path, default=REPORT_DIR)
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--top-k", type=int, default=60)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    targets = {p.stem: p for p in args.files} if args.files else None
+    print(profile_all(targets, args.out_dir, chunk_size=args.chunk_size, top_k=args.top_k))
+
+if __name__ == "__main__":
+    main()
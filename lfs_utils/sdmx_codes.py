@@ -0,0 +1,178 @@
+# sdmx_codes.py
+"""
+Declarative transformations of dotted SDMX series codes.
+
+A transform is a list of list operations (Drop / Move / Swap, with the same
+pop/insert semantics as Python lists). For each distinct code length the
+steps are replayed once on range(n) to get a single index permutation, and
+each distinct code is split once into tokens, gathered through that
+permutation and joined again (in Arrow kernels when pyarrow is available):
+
+    reorder = CodeTransform([Drop(11), Move(-3, -2), Swap(-4, -5, min_len=6)])
+    reorder(pd.Series(["A.N.EL...", ...]))
+
+check_key_length() validates transformed codes against the number of
+series dimensions of a domain's DSD.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+import logging
+import re
+
+import numpy as np
+import pandas as pd
+
+from .sdmx_registry import StructureRegistry, load_registry
+
+logger = logging.getLogger(__name__)
+
+def _valid(index: int, n: int) -> bool:
+    return -n <= index < n
+
+@dataclass(frozen=True)
+class Drop:
+    """del parts[index]"""
+    index: int
+    min_len: Optional[int] = None
+
+    def applies(self, n: int) -> bool:
+        return n >= self.min_len if self.min_len is not None else _valid(self.index, n)
+
+    def __call__(self, parts: List[int]) -> None:
+        del parts[self.index]
+
+@dataclass(frozen=True)
+class Move:
+    """parts.insert(target, parts.pop(source))"""
+    source: int
+    target: int
+    min_len: Optional[int] = None
+
+    def applies(self, n: int) -> bool:
+        return n >= self.min_len if self.min_len is not None else _valid(self.source, n)
+
+    def __call__(self, parts: List[int]) -> None:
+        parts.insert(self.target, parts.pop(self.source))
+
+@dataclass(frozen=True)
+class Swap:
+    """parts[i], parts[j] = parts[j], parts[i]"""
+    i: int
+    j: int
+    min_len: Optional[int] = None
+
+    def applies(self, n: int) -> bool:
+        if self.min_len is not None:
+            return n >= self.min_len
+        return _valid(self.i, n) and _valid(self.j, n)
+
+    def __call__(self, parts: List[int]) -> None:
+        parts[self.i], parts[self.j] = parts[self.j], parts[self.i]
+
+Step = Union[Drop, Move, Swap]
+
+def token_counts(codes: pd.Series, sep: str = ".") -> pd.Series:
+    return codes.astype(str).str.count(re.escape(sep)) + 1
+
+def split_codes(codes: Sequence[str], sep: str = ".") -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+    """Codes grouped by token count → (row mask, 2-D token array)."""
+    split = [str(c).split(sep) for c in codes]
+    lengths = np.fromiter((len(t) for t in split), dtype=np.intp, count=len(split))
+    groups = {}
+    for n in np.unique(lengths):
+        mask = lengths == n
+        tokens = np.empty((int(mask.sum()), int(n)), dtype=object)
+        tokens[:] = [t for t, m in zip(split, mask) if m]
+        groups[int(n)] = (mask, tokens)
+    return groups
+
+def join_tokens(tokens: np.ndarray, sep: str = ".") -> np.ndarray:
+    """Join a 2-D token array row-wise, one vectorized concatenation per column."""
+    if tokens.shape[1] == 0:
+        return np.full(tokens.shape[0], "", dtype=object)
+    out = tokens[:, 0].astype(object)
+    for j in range(1, tokens.shape[1]):
+        out = out + sep + tokens[:, j]
+    return out
+
+def join_columns(frame: pd.DataFrame, sep: str = ".") -> pd.Series:
+    """Row-wise sep.join of the non-null cells (as str), without a row-wise apply."""
+    mask = frame.notna().to_numpy()
+    values = frame.to_numpy(dtype=object).astype(str).astype(object)
+    out = np.full(len(frame), "", dtype=object)
+    started = np.zeros(len(frame), dtype=bool)
+    for j in range(values.shape[1]):
+        m = mask[:, j]
+        out = np.where(m & started, out + sep + values[:, j], np.where(m, values[:, j], out))
+        started |= m
+    return pd.Series(out, index=frame.index, dtype=object)
+
+@dataclass
+class CodeTransform:
+    steps: Sequence[Step]
+    sep: str = "."
+    _permutations: Dict[int, np.ndarray] = field(default_factory=dict, init=False, repr=False)
+
+    def permutation(self, n: int) -> np.ndarray:
+        """Source token index for each output position, for codes of n tokens."""
+        if n not in self._permutations:
+            parts = list(range(n))
+            for step in self.steps:
+                if step.applies(len(parts)):
+                    step(parts)
+            self._permutations[n] = np.array(parts, dtype=np.intp)
+        return self._permutations[n]
+
+    def apply_tokens(self, tokens: np.ndarray) -> np.ndarray:
+        return tokens[:, self.permutation(tokens.shape[1])]
+
+    def _apply_numpy(self, codes: Sequence[str]) -> np.ndarray:
+        out = np.empty(len(codes), dtype=object)
+        for mask, tokens in split_codes(codes, self.sep).values():
+            out[mask] = join_tokens(self.apply_tokens(tokens), self.sep)
+        return out
+
+    def _apply_arrow(self, codes: Sequence[str]) -> np.ndarray:
+        """Split, gather and join in Arrow kernels: one take() per code length."""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        lists = pc.split_pattern(pa.array(codes), self.sep)
+        lengths = pc.list_value_length(lists).to_numpy(zero_copy_only=False)
+        starts = lists.offsets.to_numpy()[:-1]
+        flat = lists.flatten()
+        out = np.empty(len(codes), dtype=object)
+        for n in np.unique(lengths):
+            rows = np.flatnonzero(lengths == n)
+            perm = self.permutation(int(n))
+            tokens = flat.take(pa.array((starts[rows, None] + perm[None, :]).ravel()))
+            offsets = pa.array(np.arange(len(rows) + 1, dtype=np.int32) * len(perm), pa.int32())
+            joined = pc.binary_join(pa.ListArray.from_arrays(offsets, tokens), pa.scalar(self.sep, flat.type))
+            out[rows] = joined.to_numpy(zero_copy_only=False)
+        return out
+
+    def __call__(self, codes: pd.Series) -> pd.Series:
+        """Transformed codes (None for missing); each distinct code is rebuilt once."""
+        codes = pd.Series(codes)
+        ids, uniques = pd.factorize(codes, use_na_sentinel=True)
+        uniques = pd.Index(uniques).astype(str)
+        try:
+            out = self._apply_arrow(uniques)
+        except ImportError:
+            out = self._apply_numpy(uniques)
+        return pd.Series(np.append(out, None)[ids], index=codes.index, dtype=object)
+
+def key_length(domain: str, registry: Optional[StructureRegistry] = None) -> int:
+    """Number of series-key dimensions (all DSD dimensions but the time dimension)."""
+    dsd = (registry or load_registry()).domain(domain).dsd
+    return len(dsd.dimension_ids) - (1 if dsd.time_dimension is not None else 0)
+
+def check_key_length(codes: pd.Series, domain: str, sep: str = ".",
+                     registry: Optional[StructureRegistry] = None) -> pd.Series:
+    """Codes whose token count differs from the domain's series key length."""
+    expected = key_length(domain, registry)
+    bad = codes[token_counts(codes, sep) != expected]
+    if len(bad):
+        logger.warning("%d of %d %s codes do not have %d tokens, e.g. %s",
+                       len(bad), len(codes), domain, expected, bad.head(3).tolist())
+    return bad
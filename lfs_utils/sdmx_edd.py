@@ -0,0 +1,320 @@
+# sdmx_edd.py
+"""
+Local interpreter for the Excel-Data-Description files (metadata/<DOMAIN>/edd.xml).
+
+An EDD maps a block of a worksheet (Top-Left .. Bottom-Right) to SDMX
+observations: every cell in the block is an OBS_VALUE, and each dimension is
+either a literal or a cell expression relative to that cell:
+
+    Cell(Row, 4)             column D of the observation's row
+    Cell(2, Column).Value    row 2 of the observation's column
+    Cell(1, 1)               one fixed cell
+
+Expressions are compiled once into row/column selections, so a whole block
+is converted with numpy repeat/tile over formatted columns instead of cell
+by cell, and the result feeds sdmx_writers directly:
+
+    mapping = load_edd("HICP")
+    grid = read_grid(PREPARED_DIR / "HICP.xlsx", mapping.worksheet)
+    obs = mapping.extract(grid)          # EDD codes + OBS_VALUE, one row per cell
+
+    python -m lfs_utils.sdmx_edd                  # check every EDD against its prepared output
+    python -m lfs_utils.sdmx_edd HICP --csv out    # ... and write SDMX-CSV from the EDD
+"""
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import argparse
+import logging
+import re
+import sys
+import time
+
+import numpy as np
+import openpyxl
+import pandas as pd
+from lxml import etree
+
+from .sdmx_registry import DataStructure, StructureRegistry, load_registry
+from .sdmx_validate import LAYOUTS, PREPARED_DIR, _code_str
+from .sdmx_writers import _as_codes, write_sdmx_csv
+
+logger = logging.getLogger(__name__)
+
+_CELL_RE = re.compile(r"^\s*Cell\(\s*(Row|\d+)\s*,\s*(Column|\d+)\s*\)(?:\.Value)?\s*$", re.IGNORECASE)
+_COORD_RE = re.compile(r"^\s*([A-Z]+)(\d+)\s*$", re.IGNORECASE)
+
+@dataclass(frozen=True)
+class CellRef:
+    """1-based cell reference; None means 'the observation's own row/column'."""
+    row: Optional[int]
+    column: Optional[int]
+
+    def __str__(self) -> str:
+        row = "Row" if self.row is None else self.row
+        column = "Column" if self.column is None else self.column
+        return f"Cell({row}, {column})"
+
+@dataclass(frozen=True)
+class DimensionMapping:
+    code: str
+    value: Optional[str] = None        # literal
+    ref: Optional[CellRef] = None      # compiled expression
+
+def compile_expression(text: str) -> CellRef:
+    """Compile 'Cell(Row, n)[.Value]' / 'Cell(r, Column)' / 'Cell(r, c)' into a CellRef."""
+    m = _CELL_RE.match(text)
+    if not m:
+        raise ValueError(f"Unsupported EDD expression: {text!r}")
+    row, column = m.groups()
+    return CellRef(None if row.lower() == "row" else int(row),
+                   None if column.lower() == "column" else int(column))
+
+def parse_coord(coord: str) -> Tuple[int, int]:
+    """'F3' → (3, 6), 1-based (row, column)."""
+    m = _COORD_RE.match(coord)
+    if not m:
+        raise ValueError(f"Invalid cell coordinate: {coord!r}")
+    letters, row = m.groups()
+    column = 0
+    for ch in letters.upper():
+        column = column * 26 + ord(ch) - ord("A") + 1
+    return int(row), column
+
+def column_letter(column: int) -> str:
+    letters = ""
+    while column:
+        column, rem = divmod(column - 1, 26)
+        letters = chr(ord("A") + rem) + letters
+    return letters
+
+def _padded(values: np.ndarray, n: int) -> np.ndarray:
+    if len(values) == n:
+        return values
+    return np.concatenate([values, np.full(n - len(values), None, dtype=object)])
+
+def _column_values(grid: np.ndarray, column: int, start: int, stop: int) -> np.ndarray:
+    """Formatted codes of grid[start:stop, column-1] (None beyond the sheet)."""
+    values = grid[start:stop, column - 1] if column <= grid.shape[1] else np.empty(0, dtype=object)
+    return _as_codes(_padded(values, stop - start))
+
+def _row_values(grid: np.ndarray, row: int, start: int, stop: int) -> np.ndarray:
+    """Formatted codes of grid[row-1, start:stop] (None beyond the sheet)."""
+    values = grid[row - 1, start:stop] if row <= grid.shape[0] else np.empty(0, dtype=object)
+    return _as_codes(_padded(values, stop - start))
+
+@dataclass
+class EddMapping:
+    """One compiled Coord-Mapping."""
+    name: str
+    dataflow: str
+    agency: str
+    version: str
+    worksheet: Optional[str]
+    top_left: Tuple[int, int]
+    bottom_right: Tuple[int, int]
+    exclude_nulls: bool = False
+    is_active: bool = True
+    dimensions: List[DimensionMapping] = field(default_factory=list)
+
+    @property
+    def range(self) -> str:
+        (r0, c0), (r1, c1) = self.top_left, self.bottom_right
+        return f"{column_letter(c0)}{r0}:{column_letter(c1)}{r1}"
+
+    @property
+    def codes(self) -> List[str]:
+        return [d.code for d in self.dimensions]
+
+    def _band(self, grid: np.ndarray, start: int, stop: int, exclude_nulls: bool) -> pd.DataFrame:
+        """Observations of block rows [start, stop) (0-based grid rows)."""
+        c0, c1 = self.top_left[1] - 1, self.bottom_right[1]
+        nr, nc = stop - start, c1 - c0
+        block = np.full((nr, nc), None, dtype=object)
+        part = grid[start:stop, c0:c1]
+        block[:, :part.shape[1]] = part
+        n = nr * nc
+
+        out: Dict[str, np.ndarray] = {}
+        for dim in self.dimensions:
+            ref = dim.ref
+            if ref is None:
+                out[dim.code] = np.full(n, dim.value, dtype=object)
+            elif ref.row is None and ref.column is None:
+                out[dim.code] = _as_codes(block.ravel())
+            elif ref.row is None:
+                # row-wise dimension: one value per block row, repeated across columns
+                out[dim.code] = np.repeat(_column_values(grid, ref.column, start, stop), nc)
+            elif ref.column is None:
+                # column-wise dimension: one value per block column, tiled down the rows
+                out[dim.code] = np.tile(_row_values(grid, ref.row, c0, c1), nr)
+            else:
+                cell = grid[ref.row - 1, ref.column - 1] if (ref.row <= grid.shape[0]
+                                                             and ref.column <= grid.shape[1]) else None
+                out[dim.code] = np.full(n, None if pd.isna(cell) else _code_str(cell), dtype=object)
+        values = block.ravel()
+        out["OBS_VALUE"] = values
+        frame = pd.DataFrame(out)
+        if exclude_nulls:
+            frame = frame[pd.notna(values)]
+        return frame
+
+    def iter_extract(self, grid: np.ndarray, chunk_rows: int = 50_000,
+                     exclude_nulls: Optional[bool] = None) -> Iterator[pd.DataFrame]:
+        """Observation chunks of about chunk_rows cells, row-major over the block."""
+        exclude_nulls = self.exclude_nulls if exclude_nulls is None else exclude_nulls
+        start = self.top_left[0] - 1
+        stop = min(self.bottom_right[0], grid.shape[0])
+        width = self.bottom_right[1] - self.top_left[1] + 1
+        step = max(1, chunk_rows // width)
+        for band in range(start, stop, step):
+            yield self._band(grid, band, min(band + step, stop), exclude_nulls)
+
+    def extract(self, grid: np.ndarray, exclude_nulls: Optional[bool] = None) -> pd.DataFrame:
+        chunks = list(self.iter_extract(grid, chunk_rows=sys.maxsize, exclude_nulls=exclude_nulls))
+        return chunks[0] if chunks else pd.DataFrame(columns=self.codes + ["OBS_VALUE"])
+
+    def check(self, grid: np.ndarray, dsd: Optional[DataStructure] = None) -> List[str]:
+        """Problems with this mapping against a sheet (and its DSD)."""
+        problems: List[str] = []
+        (r0, c0), (r1, c1) = self.top_left, self.bottom_right
+        n_rows, n_cols = grid.shape
+        if r0 > r1 or c0 > c1:
+            problems.append(f"empty block {self.range}")
+        if r1 > n_rows or c1 > n_cols:
+            problems.append(f"block {self.range} exceeds the sheet ({column_letter(n_cols)}{n_rows})")
+        if r1 < n_rows:
+            below = grid[r1:, c0 - 1:c1]
+            filled = int(pd.notna(below).any(axis=1).sum()) if below.size else 0
+            if filled:
+                problems.append(f"{filled:,} rows with values below Bottom-Right row {r1} are not mapped")
+        for dim in self.dimensions:
+            ref = dim.ref
+            if ref is not None and ((ref.row or 0) > n_rows or (ref.column or 0) > n_cols):
+                problems.append(f"{dim.code}: {ref} is outside the sheet")
+        seen = set()
+        for code in self.codes:
+            if code in seen:
+                problems.append(f"{code} mapped more than once")
+            seen.add(code)
+
+        block = grid[r0 - 1:r1, c0 - 1:c1]
+        numeric = pd.to_numeric(pd.Series(block.ravel(), dtype=object), errors="coerce")
+        non_numeric = int((numeric.isna() & pd.notna(block.ravel())).sum())
+        if non_numeric:
+            problems.append(f"{non_numeric:,} non-numeric cells in {self.range}")
+
+        if dsd is not None:
+            unknown = [c for c in self.codes if c not in dsd.by_id]
+            unmapped = [d for d in dsd.dimension_ids if d not in seen]
+            if unknown:
+                problems.append(f"not in {dsd.id}: {unknown}")
+            if unmapped:
+                problems.append(f"{dsd.id} dimensions not mapped: {unmapped}")
+        return problems
+
+# ---------- Parsing ----------
+
+def _bool(value: Optional[str], default: bool) -> bool:
+    return default if value is None else value.strip().lower() == "true"
+
+def _dimension(el: etree._Element) -> DimensionMapping:
+    code = el.get("Code")
+    if el.get("Coord") is not None:
+        return DimensionMapping(code, ref=compile_expression(el.get("Coord")))
+    value = el.get("Value", "")
+    if not _bool(el.get("IsExpression"), True):
+        return DimensionMapping(code, value=value)
+    return DimensionMapping(code, ref=compile_expression(value))
+
+def parse_edd(path: Path) -> List[EddMapping]:
+    """All Coord-Mappings of an EDD file. Malformed markup is recovered with a warning."""
+    path = Path(path)
+    parser = etree.XMLParser(recover=True, remove_comments=True)
+    root = etree.parse(str(path), parser).getroot()
+    if parser.error_log:
+        logger.warning("%s is not well-formed, parsed with recovery: %s", path, parser.error_log[0].message)
+
+    mappings = []
+    for cm in root.iter("Coord-Mapping"):
+        sheet = cm.find("Worksheets/Worksheet")
+        mappings.append(EddMapping(
+            name=cm.get("Name", ""),
+            dataflow=root.get("Dataflow", ""),
+            agency=root.get("Agency", ""),
+            version=root.get("Version", ""),
+            worksheet=sheet.get("Name") if sheet is not None else None,
+            top_left=parse_coord(cm.find("Top-Left").get("Coord")),
+            bottom_right=parse_coord(cm.find("Bottom-Right").get("Coord")),
+            exclude_nulls=_bool(cm.get("ExcludeNulls"), False),
+            is_active=_bool(cm.get("IsActive"), True),
+            dimensions=[_dimension(d) for d in cm.iter("Dimension")],
+        ))
+    return mappings
+
+def load_edd(domain: str, registry: Optional[StructureRegistry] = None) -> EddMapping:
+    """First active mapping of a domain's edd.xml."""
+    registry = registry or load_registry()
+    dom = registry.domain(domain)
+    if dom.edd is None:
+        raise FileNotFoundError(f"{domain}: no edd.xml under {dom.path}")
+    mappings = [m for m in parse_edd(dom.edd) if m.is_active]
+    if not mappings:
+        raise ValueError(f"{dom.edd}: no active Coord-Mapping")
+    return mappings[0]
+
+def read_grid(path: Path, worksheet: Optional[str] = None) -> np.ndarray:
+    """Sheet cells as a 2-D object array; grid[r-1, c-1] is Excel cell (r, c)."""
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[worksheet] if worksheet and worksheet in wb.sheetnames else wb.worksheets[0]
+        if worksheet and worksheet not in wb.sheetnames:
+            logger.warning("%s has no sheet %r, using %r", path, worksheet, ws.title)
+        rows = list(ws.iter_rows(min_row=1, values_only=True))
+    finally:
+        wb.close()
+    width = max((len(r) for r in rows), default=0)
+    grid = np.full((len(rows), width), None, dtype=object)
+    for i, row in enumerate(rows):
+        grid[i, :len(row)] = row
+    return grid
+
+# ---------- CLI ----------
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check EDD mappings against the prepared outputs.")
+    parser.add_argument("domains", nargs="*", help="domains (default: all with an EDD and an output)")
+    parser.add_argument("--csv", type=Path, help="write <DOMAIN>.csv (SDMX-CSV) from the EDD into this directory")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    registry = load_registry()
+    domains = [d.upper() for d in args.domains] or list(LAYOUTS)
+    ok = True
+    for name in domains:
+        path = PREPARED_DIR / LAYOUTS[name].file
+        if not path.exists():
+            logger.warning("Skipping %s: %s not found", name, path)
+            continue
+        mapping = load_edd(name, registry)
+        dsd = registry.domain(name).dsd
+        t0 = time.perf_counter()
+        grid = read_grid(path, mapping.worksheet)
+        obs = mapping.extract(grid)
+        elapsed = time.perf_counter() - t0
+        problems = mapping.check(grid, dsd)
+        ok &= not problems
+        print(f"{name:5s} {mapping.name} {mapping.range:10s} {len(obs):>9,} observations  ({elapsed:.2f}s)")
+        for p in problems:
+            print(f"    - {p}")
+        if args.csv:
+            missing = [d for d in dsd.dimension_ids if d not in mapping.codes]
+            if missing:
+                print(f"    (no SDMX-CSV: {missing} not mapped)")
+                continue
+            args.csv.mkdir(parents=True, exist_ok=True)
+            write_sdmx_csv(mapping.iter_extract(grid), name, args.csv / f"{name}.csv", registry=registry)
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
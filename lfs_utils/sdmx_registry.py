@@ -0,0 +1,379 @@
+# sdmx_registry.py
+"""
+Indexed in-memory registry of the SDMX 2.1 structures under metadata/.
+
+Every domain folder (metadata/<DOMAIN>/) holds a DSD, a concept scheme, a
+dataflow, an EDD and its codelists. All SDMX files are streamed with
+lxml.iterparse and compiled into plain dataclasses with dict indexes:
+dimensions by id and position, codes by id and by label, attributes by
+attachment level. Compiled files are pickled per file and keyed by content
+hash, so a warm start only hashes the files and unpickles.
+
+    reg = load_registry()
+    hicp = reg.domain("HICP")
+    hicp.dimension_ids                          # DSD order
+    hicp.codelist_for("ICP_SUFFIX").label("ANR")    # 'Annual rate of change'
+    hicp.codelist_for("ICP_SUFFIX").code_for("Annual average index")  # 'AVX'
+"""
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+import os
+import pickle
+
+from .stage_cache import file_digest
+
+logger = logging.getLogger(__name__)
+
+METADATA_DIR = Path("metadata")
+DEFAULT_CACHE_DIR = Path(os.environ.get("SDMX_CACHE_DIR", ".cache/sdmx"))
+
+# Bump when the compiled layout changes, so stale pickles are ignored
+COMPILED_VERSION = 1
+
+@dataclass
+class Code:
+    id: str
+    names: Dict[str, str] = field(default_factory=dict)
+    parent: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        return self.names.get("en") or next(iter(self.names.values()), self.id)
+
+@dataclass
+class Codelist:
+    id: str
+    agency: str
+    version: str
+    names: Dict[str, str] = field(default_factory=dict)
+    codes: Dict[str, Code] = field(default_factory=dict)
+    by_label: Dict[str, str] = field(default_factory=dict)
+
+    def index(self) -> "Codelist":
+        """Build the label → code index (all languages, case-insensitive)."""
+        self.by_label = {}
+        for code in self.codes.values():
+            for label in code.names.values():
+                self.by_label.setdefault(label.strip().casefold(), code.id)
+        return self
+
+    def __contains__(self, code_id: object) -> bool:
+        return code_id in self.codes
+
+    def label(self, code_id: str, lang: str = "en") -> Optional[str]:
+        code = self.codes.get(code_id)
+        if code is None:
+            return None
+        return code.names.get(lang, code.name)
+
+    def code_for(self, label: str) -> Optional[str]:
+        return self.by_label.get(str(label).strip().casefold())
+
+@dataclass
+class Concept:
+    id: str
+    names: Dict[str, str] = field(default_factory=dict)
+
+@dataclass
+class ConceptScheme:
+    id: str
+    agency: str
+    version: str
+    names: Dict[str, str] = field(default_factory=dict)
+    concepts: Dict[str, Concept] = field(default_factory=dict)
+
+@dataclass
+class Component:
+    """Dimension, time dimension, primary measure or attribute of a DSD."""
+    id: str
+    kind: str                                # dimension | time | measure | attribute
+    position: Optional[int] = None
+    concept: Optional[str] = None
+    codelist: Optional[str] = None
+    codelist_agency: Optional[str] = None
+    codelist_version: Optional[str] = None
+    text_type: Optional[str] = None
+    attachment: Optional[str] = None         # attributes: dataset | series | group | observation
+    related_dimensions: Tuple[str, ...] = ()
+    assignment_status: Optional[str] = None
+
+@dataclass
+class DataStructure:
+    id: str
+    agency: str
+    version: str
+    names: Dict[str, str] = field(default_factory=dict)
+    dimensions: List[Component] = field(default_factory=list)
+    time_dimension: Optional[Component] = None
+    measure: Optional[Component] = None
+    attributes: List[Component] = field(default_factory=list)
+    by_id: Dict[str, Component] = field(default_factory=dict)
+    by_position: Dict[int, Component] = field(default_factory=dict)
+    attributes_by_level: Dict[str, List[Component]] = field(default_factory=dict)
+
+    def index(self) -> "DataStructure":
+        self.dimensions.sort(key=lambda c: c.position or 0)
+        comps = self.dimensions + [c for c in (self.time_dimension, self.measure) if c] + self.attributes
+        self.by_id = {c.id: c for c in comps}
+        self.by_position = {c.position: c for c in self.dimensions + [self.time_dimension] if c and c.position}
+        self.attributes_by_level = {}
+        for attr in self.attributes:
+            self.attributes_by_level.setdefault(attr.attachment or "dataset", []).append(attr)
+        return self
+
+    @property
+    def dimension_ids(self) -> List[str]:
+        """Dimension ids in DSD order, time dimension last."""
+        ids = [d.id for d in self.dimensions]
+        if self.time_dimension is not None:
+            ids.append(self.time_dimension.id)
+        return ids
+
+@dataclass
+class Dataflow:
+    id: str
+    agency: str
+    version: str
+    names: Dict[str, str] = field(default_factory=dict)
+    structure: Optional[str] = None
+
+@dataclass
+class Fragment:
+    """Everything compiled from one SDMX file."""
+    codelists: Dict[str, Codelist] = field(default_factory=dict)
+    concept_schemes: Dict[str, ConceptScheme] = field(default_factory=dict)
+    structures: Dict[str, DataStructure] = field(default_factory=dict)
+    dataflows: Dict[str, Dataflow] = field(default_factory=dict)
+
+    def update(self, other: "Fragment") -> None:
+        self.codelists.update(other.codelists)
+        self.concept_schemes.update(other.concept_schemes)
+        self.structures.update(other.structures)
+        self.dataflows.update(other.dataflows)
+
+# ---------- Parsing ----------
+
+def _local(tag: Any) -> str:
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+_XML_LANG = "{http://www.w3.org/XML/1998/namespace}lang"
+
+def _names(el) -> Dict[str, str]:
+    return {
+        child.get(_XML_LANG, "en"): (child.text or "").strip()
+        for child in el if _local(child.tag) == "Name"
+    }
+
+def _ref(el, *path: str):
+    """Follow child local names, then return the Ref element below (or None)."""
+    for name in path:
+        el = next((c for c in el if _local(c.tag) == name), None)
+        if el is None:
+            return None
+    return next((c for c in el.iter() if _local(c.tag) == "Ref"), None)
+
+def _component(el, kind: str) -> Component:
+    concept = _ref(el, "ConceptIdentity")
+    enum = _ref(el, "LocalRepresentation", "Enumeration")
+    fmt = next((c for c in el.iter() if _local(c.tag) in ("TextFormat", "EnumerationFormat")), None)
+    position = el.get("position")
+    comp = Component(
+        id=el.get("id"),
+        kind=kind,
+        position=int(position) if position else None,
+        concept=concept.get("id") if concept is not None else None,
+        codelist=enum.get("id") if enum is not None else None,
+        codelist_agency=enum.get("agencyID") if enum is not None else None,
+        codelist_version=enum.get("version") if enum is not None else None,
+        text_type=fmt.get("textType") if fmt is not None else None,
+        assignment_status=el.get("assignmentStatus"),
+    )
+    if kind == "attribute":
+        rel = next((c for c in el if _local(c.tag) == "AttributeRelationship"), None)
+        comp.attachment, comp.related_dimensions = _attachment(rel)
+    return comp
+
+def _attachment(rel) -> Tuple[str, Tuple[str, ...]]:
+    if rel is None:
+        return "dataset", ()
+    kinds = [_local(c.tag) for c in rel]
+    if "PrimaryMeasure" in kinds:
+        return "observation", ()
+    if "Group" in kinds or "AttachmentGroup" in kinds:
+        return "group", ()
+    dims = tuple(r.get("id") for c in rel if _local(c.tag) == "Dimension"
+                 for r in c.iter() if _local(r.tag) == "Ref")
+    return ("series", dims) if dims else ("dataset", ())
+
+def parse_structure_file(path: Path) -> Fragment:
+    """Stream one SDMX-ML 2.1 structure message into a Fragment."""
+    from lxml import etree
+
+    frag = Fragment()
+    codelist = scheme = dsd = None
+    for event, el in etree.iterparse(str(path), events=("start", "end"), remove_comments=True):
+        tag = _local(el.tag)
+        if event == "start":
+            if tag == "Codelist":
+                codelist = Codelist(el.get("id"), el.get("agencyID"), el.get("version"))
+            elif tag == "ConceptScheme":
+                scheme = ConceptScheme(el.get("id"), el.get("agencyID"), el.get("version"))
+            elif tag == "DataStructure":
+                dsd = DataStructure(el.get("id"), el.get("agencyID"), el.get("version"))
+            continue
+
+        if tag == "Code" and codelist is not None:
+            parent = _ref(el, "Parent")
+            codelist.codes[el.get("id")] = Code(el.get("id"), _names(el),
+                                                parent.get("id") if parent is not None else None)
+        elif tag == "Codelist" and codelist is not None:
+            codelist.names = _names(el)
+            frag.codelists[codelist.id] = codelist.index()
+            codelist = None
+        elif tag == "Concept" and scheme is not None:
+            scheme.concepts[el.get("id")] = Concept(el.get("id"), _names(el))
+        elif tag == "ConceptScheme" and scheme is not None:
+            scheme.names = _names(el)
+            frag.concept_schemes[scheme.id] = scheme
+            scheme = None
+        elif tag == "Dimension" and dsd is not None and el.get("position"):
+            dsd.dimensions.append(_component(el, "dimension"))
+        elif tag == "TimeDimension" and dsd is not None:
+            dsd.time_dimension = _component(el, "time")
+        elif tag == "PrimaryMeasure" and dsd is not None and el.get("id"):
+            dsd.measure = _component(el, "measure")
+        elif tag == "Attribute" and dsd is not None and el.get("id"):
+            dsd.attributes.append(_component(el, "attribute"))
+        elif tag == "DataStructure" and dsd is not None:
+            dsd.names = _names(el)
+            frag.structures[dsd.id] = dsd.index()
+            dsd = None
+        elif tag == "Dataflow":
+            structure = _ref(el, "Structure")
+            frag.dataflows[el.get("id")] = Dataflow(
+                el.get("id"), el.get("agencyID"), el.get("version"), _names(el),
+                structure.get("id") if structure is not None else None,
+            )
+        else:
+            continue
+        # Compiled: free the subtree (components only after their DSD closes)
+        if tag in ("Codelist", "ConceptScheme", "DataStructure", "Dataflow"):
+            el.clear()
+    return frag
+
+# ---------- Registry ----------
+
+@dataclass
+class Domain:
+    """Structures of one metadata/<DOMAIN>/ folder."""
+    name: str
+    path: Path
+    structures: Fragment = field(default_factory=Fragment)
+    edd: Optional[Path] = None
+
+    @property
+    def dsd(self) -> Optional[DataStructure]:
+        return next(iter(self.structures.structures.values()), None)
+
+    @property
+    def dataflow(self) -> Optional[Dataflow]:
+        return next(iter(self.structures.dataflows.values()), None)
+
+    @property
+    def codelists(self) -> Dict[str, Codelist]:
+        return self.structures.codelists
+
+    @property
+    def dimension_ids(self) -> List[str]:
+        return self.dsd.dimension_ids if self.dsd else []
+
+    def dimension(self, key) -> Optional[Component]:
+        """Component by id, or dimension by 1-based position."""
+        if self.dsd is None:
+            return None
+        return self.dsd.by_position.get(key) if isinstance(key, int) else self.dsd.by_id.get(key)
+
+    def codelist_for(self, component_id: str) -> Optional[Codelist]:
+        """Local codelist enumerating a component (None when not shipped in metadata/)."""
+        comp = self.dimension(component_id)
+        if comp is None or comp.codelist is None:
+            return None
+        return self.codelists.get(comp.codelist)
+
+    def concept_name(self, concept_id: str, lang: str = "en") -> Optional[str]:
+        for scheme in self.structures.concept_schemes.values():
+            concept = scheme.concepts.get(concept_id)
+            if concept is not None:
+                return concept.names.get(lang) or next(iter(concept.names.values()), None)
+        return None
+
+class StructureRegistry:
+    """All domains under a metadata root, with a per-file compiled cache."""
+
+    def __init__(self, root: Path = METADATA_DIR, cache_dir: Optional[Path] = DEFAULT_CACHE_DIR):
+        self.root = Path(root)
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.domains: Dict[str, Domain] = {}
+        self.stats = {"parsed": 0, "cached": 0}
+
+    def load(self) -> "StructureRegistry":
+        for folder in sorted(p for p in self.root.iterdir() if p.is_dir()):
+            domain = Domain(folder.name, folder)
+            for path in sorted(folder.glob("*.xml")):
+                if path.name == "edd.xml":
+                    domain.edd = path
+                    continue
+                domain.structures.update(self._compile(path))
+            self.domains[domain.name] = domain
+        logger.info("SDMX registry: %d domains, %d files parsed, %d from cache",
+                    len(self.domains), self.stats["parsed"], self.stats["cached"])
+        return self
+
+    def _compile(self, path: Path) -> Fragment:
+        digest = file_digest(path)
+        cached = self.cache_dir / f"{digest}.pkl" if self.cache_dir is not None else None
+        if cached is not None and cached.exists():
+            try:
+                with open(cached, "rb") as f:
+                    version, frag = pickle.load(f)
+                if version == COMPILED_VERSION:
+                    self.stats["cached"] += 1
+                    return frag
+            except Exception as e:
+                logger.warning("Ignoring unreadable compiled cache %s: %s", cached, e)
+
+        frag = parse_structure_file(path)
+        self.stats["parsed"] += 1
+        if cached is not None:
+            cached.parent.mkdir(parents=True, exist_ok=True)
+            tmp = cached.with_suffix(".tmp")
+            with open(tmp, "wb") as f:
+                pickle.dump((COMPILED_VERSION, frag), f, protocol=pickle.HIGHEST_PROTOCOL)
+            tmp.replace(cached)
+        return frag
+
+    def domain(self, name: str) -> Domain:
+        try:
+            return self.domains[name.upper()]
+        except KeyError:
+            raise KeyError(f"No SDMX structures for domain {name!r} under {self.root}") from None
+
+    def find_codelist(self, codelist_id: str, agency: Optional[str] = None) -> Optional[Codelist]:
+        """First codelist with this id (and agency, if given) in any domain."""
+        for domain in self.domains.values():
+            codelist = domain.codelists.get(codelist_id)
+            if codelist is not None and (agency is None or codelist.agency == agency):
+                return codelist
+        return None
+
+_REGISTRY: Optional[StructureRegistry] = None
+
+def load_registry(root: Path = METADATA_DIR, cache_dir: Optional[Path] = DEFAULT_CACHE_DIR,
+                  refresh: bool = False) -> StructureRegistry:
+    """Process-wide registry, built on first use."""
+    global _REGISTRY
+    if refresh or _REGISTRY is None or _REGISTRY.root != Path(root):
+        _REGISTRY = StructureRegistry(root, cache_dir).load()
+    return _REGISTRY
@@ -0,0 +1,486 @@
+# sdmx_service.py
+"""
+Local SDMX-REST-style data endpoint over the prepared outputs.
+
+    python -m lfs_utils.sdmx_service --port 8765
+    curl 'http://127.0.0.1:8765/data/ELS-HICP/M..ANR.?startPeriod=2020-01&format=json'
+    curl 'http://127.0.0.1:8765/data/LFS/Q.EL30+EL51..................................?startPeriod=2001-Q2'
+    curl 'http://127.0.0.1:8765/dataflow'              # flows and their key dimensions
+
+Routes:
+
+    /data/{flow}[/{key}]   flow: domain (LFS), dataflow id (ELS-LFS) or
+                           AGENCY,ID,VERSION; key: one part per DSD dimension
+                           except TIME_PERIOD, in DSD order, '.'-separated;
+                           empty part = any code, A+B = either; "all" = all
+    /dataflow              flows, dimension order and observation counts
+
+Query: startPeriod / endPeriod (2010, 2010-Q1, 2010-M03, 2010-03, ...),
+format=csv|json (or Accept: application/vnd.sdmx.data+csv / +json).
+Responses are streamed in chunks: SDMX-CSV through sdmx_writers, or an
+SDMX-JSON data message with series keyed by dimension value positions.
+
+Each flow is loaded once from its prepared output (tidy_observations over
+read_table, so the Parquet twin when fresh). Dimensions the output does not
+carry are '_Z', except REF_AREA 'EL'. Every dimension gets an inverted index
+(rows sorted by code, with offsets per code), so a key resolves by
+intersecting sorted row-id lists, smallest first, instead of scanning. The
+build manifest (.cache/build/nodes, written by pipeline.py) is polled; when
+it changes, flows whose output file changed are rebuilt on their next
+request.
+"""
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+import argparse
+import json
+import logging
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from .build_cache import DEFAULT_BUILD_DIR
+from .columnar import parquet_path, read_table
+from .sdmx_registry import StructureRegistry, load_registry
+from .sdmx_validate import LAYOUTS, PREPARED_DIR, _code_str
+from .sdmx_writers import _as_values, iter_sdmx_csv
+from .tracing import traced
+
+logger = logging.getLogger(__name__)
+
+CONSTANTS = {"REF_AREA": "EL"}
+NOT_APPLICABLE = "_Z"
+MANIFEST_DIR = DEFAULT_BUILD_DIR / "nodes"
+CHUNK_ROWS = 20_000
+CSV_TYPE = "application/vnd.sdmx.data+csv; charset=utf-8"
+JSON_TYPE = "application/vnd.sdmx.data+json; charset=utf-8"
+
+class QueryError(ValueError):
+    """Bad request (HTTP 400)."""
+
+class NotFound(LookupError):
+    """Unknown flow or no matching observations (HTTP 404)."""
+
+# ---------- Periods ----------
+
+def period_bounds(period: str) -> Tuple[Optional[np.datetime64], Optional[np.datetime64]]:
+    """First and last day of an SDMX period (YYYY, YYYY-Sn, -Qn, -Mnn, -nn, -Wnn, -nn-nn); (None, None) if unknown."""
+    p = str(period).strip().upper()
+    try:
+        year = int(p[:4])
+        rest = p[5:] if len(p) > 4 and p[4] == "-" else p[4:]
+        if not rest or rest == "A1":
+            first, months = 1, 12
+        elif rest[0] == "S":
+            first, months = (int(rest[1:]) - 1) * 6 + 1, 6
+        elif rest[0] == "Q":
+            first, months = (int(rest[1:]) - 1) * 3 + 1, 3
+        elif rest[0] == "M":
+            first, months = int(rest[1:]), 1
+        elif rest[0] == "W":
+            start = np.datetime64(f"{year}-01-04") - (np.datetime64(f"{year}-01-04").astype(object).weekday())
+            start = start + np.timedelta64(7 * (int(rest[1:]) - 1), "D")
+            return start, start + np.timedelta64(6, "D")
+        elif len(rest) == 5:                      # YYYY-MM-DD
+            day = np.datetime64(p[:10], "D")
+            return day, day
+        else:
+            first, months = int(rest), 1
+        if not 1 <= first <= 12 or first + months - 1 > 12:
+            return None, None
+        start = np.datetime64(f"{year}-{first:02d}", "M")
+        end = start + np.timedelta64(months, "M")
+        return start.astype("datetime64[D]"), end.astype("datetime64[D]") - np.timedelta64(1, "D")
+    except ValueError:
+        return None, None
+
+# ---------- Index ----------
+
+@dataclass
+class DimensionIndex:
+    """Codes of one dimension: per-row code numbers and rows grouped by code (ascending row ids)."""
+    labels: List[str]
+    codes: np.ndarray                             # row → code number
+    rows: np.ndarray                              # row ids ordered by code, ascending within a code
+    offsets: np.ndarray                           # rows[offsets[i]:offsets[i + 1]] have labels[i]
+    by_label: Dict[str, int] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, values: np.ndarray) -> "DimensionIndex":
+        codes, uniques = pd.factorize(values, sort=True)
+        counts = np.bincount(codes, minlength=len(uniques))
+        labels = [str(u) for u in uniques]
+        return cls(labels, codes.astype(np.int32), np.argsort(codes, kind="stable").astype(np.int64),
+                   np.concatenate(([0], np.cumsum(counts))), {label: i for i, label in enumerate(labels)})
+
+    def postings(self, label: str) -> np.ndarray:
+        i = self.by_label.get(label)
+        if i is None:
+            return self.rows[:0]
+        return self.rows[self.offsets[i]:self.offsets[i + 1]]
+
+    def select(self, labels: Sequence[str]) -> np.ndarray:
+        lists = [self.postings(label) for label in labels]
+        if len(lists) == 1:
+            return lists[0]
+        return np.unique(np.concatenate(lists))
+
+@dataclass
+class FlowIndex:
+    domain: str
+    flow_ref: str                                 # AGENCY:ID(VERSION), as in SDMX-CSV
+    dimensions: List[str]                         # key dimensions, DSD order
+    time: np.ndarray                              # TIME_PERIOD per row
+    time_start: np.ndarray                        # datetime64[D], NaT when unparsable
+    time_end: np.ndarray
+    values: np.ndarray                            # float64 OBS_VALUE
+    index: Dict[str, DimensionIndex]
+    source: Tuple = ()                            # stat signature of the output it was built from
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def resolve(self, key: str = "all", start: Optional[str] = None, end: Optional[str] = None) -> np.ndarray:
+        """Ascending row ids matching a key and period range."""
+        parts = [] if key in ("", "all", "ALL") else key.split(".")
+        if parts and len(parts) != len(self.dimensions):
+            raise QueryError(f"{self.domain}: key has {len(parts)} parts, the DSD has {len(self.dimensions)} "
+                             f"dimensions ({'.'.join(self.dimensions)})")
+        selections = [self.index[dim].select(part.split("+"))
+                      for dim, part in zip(self.dimensions, parts) if part not in ("", "*")]
+        if selections:
+            selections.sort(key=len)
+            rows = selections[0]
+            for other in selections[1:]:
+                if not len(rows):
+                    break
+                rows = np.intersect1d(rows, other, assume_unique=True)
+        else:
+            rows = np.arange(len(self), dtype=np.int64)
+
+        if start or end:
+            keep = np.ones(len(rows), dtype=bool)
+            if start:
+                first = period_bounds(start)[0]
+                if first is None:
+                    raise QueryError(f"startPeriod {start!r} is not an SDMX period")
+                keep &= self.time_end[rows] >= first
+            if end:
+                last = period_bounds(end)[1]
+                if last is None:
+                    raise QueryError(f"endPeriod {end!r} is not an SDMX period")
+                keep &= self.time_start[rows] <= last
+            rows = rows[keep]
+        return rows
+
+    def frame(self, rows: np.ndarray) -> pd.DataFrame:
+        """Observations of `rows`: key dimensions, TIME_PERIOD, OBS_VALUE."""
+        out = {dim: np.asarray(self.index[dim].labels, dtype=object)[self.index[dim].codes[rows]]
+               for dim in self.dimensions}
+        out["TIME_PERIOD"] = self.time[rows]
+        out["OBS_VALUE"] = self.values[rows]
+        return pd.DataFrame(out)
+
+def _codes(values: pd.Series) -> np.ndarray:
+    """Code text per row, '_Z' where missing (each distinct value formatted once)."""
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    labels = np.array([_code_str(u) for u in uniques] + [NOT_APPLICABLE], dtype=object)
+    return labels[codes]
+
+def _source_signature(path: Path) -> Tuple:
+    sig = []
+    for p in (path, parquet_path(path) / "_meta.json"):
+        try:
+            st = p.stat()
+            sig.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            sig.append(None)
+    return tuple(sig)
+
+@traced("read")
+def build_flow(domain: str, registry: Optional[StructureRegistry] = None,
+               prepared_dir: Path = PREPARED_DIR) -> FlowIndex:
+    """Index the observations of one domain's prepared output."""
+    from .sdmx_writers import tidy_observations
+
+    registry = registry or load_registry()
+    dom = registry.domain(domain)
+    dsd, flow = dom.dsd, dom.dataflow
+    path = Path(prepared_dir) / LAYOUTS[domain].file
+    if not path.exists():
+        raise NotFound(f"{domain}: {path} not found")
+    source = _source_signature(path)
+
+    chunks = list(tidy_observations(read_table(path, dtype=object), domain, registry=registry))
+    obs = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=["OBS_VALUE"])
+    values = pd.to_numeric(obs["OBS_VALUE"], errors="coerce").to_numpy(dtype="float64")
+    present = ~np.isnan(values)
+    obs, values = obs[present].reset_index(drop=True), values[present]
+
+    time_id = dsd.time_dimension.id
+    dimensions = [d for d in dsd.dimension_ids if d != time_id]
+    index = {}
+    for dim in dimensions:
+        if dim in obs.columns:
+            column = _codes(obs[dim])
+        else:
+            column = np.full(len(obs), CONSTANTS.get(dim, NOT_APPLICABLE), dtype=object)
+        index[dim] = DimensionIndex.build(column)
+
+    time = _codes(obs[time_id]) if time_id in obs.columns else np.full(len(obs), NOT_APPLICABLE, dtype=object)
+    periods, inverse = np.unique(time.astype(str), return_inverse=True)
+    bounds = [period_bounds(p) for p in periods]
+    nat = np.datetime64("NaT", "D")
+    starts = np.array([nat if b[0] is None else b[0] for b in bounds], dtype="datetime64[D]")
+    ends = np.array([nat if b[1] is None else b[1] for b in bounds], dtype="datetime64[D]")
+
+    logger.info("%s: indexed %d observations, %d dimensions", domain, len(values), len(dimensions))
+    return FlowIndex(domain, f"{flow.agency}:{flow.id}({flow.version})", dimensions, time,
+                     starts[inverse], ends[inverse], values, index, source)
+
+# ---------- Catalog (hot reload) ----------
+
+class Catalog:
+    """Flow indexes by domain, built on first use and rebuilt after the build manifest changes."""
+
+    def __init__(self, registry: Optional[StructureRegistry] = None, prepared_dir: Path = PREPARED_DIR,
+                 manifest_dir: Path = MANIFEST_DIR, poll_seconds: float = 1.0):
+        self.registry = registry or load_registry()
+        self.prepared_dir = Path(prepared_dir)
+        self.manifest_dir = Path(manifest_dir)
+        self.poll_seconds = poll_seconds
+        self._flows: Dict[str, FlowIndex] = {}
+        self._lock = threading.Lock()                 # guards _flows and _building
+        self._building: Dict[str, threading.Lock] = {}
+        self._manifest = self._manifest_signature()
+        self._checked = time.monotonic()
+        self._aliases: Dict[str, str] = {}
+        for name in LAYOUTS:
+            flow = self.registry.domain(name).dataflow
+            for alias in (name, flow.id, f"{flow.agency},{flow.id}", f"{flow.agency},{flow.id},{flow.version}"):
+                self._aliases[alias.upper()] = name
+
+    def domain_of(self, flow: str) -> str:
+        name = self._aliases.get(unquote(flow).upper())
+        if name is None:
+            raise NotFound(f"unknown dataflow {flow!r}; known: {', '.join(LAYOUTS)}")
+        return name
+
+    def _manifest_signature(self) -> Tuple:
+        try:
+            return tuple(sorted((p.name, p.stat().st_mtime_ns) for p in self.manifest_dir.glob("*.json")))
+        except OSError:
+            return ()
+
+    def refresh(self) -> List[str]:
+        """Drop flows whose output changed since they were built, if the manifest changed; returns them."""
+        now = time.monotonic()
+        if now - self._checked < self.poll_seconds:
+            return []
+        self._checked = now
+        manifest = self._manifest_signature()
+        if manifest == self._manifest:
+            return []
+        self._manifest = manifest
+        stale = [name for name, flow in self._flows.items()
+                 if _source_signature(self.prepared_dir / LAYOUTS[name].file) != flow.source]
+        for name in stale:
+            del self._flows[name]
+        if stale:
+            logger.info("Build manifest changed; reloading %s", ", ".join(stale))
+        return stale
+
+    def get(self, flow: str) -> FlowIndex:
+        """
+        The flow's index, building it on first use. Builds run under a
+        per-flow lock, so a slow build does not block requests for flows
+        that are already loaded, and concurrent requests build a flow once.
+        """
+        name = self.domain_of(flow)
+        with self._lock:
+            self.refresh()
+            index = self._flows.get(name)
+            if index is not None:
+                return index
+            building = self._building.setdefault(name, threading.Lock())
+        with building:
+            with self._lock:
+                index = self._flows.get(name)
+            if index is None:
+                index = build_flow(name, self.registry, self.prepared_dir)
+                with self._lock:
+                    self._flows[name] = index
+            return index
+
+    def loaded(self) -> Dict[str, FlowIndex]:
+        return dict(self._flows)
+
+# ---------- Responses ----------
+
+def iter_csv(flow: FlowIndex, rows: np.ndarray, registry: StructureRegistry) -> Iterator[str]:
+    chunks = (flow.frame(rows[i:i + CHUNK_ROWS]) for i in range(0, len(rows), CHUNK_ROWS))
+    yield from iter_sdmx_csv(chunks, flow.domain, registry=registry)
+
+def iter_json(flow: FlowIndex, rows: np.ndarray) -> Iterator[str]:
+    """SDMX-JSON data message: series keyed by dimension value positions, observations by time position."""
+    dims = flow.dimensions
+    # Dimension values present in the result, positions per row
+    positions, values = [], []
+    for dim in dims:
+        idx = flow.index[dim]
+        used, pos = np.unique(idx.codes[rows], return_inverse=True)
+        positions.append(pos)
+        values.append([{"id": idx.labels[i]} for i in used])
+    periods, time_pos = np.unique(flow.time[rows].astype(str), return_inverse=True)
+
+    structure = {
+        "dimensions": {
+            "series": [{"id": dim, "keyPosition": k, "values": v} for k, (dim, v) in enumerate(zip(dims, values))],
+            "observation": [{"id": "TIME_PERIOD", "keyPosition": len(dims), "values": [{"id": p} for p in periods]}],
+        },
+    }
+    yield ('{"meta":' + json.dumps({"schema": "https://json.sdmx.org/1.0/sdmx-json-data-schema.json",
+                                    "prepared": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                                    "sender": {"id": "ELSTAT"}, "dataflow": flow.flow_ref})
+           + ',"data":{"structure":' + json.dumps(structure) + ',"dataSets":[{"action":"Information","series":{')
+
+    if len(rows):
+        keys = np.full(len(rows), "", dtype=object)
+        for k, pos in enumerate(positions):
+            keys = keys + (":" if k else "") + pos.astype(str).astype(object)
+        order = np.lexsort((time_pos, keys.astype(str)))
+        keys, time_pos, obs_values = keys[order], time_pos[order], _as_values(pd.Series(flow.values[rows][order]))
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        ends = np.r_[starts[1:], len(keys)]
+        first = True
+        for s in range(0, len(starts), 500):
+            parts = []
+            for start, stop in zip(starts[s:s + 500], ends[s:s + 500]):
+                obs = ",".join(f'"{t}":[{v if v is not None else "null"}]'
+                               for t, v in zip(time_pos[start:stop], obs_values[start:stop]))
+                parts.append(("" if first else ",") + f'"{keys[start]}":{{"observations":{{{obs}}}}}')
+                first = False
+            yield "".join(parts)
+    yield "}}]}}\n"
+
+def query(catalog: Catalog, flow: str, key: str = "all", params: Optional[Dict[str, str]] = None,
+          fmt: str = "csv") -> Tuple[str, Iterator[str], int]:
+    """(content type, body pieces, observation count) for one data request."""
+    params = params or {}
+    index = catalog.get(flow)
+    rows = index.resolve(key, params.get("startPeriod"), params.get("endPeriod"))
+    if not len(rows):
+        raise NotFound("NoResultsFound")
+    if fmt == "json":
+        return JSON_TYPE, iter_json(index, rows), len(rows)
+    return CSV_TYPE, iter_csv(index, rows, catalog.registry), len(rows)
+
+# ---------- HTTP ----------
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    catalog: Catalog = None                       # set by serve()
+
+    def log_message(self, fmt, *args):
+        logger.info("%s %s", self.address_string(), fmt % args)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        self._streaming = False
+        try:
+            if parts == ["dataflow"]:
+                self._send_json(self._dataflows())
+            elif len(parts) in (2, 3) and parts[0] == "data":
+                fmt = params.get("format") or ("json" if "json" in self.headers.get("Accept", "") else "csv")
+                if fmt not in ("csv", "json"):
+                    raise QueryError(f"format must be csv or json, not {fmt!r}")
+                t0 = time.perf_counter()
+                content_type, body, n = query(self.catalog, parts[1], parts[2] if len(parts) == 3 else "all",
+                                              params, fmt)
+                self._stream(content_type, body)
+                logger.info("%s: %d observations in %.3fs", url.path, n, time.perf_counter() - t0)
+            else:
+                raise NotFound(f"no route {url.path}; use /data/{{flow}}/{{key}} or /dataflow")
+        except QueryError as exc:
+            self._send_error(400, str(exc))
+        except NotFound as exc:
+            self._send_error(404, str(exc))
+        except Exception:
+            logger.exception("%s failed", url.path)
+            if self._streaming:
+                # Headers and part of the body are out; drop the connection
+                # so the client sees a truncated response rather than a 200.
+                self.close_connection = True
+            else:
+                self._send_error(500, "internal server error")
+
+    def _dataflows(self) -> List[Dict]:
+        out = []
+        for name in LAYOUTS:
+            dom = self.catalog.registry.domain(name)
+            flow = dom.dataflow
+            loaded = self.catalog.loaded().get(name)
+            out.append({"domain": name, "id": flow.id, "agency": flow.agency, "version": flow.version,
+                        "key": [d for d in dom.dsd.dimension_ids if d != dom.dsd.time_dimension.id],
+                        "observations": len(loaded) if loaded is not None else None})
+        return out
+
+    def _stream(self, content_type: str, pieces: Iterator[str]) -> None:
+        self._streaming = True
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for piece in pieces:
+            data = piece.encode("utf-8")
+            if data:
+                self.wfile.write(b"%X\r\n%s\r\n" % (len(data), data))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _send_json(self, payload, status: int = 200) -> None:
+        data = json.dumps(payload, indent=1).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status: int, message: str) -> None:
+        self._send_json({"errors": [{"code": status, "title": message}]}, status)
+
+def serve(host: str = "127.0.0.1", port: int = 8765, catalog: Optional[Catalog] = None,
+          preload: Sequence[str] = ()) -> ThreadingHTTPServer:
+    """Start the server (call serve_forever() on the result)."""
+    catalog = catalog or Catalog()
+    for name in preload:
+        catalog.get(name)
+    handler = type("BoundHandler", (Handler,), {"catalog": catalog})
+    return ThreadingHTTPServer((host, port), handler)
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve the prepared outputs as an SDMX-REST-style data endpoint.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--preload", nargs="*", metavar="FLOW",
+                        help="flows to index at start-up (no names: all; default: each on its first request)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    preload = [] if args.preload is None else (args.preload or list(LAYOUTS))
+    server = serve(args.host, args.port, preload=preload)
+    print(f"SDMX data endpoint on http://{args.host}:{args.port}/data/{{flow}}/{{key}}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
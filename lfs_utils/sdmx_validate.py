@@ -0,0 +1,331 @@
+# sdmx_validate.py
+"""
+SDMX conformance validator for the prepared outputs in assets/prepared/.
+
+Each output is checked against metadata/<DOMAIN>/dsd.xml (via the structure
+registry) for:
+  - dimension completeness (every DSD dimension is carried by the file)
+  - missing values in dimension columns
+  - code membership in the dimension's codelist
+  - TIME_PERIOD format per FREQ
+  - duplicate series keys
+
+All checks work on factorized columns: Python only touches each distinct
+value (or distinct FREQ/TIME_PERIOD pair) once, never each cell, and keys
+are compared as 64-bit hashes.
+
+    python -m lfs_utils.sdmx_validate            # all outputs, in parallel
+    python -m lfs_utils.sdmx_validate HICP MCI   # exit code 1 on violations
+"""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import logging
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from .columnar import read_table
+from .dedup import dedup
+from .sdmx_registry import DataStructure, Domain, StructureRegistry, load_registry
+from .tracing import traced
+
+logger = logging.getLogger(__name__)
+
+PREPARED_DIR = Path("assets/prepared")
+
+# SDMX "not applicable" is valid for every coded dimension
+ALWAYS_VALID = {"_Z"}
+
+# Standard SDMX codelists referenced by the DSDs but not shipped in metadata/
+STANDARD_CODELISTS: Dict[str, Set[str]] = {
+    "CL_FREQ": {"A", "S", "Q", "M", "W", "D", "H", "B", "N"},
+}
+
+TIME_FORMATS: Dict[str, str] = {
+    "A": r"\d{4}",
+    "S": r"\d{4}-S[12]",
+    "Q": r"\d{4}-Q[1-4]",
+    "M": r"\d{4}-M(0[1-9]|1[0-2])",
+    "W": r"\d{4}-W(0[1-9]|[1-4]\d|5[0-3])",
+    "D": r"\d{4}-(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01])",
+}
+
+@dataclass(frozen=True)
+class Layout:
+    """
+    How an output file carries the DSD.
+
+    columns: extra output column → DSD component id (columns whose upper-cased
+             name is a component id are mapped automatically).
+    header_rows: leading rows holding codes per measure column, as
+             {row index: dimension id} (wide layouts).
+    measures: observation columns; default = every unmapped, unignored column.
+    time_in_columns: the measure column headers are TIME_PERIOD values.
+    keys: output columns that tell series apart without being DSD
+             dimensions; part of the duplicate-key check, not code-checked.
+    """
+    file: str
+    columns: Dict[str, str] = field(default_factory=dict)
+    header_rows: Dict[int, str] = field(default_factory=dict)
+    measures: Optional[Tuple[str, ...]] = None
+    ignore: Tuple[str, ...] = ()
+    time_in_columns: bool = False
+    keys: Tuple[str, ...] = ()
+
+LAYOUTS: Dict[str, Layout] = {
+    "MCI": Layout("MCI.xlsx",
+                  columns={"series_code": "MCI_SERIES", "index_mode": "ICP_SUFFIX"},
+                  measures=("value",)),
+    "HICP": Layout("HICP.xlsx",
+                   header_rows={0: "ICP_SUFFIX"},
+                   ignore=("YEAR", "MONTH")),
+    "CCI": Layout("CCI.xlsx",
+                  columns={"Category": "WORK_CATEGORY"},
+                  measures=("Value",),
+                  ignore=("Year", "Quarter", "CategoryName")),
+    "BLA": Layout("BLA.xlsx",
+                  header_rows={0: "UNIT_MEASURE", 1: "DWELLINGS", 2: "URBAN_STATUS", 3: "MEASUREMENT"}),
+    "NFG": Layout("NFG.xlsx",
+                  columns={"Date": "TIME_PERIOD"},
+                  header_rows={0: "MATURITY", 1: "ACCOUNTING_ENTRY", 2: "INSTR_ASSET", 3: "STO"}),
+    "EDP": Layout("EDP.xlsx",
+                  columns={"CL_NA_TABLEID/DATES": "CL_NA_TABLEID"},
+                  time_in_columns=True),
+    "LFS": Layout("LFS.xlsx",
+                  columns={"gender": "SEX", "education": "EDUCATION_LEVEL_MAIN",
+                           "employment_status": "MAIN_EMPLOYMENT_STATUS", "economic_sector": "SECTOR",
+                           "occupation": "TYPE_OCCUPATION", "unit_measure": "UNIT_OF_MEASURE"},
+                  measures=("value",),
+                  ignore=("ref_area", "source_agency", "file_source", "sheet_name"),
+                  keys=("indicator",)),
+}
+
+@dataclass
+class Violation:
+    rule: str            # missing_dimension | missing_value | invalid_code | invalid_time_period | duplicate_key
+    component: Optional[str]
+    column: Optional[str]
+    count: int
+    examples: List[Any] = field(default_factory=list)
+
+@dataclass
+class ValidationReport:
+    domain: str
+    path: str
+    rows: int
+    violations: List[Violation] = field(default_factory=list)
+    unchecked: List[str] = field(default_factory=list)   # components whose codelist is not available
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.violations
+
+    def summary(self) -> str:
+        status = "OK" if self.ok else f"{len(self.violations)} violation(s)"
+        lines = [f"{self.domain:<5} {status:<18} rows={self.rows:,} ({self.seconds*1000:.0f} ms)"]
+        for v in self.violations:
+            where = v.column if v.column is not None else v.component
+            examples = f"  e.g. {str(v.examples[:5])[:120]}" if v.examples else ""
+            lines.append(f"    - {v.rule:<20} {str(where)[:28]:<28} {v.count:>7,}{examples}")
+        return "\n".join(lines)
+
+def map_columns(columns: Iterable, dsd: DataStructure, layout: Layout) -> Tuple[Dict[Any, str], List[Any]]:
+    """Row-wise dimension columns (column → component id) and measure columns of a layout."""
+    mapped: Dict[Any, str] = {}
+    columns = list(columns)
+    for col in columns:
+        if col in layout.ignore:
+            continue
+        comp = layout.columns.get(col) or (str(col).upper() if str(col).upper() in dsd.by_id else None)
+        if comp is not None and dsd.by_id[comp].kind in ("dimension", "time"):
+            mapped[col] = comp
+    if layout.measures is not None:
+        measures = [c for c in layout.measures if c in columns]
+    else:
+        measures = [c for c in columns if c not in mapped and c not in layout.ignore]
+    return mapped, measures
+
+def _code_str(value: Any) -> str:
+    """Excel hands back 2007 / 2007.0 for codes typed as numbers."""
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+def _factorize_codes(values: pd.Series) -> Tuple[np.ndarray, List[str]]:
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    return codes, [_code_str(u) for u in uniques]
+
+def _allowed_codes(domain: Domain, registry: StructureRegistry, component_id: str) -> Optional[Set[str]]:
+    comp = domain.dimension(component_id)
+    if comp is None or comp.codelist is None:
+        return None
+    codelist = domain.codelists.get(comp.codelist) or registry.find_codelist(comp.codelist, comp.codelist_agency)
+    if codelist is not None:
+        return set(codelist.codes) | ALWAYS_VALID
+    if comp.codelist in STANDARD_CODELISTS:
+        return STANDARD_CODELISTS[comp.codelist] | ALWAYS_VALID
+    return None
+
+def _top_examples(uniques: List[str], counts: np.ndarray, mask: np.ndarray, n: int = 10) -> List[str]:
+    idx = np.flatnonzero(mask)
+    return [uniques[i] for i in idx[np.argsort(-counts[idx], kind="stable")][:n]]
+
+def _check_codes(codes: np.ndarray, uniques: List[str], allowed: Set[str],
+                 component: str, column: Any) -> Optional[Violation]:
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    bad = np.fromiter((u not in allowed for u in uniques), dtype=bool, count=len(uniques))
+    if not bad.any():
+        return None
+    return Violation("invalid_code", component, str(column), int(counts[bad].sum()),
+                     _top_examples(uniques, counts, bad))
+
+def _check_time(time_codes: np.ndarray, time_uniques: List[str],
+                freq_codes: np.ndarray, freq_uniques: List[str], column: Any) -> Optional[Violation]:
+    """Validate each distinct (FREQ, TIME_PERIOD) pair once."""
+    valid = (time_codes >= 0) & (freq_codes >= 0)
+    pair = freq_codes[valid].astype(np.int64) * max(len(time_uniques), 1) + time_codes[valid]
+    pair_codes, pairs = pd.factorize(pair)
+    counts = np.bincount(pair_codes, minlength=len(pairs))
+    patterns = {f: re.compile(p) for f, p in TIME_FORMATS.items()}
+
+    bad = np.zeros(len(pairs), dtype=bool)
+    labels = []
+    for i, p in enumerate(pairs):
+        freq = freq_uniques[p // max(len(time_uniques), 1)]
+        period = time_uniques[p % max(len(time_uniques), 1)]
+        pattern = patterns.get(freq)
+        bad[i] = pattern is None or pattern.fullmatch(period) is None
+        labels.append(f"{freq}:{period}")
+    if not bad.any():
+        return None
+    return Violation("invalid_time_period", "TIME_PERIOD", str(column), int(counts[bad].sum()),
+                     _top_examples(labels, counts, bad))
+
+@traced("validate")
+def validate_frame(df: pd.DataFrame, domain_name: str, layout: Optional[Layout] = None,
+                   registry: Optional[StructureRegistry] = None, path: str = "") -> ValidationReport:
+    start = time.perf_counter()
+    registry = registry or load_registry()
+    domain = registry.domain(domain_name)
+    layout = layout or LAYOUTS[domain_name]
+    dsd = domain.dsd
+    time_id = dsd.time_dimension.id if dsd.time_dimension else None
+
+    n_header = max(layout.header_rows, default=-1) + 1
+    header = df.iloc[:n_header]
+    body = df.iloc[n_header:]
+    report = ValidationReport(domain_name, path, len(body))
+
+    mapped, measures = map_columns(df.columns, dsd, layout)
+
+    # Dimension completeness
+    carried = set(mapped.values()) | set(layout.header_rows.values())
+    if layout.time_in_columns and time_id:
+        carried.add(time_id)
+    for dim_id in dsd.dimension_ids:
+        if dim_id not in carried:
+            report.violations.append(Violation("missing_dimension", dim_id, None, len(body)))
+
+    # Row-wise dimensions: missing values and code membership
+    factorized: Dict[str, Tuple[np.ndarray, List[str], Any]] = {}
+    for col, comp in mapped.items():
+        codes, uniques = _factorize_codes(body[col])
+        factorized[comp] = (codes, uniques, col)
+        nulls = int((codes < 0).sum())
+        if nulls:
+            report.violations.append(Violation("missing_value", comp, str(col), nulls))
+        if comp == time_id:
+            continue
+        allowed = _allowed_codes(domain, registry, comp)
+        if allowed is None:
+            report.unchecked.append(comp)
+            continue
+        v = _check_codes(codes, uniques, allowed, comp, col)
+        if v:
+            report.violations.append(v)
+
+    # Column-wise dimensions from header rows (codes per measure column)
+    for row, comp in sorted(layout.header_rows.items()):
+        codes, uniques = _factorize_codes(header.iloc[row][measures].reset_index(drop=True))
+        nulls = int((codes < 0).sum())
+        if nulls:
+            report.violations.append(Violation("missing_value", comp, f"header row {row}", nulls))
+        allowed = _allowed_codes(domain, registry, comp)
+        if allowed is None:
+            report.unchecked.append(comp)
+            continue
+        v = _check_codes(codes, uniques, allowed, comp, f"header row {row}")
+        if v:
+            report.violations.append(v)
+
+    # TIME_PERIOD format per FREQ
+    if "FREQ" in factorized:
+        freq_codes, freq_uniques, _ = factorized["FREQ"]
+        if time_id in factorized:
+            time_codes, time_uniques, time_col = factorized[time_id]
+            v = _check_time(time_codes, time_uniques, freq_codes, freq_uniques, time_col)
+            if v:
+                report.violations.append(v)
+        elif layout.time_in_columns:
+            # every row's FREQ must fit every period header
+            periods = [_code_str(c) for c in measures]
+            time_codes = np.tile(np.arange(len(periods)), len(freq_codes))
+            v = _check_time(time_codes, periods, np.repeat(freq_codes, len(periods)), freq_uniques,
+                            "column headers")
+            if v:
+                report.violations.append(v)
+
+    # Duplicate series keys (hashed)
+    key_cols = list(mapped) + [c for c in layout.keys if c in body.columns]
+    if key_cols and len(body):
+        result = dedup(body, subset=key_cols)
+        if result.dropped_rows:
+            sizes = result.group_sizes.astype(object)
+            examples = sizes.where(sizes.notna(), None).to_dict("records")
+            report.violations.append(Violation("duplicate_key", None, ", ".join(map(str, key_cols)),
+                                               result.rows_in_duplicate_groups, examples))
+
+    report.seconds = time.perf_counter() - start
+    return report
+
+def validate_output(domain_name: str, path: Optional[Path] = None,
+                    registry: Optional[StructureRegistry] = None) -> ValidationReport:
+    layout = LAYOUTS[domain_name]
+    path = Path(path) if path else PREPARED_DIR / layout.file
+    start = time.perf_counter()
+    df = read_table(path, dtype=object)
+    report = validate_frame(df, domain_name, layout, registry, str(path))
+    report.seconds = time.perf_counter() - start
+    return report
+
+def validate_all(domains: Optional[Iterable[str]] = None, max_workers: Optional[int] = None) -> Dict[str, ValidationReport]:
+    """Validate outputs in parallel; results keep the order of `domains`."""
+    domains = list(domains or LAYOUTS)
+    targets = [d for d in domains if (PREPARED_DIR / LAYOUTS[d].file).exists()]
+    for d in set(domains) - set(targets):
+        logger.warning("Skipping %s: %s not found", d, PREPARED_DIR / LAYOUTS[d].file)
+    max_workers = max_workers or min(len(targets), os.cpu_count() or 1) or 1
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        reports = list(pool.map(validate_output, targets))
+    return dict(zip(targets, reports))
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    argv = list(sys.argv[1:] if argv is None else argv)
+    domains = [d.upper() for d in argv] or None
+    reports = validate_all(domains)
+    for report in reports.values():
+        print(report.summary())
+        if report.unchecked:
+            print(f"    (codelists not in metadata/: {', '.join(sorted(set(report.unchecked)))})")
+    return 0 if all(r.ok for r in reports.values()) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
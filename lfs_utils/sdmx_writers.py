@@ -0,0 +1,228 @@
+# sdmx_writers.py
+"""
+Streaming SDMX-CSV and SDMX-ML 2.1 StructureSpecificData writers.
+
+Writers consume tidy observation chunks — one row per observation, columns
+named by DSD component id plus OBS_VALUE — and yield text pieces, so memory
+stays bounded by one chunk whatever the dataset size. Columns are emitted in
+DSD dimension order and values are formatted column-wise per chunk (no
+object upcast of the whole frame, no Excel round trip).
+
+tidy_observations() turns a prepared output (long or wide, with or without
+code header rows; see sdmx_validate.LAYOUTS) into such chunks:
+
+    chunks = tidy_observations(read_table("assets/prepared/HICP.xlsx", dtype=object),
+                               "HICP", constants={"REF_AREA": "EL", "UNIT_MEASURE": "IX"})
+    write_sdmx_ml(chunks, "HICP", "HICP.xml")
+
+For SDMX-ML, feed observations sorted by series key to get one <Series>
+element per series; unsorted input is still valid but may repeat a series.
+"""
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+from xml.sax.saxutils import escape
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .sdmx_registry import DataStructure, StructureRegistry, load_registry
+from .sdmx_validate import LAYOUTS, Layout, _code_str, map_columns
+from .tracing import traced
+
+logger = logging.getLogger(__name__)
+
+Chunks = Union[pd.DataFrame, Iterable[pd.DataFrame]]
+
+MESSAGE_NS = "http://www.sdmx.org/resources/sdmxml/schemas/v2_1/message"
+COMMON_NS = "http://www.sdmx.org/resources/sdmxml/schemas/v2_1/common"
+SS_NS = "http://www.sdmx.org/resources/sdmxml/schemas/v2_1/data/structurespecific"
+XSI_NS = "http://www.w3.org/2001/XMLSchema-instance"
+
+# Small chunks (e.g. one per measure column) are coalesced up to this size
+CHUNK_ROWS = 100_000
+
+def _chunks(data: Chunks, chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    if isinstance(data, pd.DataFrame):
+        yield data
+        return
+    buf: List[pd.DataFrame] = []
+    size = 0
+    for chunk in data:
+        buf.append(chunk)
+        size += len(chunk)
+        if size >= chunk_rows:
+            yield pd.concat(buf, ignore_index=True) if len(buf) > 1 else buf[0]
+            buf, size = [], 0
+    if buf:
+        yield pd.concat(buf, ignore_index=True) if len(buf) > 1 else buf[0]
+
+def _as_codes(values: pd.Series) -> np.ndarray:
+    """Code strings per row (None for missing), formatting each distinct value once."""
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    labels = np.array([_code_str(u) for u in uniques] + [None], dtype=object)
+    return labels[codes]
+
+def _as_values(values: pd.Series) -> np.ndarray:
+    """Numeric observation text per row (None if not a number); whole numbers print without '.0'."""
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    numeric = pd.to_numeric(pd.Series(uniques, dtype=object), errors="coerce").astype(float).to_numpy()
+    labels = [None if np.isnan(v) else str(int(v)) if v.is_integer() else repr(float(v)) for v in numeric]
+    return np.array(labels + [None], dtype=object)[codes]
+
+def _structure(domain: str, registry: Optional[StructureRegistry]) -> DataStructure:
+    registry = registry or load_registry()
+    return registry.domain(domain).dsd
+
+def _xml_attr(values: np.ndarray) -> np.ndarray:
+    """XML-escaped attribute text per row, escaping each distinct value once."""
+    codes, uniques = pd.factorize(values)
+    escaped = np.array([escape(str(u), {'"': "&quot;"}) for u in uniques] + [""], dtype=object)
+    return escaped[codes]
+
+def _ordered(chunk: pd.DataFrame, dsd: DataStructure, constants: Dict[str, str], dropna: bool) -> pd.DataFrame:
+    """Chunk restricted to DSD dimensions (in order) + OBS_VALUE, as code strings."""
+    dims = dsd.dimension_ids
+    missing = [d for d in dims if d not in chunk.columns and d not in constants]
+    if missing:
+        raise ValueError(f"{dsd.id}: observations lack dimensions {missing}; pass them as constants")
+    out = {}
+    for d in dims:
+        out[d] = _as_codes(chunk[d]) if d in chunk.columns else np.full(len(chunk), constants[d], dtype=object)
+    out["OBS_VALUE"] = _as_values(chunk["OBS_VALUE"])
+    frame = pd.DataFrame(out, columns=dims + ["OBS_VALUE"])
+    if dropna:
+        frame = frame[frame["OBS_VALUE"].notna().to_numpy()]
+    return frame
+
+# ---------- Tidy observations from prepared outputs ----------
+
+def tidy_observations(df: pd.DataFrame, domain: str, layout: Optional[Layout] = None,
+                      constants: Optional[Dict[str, str]] = None,
+                      registry: Optional[StructureRegistry] = None) -> Iterator[pd.DataFrame]:
+    """
+    Yield observation chunks (component-id columns + OBS_VALUE) from a
+    prepared output: one chunk per measure column for wide layouts, one
+    chunk for long ones.
+    """
+    dsd = _structure(domain, registry)
+    layout = layout or LAYOUTS[domain]
+    constants = dict(constants or {})
+    mapped, measures = map_columns(df.columns, dsd, layout)
+
+    n_header = max(layout.header_rows, default=-1) + 1
+    header = df.iloc[:n_header]
+    body = df.iloc[n_header:].rename(columns=mapped)[list(mapped.values())]
+
+    columns = {comp: body[comp].to_numpy() for comp in body.columns}
+    n = len(body)
+    for measure in measures:
+        fixed = dict(constants)
+        for row, comp in layout.header_rows.items():
+            fixed[comp] = _code_str(header.iloc[row][measure])
+        if layout.time_in_columns:
+            fixed[dsd.time_dimension.id] = _code_str(measure)
+        chunk = dict(columns)
+        chunk.update({comp: np.full(n, code, dtype=object) for comp, code in fixed.items()})
+        chunk["OBS_VALUE"] = df.iloc[n_header:][measure].to_numpy()
+        yield pd.DataFrame(chunk)
+
+# ---------- SDMX-CSV ----------
+
+def iter_sdmx_csv(data: Chunks, domain: str, constants: Optional[Dict[str, str]] = None,
+                  dropna: bool = True, registry: Optional[StructureRegistry] = None) -> Iterator[str]:
+    """SDMX-CSV (DATAFLOW column + DSD dimensions + OBS_VALUE), one string per chunk."""
+    registry = registry or load_registry()
+    dsd = _structure(domain, registry)
+    flow = registry.domain(domain).dataflow
+    flow_ref = f"{flow.agency}:{flow.id}({flow.version})"
+    constants = dict(constants or {})
+
+    yield ",".join(["DATAFLOW"] + dsd.dimension_ids + ["OBS_VALUE"]) + "\n"
+    for chunk in _chunks(data):
+        frame = _ordered(chunk, dsd, constants, dropna)
+        if len(frame):
+            frame.insert(0, "DATAFLOW", flow_ref)
+            yield frame.to_csv(index=False, header=False, lineterminator="\n")
+
+@traced("write")
+def write_sdmx_csv(data: Chunks, domain: str, path: Union[str, Path], **kwargs) -> Path:
+    path = Path(path)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for piece in iter_sdmx_csv(data, domain, **kwargs):
+            f.write(piece)
+    logger.info("SDMX-CSV written to %s", path)
+    return path
+
+# ---------- SDMX-ML 2.1 StructureSpecificData ----------
+
+def iter_sdmx_ml(data: Chunks, domain: str, constants: Optional[Dict[str, str]] = None,
+                 dropna: bool = True, sender: str = "ELSTAT",
+                 registry: Optional[StructureRegistry] = None) -> Iterator[str]:
+    """StructureSpecificData message with TIME_PERIOD at observation level."""
+    dsd = _structure(domain, registry)
+    constants = dict(constants or {})
+    time_id = dsd.time_dimension.id
+    series_dims = [d for d in dsd.dimension_ids if d != time_id]
+    structure_id = f"{dsd.agency}_{dsd.id}_{dsd.version.replace('.', '_')}"
+    urn = (f"urn:sdmx:org.sdmx.infomodel.datastructure.DataStructure="
+           f"{dsd.agency}:{dsd.id}({dsd.version}):ObsLevelDim:{time_id}")
+    prepared = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+
+    yield ('<?xml version="1.0" encoding="UTF-8"?>\n'
+           f'<message:StructureSpecificData xmlns:message="{MESSAGE_NS}" xmlns:common="{COMMON_NS}" '
+           f'xmlns:ss="{SS_NS}" xmlns:xsi="{XSI_NS}" xmlns:ns1="{urn}">\n'
+           '<message:Header>\n'
+           f'<message:ID>{domain}_{prepared.replace("-", "").replace(":", "")}</message:ID>\n'
+           '<message:Test>false</message:Test>\n'
+           f'<message:Prepared>{prepared}</message:Prepared>\n'
+           f'<message:Sender id="{sender}"/>\n'
+           f'<message:Structure structureID="{structure_id}" namespace="{urn}" dimensionAtObservation="{time_id}">'
+           f'<common:Structure><Ref agencyID="{dsd.agency}" id="{dsd.id}" version="{dsd.version}"/></common:Structure>'
+           '</message:Structure>\n'
+           '</message:Header>\n'
+           f'<message:DataSet ss:structureRef="{structure_id}" xsi:type="ns1:DataSetType" ss:dataScope="DataStructure">\n')
+
+    open_key = None
+    for chunk in _chunks(data):
+        frame = _ordered(chunk, dsd, constants, dropna)
+        if not len(frame):
+            continue
+        # Group by series key within the chunk, keeping first-seen order
+        key_cols = frame[series_dims]
+        order = np.argsort(pd.factorize(pd.util.hash_pandas_object(key_cols, index=False))[0], kind="stable")
+        frame = frame.iloc[order]
+
+        # object arrays concatenate element-wise
+        keys = np.full(len(frame), "", dtype=object)
+        for d in series_dims:
+            keys = keys + f' {d}="' + _xml_attr(frame[d].to_numpy()) + '"'
+        obs = (f'<Obs {time_id}="' + _xml_attr(frame[time_id].to_numpy())
+               + '" OBS_VALUE="' + _xml_attr(frame["OBS_VALUE"].to_numpy()) + '"/>')
+
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        ends = np.r_[starts[1:], len(keys)]
+        parts: List[str] = []
+        for start, end in zip(starts, ends):
+            key = keys[start]
+            if key != open_key:
+                if open_key is not None:
+                    parts.append("</Series>\n")
+                parts.append(f"<Series{key}>\n")
+                open_key = key
+            parts.append("\n".join(obs[start:end]) + "\n")
+        yield "".join(parts)
+
+    if open_key is not None:
+        yield "</Series>\n"
+    yield "</message:DataSet>\n</message:StructureSpecificData>\n"
+
+@traced("write")
+def write_sdmx_ml(data: Chunks, domain: str, path: Union[str, Path], **kwargs) -> Path:
+    path = Path(path)
+    with open(path, "w", encoding="utf-8") as f:
+        for piece in iter_sdmx_ml(data, domain, **kwargs):
+            f.write(piece)
+    logger.info("SDMX-ML StructureSpecificData written to %s", path)
+    return path
@@ -5,13 +5,57 @@ Analyzes Excel sheets to extract dimension information and structure
 
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Tuple, Any, Optional
 import logging
 
+try:
+    from . import metrics
+    from .tracing import traced
+except ImportError:                      # imported as a top-level module (lfs_utils on sys.path)
+    import metrics
+    from tracing import traced
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def numeric_mask(df: pd.DataFrame) -> np.ndarray:
+    """
+    Boolean grid of df's shape, True where a cell holds a number or numeric
+    text ("12", " 3.5 ", "1e3"). One pd.to_numeric over the flattened
+    values; boolean columns never count as numeric.
+    """
+    if df.empty:
+        return np.zeros(df.shape, dtype=bool)
+    values = df.to_numpy(dtype=object).ravel()
+    numbers = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce')
+    mask = numbers.notna().to_numpy(copy=True).reshape(df.shape)
+    mask[:, [pd.api.types.is_bool_dtype(t) for t in df.dtypes]] = False
+    return mask
+
+def number_mask(df: pd.DataFrame) -> np.ndarray:
+    """
+    Boolean grid of df's shape, True where df.iloc[r, c] is an int or float
+    (not NaN); unlike numeric_mask, numeric text does not count. Decided per
+    column from its dtype, cell by cell only in object columns.
+    """
+    mask = np.zeros(df.shape, dtype=bool)
+    for c in range(df.shape[1]):
+        col = df.iloc[:, c]
+        if pd.api.types.is_float_dtype(col):      # np.float64 scalars are floats
+            mask[:, c] = col.notna().to_numpy()
+        elif col.dtype == object:                 # int64/bool columns give numpy scalars, which are not
+            mask[:, c] = np.fromiter((isinstance(v, (int, float)) and v == v for v in col.to_numpy()),
+                                     dtype=bool, count=len(col))
+    return mask
+
+def data_bounds(mask: np.ndarray) -> Tuple[Optional[int], Optional[int], Optional[int]]:
+    """(first row, its first numeric column, last row) of a numeric mask; Nones when it is all False."""
+    rows = np.flatnonzero(mask.any(axis=1))
+    if not len(rows):
+        return None, None, None
+    return int(rows[0]), int(np.argmax(mask[rows[0]])), int(rows[-1])
+
 class SheetAnalyzer:
     """Analyzes Excel sheets to understand their structure and dimensions"""
     
@@ -19,6 +63,7 @@ class SheetAnalyzer:
         self.dimensions = {}
         self.sheet_structure = {}
         
+    @traced("read")
     def analyze_sheet(self, file_path: str, sheet_name: str) -> Dict[str, Any]:
         """
         Analyze a specific sheet from an Excel file
@@ -35,6 +80,7 @@ class SheetAnalyzer:
             
             # Read the sheet
             df = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
+            metrics.sheet_read(df)
             logger.info(f"Sheet loaded: {df.shape[0]} rows x {df.shape[1]} columns")
             
             # Analyze the structure
@@ -103,16 +149,12 @@ class SheetAnalyzer:
             'end_col': None
         }
         
-        # Look for numeric data
-        for row_idx in range(len(df)):
-            for col_idx in range(df.shape[1]):
-                cell_value = df.iloc[row_idx, col_idx]
-                if pd.notna(cell_value) and isinstance(cell_value, (int, float)):
-                    if data_area['start_row'] is None:
-                        data_area['start_row'] = row_idx
-                        data_area['start_col'] = col_idx
-                    data_area['end_row'] = row_idx
-                    data_area['end_col'] = col_idx
+        # Number cells: first one in the first numeric row, last one in the last
+        mask = number_mask(df)
+        start_row, start_col, end_row = data_bounds(mask)
+        if start_row is not None:
+            data_area.update(start_row=start_row, start_col=start_col, end_row=end_row,
+                             end_col=int(np.flatnonzero(mask[end_row])[-1]))
         
         return data_area
     
@@ -0,0 +1,143 @@
+# stage_cache.py
+"""
+On-disk memoization for pipeline stages.
+
+A stage is a plain function whose result is pickled under a key built from
+the hashes of its arguments (DataFrames by row hashes, paths by file content)
+and of its own source code plus any declared dependency modules. Re-running a
+stage with unchanged inputs loads the pickle instead of recomputing.
+"""
+from dataclasses import is_dataclass, asdict
+from functools import wraps
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Iterable, Optional
+import hashlib
+import inspect
+import logging
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path(os.environ.get("LFS_CACHE_DIR", ".cache/stages"))
+
+def file_digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _update(h: "hashlib._Hash", obj: Any) -> None:
+    """Feed a stable fingerprint of obj into h."""
+    if isinstance(obj, pd.DataFrame):
+        h.update(b"df")
+        h.update(repr([(str(c), str(t)) for c, t in obj.dtypes.items()]).encode())
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, pd.Series):
+        h.update(b"series")
+        h.update(repr((obj.name, str(obj.dtype))).encode())
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, np.ndarray):
+        h.update(b"nd")
+        h.update(repr((obj.dtype.str, obj.shape)).encode())
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, Path):
+        h.update(b"path")
+        h.update(str(obj).encode())
+        h.update(file_digest(obj).encode() if obj.is_file() else b"<missing>")
+    elif isinstance(obj, dict):
+        h.update(b"dict")
+        for k in sorted(obj, key=repr):
+            _update(h, k)
+            _update(h, obj[k])
+    elif isinstance(obj, (list, tuple)):
+        h.update(type(obj).__name__.encode())
+        for item in obj:
+            _update(h, item)
+    elif is_dataclass(obj) and not isinstance(obj, type):
+        h.update(type(obj).__qualname__.encode())
+        _update(h, asdict(obj))
+    else:
+        h.update(repr(obj).encode())
+
+def fingerprint(*objs: Any) -> str:
+    h = hashlib.sha256()
+    for obj in objs:
+        _update(h, obj)
+    return h.hexdigest()
+
+def code_fingerprint(func: Callable, deps: Iterable[Any] = ()) -> str:
+    """
+    Hash of the stage's own source plus its dependencies: modules, functions
+    and classes contribute their source, anything else (config dicts, name
+    lists) its value fingerprint.
+    """
+    h = hashlib.sha256(inspect.getsource(func).encode())
+    for dep in deps:
+        if isinstance(dep, ModuleType) or inspect.isfunction(dep) or inspect.isclass(dep):
+            h.update(inspect.getsource(dep).encode())
+        else:
+            _update(h, dep)
+    return h.hexdigest()
+
+class StageCache:
+    """
+    Pickle store for stage results, one file per (stage, key).
+
+    Set enabled=False (or LFS_STAGE_CACHE=0) to always recompute.
+    """
+
+    def __init__(self, root: Path = DEFAULT_CACHE_DIR, enabled: Optional[bool] = None):
+        self.root = Path(root)
+        if enabled is None:
+            enabled = os.environ.get("LFS_STAGE_CACHE", "1") != "0"
+        self.enabled = enabled
+
+    def _file(self, name: str, key: str) -> Path:
+        return self.root / name / f"{key}.pkl"
+
+    def stage(self, func: Optional[Callable] = None, *, deps: Iterable[Any] = ()):
+        """
+        Decorator: memoize func on disk. Path arguments are keyed by file
+        content, so pass output locations as str. Results that are Paths
+        are only reused while the file they point to still exists.
+        """
+        def decorate(fn: Callable) -> Callable:
+            name = fn.__name__
+            code_key = code_fingerprint(fn, deps)
+            signature = inspect.signature(fn)
+
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                key = fingerprint(code_key, dict(bound.arguments))
+                path = self._file(name, key)
+
+                if path.exists():
+                    with open(path, "rb") as f:
+                        result = pickle.load(f)
+                    if not isinstance(result, Path) or result.exists():
+                        logger.info("Stage %-12s cache hit  (%s)", name, key[:12])
+                        return result
+
+                logger.info("Stage %-12s computing  (%s)", name, key[:12])
+                result = fn(*args, **kwargs)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(".tmp")
+                with open(tmp, "wb") as f:
+                    pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+                tmp.replace(path)
+                return result
+
+            return wrapper
+
+        return decorate(func) if func is not None else decorate
@@ -0,0 +1,737 @@
+# synthetic.py
+"""
+Synthetic ELSTAT-shaped workbooks with their ground truth.
+
+Each Layout reproduces one real table layout (title block, header rows,
+section markers, footnotes, placeholders such as '..') at any number of
+years, writes it row by row with xlsxwriter in constant-memory mode and
+returns the tidy observations it wrote. check() parses the workbook with the
+strategy that owns the layout and compares what comes back with that truth,
+so a benchmark on a large synthetic input also says whether the parser got
+the numbers right.
+
+    book = generate("bla", ".benchmarks/synthetic", years=500)
+    result = check("bla", book.path, book.truth)
+    print(result.summary())
+
+    python -m lfs_utils.synthetic bla --years 500 --check
+    python -m lfs_utils.synthetic all --scale 10 --check
+
+The truth holds what the strategy is meant to extract: e.g. the MCI v1
+annual-average column is written but not expected (the strategy reads the
+month columns only), and LFS sub-categories are forward-filled across their
+header block.
+"""
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+import argparse
+import contextlib
+import hashlib
+import io
+import logging
+import math
+import re
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIR = Path(".benchmarks") / "synthetic"
+MONTHS = ["JAN", "FEB", "MAR", "APR", "MAY", "JUNE", "JULY", "AUG", "SEP", "OCT", "NOV", "DEC"]
+QUARTERS = ["A", "B", "C", "D"]
+BANNER = [" ΕLSTAT", "General Dirictorate of Statistical", "Business Statistics Division",
+          "Manufacture - Construction Indices ", "and Industrial Products Section"]
+
+PathLike = Union[str, Path]
+
+# ---------- Writing ----------
+
+class _Sheet:
+    """Rows are appended in order (constant-memory mode cannot go back)."""
+
+    def __init__(self, book, name: str):
+        self.ws = book.add_worksheet(name)
+        self.row = 0
+
+    def add(self, *cells: Any) -> None:
+        for col, value in enumerate(cells):
+            if value is not None:
+                self.ws.write(self.row, col, value)
+        self.row += 1
+
+    def skip(self, n: int = 1) -> None:
+        self.row += n
+
+def _workbook(path: Path):
+    import xlsxwriter
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return xlsxwriter.Workbook(str(path), {"constant_memory": True})
+
+def _walk(rng: np.random.Generator, shape: Tuple[int, ...], start: float = 80.0, vol: float = 0.005) -> np.ndarray:
+    """Positive random walks along axis 0."""
+    steps = rng.normal(vol / 2, vol, shape)
+    return start * np.exp(np.cumsum(steps, axis=0))
+
+# ---------- BLA: year rows with 'Σύνολο', then months ----------
+
+def write_bla(path: Path, years: int, rng: np.random.Generator, start: int = 2007,
+              last_months: int = 4) -> pd.DataFrame:
+    n = (years - 1) * 12 + last_months
+    permits = rng.integers(1_000, 9_000, n)
+    area = permits * rng.integers(150, 300, n)
+    volume = area * rng.integers(3, 5, n)
+    year = start + np.arange(n) // 12
+    month = np.arange(n) % 12 + 1
+
+    book = _workbook(path)
+    sheet = _Sheet(book, "Φύλλο1")
+    sheet.skip()
+    sheet.add(f"    Πίνακας 01. Μηνιαία Ιδιωτική Οικοδομική Δραστηριότητα, αριθμός αδειών, επιφάνεια και όγκος, "
+              f"{start}-{start + years - 1}")
+    sheet.skip()
+    sheet.add(f"    Table 01. Monthly Private Building Activity, number of permits, surface and volume, "
+              f"{start}-{start + years - 1}")
+    sheet.skip(2)
+    sheet.add(" 'Ετος                         Year", "Μήνας                            Month",
+              "Αριθμός αδειών Number of permits", "Επιφάνεια  (μ2)          Surface  (m2)",
+              " 'Ογκος  (μ3)           Volume  (m3)")
+    annual = []
+    for y in range(years):
+        block = slice(y * 12, min((y + 1) * 12, n))
+        totals = [int(permits[block].sum()), int(area[block].sum()), int(volume[block].sum())]
+        annual.append([start + y] + totals)
+        sheet.add(start + y, "Σύνολο 'Ετους Annual Total                          ", *totals)
+        for i in range(block.start, block.stop):
+            sheet.add(None, int(month[i]), int(permits[i]), int(area[i]), int(volume[i]))
+    book.add_worksheet("Φύλλο2")
+    book.close()
+
+    monthly = pd.DataFrame({"FREQ": "M", "YEAR": year, "MONTH": month,
+                            "LICENCES": permits, "AREA": area, "VOLUME": volume})
+    yearly = pd.DataFrame(annual, columns=["YEAR", "LICENCES", "AREA", "VOLUME"]).assign(FREQ="A", MONTH=None)
+    return pd.concat([yearly, monthly], ignore_index=True)[["FREQ", "YEAR", "MONTH", "LICENCES", "AREA", "VOLUME"]]
+
+def _parse_bla(path: Path):
+    from strategy_bla import parse_bla_sheet
+    xl = pd.ExcelFile(path)
+    return parse_bla_sheet(xl.parse(xl.sheet_names[0], header=None))
+
+# ---------- MCI ----------
+
+MCI_GROUPS = ["OVERALL INDEX", "Cement, mortars and ready mixed concrete", "Natural stone",
+              "Marble products, granites", "Artificial stone", "Timber and builders’ carpentry", "Basic metals",
+              "Plumbing, heating and drainage equipment and supplies", "Door and window fittings",
+              "Electrical equipment", "Glass products", "Paints and varnishes",
+              "Floor and wall tiles and sanitary ware", "Insulating materials", "Elevators",
+              "Fuel for machinery (diesel), electricity, water"]
+MCI_TITLE = "IN CONSTRUCTION OF NEW RESIDENTIAL BUILDINGS"
+
+def _mci_groups(n: int) -> List[str]:
+    return MCI_GROUPS[:n] + [f"Material group {i}" for i in range(len(MCI_GROUPS), n)]
+
+def _mci_label(label: str) -> str:
+    return label.replace("’", "'").replace("‘", "'").strip()
+
+def write_mci_v1(path: Path, years: int, rng: np.random.Generator, start: int = 2000,
+                 last_months: int = 6) -> pd.DataFrame:
+    """
+    One block per year: monthly indices for the first two years, monthly
+    changes after that and, for the last seven, the 'MATERIAL COST INDICES'
+    blocks ELSTAT appends to the file (same as the real workbook).
+    """
+    groups = MCI_GROUPS
+    months = years * 12
+    index = _walk(rng, (months, len(groups)), 75.0)
+    change = rng.normal(0.3, 1.0, (months, len(groups)))
+    blocks = [(y, "MONTHLY MATERIAL COST INDICES", "CTX") for y in range(min(2, years))]
+    blocks += [(y, "MONTHLY CHANGES OF MATERIAL COST INDEX", "MOR") for y in range(2, years)]
+    blocks += [(y, "MATERIAL COST INDICES", "CTX") for y in range(max(years - 7, 0), years)]
+
+    book = _workbook(path)
+    sheet = _Sheet(book, f"MATERIAL COST INDICES {start}-{start + years - 1}")
+    sheet.skip(4)
+    for line in BANNER:
+        sheet.add(line)
+    sheet.skip()
+    truth = []
+    for y, title, mode in blocks:
+        n_months = last_months if y == years - 1 else 12
+        values = (index if mode == "CTX" else change)[y * 12:y * 12 + n_months]
+        sheet.add(f"{title} {MCI_TITLE} YEAR {start + y}")
+        sheet.add("Base year : 2021=100.0")
+        sheet.skip()
+        sheet.add(None, "MATERIAL GROUPS", *MONTHS, "ANNUAL AVERAGE")
+        for g, group in enumerate(groups):
+            row = values[:, g].tolist() + [None] * (12 - n_months)
+            average = float(values[:, g].mean()) if n_months == 12 else None
+            sheet.add(str(g) if g else None, group, *row, average)
+        sheet.skip()
+        truth.append(pd.DataFrame({
+            "time_period": np.repeat([f"{start + y}-M{m:02d}" for m in range(1, n_months + 1)], len(groups)),
+            "series_label": np.tile([_mci_label(g) for g in groups], n_months),
+            "index_mode": mode,
+            "value": values.ravel(),
+        }))
+    _mci_info(book)
+    book.close()
+    return pd.concat(truth, ignore_index=True).drop_duplicates(["time_period", "series_label", "index_mode"])
+
+def write_mci_v2(path: Path, years: int, rng: np.random.Generator, start: int = 2000,
+                 last_months: int = 6, groups: int = 16) -> pd.DataFrame:
+    """Material groups as columns, one row per 'MON-yy' plus an 'ANNUAL AVERAGE-yyyy' row per full year."""
+    labels = _mci_groups(groups)
+    book = _workbook(path)
+    end = start + years - 1
+    sheet = _Sheet(book, f"MATERIAL COSTS {start}-{end}")
+    sheet.skip(4)
+    for line in BANNER:
+        sheet.add(line)
+    sheet.add(f"ANNUALY MATERIAL COST INDICES {MCI_TITLE} PERIOD: {start} - {end}")
+    sheet.add("(Base year 2021=100.0)")
+    sheet.add("Year and month", *labels)
+    values = _walk(rng, (years * 12, groups), 75.0)
+    periods, rows = [], []
+    for y in range(years):
+        n_months = last_months if y == years - 1 else 12
+        block = values[y * 12:y * 12 + n_months]
+        for m in range(n_months):
+            sheet.add(f"{MONTHS[m]}-{(start + y) % 100:02d}", *block[m].tolist())
+            periods.append(f"{start + y}-M{m + 1:02d}")
+            rows.append(block[m])
+        if n_months == 12:
+            average = block.mean(axis=0)
+            sheet.add(f"ANNUAL AVERAGE-{start + y}", *average.tolist())
+            periods.append(str(start + y))
+            rows.append(average)
+    _mci_info(book)
+    book.close()
+    data = np.vstack(rows)
+    return pd.DataFrame({
+        "time_period": np.repeat(periods, groups),
+        "series_label": np.tile([_mci_label(g) for g in labels], len(periods)),
+        "index_mode": np.repeat(["CTX" if "-M" in p else "AVX" for p in periods], groups),
+        "value": data.ravel(),
+    })
+
+def _mci_info(book) -> None:
+    info = _Sheet(book, "INFO")
+    info.skip(4)
+    for line in [" ELSTAT", "General Directorate of Statistical ", "Business Statistics Division"]:
+        info.add(line)
+
+def _parse_mci(path: Path):
+    from strategy_mci import excel_to_tidy
+    with contextlib.redirect_stdout(io.StringIO()):
+        return excel_to_tidy(Path(path))
+
+# ---------- CCI: 'YEAR nnnn' blocks of 17 work categories ----------
+
+CCI_CATEGORIES = ["Earth-moving", "Concrete reinforced or not", "Wall-building", "Plastering",
+                  "Electrical installations", "Hydraulic installations", "Central heating installations",
+                  "Coverings-Coatings", "Carpentry", "Iron and steel structures", "Aluminium structures",
+                  "Painting", "Insulation", "Glazing", "Elevators", "Plaster structures",
+                  "Special installations without appliances and accessories"]
+
+def write_cci(path: Path, years: int, rng: np.random.Generator, start: int = 2000,
+              last_quarters: int = 2) -> pd.DataFrame:
+    names = ["OVERALL INDEX"] + CCI_CATEGORIES
+    values = _walk(rng, (years * 4, len(names)), 85.0)
+    book = _workbook(path)
+    sheet = _Sheet(book, f"WORK CATEGORIES {start}-{start + years - 1}")
+    sheet.skip(4)
+    for line in BANNER:
+        sheet.add(line)
+    sheet.skip()
+    truth = []
+    for y in range(years):
+        n_q = last_quarters if y == years - 1 else 4
+        block = values[y * 4:y * 4 + n_q]
+        average = block.mean(axis=0) if n_q == 4 else None
+        sheet.add("QUARTERLY PRICE INDICES OF WORK CATEGORIES IN CONSTRUCTION (OUTPUT)")
+        sheet.add(f"FOR NEW RESIDENTIAL BUILDINGS YEAR {start + y}  ")
+        sheet.add("(2021=100,0)")
+        sheet.add("WORK CATEGORIES", None, "QUARTER", None, None, None, "ANNUAL AVERAGE")
+        sheet.add(None, None, *QUARTERS)
+        for c, name in enumerate(names):
+            row = block[:, c].tolist() + [None] * (4 - n_q)
+            avg = float(average[c]) if average is not None else None
+            if c == 0:
+                sheet.add(None, name, *row, avg)
+            else:
+                sheet.add(c, f" {name}{' ' * (c % 5) * 4}", *row, avg)
+        sheet.skip()
+        quarters = QUARTERS[:n_q] + (["_Z"] if n_q == 4 else [])
+        cells = np.vstack([block, average[None, :]]) if n_q == 4 else block
+        truth.append(pd.DataFrame({
+            "Year": start + y,
+            "Quarter": np.repeat(quarters, len(names)),
+            "Category": np.tile(np.arange(len(names)), len(quarters)),
+            "CategoryName": np.tile(names, len(quarters)),
+            "Value": cells.ravel(),
+        }))
+    book.add_worksheet("INFO")
+    book.close()
+    return pd.concat(truth, ignore_index=True)
+
+def _parse_cci(path: Path):
+    from strategy_cci import parse_cci_sheet_dynamic
+    xl = pd.ExcelFile(path)
+    sheet = xl.parse(xl.sheet_names[0], header=None)
+    sheet.iloc[:, 0] = sheet.iloc[:, 0].ffill()
+    sheet.iloc[:, 1] = sheet.iloc[:, 1].ffill()
+    return parse_cci_sheet_dynamic(sheet.astype(str))
+
+# ---------- NFG: receivable/payable header rows ----------
+
+NFG_ACCOUNTS = [
+    ("Market output, output for own final use and payments for non-market output", "P1O"),
+    ("Intermediate consumption", "P2"), ("Consumption of fixed capital", "P51C"),
+    ("Compensation of employees, payable", "D1"), ("Other taxes on production, payable", "D29"),
+    ("Other subsidies on production, receivable", "D39R"),
+    ("Taxes on production and imports, receivable", "D2"), ("Taxes on products, receivable", "D21"),
+    ("VAT, receivable", "D211"), ("Other taxes on production, receivable", "D29"),
+    ("Property income, receivable", "D4  "), ("Interest, receivable  (1)", "D41 "),
+    ("Other property income, receivable", "D4N "), ("Subsidies, payable", "D3P"),
+    ("Subsidies on products, payable", "D31P"), ("Other subsidies on production, payable", "D39P"),
+    ("Property income, payable", "D4 "), ("Interest, payable       (1)", "D41 "),
+    ("Other property income, payable", "D4N "), ("Current taxes on income, wealth etc., receivable", "D5"),
+    ("Net social contributions, receivable", "D61"),
+    ("- of which employers' actual social contributions", "D611"),
+    ("- of which households' actual social contributions", "D613"),
+    ("Other current transfers, receivable(1)", "D7  "), ("Current taxes on income, wealth etc., payable", "D5"),
+    ("Social benefits other than social transfers in kind, payable", "D62"),
+    ("Social transfers in kind - purchased market production, payable", "D632"),
+    ("Social benefits other than social transfers in kind and social transfers in kind - purchased market "
+     "production, payable", "D6M"),
+    ("Other current transfers, payable        (1)", "D7  "), ("Final consumption expenditure", "P3"),
+    ("Individual consumption expenditure", "P31"), ("Collective consumption expenditure", "P32"),
+    ("Adjustment for the change in pension entitlements", "D8"), ("Saving, gross", "B8G"),
+    ("Capital transfers, receivable     (1)", "D9  "), ("Capital taxes, receivable    (1)", "D91  "),
+    ("Other capital transfers and investment grants, receivable      (1)", "D9N  "),
+    ("Capital transfers, payable        (1)", "D9  "), ("Investment grants, payable         (1)", "D92"),
+    ("Gross capital formation", "P5"), ("Gross fixed capital formation", "P51G"),
+    ("Changes in inventories and acquisitions less disposals of valuables", "P5M"),
+    ("Acquisitions less disposals of non-financial non-produced assets", "NP"),
+    ("Gross capital formation and acquisitions less disposals of non-financial non produced assets", "P5L"),
+    ("Net lending (+)/net borrowing (-)", "B9"), ("Total expenditure", "OTE"), ("Total revenue", "OTR"),
+    ("Output", "P1"), ("Value added, gross", "B1G"), ("Taxes on income", "D51"), ("Other current taxes", "D59"),
+]
+NFG_DEBT = [("GD Total Maastricht debt", "GD", "_Z"), ("AF.2 Currency and deposits", "F2", "_Z"),
+            ("AF.21 Currency", "F21", "_Z"), ("AF.22 + AF.29 Deposits", "F2M", "_Z"),
+            ("AF.3 Debt decurities", "F3", "_Z"), ("AF.31 Short-term debt securities", "F3", "S"),
+            ("AF.32 Long-term debt securities", "F3", "L"), ("AF.4 Loans", "F4", "_Z"),
+            ("AF.41 Short-term loans", "F4", "S"), ("AF.42 Long-term loans", "F4", "L")]
+NFG_HEADER = ["MATURITY", "ACCOUNT_ENTRY", "INSTR_ASSET", "NA_ITEM"]
+
+def _entry(label: str) -> str:
+    label = label.lower()
+    return "C" if "receivable" in label else "D" if "payable" in label else "_Z"
+
+def _nfg_sheet(book, name: str, title: Tuple[str, str], columns: List[Tuple[str, str]], periods: List[str],
+               values: np.ndarray, provisional: int, tail: Optional[str] = None) -> None:
+    width = len(columns) + (2 if tail else 1)
+    sheet = _Sheet(book, name)
+    sheet.add(title[0], *[None] * (width - 2), title[1])
+    sheet.add("Σε εκατομμύρια ευρώ", *[None] * (width - 2), "In million €")
+    sheet.add("Quarter \n\nΤρίμηνο", *[label for label, _ in columns],
+              *(["Capital transfers from general government to relevant sectors representing taxes and social "
+                 "contributions assessed but unlikely to be collected"] if tail else []))
+    sheet.add(None, *[code for _, code in columns], *([tail] if tail else []))
+    sheet.add(None, *range(2, len(columns) + 2), *([len(columns) + 2] if tail else []))
+    for i, period in enumerate(periods):
+        star = "*" if i >= len(periods) - provisional else ""
+        sheet.add(period + star, *values[i].tolist(), *(["M"] if tail else []))
+    sheet.add("* Προσωρινά στοιχεία", *[None] * (width - 2), "*provisional data")
+
+def write_nfg(path: Path, years: int, rng: np.random.Generator, start: int = 1999,
+              last_quarters: int = 1) -> pd.DataFrame:
+    """Πίνακας 25 (accounts, from `start`) and Πίνακας 28 (debt, from the year after)."""
+    n = (years - 1) * 4 + last_quarters
+    periods = [f"{start + q // 4}-Q{q % 4 + 1}" for q in range(n)]
+    accounts = rng.integers(1, 20_000, (n, len(NFG_ACCOUNTS)))
+    debt_periods = periods[4:]
+    debt = rng.integers(100, 400_000, (len(debt_periods), len(NFG_DEBT)))
+
+    book = _workbook(path)
+    _nfg_sheet(book, "Πίνακας 25",
+               ("Πίνακας : Τριμηνιαίοι μη χρηματοοικονομικοί λογαριασμοί Γενικής Κυβέρνησης (ESA 2010)",
+                "Table : Quarterly Non-Financial Accounts of General Government (ESA 2010)"),
+               NFG_ACCOUNTS, periods, accounts, provisional=4, tail="D995   ")
+    _nfg_sheet(book, "Πίνακας 28",
+               ("Πίνακας : Τριμηνιαίο Ενοποιημένο χρέος (Maastricht debt) Γενικής Κυβέρνησης (ESA 2010)",
+                "Table : Quarterly Gross debt (Maastricht debt) for General Government (ESA 2010)"),
+               [(label, code) for label, code, _ in NFG_DEBT], debt_periods, debt, provisional=4)
+    book.close()
+
+    first = pd.DataFrame({
+        "time_period": np.repeat(periods, len(NFG_ACCOUNTS)),
+        "NA_ITEM": np.tile([code.strip() for _, code in NFG_ACCOUNTS], n),
+        "INSTR_ASSET": "_Z",
+        "ACCOUNT_ENTRY": np.tile([_entry(label) for label, _ in NFG_ACCOUNTS], n),
+        "MATURITY": "_Z",
+        "value": accounts.ravel(),
+    })
+    second = pd.DataFrame({
+        "time_period": np.repeat(debt_periods, len(NFG_DEBT)),
+        "NA_ITEM": "_Z",
+        "INSTR_ASSET": np.tile([code for _, code, _ in NFG_DEBT], len(debt_periods)),
+        "ACCOUNT_ENTRY": "_Z",
+        "MATURITY": np.tile([maturity for _, _, maturity in NFG_DEBT], len(debt_periods)),
+        "value": debt.ravel(),
+    })
+    return pd.concat([first, second], ignore_index=True)
+
+def _parse_nfg(path: Path):
+    import strategy_nfg as nfg
+    with contextlib.redirect_stdout(io.StringIO()):
+        sheets = nfg.load_excel_sheets(str(path))
+        return nfg.merge_and_finalize(nfg.clean_df1(sheets["sheet1"]), nfg.clean_df2(sheets["sheet2"]))
+
+def nfg_tidy(merged: Tuple[pd.DataFrame, List[list]]) -> pd.DataFrame:
+    """The NFG strategy's output (data rows, header rows: label, FREQ, one code per series) as tidy observations."""
+    data, header_rows = merged
+    header = {row[0]: np.array([str(v).strip() for v in row[2:]]) for row in header_rows}
+    data = data[data.iloc[:, 0].astype(str).str.match(r"^\d{4}-Q[1-4]$").to_numpy()]
+    n, k = len(data), data.shape[1] - 2
+    out = pd.DataFrame({"time_period": np.repeat(data.iloc[:, 0].to_numpy(), k),
+                        "value": pd.to_numeric(pd.Series(data.iloc[:, 2:].to_numpy().ravel()), errors="coerce")})
+    for name in NFG_HEADER:
+        out[name] = np.tile(header[name], n)
+    return out.dropna(subset=["value"])
+
+# ---------- LFS annual JOB-SexAge: three header rows ----------
+
+# (first category as the parser names it, header text in the workbook, [(row 1, row 2) per column])
+JOB_SEXAGE_COLUMNS = [
+    ("Total Employed", "Total Employed", [(None, None)]),
+    ("Number of persons working at the local unit", "Number of persons working at the local unit",
+     [("Up to 10 persons", None), ("11 to 19 persons", None), ("20 to 49 persons", None),
+      ("50 persons or more", None), ("Do not know but more than 10 person", None)]),
+    ("Business ownership", "Business ownership", [("Public sector", None), ("Private sector", None)]),
+    ("Sector of economic activity", "Sector of economic activity",
+     [("Primary", "Agriculture, forestry and fishing"), ("Secondary", "Secondary sector total"),
+      (None, "Industry including energy"), (None, "Construction"), ("Tertiary", "Tertiary sector total"),
+      (None, "Trade, hotels and restaurants, transport and communication"),
+      (None, "Financial, real estate, renting and business activities"), (None, "Other service activities"),
+      (None, "Did no answer")]),
+    ("Type of occupation", "Type of occupation",
+     [("Highly skilled non- manual ", None), ("Low skilled non-manual ", None), ("Skilled manual ", None),
+      ("Agriculture, forestry, animal husbandry, fishing", None), ("Elementary occupations ", None)]),
+    ("Status in employment", "Status in employment",
+     [("Self employed with employees", None), ("Self employed without employees", None), ("Employees", None),
+      ("Family workers", None)]),
+    ("Employment distinction", "Employment distinction", [("Full-time employed", None), ("Part-time employed", None)]),
+    ("Reasons for the part-time work", "Reasons for the part- time work",
+     [("School education or training", None), ("Of own illness or disability", None),
+      ("Could not find a full-time job", None), ("Other reasons", None),
+      ("of them, looking after children or incapacitated adults", None)]),
+    ("Permanency of the job (for employees)", "Permanency of the job (for employees)",
+     [("Permanent job", None), ("Temporary /contract of limited duration", None),
+      ("Duration of temporary job", "Up to 6 months"), (None, "From 7 to 12 months"), (None, "More than 12 months")]),
+    ("Reasons for having a temporary job", "Reasons for having a temporary job",
+     [("Contract covering a period of training", None), ("Could not find a permanent job", None),
+      ("Did not want a permanent job", None), ("Other reasons", None)]),
+    ("Hours actually worked during reference week",
+     "H o u r s   a c t u a l l y   w o r k e d   d u r I n g   t h e   r e f e r e n c e   w e e k ",
+     [("Average number of hours", None), ("Less than 35 hours", "Total <35"), ("Hour group A", "0-9"),
+      (None, "10-19"), (None, "20-34"), ("Hour group B", "0-14"), (None, "15-24"), (None, "25-34"),
+      ("More than 35 hours", "Total 35+"), ("Hour group 35+", "35-39"), (None, "40-47"), (None, "48+")]),
+    ("Hours actually worked in reference week related to usual hours",
+     "  Hours actually worked in reference week related to usual hours",
+     [("Worked usual hours", None), ("Worked more than usual hours", None), ("Worked less than usual hours", None),
+      ("Main reason", "Bad weather, technical or economic"), (None, "Illness, injury, annual holidays"),
+      (None, "Other reason")]),
+    ("Atypical work", "A t y p I c a l   w o r k ",
+     [("Shift-work (employees only)", "Usually"), (None, "Sometimes"),
+      ("Evening work", "Usually ←2008\nAt least half working days , 2009→"),
+      (None, "Sometimes,  ←2008\nLess than half working days, 2009→"),
+      ("Night work", "Usually ←2008\nAt least half working days , 2009→"),
+      (None, "Sometimes,  ←2008\nLess than half working days, 2009→"),
+      ("Saturday work", "Usually, ←2008\nAt least twice, 2009 →"), (None, "Sometimes ←2008\nOnce, 2009 → "),
+      ("Sunday work", "Usually, ←2008\nAt least twice, 2009 →"), (None, "Sometimes ←2008\nOnce, 2009 → "),
+      ("Work at home", "Usually ←2008\nAt least half working days , 2009→"),
+      (None, "Sometimes,  ←2008\nLess than half working days, 2009→")]),
+]
+LFS_AGES = ["15-19", "20-24", "25-29", "30-44", "45-64", "65+"]
+
+def _lfs_label(text: Optional[str]) -> str:
+    if text is None:
+        return "_Z"
+    return re.sub(r"\s+", " ", text.strip()).replace("non- manual", "non-manual")
+
+def _job_sexage_columns() -> List[Tuple[str, str, str, str, Optional[str], Optional[str]]]:
+    """Per data column: category, sub-category, sub-sub-category (truth) and the three header cells."""
+    out = []
+    for category, header, cells in JOB_SEXAGE_COLUMNS:
+        current = None
+        for i, (sub, subsub) in enumerate(cells):
+            current = sub if sub is not None else current
+            out.append((category, _lfs_label(current), _lfs_label(subsub), header if i == 0 else None, sub, subsub))
+    return out
+
+def write_lfs_job_sexage(path: Path, years: int, rng: np.random.Generator, start: int = 1981,
+                         suppressed: float = 0.15) -> pd.DataFrame:
+    """Years newest first, Men/Women by age plus totals; whole category blocks of a year may be '..'."""
+    columns = _job_sexage_columns()
+    rows = [(sex, age) for sex, total in (("Men", "Total Males"), ("Women", "Total Females"))
+            for age in LFS_AGES + [total]] + [("YEAR TOTAL", "Total")]
+    block_of = np.concatenate([[b] * len(cells) for b, (_, _, cells) in enumerate(JOB_SEXAGE_COLUMNS)])
+    share = np.isin(block_of, [1, 2])                       # shares of the employed, not thousands
+
+    book = _workbook(path)
+    contents = _Sheet(book, "Contents")
+    contents.add("Contents")
+    contents.add("JOB-SexAge", "Characteristics of the main job by sex and age")
+    sheet = _Sheet(book, "JOB-SexAge")
+    sheet.add("Characteristics of the main job", None, None, *[c[3] for c in columns])
+    sheet.add(None, None, None, *[c[4] for c in columns])
+    sheet.add("Year", "Sex", "Age", *[c[5] for c in columns])
+    sheet.skip()
+
+    truth = []
+    for year in range(start + years - 1, start - 1, -1):
+        values = np.where(share, rng.uniform(0.01, 1.0, (len(rows), len(columns))),
+                          rng.uniform(0.1, 2_500.0, (len(rows), len(columns))))
+        hidden = rng.random(len(JOB_SEXAGE_COLUMNS)) < suppressed
+        hidden[0] = False
+        mask = hidden[block_of]
+        placeholder = np.where(block_of == 10, "...", "..")
+        for r, (sex, age) in enumerate(rows):
+            sheet.add(year, sex, age, *[str(placeholder[c]) if mask[c] else float(values[r, c])
+                                        for c in range(len(columns))])
+        keep = np.flatnonzero(~mask)
+        truth.append(pd.DataFrame({
+            "Year": year,
+            "Sex": np.repeat([s for s, _ in rows], len(keep)),
+            "Age_Group": np.repeat([a for _, a in rows], len(keep)),
+            "Job_Characteristic": np.tile([columns[c][0] for c in keep], len(rows)),
+            "Job_Subcategory": np.tile([columns[c][1] for c in keep], len(rows)),
+            "Job_Sub_Subcategory": np.tile([columns[c][2] for c in keep], len(rows)),
+            "Value": values[:, keep].ravel(),
+        }))
+    book.close()
+    return pd.concat(truth, ignore_index=True)
+
+def _parse_lfs_job_sexage(path: Path):
+    from .bench import sandbox
+    from .job_sexage_parser import JOBSexAgeParser
+    analysis = {"file_path": str(Path(path).resolve()), "sheet_name": "JOB-SexAge"}
+    with sandbox({}), contextlib.redirect_stdout(io.StringIO()):   # the parser saves into assets/prepared
+        return JOBSexAgeParser().parse_sheet(analysis)
+
+def job_sexage_tidy(wide: pd.DataFrame) -> pd.DataFrame:
+    """JOBSexAgeParser's wide output (one category column set per record) back to one row per cell."""
+    fixed = {"Year", "Sex", "Age_Group", "Unit_of_Measure", "Value"}
+    categories = [c for c in wide.columns if c not in fixed and not str(c).endswith("_subcategory")]
+    out = wide[["Year", "Sex", "Age_Group", "Value"]].copy()
+    out["Job_Characteristic"], out["Job_Subcategory"], out["Job_Sub_Subcategory"] = "Total Employed", "_Z", "_Z"
+    for c in categories:
+        sub = wide[c].astype(str)
+        subsub = wide[f"{c}_subcategory"].astype(str) if f"{c}_subcategory" in wide else pd.Series("_Z", wide.index)
+        hit = ((sub != "_Z") | (subsub != "_Z")).to_numpy()
+        out.loc[hit, "Job_Characteristic"] = c
+        out.loc[hit, "Job_Subcategory"] = sub[hit]
+        out.loc[hit, "Job_Sub_Subcategory"] = subsub[hit]
+    return out
+
+# ---------- Layouts ----------
+
+@dataclass(frozen=True)
+class Layout:
+    name: str
+    write: Callable[..., pd.DataFrame]            # (path, years, rng, **params) → truth
+    filename: str                                 # formatted with start and end year
+    keys: Tuple[str, ...]
+    values: Tuple[str, ...]
+    parse: Callable[[Path], Any]                  # path → what the owning strategy returns
+    tidy: Callable[[Any], pd.DataFrame] = lambda out: out     # that → truth columns
+    start: int = 2000
+    base_years: int = 25                          # the real workbook's span (scale 1)
+    max_years: int = 8000
+    width: Optional[str] = None                   # parameter grown once max_years is reached
+    base_width: int = 0
+
+    def sized(self, scale: int) -> Dict[str, int]:
+        """Parameters for `scale` times the real workbook's rows (then columns, where years run out)."""
+        years = min(self.base_years * scale, self.max_years)
+        params = {"years": years}
+        if self.width:
+            params[self.width] = self.base_width * max(1, math.ceil(self.base_years * scale / years))
+        return params
+
+LAYOUTS: Dict[str, Layout] = {l.name: l for l in [
+    Layout("bla", write_bla, "A1302_SOP03_TS_MM_12_{start}_04_{end}_01_F_Bl.xlsx",
+           ("FREQ", "YEAR", "MONTH"), ("LICENCES", "AREA", "VOLUME"), _parse_bla, start=2007, base_years=19),
+    Layout("mci_v1", write_mci_v1, "A0511_DKT60_TS_MM_01_{start}_06_{end}_02_F_EN.xlsx",
+           ("time_period", "series_label", "index_mode"), ("value",), _parse_mci,
+           tidy=lambda out: out[["time_period", "series_label", "index_mode", "value"]], base_years=26),
+    Layout("mci_v2", write_mci_v2, "A0511_DKT60_TS_MM_01_{start}_06_{end}_03_F_EN.xlsx",
+           ("time_period", "series_label", "index_mode"), ("value",), _parse_mci,
+           tidy=lambda out: out[["time_period", "series_label", "index_mode", "value"]], base_years=26,
+           max_years=100, width="groups", base_width=16),          # 'JAN-00' years are two digits
+    Layout("cci", write_cci, "A0511_DKT63_TS_QQ_01_{start}_02_{end}_04_F_EN.xlsx",
+           ("Year", "Quarter", "Category"), ("Value",), _parse_cci, base_years=26),
+    Layout("nfg", write_nfg, "A0701_SEL05_TS_QQ_01_{start}_01_{end}_01E_F_BI.xlsx",
+           ("time_period", "NA_ITEM", "INSTR_ASSET", "ACCOUNT_ENTRY", "MATURITY"), ("value",), _parse_nfg,
+           tidy=nfg_tidy, start=1999, base_years=27),
+    Layout("lfs_job_sexage", write_lfs_job_sexage, "A0101_SJO03_TS_AN_00_{start}_00_{end}_02_F_EN.xlsx",
+           ("Year", "Sex", "Age_Group", "Job_Characteristic", "Job_Subcategory", "Job_Sub_Subcategory"),
+           ("Value",), _parse_lfs_job_sexage, tidy=job_sexage_tidy, start=1981, base_years=44),
+]}
+
+# ---------- Generating ----------
+
+@dataclass
+class Synthetic:
+    layout: str
+    path: Path
+    params: Dict[str, Any]
+    truth: pd.DataFrame = field(repr=False)
+
+def truth_path(path: PathLike) -> Path:
+    return Path(path).with_suffix(".truth.parquet")
+
+def load_truth(path: PathLike) -> pd.DataFrame:
+    return pd.read_parquet(truth_path(path))
+
+def _key(layout: Layout, params: Dict[str, Any], seed: int) -> str:
+    h = hashlib.sha256(Path(__file__).read_bytes())
+    h.update(repr((layout.name, sorted(params.items()), seed)).encode())
+    return h.hexdigest()
+
+def generate(layout: Union[str, Layout], out_dir: PathLike = DEFAULT_DIR, scale: Optional[int] = None,
+             seed: int = 0, **params) -> Synthetic:
+    """
+    Write a workbook of `layout` into out_dir (named like the real file, so
+    the strategies' globs find it) plus its truth as <name>.truth.parquet.
+    Size comes from `scale` (x the real workbook) or explicit parameters
+    such as years=; an existing workbook with the same parameters is reused.
+    """
+    layout = LAYOUTS[layout] if isinstance(layout, str) else layout
+    params = {**layout.sized(scale or 1), **params}
+    end = layout.start + params["years"] - 1
+    path = Path(out_dir) / layout.filename.format(start=layout.start, end=end)
+    stamp = path.with_suffix(".key")
+    key = _key(layout, params, seed)
+    if path.exists() and truth_path(path).exists() and stamp.exists() and stamp.read_text() == key:
+        return Synthetic(layout.name, path, params, load_truth(path))
+    logger.info("Writing %s (%s)", path, ", ".join(f"{k}={v}" for k, v in params.items()))
+    truth = layout.write(path, rng=np.random.default_rng(seed), **params)
+    truth.to_parquet(truth_path(path), index=False)
+    stamp.write_text(key)
+    return Synthetic(layout.name, path, params, truth)
+
+# ---------- Checking ----------
+
+def _key_text(values: pd.Series) -> pd.Series:
+    """Key cells as comparable text: integral numbers without '.0', blanks for missing."""
+    text = values.astype("string").str.strip().fillna("").replace({"nan": "", "None": "", "<NA>": ""})
+    numbers = pd.to_numeric(values, errors="coerce")
+    integral = (numbers.notna() & (numbers == numbers.round())).to_numpy()
+    text[integral] = numbers[integral].astype("int64").astype("string")
+    return text
+
+def _long(frame: pd.DataFrame, keys: Sequence[str], values: Sequence[str]) -> pd.DataFrame:
+    frame = frame.reset_index(drop=True)
+    if len(values) == 1:
+        out = frame[list(keys)].copy()
+        out["value"] = pd.to_numeric(frame[values[0]], errors="coerce")
+        keys = list(keys)
+    else:
+        out = frame.melt(id_vars=list(keys), value_vars=list(values), var_name="measure", value_name="value")
+        out["value"] = pd.to_numeric(out["value"], errors="coerce")
+        keys = list(keys) + ["measure"]
+    for k in keys:
+        out[k] = _key_text(out[k])
+    return out.dropna(subset=["value"])
+
+@dataclass
+class Check:
+    layout: str
+    expected: int
+    matched: int
+    missing: int          # in the truth, not in the output
+    unexpected: int       # in the output, not in the truth
+    wrong: int            # same key, different value
+    duplicates: int       # keys the output has more than once
+    examples: pd.DataFrame = field(repr=False, default_factory=pd.DataFrame)
+
+    @property
+    def errors(self) -> int:
+        return self.missing + self.unexpected + self.wrong + self.duplicates
+
+    @property
+    def ok(self) -> bool:
+        return self.errors == 0
+
+    def summary(self) -> str:
+        status = "OK" if self.ok else "MISMATCH"
+        return (f"{self.layout}: {status} - {self.matched:,}/{self.expected:,} observations match; "
+                f"missing {self.missing:,}, unexpected {self.unexpected:,}, wrong value {self.wrong:,}, "
+                f"duplicate keys {self.duplicates:,}")
+
+def compare(truth: pd.DataFrame, output: pd.DataFrame, keys: Sequence[str], values: Sequence[str],
+            layout: str = "", rtol: float = 1e-9) -> Check:
+    t = _long(truth, keys, values)
+    o = _long(output, keys, values)
+    on = [c for c in t.columns if c != "value"]
+    dupes = o.duplicated(on)
+    o = o[~dupes.to_numpy()]
+    merged = t.merge(o, on=on, how="outer", suffixes=("_true", "_out"), indicator=True)
+    both = (merged["_merge"] == "both").to_numpy()
+    close = np.isclose(merged["value_out"].to_numpy(dtype=float), merged["value_true"].to_numpy(dtype=float),
+                       rtol=rtol, atol=1e-9)
+    wrong = both & ~close
+    problems = merged[~both | wrong]
+    return Check(layout, expected=len(t), matched=int((both & close).sum()),
+                 missing=int((merged["_merge"] == "left_only").sum()),
+                 unexpected=int((merged["_merge"] == "right_only").sum()),
+                 wrong=int(wrong.sum()), duplicates=int(dupes.sum()), examples=problems.head(20))
+
+def check_output(layout: Union[str, Layout], output: Any, truth: pd.DataFrame) -> Check:
+    """Compare what the layout's strategy returned (e.g. from a benchmark run) with the truth."""
+    layout = LAYOUTS[layout] if isinstance(layout, str) else layout
+    return compare(truth, layout.tidy(output), layout.keys, layout.values, layout.name)
+
+def check(layout: Union[str, Layout], path: PathLike, truth: Optional[pd.DataFrame] = None) -> Check:
+    """Parse `path` with the layout's strategy and compare with the truth written next to it."""
+    layout = LAYOUTS[layout] if isinstance(layout, str) else layout
+    truth = load_truth(path) if truth is None else truth
+    return check_output(layout, layout.parse(Path(path)), truth)
+
+# ---------- CLI ----------
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Write synthetic ELSTAT-shaped workbooks with their ground truth.")
+    parser.add_argument("layouts", nargs="+", choices=sorted(LAYOUTS) + ["all"])
+    parser.add_argument("--out", default=str(DEFAULT_DIR))
+    parser.add_argument("--scale", type=int, help="x the real workbook's size")
+    parser.add_argument("--years", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check", action="store_true", help="parse with the strategy and compare with the truth")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    try:
+        from loguru import logger as strategy_logger
+        strategy_logger.remove()
+    except ImportError:
+        pass
+    names = sorted(LAYOUTS) if "all" in args.layouts else args.layouts
+    extra = {"years": args.years} if args.years else {}
+    failed = 0
+    for name in names:
+        book = generate(name, args.out, scale=args.scale, seed=args.seed, **extra)
+        print(f"{book.path}  {len(book.truth):,} observations")
+        if args.check:
+            result = check(name, book.path, book.truth)
+            print("  " + result.summary())
+            if not result.ok:
+                failed += 1
+                print(result.examples.head(5).to_string())
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,314 @@
+# tracing.py
+"""
+Stage tracing: wall time, CPU time, rows in/out and peak RSS per stage.
+
+Stages are the crawl/read/parse/transform/mask/merge/validate/write steps of
+the strategies and parsers, marked with a decorator or a context manager:
+
+    @traced("parse")
+    def parse_bla_sheet(sheet): ...             # rows in/out from the first frame argument / the result
+
+    with stage("write", output_file, rows_in=len(df)):
+        df.to_excel(output_file, index=False)
+
+Tracing is off unless LFS_TRACE names a directory (or enable() is called).
+Off, a traced function costs one flag test and stage() returns a shared
+no-op. On, every finished span is buffered and flush() (called per pipeline
+node and at exit) appends it to <dir>/trace-<pid>.jsonl, so process-pool
+workers need no coordination. export() merges those files into a Chrome
+trace (chrome://tracing, ui.perfetto.dev) and a per-stage summary table:
+
+    LFS_TRACE=reports/trace python pipeline.py      # or: python pipeline.py --trace
+    python -m lfs_utils.tracing reports/trace        # → reports/trace.json + trace_summary.md
+
+Observers registered with observe() (see metrics.py) receive every finished
+span whether or not spans are also being recorded; while one is registered,
+stages are timed even with tracing off.
+"""
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+import argparse
+import atexit
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:                              # Windows: no getrusage
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("crawl", "read", "parse", "transform", "mask", "merge", "validate", "write", "node")
+ENV = "LFS_TRACE"
+
+PathLike = Union[str, Path]
+
+@dataclass
+class Span:
+    name: str
+    cat: str
+    start: float                                  # time.time() at entry, s
+    wall: float = 0.0                             # s
+    cpu: float = 0.0                              # this thread's CPU time, s
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+    peak_rss: Optional[int] = None                # process high-water mark at exit, bytes
+    rss_growth: Optional[int] = None              # how much the stage raised that mark, bytes
+    pid: int = 0
+    tid: int = 0
+    error: Optional[str] = None
+
+class _State:
+    def __init__(self):
+        self.enabled = False
+        self.active = False                       # enabled, or someone observes spans
+        self.observers: List[Callable[[Span], None]] = []
+        self.directory: Optional[Path] = None
+        self.spans: List[Span] = []
+        self.lock = threading.Lock()
+
+_state = _State()
+
+def enable(directory: PathLike = "reports/trace") -> None:
+    """Start recording; spans are flushed to `directory` (also exported to child processes via LFS_TRACE)."""
+    _state.directory = Path(directory)
+    _state.directory.mkdir(parents=True, exist_ok=True)
+    os.environ[ENV] = str(_state.directory)
+    _state.enabled = _state.active = True
+
+def disable() -> None:
+    flush()
+    _state.enabled = False
+    _state.active = bool(_state.observers)
+
+def observe(fn: Callable[[Span], None]) -> None:
+    """Call fn(span) as each stage finishes (spans are timed even while recording is off)."""
+    if fn not in _state.observers:
+        _state.observers.append(fn)
+    _state.active = True
+
+def enabled() -> bool:
+    return _state.enabled
+
+def directory() -> Optional[Path]:
+    return _state.directory
+
+# ---------- Measuring ----------
+
+def peak_rss() -> Optional[int]:
+    """Peak resident set size of this process so far, in bytes (None where unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def count_rows(obj: Any, records: bool = False) -> Optional[int]:
+    """
+    Rows of a frame/array, summed over a dict, tuple or list of frames; with
+    `records` a list of anything else (e.g. parsed record dicts) counts too.
+    """
+    if hasattr(obj, "shape"):
+        return len(obj)
+    if isinstance(obj, dict):
+        counts = [count_rows(v) for v in obj.values()]
+    elif isinstance(obj, (tuple, list)):
+        counts = [count_rows(v) for v in obj]
+        if isinstance(obj, list) and records and obj and not any(c is not None for c in counts):
+            return len(obj)
+    else:
+        return None
+    counts = [c for c in counts if c is not None]
+    return sum(counts) if counts else None
+
+class _Stage:
+    """One running span; set .rows_out inside the block when the result is not returned."""
+
+    __slots__ = ("span", "rss0", "t0", "c0")
+
+    def __init__(self, cat: str, name: str, rows_in: Optional[int]):
+        self.span = Span(name, cat, time.time(), rows_in=rows_in, pid=os.getpid(), tid=threading.get_ident())
+
+    @property
+    def rows_out(self) -> Optional[int]:
+        return self.span.rows_out
+
+    @rows_out.setter
+    def rows_out(self, value: Optional[int]) -> None:
+        self.span.rows_out = value
+
+    def __enter__(self):
+        self.rss0 = peak_rss()
+        self.c0 = time.thread_time()
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        span = self.span
+        span.wall = time.perf_counter() - self.t0
+        span.cpu = time.thread_time() - self.c0
+        span.peak_rss = peak_rss()
+        if span.peak_rss is not None and self.rss0 is not None:
+            span.rss_growth = span.peak_rss - self.rss0
+        if exc_type is not None:
+            span.error = exc_type.__name__
+        if _state.enabled:
+            with _state.lock:
+                _state.spans.append(span)
+        for fn in _state.observers:
+            fn(span)
+        return False
+
+class _Off:
+    """What stage() returns while tracing is off."""
+
+    rows_out = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+_OFF = _Off()
+
+def stage(cat: str, name: str, rows_in: Optional[int] = None):
+    """Context manager timing one stage."""
+    if not _state.active:
+        return _OFF
+    return _Stage(cat, str(name), rows_in)
+
+def traced(cat: str, name: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """
+    Decorator: each call is a `cat` stage named after the function. Rows in
+    come from the first frame argument, rows out from the result (frames or
+    a list of records).
+    """
+    def decorate(fn: Callable) -> Callable:
+        module = fn.__module__.rsplit(".", 1)[-1]
+        label = name or (fn.__qualname__ if module == "__main__" else f"{module}.{fn.__qualname__}")
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _state.active:
+                return fn(*args, **kwargs)
+            rows_in = next((n for n in map(count_rows, args) if n is not None), None)
+            with _Stage(cat, label, rows_in) as s:
+                result = fn(*args, **kwargs)
+                s.span.rows_out = count_rows(result, records=True)
+            return result
+        return wrapper
+    return decorate
+
+# ---------- Output ----------
+
+def flush() -> Optional[Path]:
+    """Append the buffered spans to <dir>/trace-<pid>.jsonl."""
+    with _state.lock:
+        spans, _state.spans = _state.spans, []
+    if not spans or _state.directory is None:
+        return None
+    path = _state.directory / f"trace-{os.getpid()}.jsonl"
+    with open(path, "a", encoding="utf-8") as f:
+        for span in spans:
+            f.write(json.dumps(asdict(span)) + "\n")
+    return path
+
+def load(directory: PathLike) -> List[Span]:
+    spans = []
+    for path in sorted(Path(directory).glob("trace-*.jsonl")):
+        with open(path, encoding="utf-8") as f:
+            spans += [Span(**json.loads(line)) for line in f if line.strip()]
+    return sorted(spans, key=lambda s: s.start)
+
+def clear(directory: PathLike) -> None:
+    for path in Path(directory).glob("trace-*.jsonl"):
+        path.unlink()
+
+def chrome_trace(spans: Sequence[Span]) -> Dict[str, Any]:
+    """Complete ("X") events in microseconds from the first span, one track per process/thread."""
+    t0 = min((s.start for s in spans), default=0.0)
+    events = []
+    for s in spans:
+        args = {k: v for k, v in (("cpu_s", round(s.cpu, 6)), ("rows_in", s.rows_in), ("rows_out", s.rows_out),
+                                  ("peak_rss_mb", _mb(s.peak_rss)), ("rss_growth_mb", _mb(s.rss_growth)),
+                                  ("error", s.error)) if v is not None}
+        events.append({"name": s.name, "cat": s.cat, "ph": "X", "ts": round((s.start - t0) * 1e6),
+                       "dur": round(s.wall * 1e6), "pid": s.pid, "tid": s.tid, "args": args})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+def _mb(n: Optional[int]) -> Optional[float]:
+    return None if n is None else round(n / 2**20, 1)
+
+def summary(spans: Sequence[Span]) -> str:
+    """Markdown table per stage (category + name), slowest first."""
+    groups: Dict[tuple, List[Span]] = {}
+    for s in spans:
+        groups.setdefault((s.cat, s.name), []).append(s)
+    rows = []
+    for (cat, name), group in groups.items():
+        rows_in = [s.rows_in for s in group if s.rows_in is not None]
+        rows_out = [s.rows_out for s in group if s.rows_out is not None]
+        peaks = [s.peak_rss for s in group if s.peak_rss is not None]
+        rows.append((sum(s.wall for s in group), cat, name, len(group), sum(s.cpu for s in group),
+                     sum(rows_in) if rows_in else None, sum(rows_out) if rows_out else None,
+                     max(peaks) if peaks else None, sum(bool(s.error) for s in group)))
+    lines = ["| Stage | Name | Calls | Wall (s) | CPU (s) | Rows in | Rows out | Peak RSS (MB) | Errors |",
+             "|---|---|---|---|---|---|---|---|---|"]
+    for wall, cat, name, calls, cpu, r_in, r_out, peak, errors in sorted(rows, key=lambda r: -r[0]):
+        lines.append(f"| {cat} | {name} | {calls} | {wall:.3f} | {cpu:.3f} | {'' if r_in is None else f'{r_in:,}'} "
+                     f"| {'' if r_out is None else f'{r_out:,}'} | {'' if peak is None else _mb(peak)} "
+                     f"| {errors or ''} |")
+    by_cat: Dict[str, float] = {}
+    for s in spans:
+        if s.cat != "node":
+            by_cat[s.cat] = by_cat.get(s.cat, 0.0) + s.wall
+    if by_cat:
+        lines += ["", "| Stage | Wall (s) |", "|---|---|"]
+        lines += [f"| {cat} | {wall:.3f} |" for cat, wall in sorted(by_cat.items(), key=lambda kv: -kv[1])]
+    return "\n".join(lines) + "\n"
+
+def export(directory: PathLike, out: Optional[PathLike] = None) -> Path:
+    """Merge <directory>/trace-*.jsonl into <out> (default: <directory>.json) plus <out stem>_summary.md."""
+    flush()
+    spans = load(directory)
+    out = Path(out) if out else Path(directory).with_suffix(".json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(chrome_trace(spans)), encoding="utf-8")
+    out.with_name(f"{out.stem}_summary.md").write_text(summary(spans), encoding="utf-8")
+    return out
+
+def _flush_at_exit() -> None:
+    if _state.enabled:
+        flush()
+
+if os.environ.get(ENV):
+    enable(os.environ[ENV])
+atexit.register(_flush_at_exit)
+
+# The LFS sheet parsers import their helpers as top-level modules (lfs_utils on
+# sys.path); both names must share one buffer.
+sys.modules.setdefault("tracing", sys.modules[__name__])
+sys.modules.setdefault("lfs_utils.tracing", sys.modules[__name__])
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Merge stage traces into a Chrome trace and a summary table.")
+    parser.add_argument("directory", nargs="?", default=os.environ.get(ENV, "reports/trace"))
+    parser.add_argument("--out", help="trace JSON to write (default: <directory>.json)")
+    args = parser.parse_args(argv)
+    path = export(args.directory, args.out)
+    print(path.with_name(f"{path.stem}_summary.md").read_text(encoding="utf-8"))
+    print(f"Chrome trace: {path}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,7 +1,12 @@
-from typing import Iterable, Set, Dict, Tuple, Optional
+from typing import Iterable, Set, Dict, List, Tuple, Optional
 import logging
 import pandas as pd
 
+from . import metrics
+from .dedup import dedup
+from .merge_utils import union_concat
+from .tracing import traced
+
 logger = logging.getLogger(__name__)
 
 def standardize_columns(df: pd.DataFrame, rename_map: Dict) -> pd.DataFrame:
@@ -23,13 +28,18 @@ def drop_duplicate_columns(df: pd.DataFrame) -> pd.DataFrame:
     return df.loc[:, ~df.columns.duplicated()]
 
 def drop_duplicate_rows(df: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
-    before = df.shape[0]
-    out = df.drop_duplicates()
-    return out, before - out.shape[0]
+    """
+    Drop fully duplicated rows in one hashed pass (see dedup.dedup);
+    categorical columns hash their categories, not every cell.
+    """
+    result = dedup(df)
+    metrics.DUPLICATES_DROPPED.inc(result.dropped_rows)
+    return result.df, result.dropped_rows
 
 def fill_na(df: pd.DataFrame, fill_value: str = "_Z") -> pd.DataFrame:
     return df.fillna(fill_value)
 
+@traced("transform")
 def clean_dataframe(
     df: pd.DataFrame,
     col_to_check: str = "Value",
@@ -51,3 +61,51 @@ def clean_dataframe(
 
     logger.info("Cleaned: dropped dupes=%d, invalid=%d", dropped, stats["dropped_invalid_rows"])
     return df, stats
+
+@traced("transform")
+def assemble_union(
+    dfs: List[pd.DataFrame],
+    value_col: str = "Value",
+    invalid_value: str = "_Z",
+    status_col: str = "OBS_STATUS"
+) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """
+    Union-concat parsed frames and keep `value_col` numeric.
+
+    Rows whose value is empty or `invalid_value` are dropped (as the old
+    fillna + clean_dataframe did). Suppression markers ('..', '...': any
+    other non-numeric text) are kept: the value becomes NaN and the marker
+    goes to `status_col`, "A" for ordinary values. Duplicates are then
+    dropped on hashed whole rows (dimensions, value and status): the EMP,
+    JOB and STATUS sheets have rows that share every dimension but differ
+    in value (the parsers do not emit the column telling them apart), and
+    those are distinct observations.
+    Stats: dropped_dupe_rows, dropped_invalid_rows, suppressed_rows.
+    """
+    stats = {"dropped_dupe_rows": 0, "dropped_invalid_rows": 0, "suppressed_rows": 0}
+
+    df = union_concat([drop_duplicate_columns(d) for d in dfs], value_col=value_col, fill_value=invalid_value)
+
+    raw = df[value_col]
+    numeric = pd.to_numeric(raw, errors="coerce")
+    text = raw.astype(str).str.strip()
+    status = (df[status_col].astype(object) if status_col in df.columns
+              else pd.Series(invalid_value, index=df.index, dtype=object))
+    flagged = ~status.isin(["A", invalid_value])  # markers kept by an earlier assembly
+    invalid = (raw.isna() | text.eq(invalid_value)) & ~flagged
+    marker = numeric.isna() & ~invalid & ~flagged
+    status = status.where(flagged, "A").mask(marker, text)
+    df = df.assign(**{value_col: numeric, status_col: status.astype("category")})
+
+    stats["dropped_invalid_rows"] = int(invalid.sum())
+    df = df[~invalid.to_numpy()]
+    stats["suppressed_rows"] = int((df[status_col] != "A").sum())
+
+    result = dedup(df)
+    metrics.DUPLICATES_DROPPED.inc(result.dropped_rows)
+    df = result.df
+    stats["dropped_dupe_rows"] = result.dropped_rows
+
+    logger.info("Assembled %d frames: %d rows, dropped dupes=%d, invalid=%d, suppressed kept=%d",
+                len(dfs), len(df), result.dropped_rows, stats["dropped_invalid_rows"], stats["suppressed_rows"])
+    return df, stats
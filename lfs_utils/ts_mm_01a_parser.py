@@ -11,6 +11,15 @@ import re
 from typing import Dict, List, Tuple, Optional
 import logging
 
+try:
+    from . import metrics
+    from .columnar import write_parquet
+    from .tracing import traced
+except ImportError:                      # imported as a top-level module (lfs_utils on sys.path)
+    import metrics
+    from columnar import write_parquet
+    from tracing import traced
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,11 +35,13 @@ class TS_MM_01A_Parser:
         self.data = None
         self.parsed_data = None
         
+    @traced("read")
     def load_excel(self) -> pd.DataFrame:
         """Load the Excel file and return raw data"""
         try:
             # Read the Excel file
             df = pd.read_excel(self.file_path, sheet_name='TABLE 1Α', header=None)
+            metrics.sheet_read(df)
             logger.info(f"Loaded Excel file with shape: {df.shape}")
             return df
         except Exception as e:
@@ -250,6 +261,7 @@ class TS_MM_01A_Parser:
         
         return sdmx_df[sdmx_columns]
     
+    @traced("parse")
     def parse(self) -> pd.DataFrame:
         """Main parsing method"""
         logger.info("Starting TS MM 01A parsing...")
@@ -274,10 +286,12 @@ class TS_MM_01A_Parser:
         
         return sdmx_data
     
+    @traced("write")
     def save_to_excel(self, output_path: str):
         """Save parsed data to Excel"""
         if self.parsed_data is not None:
             self.parsed_data.to_excel(output_path, index=False)
+            write_parquet(self.parsed_data, output_path)
             logger.info(f"Data saved to: {output_path}")
         else:
             logger.warning("No parsed data to save")
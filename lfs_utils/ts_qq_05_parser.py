@@ -12,6 +12,15 @@ from typing import Dict, List, Tuple, Optional
 import re
 from datetime import datetime
 
+try:
+    from . import metrics
+    from .columnar import write_parquet
+    from .tracing import traced
+except ImportError:                      # imported as a top-level module (lfs_utils on sys.path)
+    import metrics
+    from columnar import write_parquet
+    from tracing import traced
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -39,11 +48,13 @@ class TS_QQ_05_Parser:
             'PERCETANGES': 'Percentage'  # Note: typo in original data
         }
     
+    @traced("read")
     def load_data(self) -> pd.DataFrame:
         """Load Excel file"""
         try:
             logger.info(f"Loading file: {self.file_path}")
             self.df = pd.read_excel(self.file_path, header=None)
+            metrics.sheet_read(self.df)
             logger.info(f"Loaded data with shape: {self.df.shape}")
             return self.df
         except Exception as e:
@@ -208,6 +219,7 @@ class TS_QQ_05_Parser:
         logger.info(f"Parsed {len(data_points)} data points from percentages section")
         return data_points
     
+    @traced("parse")
     def parse(self) -> pd.DataFrame:
         """Main parsing method"""
         logger.info("Starting TS QQ 05 parsing...")
@@ -319,6 +331,7 @@ class TS_QQ_05_Parser:
         
         return summary
     
+    @traced("write")
     def save_to_excel(self, output_path: str = None) -> str:
         """Save parsed data to Excel"""
         if self.parsed_data is None:
@@ -333,6 +346,7 @@ class TS_QQ_05_Parser:
         
         # Save to Excel
         self.parsed_data.to_excel(output_path, index=False)
+        write_parquet(self.parsed_data, output_path)
         logger.info(f"Data saved to: {output_path}")
         return output_path
 
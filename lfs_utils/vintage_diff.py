@@ -0,0 +1,218 @@
+# vintage_diff.py
+"""
+What changed between two releases of a dataset.
+
+Two tidy vintages (series_key, time_period, value) are aligned on a 64-bit
+hash of their (series, period) key: both sides are sorted by hash once and
+matched with searchsorted, so every observation is classified as added,
+removed, revised or unchanged in a handful of array operations. Revisions
+carry their magnitude (absolute and relative).
+
+    old, new = store.vintages(dataset)[-2:]
+    report = diff_vintages(store, dataset, old, new)
+    print(report.summary())
+    report.write_delta("reports/vintage_diff")        # changed rows only
+
+    python -m lfs_utils.vintage_diff                    # latest two vintages of every dataset
+    python -m lfs_utils.vintage_diff A0515_DKT90_TS_MM_01_1996 2025-01 2025-02
+    python -m lfs_utils.vintage_diff --files OLD.xlsx NEW.xlsx --source HICP
+"""
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+import argparse
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .vintage_store import COLUMNS, SOURCES, VintageStore
+
+logger = logging.getLogger(__name__)
+
+REPORT_DIR = Path("reports")
+STATUSES = ["added", "removed", "revised", "unchanged"]
+
+def key_hash(obs: pd.DataFrame) -> np.ndarray:
+    return pd.util.hash_pandas_object(obs[["series_key", "time_period"]], index=False).to_numpy()
+
+def _sorted(obs: pd.DataFrame) -> pd.DataFrame:
+    obs = obs[COLUMNS].reset_index(drop=True)
+    h = key_hash(obs)
+    order = np.argsort(h, kind="stable")
+    obs = obs.iloc[order].reset_index(drop=True)
+    obs["_hash"] = h[order]
+    dupes = np.r_[False, obs["_hash"].to_numpy()[1:] == obs["_hash"].to_numpy()[:-1]]
+    if dupes.any():
+        logger.warning("%d duplicate series/period keys ignored (first kept)", int(dupes.sum()))
+        obs = obs[~dupes].reset_index(drop=True)
+    return obs
+
+def diff_observations(old: pd.DataFrame, new: pd.DataFrame, tolerance: float = 0.0) -> pd.DataFrame:
+    """
+    One row per observation of either side: series_key, time_period, status,
+    old_value, new_value, change (new - old) and pct_change (relative to old).
+    """
+    a, b = _sorted(old), _sorted(new)
+    ha, hb = a["_hash"].to_numpy(), b["_hash"].to_numpy()
+
+    pos = np.searchsorted(hb, ha).clip(max=max(len(hb) - 1, 0))
+    matched = (hb[pos] == ha) if len(hb) else np.zeros(len(ha), dtype=bool)
+    ia, ib = np.flatnonzero(matched), pos[matched]
+    for col in ("series_key", "time_period"):
+        if not (a[col].to_numpy()[ia] == b[col].to_numpy()[ib]).all():
+            raise RuntimeError("series/period key hash collision")
+    only_b = np.ones(len(hb), dtype=bool)
+    only_b[ib] = False
+
+    old_v = a["value"].to_numpy(dtype=float)
+    new_v = b["value"].to_numpy(dtype=float)
+    both_old, both_new = old_v[ia], new_v[ib]
+    change = both_new - both_old
+    same = (np.abs(change) <= tolerance) | (np.isnan(both_old) & np.isnan(both_new))
+
+    removed = np.flatnonzero(~matched)
+    added = np.flatnonzero(only_b)
+    out = pd.DataFrame({
+        "series_key": np.concatenate([a["series_key"].to_numpy()[ia], a["series_key"].to_numpy()[removed],
+                                      b["series_key"].to_numpy()[added]]),
+        "time_period": np.concatenate([a["time_period"].to_numpy()[ia], a["time_period"].to_numpy()[removed],
+                                       b["time_period"].to_numpy()[added]]),
+        "status": np.concatenate([np.where(same, "unchanged", "revised"),
+                                  np.full(len(removed), "removed"), np.full(len(added), "added")]),
+        "old_value": np.concatenate([both_old, old_v[removed], np.full(len(added), np.nan)]),
+        "new_value": np.concatenate([both_new, np.full(len(removed), np.nan), new_v[added]]),
+    })
+    out["change"] = out["new_value"] - out["old_value"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out["pct_change"] = np.where(out["old_value"] != 0, 100 * out["change"] / out["old_value"].abs(), np.nan)
+    out["status"] = pd.Categorical(out["status"], categories=STATUSES)
+    return out.sort_values(["series_key", "time_period"], kind="stable").reset_index(drop=True)
+
+@dataclass
+class DiffReport:
+    dataset: str
+    old: str
+    new: str
+    diff: pd.DataFrame = field(repr=False)
+
+    @property
+    def counts(self) -> Dict[str, int]:
+        return {s: int(n) for s, n in self.diff["status"].value_counts().reindex(STATUSES, fill_value=0).items()}
+
+    @property
+    def changed(self) -> pd.DataFrame:
+        return self.diff[(self.diff["status"] != "unchanged").to_numpy()]
+
+    def by_series(self) -> pd.DataFrame:
+        """Per series: number of added/removed/revised observations and the largest revision."""
+        changed = self.changed
+        table = pd.crosstab(changed["series_key"], changed["status"]).reindex(columns=STATUSES[:3], fill_value=0)
+        revised = changed[(changed["status"] == "revised").to_numpy()]
+        table["max_abs_change"] = revised["change"].abs().groupby(revised["series_key"]).max()
+        return table.sort_values(["revised", "added", "removed"], ascending=False)
+
+    def summary(self, top: int = 10) -> str:
+        c = self.counts
+        lines = [f"## {self.dataset}: {self.old} → {self.new}", "",
+                 f"- added {c['added']:,}, removed {c['removed']:,}, revised {c['revised']:,}, "
+                 f"unchanged {c['unchanged']:,}"]
+        revised = self.diff[(self.diff["status"] == "revised").to_numpy()]
+        if len(revised):
+            largest = revised.loc[revised["change"].abs().nlargest(top).index]
+            lines += [f"- mean |revision| {revised['change'].abs().mean():.4g}, "
+                      f"max |revision| {revised['change'].abs().max():.4g}", "",
+                      "| Series | Period | Old | New | Change | % |", "|---|---|---|---|---|---|"]
+            lines += [f"| {r.series_key} | {r.time_period} | {r.old_value:g} | {r.new_value:g} "
+                      f"| {r.change:+.4g} | {r.pct_change:+.3g} |" for r in largest.itertuples()]
+        if c["added"] or c["removed"]:
+            series = self.by_series()
+            moved = series[(series["added"] > 0) | (series["removed"] > 0)].head(top)
+            lines += ["", "| Series | Added | Removed |", "|---|---|---|"]
+            lines += [f"| {r.Index} | {r.added} | {r.removed} |" for r in moved.itertuples()]
+        return "\n".join(lines) + "\n"
+
+    def write_delta(self, directory: Union[str, Path] = REPORT_DIR / "vintage_diff") -> Path:
+        """Changed observations only, as CSV."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{self.dataset}_{self.old}_{self.new}.csv"
+        self.changed.to_csv(path, index=False)
+        return path
+
+def vintage_observations(store: VintageStore, dataset: str, vintage: str) -> pd.DataFrame:
+    """The observations published in one vintage."""
+    data = store.frame(dataset)
+    if vintage not in store.vintages(dataset):
+        raise KeyError(f"{dataset} has no vintage {vintage!r} (have {store.vintages(dataset)})")
+    return data[(data["vintage"] == vintage).to_numpy()]
+
+def diff_vintages(store: VintageStore, dataset: str, old: Optional[str] = None, new: Optional[str] = None,
+                  tolerance: float = 0.0) -> DiffReport:
+    """Diff two stored vintages (default: the latest two)."""
+    vintages = store.vintages(dataset)
+    if old is None or new is None:
+        if len(vintages) < 2:
+            raise ValueError(f"{dataset} has {len(vintages)} vintage(s); nothing to compare")
+        old, new = vintages[-2], vintages[-1]
+    diff = diff_observations(vintage_observations(store, dataset, old),
+                             vintage_observations(store, dataset, new), tolerance)
+    return DiffReport(dataset, old, new, diff)
+
+def diff_files(old: Union[str, Path], new: Union[str, Path], source: str, tolerance: float = 0.0) -> DiffReport:
+    """Diff two workbooks of a domain directly, without the store."""
+    src = SOURCES[source]
+    dataset, v_old = src.identify(Path(old).name)
+    _, v_new = src.identify(Path(new).name)
+    return DiffReport(dataset, v_old, v_new, diff_observations(src.parse(old), src.parse(new), tolerance))
+
+def diff_all(store: Optional[VintageStore] = None, tolerance: float = 0.0) -> List[DiffReport]:
+    """Latest vs previous vintage for every stored dataset with at least two vintages."""
+    store = store or VintageStore()
+    return [diff_vintages(store, d, tolerance=tolerance) for d in store.datasets() if len(store.vintages(d)) > 1]
+
+def write_report(reports: Sequence[DiffReport], directory: Union[str, Path] = REPORT_DIR) -> Path:
+    """reports/vintage_diff.md plus one delta CSV per dataset under reports/vintage_diff/."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for report in reports:
+        report.write_delta(directory / "vintage_diff")
+    path = directory / "vintage_diff.md"
+    path.write_text("# Vintage revisions\n\n" + "\n".join(r.summary() for r in reports), encoding="utf-8")
+    return path
+
+def report() -> str:
+    """Pipeline node: latest-vintage revisions of every dataset."""
+    reports = diff_all()
+    write_report(reports)
+    return "; ".join(f"{r.dataset} {r.old}→{r.new}: {r.counts['revised']} revised, "
+                     f"{r.counts['added']} added, {r.counts['removed']} removed" for r in reports)
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Revisions between dataset vintages.")
+    parser.add_argument("dataset", nargs="?")
+    parser.add_argument("old", nargs="?")
+    parser.add_argument("new", nargs="?")
+    parser.add_argument("--files", nargs=2, metavar=("OLD", "NEW"), help="compare two workbooks directly")
+    parser.add_argument("--source", choices=sorted(SOURCES), help="domain of --files")
+    parser.add_argument("--tolerance", type=float, default=0.0, help="ignore revisions up to this size")
+    parser.add_argument("--out", default=str(REPORT_DIR))
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    if args.files:
+        if not args.source:
+            parser.error("--files needs --source")
+        reports = [diff_files(*args.files, source=args.source, tolerance=args.tolerance)]
+    elif args.dataset:
+        reports = [diff_vintages(VintageStore(), args.dataset, args.old, args.new, args.tolerance)]
+    else:
+        reports = diff_all(tolerance=args.tolerance)
+    path = write_report(reports, args.out)
+    for r in reports:
+        print(r.summary())
+    print(f"Report: {path}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,319 @@
+# vintage_store.py
+"""
+Append-only observation store keyed by (dataset, series, period, vintage).
+
+Every vintage workbook is parsed once into tidy observations (series_key,
+time_period, value) and written as one Parquet part,
+
+    assets/vintages/dataset=<id>/vintage=<v>/part-<digest>.parquet
+
+sorted by series key and period, so the row-group statistics of those two
+columns act as an index for readers that filter on them. A (dataset,
+vintage) is immutable: re-ingesting the same file is a no-op and a different
+file claiming a stored vintage is refused. Queries load a dataset once,
+sorted by (series, period, vintage), and answer from binary searches:
+
+    store = VintageStore()
+    store.ingest_source("HICP")
+    store.as_of("A0515_DKT90_TS_MM_01_1996", "2025-01")       # value per observation as of a vintage
+    store.history("A0515_DKT90_TS_MM_01_1996", "OVERALL_HICP", "2024-M12")
+
+    python -m lfs_utils.vintage_store ingest [DOMAINS]
+    python -m lfs_utils.vintage_store as-of DATASET VINTAGE [--series KEY]
+    python -m lfs_utils.vintage_store history DATASET KEY [--period PERIOD]
+
+Vintages compare as strings ("2025-02" < "2025-03"). LFS has no source yet:
+strategy_LFS records do not identify one observation per series and period.
+"""
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import argparse
+import glob
+import json
+import logging
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from .stage_cache import file_digest
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = Path(os.environ.get("LFS_VINTAGE_DIR", "assets/vintages"))
+COLUMNS = ["series_key", "time_period", "value"]
+
+PathLike = Union[str, Path]
+
+# ---------- Vintage identification ----------
+
+def elstat_vintage(fname: str) -> Tuple[str, str]:
+    """(dataset_id, vintage) as strategy_mci derives them from ELSTAT file names."""
+    from strategy_mci import extract_dataset_id_and_vintage
+    return extract_dataset_id_and_vintage(Path(fname).name)
+
+def reference_vintage(fname: str) -> Tuple[str, str]:
+    """
+    <dataset>_<start year>_<ref month>_<ref year>_<edition>_F_<lang>: the
+    vintage is the reference month ("2025-03"), edition appended when not 01.
+    """
+    parts = Path(fname).stem.split("_")
+    years = [i for i, p in enumerate(parts) if re.fullmatch(r"\d{4}", p)]
+    if len(years) < 2 or years[-1] + 1 >= len(parts):
+        return elstat_vintage(fname)
+    start, ref = years[-2], years[-1]
+    vintage = f"{parts[ref]}-{parts[ref - 1].zfill(2)}"
+    if parts[ref + 1] != "01":
+        vintage += f".{parts[ref + 1]}"
+    return "_".join(parts[:start]), vintage
+
+# ---------- Per-domain tidy observations ----------
+
+def _melt(frame: pd.DataFrame, measures: Sequence[str]) -> pd.DataFrame:
+    """Wide YEAR/MONTH/FREQ frame → series_key (measure name), time_period, value."""
+    from strategy_bla import create_time_period
+    frame = frame.assign(time_period=create_time_period(frame))
+    long = frame.melt(id_vars=["time_period"], value_vars=[m for m in measures if m in frame.columns],
+                      var_name="series_key", value_name="value")
+    return long[COLUMNS]
+
+def mci_observations(path: PathLike) -> pd.DataFrame:
+    from strategy_mci import excel_to_tidy
+    tidy = excel_to_tidy(Path(path))
+    if tidy.empty:
+        return pd.DataFrame(columns=COLUMNS)
+    key = tidy["series_code"].astype(str) + "." + tidy["index_mode"].fillna("").astype(str)
+    return pd.DataFrame({"series_key": key, "time_period": tidy["time_period"], "value": tidy["value"]})
+
+def hicp_observations(path: PathLike) -> pd.DataFrame:
+    """Index tables (parse_mci_sheet layout) or the HICP table (parse_hicp_sheet)."""
+    from strategy_hicp import parse_hicp_sheet, parse_mci_sheet
+    sheet = pd.read_excel(path, header=None)
+    wide = parse_mci_sheet(sheet)
+    if wide.empty:
+        wide = parse_hicp_sheet(sheet)
+    if wide.empty:
+        return pd.DataFrame(columns=COLUMNS)
+    return _melt(wide, [c for c in wide.columns if c not in ("YEAR", "MONTH", "FREQ")])
+
+def bla_observations(path: PathLike) -> pd.DataFrame:
+    from strategy_bla import parse_bla_sheet
+    wide = parse_bla_sheet(pd.read_excel(path, header=None))
+    if wide.empty:
+        return pd.DataFrame(columns=COLUMNS)
+    return _melt(wide, ["LICENCES", "AREA", "VOLUME"])
+
+@dataclass(frozen=True)
+class VintageSource:
+    pattern: str                                          # glob of vintage workbooks
+    parse: Callable[[PathLike], pd.DataFrame]             # workbook → series_key, time_period, value
+    identify: Callable[[str], Tuple[str, str]] = elstat_vintage
+
+SOURCES: Dict[str, VintageSource] = {
+    "MCI": VintageSource("assets/MCI/*_TS_*.xlsx", mci_observations),
+    "HICP": VintageSource("assets/HICP/*_TS_*.xlsx", hicp_observations),
+    "BLA": VintageSource("assets/BLA/*_TS_*.xlsx", bla_observations, reference_vintage),
+}
+
+# ---------- Store ----------
+
+def _normalize(frame: pd.DataFrame) -> pd.DataFrame:
+    """Typed, de-duplicated and sorted observations (first occurrence of a key/period wins)."""
+    obs = pd.DataFrame({
+        "series_key": frame["series_key"].astype(str).to_numpy(dtype=object),
+        "time_period": frame["time_period"].astype(str).to_numpy(dtype=object),
+        "value": pd.to_numeric(frame["value"], errors="coerce").astype(float).to_numpy(),
+    })
+    obs = obs[~np.isnan(obs["value"].to_numpy())]
+    dupes = obs.duplicated(["series_key", "time_period"])
+    if dupes.any():
+        logger.warning("%d duplicate series/period observations dropped (first kept)", int(dupes.sum()))
+        obs = obs[~dupes.to_numpy()]
+    return obs.sort_values(["series_key", "time_period"], kind="stable").reset_index(drop=True)
+
+class VintageStore:
+    """Partitioned Parquet parts + manifest.json (dataset → vintage → file, digest, rows)."""
+
+    def __init__(self, root: PathLike = STORE_DIR):
+        self.root = Path(root)
+        self._manifest_path = self.root / "manifest.json"
+        try:
+            self.manifest: Dict[str, Dict[str, Dict]] = json.loads(self._manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.manifest = {}
+        self._frames: Dict[str, pd.DataFrame] = {}
+
+    def _save_manifest(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self._manifest_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.manifest, indent=1, sort_keys=True), encoding="utf-8")
+        tmp.replace(self._manifest_path)
+
+    def datasets(self) -> List[str]:
+        return sorted(self.manifest)
+
+    def vintages(self, dataset: str) -> List[str]:
+        return sorted(self.manifest.get(dataset, {}))
+
+    # ----- writing -----
+
+    def ingest(self, observations: pd.DataFrame, dataset: str, vintage: str,
+               source: str = "", digest: str = "") -> bool:
+        """Append one vintage; False if it is already stored with the same content."""
+        entry = self.manifest.get(dataset, {}).get(vintage)
+        if entry is not None:
+            if digest and entry["digest"] == digest:
+                return False
+            raise ValueError(f"{dataset} vintage {vintage} is already stored (from {entry['file']}); "
+                             f"refusing {source or 'new data'}")
+        obs = _normalize(observations)
+        part = self.root / f"dataset={dataset}" / f"vintage={vintage}" / f"part-{(digest or 'manual')[:16]}.parquet"
+        part.parent.mkdir(parents=True, exist_ok=True)
+        obs.to_parquet(part, index=False, row_group_size=50_000)
+        self.manifest.setdefault(dataset, {})[vintage] = {
+            "file": source, "digest": digest, "rows": len(obs),
+            "part": str(part.relative_to(self.root)),
+        }
+        self._save_manifest()
+        self._frames.pop(dataset, None)
+        logger.info("Stored %s %s: %d observations", dataset, vintage, len(obs))
+        return True
+
+    def _stored_digests(self) -> Dict[str, Tuple[str, str]]:
+        return {e["digest"]: (d, v) for d, vs in self.manifest.items() for v, e in vs.items() if e["digest"]}
+
+    def ingest_files(self, files: Iterable[PathLike], source: VintageSource) -> Dict[str, str]:
+        """Parse and store each workbook not stored yet; file name → outcome."""
+        known = self._stored_digests()
+        outcome = {}
+        for path in sorted(map(str, files)):
+            name = Path(path).name
+            digest = file_digest(Path(path))
+            if digest in known:
+                outcome[name] = "already stored as {} {}".format(*known[digest])
+                continue
+            dataset, vintage = source.identify(name)
+            try:
+                obs = source.parse(path)
+                if obs.empty:
+                    outcome[name] = "no observations"
+                    continue
+                self.ingest(obs, dataset, vintage, source=name, digest=digest)
+                outcome[name] = f"stored as {dataset} {vintage}"
+                known[digest] = (dataset, vintage)
+            except Exception as exc:
+                logger.error("%s: %s", name, exc)
+                outcome[name] = f"failed: {exc}"
+        return outcome
+
+    def ingest_source(self, domain: str) -> Dict[str, str]:
+        source = SOURCES[domain]
+        return self.ingest_files(glob.glob(source.pattern), source)
+
+    # ----- reading -----
+
+    def frame(self, dataset: str) -> pd.DataFrame:
+        """All vintages of a dataset, sorted by (series_key, time_period, vintage)."""
+        if dataset not in self._frames:
+            if dataset not in self.manifest:
+                raise KeyError(f"no dataset {dataset!r} in {self.root}")
+            parts = []
+            for vintage, entry in self.manifest[dataset].items():
+                part = pd.read_parquet(self.root / entry["part"])
+                parts.append(pd.DataFrame({
+                    "series_key": part["series_key"].to_numpy(dtype=object),
+                    "time_period": part["time_period"].to_numpy(dtype=object),
+                    "vintage": np.full(len(part), vintage, dtype=object),
+                    "value": part["value"].to_numpy(dtype=float),
+                }))
+            data = pd.concat(parts, ignore_index=True)
+            self._frames[dataset] = data.sort_values(["series_key", "time_period", "vintage"],
+                                                     kind="stable").reset_index(drop=True)
+        return self._frames[dataset]
+
+    def _series_rows(self, data: pd.DataFrame, series: Union[str, Sequence[str]]) -> np.ndarray:
+        keys = data["series_key"].to_numpy()
+        series = [series] if isinstance(series, str) else list(series)
+        lo = np.searchsorted(keys, series, side="left")
+        hi = np.searchsorted(keys, series, side="right")
+        return np.concatenate([np.arange(a, b) for a, b in zip(lo, hi)] or [np.empty(0, dtype=np.intp)])
+
+    def as_of(self, dataset: str, vintage: Optional[str] = None,
+              series: Optional[Union[str, Sequence[str]]] = None) -> pd.DataFrame:
+        """Latest value of every (series, period) published up to `vintage` (default: newest)."""
+        data = self.frame(dataset)
+        if series is not None:
+            data = data.iloc[self._series_rows(data, series)]
+        if vintage is not None:
+            data = data[(data["vintage"] <= vintage).to_numpy()]
+        keys = data["series_key"].to_numpy()
+        periods = data["time_period"].to_numpy()
+        last = np.r_[(keys[1:] != keys[:-1]) | (periods[1:] != periods[:-1]), True] if len(data) else []
+        return data[last].reset_index(drop=True)
+
+    def history(self, dataset: str, series: str, time_period: Optional[str] = None) -> pd.DataFrame:
+        """Every published value of a series (optionally one period), with the change from the previous vintage."""
+        data = self.frame(dataset)
+        data = data.iloc[self._series_rows(data, series)]
+        if time_period is not None:
+            data = data[(data["time_period"] == time_period).to_numpy()]
+        data = data.reset_index(drop=True)
+        same = np.r_[False, data["time_period"].to_numpy()[1:] == data["time_period"].to_numpy()[:-1]]
+        revision = data["value"].diff().to_numpy()
+        return data.assign(revision=np.where(same, revision, np.nan))
+
+def ingest_all(domains: Optional[Iterable[str]] = None, root: PathLike = STORE_DIR) -> str:
+    """
+    Ingest every source (pipeline node); summary of what was added. The
+    manifest is written on every run, even when nothing is new, so the
+    node's declared output always exists (its content, which downstream
+    builds are keyed on, only changes when a vintage is added).
+    """
+    store = VintageStore(root)
+    stored = []
+    for domain in domains or SOURCES:
+        outcome = store.ingest_source(domain)
+        stored += [name for name, result in outcome.items() if result.startswith("stored")]
+    store._save_manifest()
+    return f"{len(stored)} new vintages stored" if stored else "no new vintages"
+
+# ---------- CLI ----------
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Vintage-aware observation store.")
+    parser.add_argument("--root", default=str(STORE_DIR))
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("ingest", help="parse and store new vintage workbooks")
+    p.add_argument("domains", nargs="*", default=list(SOURCES))
+    sub.add_parser("list", help="datasets and vintages")
+    p = sub.add_parser("as-of", help="latest values as of a vintage")
+    p.add_argument("dataset")
+    p.add_argument("vintage", nargs="?")
+    p.add_argument("--series", action="append")
+    p = sub.add_parser("history", help="revision history of a series")
+    p.add_argument("dataset")
+    p.add_argument("series")
+    p.add_argument("--period")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    store = VintageStore(args.root)
+    if args.command == "ingest":
+        for domain in args.domains:
+            for name, outcome in store.ingest_source(domain).items():
+                print(f"{domain:5s} {name}: {outcome}")
+    elif args.command == "list":
+        for dataset in store.datasets():
+            for vintage in store.vintages(dataset):
+                entry = store.manifest[dataset][vintage]
+                print(f"{dataset:32s} {vintage:10s} {entry['rows']:>8,d}  {entry['file']}")
+    elif args.command == "as-of":
+        print(store.as_of(args.dataset, args.vintage, args.series).to_string(max_rows=40))
+    else:
+        print(store.history(args.dataset, args.series, args.period).to_string(max_rows=40))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,99 @@
+# xlsx_writer.py
+"""
+Constant-memory Excel writer for the prepared outputs.
+
+DataFrame.to_excel goes through openpyxl, which builds every cell object
+before saving. write_excel streams instead: xlsxwriter in constant_memory
+mode flushes each row as it is written, and the frame is converted one
+chunk of rows at a time, so neither the workbook nor an object copy of the
+whole table is ever held in memory and write time grows linearly.
+
+Unless parquet=False, the frame also gets its typed Parquet twin
+(columnar.write_parquet), which readers use instead of the workbook.
+
+SDMX-style header blocks (the code rows under the column names, e.g.
+UNIT/MEASURE for BLA or ICP_SUFFIX for HICP) are passed separately as plain
+rows instead of being concatenated on top of the data, which would upcast
+every column to object:
+
+    write_excel(df, "assets/prepared/HICP.xlsx", header_rows=[icp_suffix_row(df.columns)])
+
+The layout matches to_excel(index=False): sheet "Sheet1", bold column names
+in row 1, numbers as numbers, missing values as empty cells, datetimes as
+yyyy-mm-dd hh:mm:ss.
+"""
+from pathlib import Path
+from typing import Any, Sequence, Union
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .columnar import write_parquet
+
+logger = logging.getLogger(__name__)
+
+CHUNK_ROWS = 10_000
+DATETIME_FORMAT = "yyyy-mm-dd hh:mm:ss"              # what to_excel uses
+HEADER_FORMAT = {"bold": True, "border": 1, "align": "center", "valign": "top"}
+
+PathLike = Union[str, Path]
+
+def _cells(column: pd.Series) -> np.ndarray:
+    """Cell values of one column chunk: Python scalars, None where missing."""
+    values = column.to_numpy(dtype=object)
+    missing = column.isna().to_numpy()
+    if missing.any():
+        values[missing] = None
+    return values
+
+def write_excel(df: pd.DataFrame, path: PathLike, header_rows: Sequence[Sequence[Any]] = (),
+                sheet_name: str = "Sheet1", chunk_size: int = CHUNK_ROWS, parquet: bool = True) -> Path:
+    """
+    Write df (without its index) to `path`: column names, then `header_rows`
+    (one value per column; None for an empty cell), then the data rows.
+    """
+    import xlsxwriter
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    book = xlsxwriter.Workbook(str(path), {
+        "constant_memory": True,
+        "strings_to_formulas": False,
+        "strings_to_urls": False,
+        "remove_timezone": True,
+        "nan_inf_to_errors": True,
+        "default_date_format": DATETIME_FORMAT,
+    })
+    try:
+        sheet = book.add_worksheet(sheet_name)
+        bold = book.add_format(HEADER_FORMAT)
+        ncols = df.shape[1]
+
+        for c, name in enumerate(df.columns):
+            sheet.write(0, c, name if not isinstance(name, tuple) else ".".join(map(str, name)), bold)
+        r = 1
+        for row in header_rows:
+            if len(row) != ncols:
+                raise ValueError(f"header row has {len(row)} values for {ncols} columns")
+            sheet.write_row(r, 0, [None if _missing(v) else v for v in row])
+            r += 1
+
+        for start in range(0, len(df), chunk_size):
+            block = df.iloc[start:start + chunk_size]
+            columns = [_cells(block.iloc[:, c]) for c in range(ncols)]
+            for values in zip(*columns):
+                sheet.write_row(r, 0, values)
+                r += 1
+    finally:
+        book.close()
+    logger.info("Wrote %d rows x %d columns (+%d header rows) to %s", len(df), df.shape[1], len(header_rows), path)
+    if parquet:
+        write_parquet(df, path, header_rows)
+    return path
+
+def _missing(value: Any) -> bool:
+    try:
+        return bool(pd.isna(value))
+    except (TypeError, ValueError):
+        return False
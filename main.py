@@ -3,6 +3,9 @@ import os
 from crawler import find_xlsx_links_in_html, download_xlsx_file
 from openpyxl import load_workbook
 
+from lfs_utils import metrics
+from lfs_utils.tracing import traced
+
 # List of datasets to process
 DATASETS = [
     {
@@ -93,6 +96,7 @@ def unhide_and_unprotect_xlsx(file_path):
     except Exception as e:
         logger.error(f"Failed to process {file_path}: {e}")
 
+@traced("crawl")
 def process_dataset(base_url, folder_name):
     logger.info(f"Processing dataset: {folder_name} from {base_url}")
     os.makedirs(os.path.join("assets", folder_name), exist_ok=True)
@@ -136,4 +140,5 @@ def process_dataset(base_url, folder_name):
 
 if __name__ == "__main__":
     for dataset in DATASETS:
-        process_dataset(dataset["base_url"], dataset["folder_name"])
+        with metrics.domain(f"crawl_{dataset['folder_name']}"):   # as under pipeline.py --crawl
+            process_dataset(dataset["base_url"], dataset["folder_name"])
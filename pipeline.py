@@ -0,0 +1,206 @@
+"""
+Single entry point: refresh every domain as a dependency graph.
+
+    crawl_<DOMAIN>  →  mci, hicp, cci, edp, nfg, lfs, lfs_annual, bla, bla_04, bla_16
+                    →  bla_overall, lfs_layer, vintages → revisions
+                    →  validate  →  export
+                    →  store (assets/sdmx/observations.sqlite, lfs_utils/obs_store.py)
+                    →  consistency (totals vs their parts, lfs_utils/consistency.py)
+                    →  profile (per-column profiles + codelist coverage, lfs_utils/profiler.py)
+    twins (Parquet twins of the parsed LFS workbooks)  →  lfs_layer, consistency
+
+Strategies run in a process pool (one process per ready node); edges come
+from each node's declared inputs/outputs, so a node starts as soon as the
+files it reads have been rebuilt. Crawling needs network access and is only
+included with --crawl.
+
+Builds are incremental: a node whose input files, code (its module and the
+repo modules it imports) and parameters match its last successful run is
+skipped (lfs_utils/build_cache.py, state under .cache/build).
+
+    python pipeline.py                      # all strategies + validation/export
+    python pipeline.py -j 4 hicp edp        # only these (and what they depend on)
+    python pipeline.py --crawl              # download first
+    python pipeline.py --list               # show the graph
+    python pipeline.py --dry-run            # what would rebuild, and why
+    python pipeline.py --force              # rebuild everything
+    python pipeline.py --trace              # stage timeline → reports/trace.json (+ trace_summary.md)
+    python pipeline.py --metrics [PROM]     # run metrics → reports/metrics.prom (node-exporter textfile) + .json
+"""
+from pathlib import Path
+import argparse
+import json
+import logging
+import sys
+import time
+
+from loguru import logger
+
+from lfs_utils import metrics, tracing
+from lfs_utils.build_cache import BuildState
+from lfs_utils.columnar import parquet_path
+from lfs_utils.config import Paths
+from lfs_utils.consistency import CATALOGUE as CONSISTENCY_CATALOGUE
+from lfs_utils.dag import Node, build_graph, results_to_dicts, run_dag, timing_report
+from lfs_utils.vintage_store import SOURCES as VINTAGE_SOURCES
+
+PREPARED = "assets/prepared"
+REPORT_DIR = Path("reports")
+SDMX_DIR = Path("assets/sdmx")
+
+CRAWLED = ["MCI", "NFG", "LFS", "EDP", "BLA", "CCI", "HICP"]
+DOMAIN_OUTPUTS = [f"{PREPARED}/{d}.xlsx" for d in ["MCI", "HICP", "CCI", "BLA", "NFG", "EDP", "LFS"]]
+# Parsed LFS workbooks read through columnar.read_table; no node writes them, so their twins are backfilled
+PARSED_LFS = sorted({str(Paths().file(k)) for k in Paths().inputs}
+                    | {f"{PREPARED}/{d.source}" for d in CONSISTENCY_CATALOGUE if not d.domain})
+
+def crawl(folder_name):
+    """Download every dataset of main.DATASETS stored under assets/<folder_name>."""
+    import main as crawler_main
+    for dataset in crawler_main.DATASETS:
+        if dataset["folder_name"] == folder_name:
+            crawler_main.process_dataset(dataset["base_url"], dataset["folder_name"])
+
+def validate():
+    """SDMX conformance report for every prepared output (reports/validation.md)."""
+    from lfs_utils.sdmx_validate import validate_all
+    reports = validate_all(max_workers=1)
+    lines = [r.summary() for r in reports.values()]
+    REPORT_DIR.mkdir(exist_ok=True)
+    (REPORT_DIR / "validation.md").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    failing = [d for d, r in reports.items() if not r.ok]
+    return f"violations in {', '.join(failing)}" if failing else "all outputs conform"
+
+def export_sdmx():
+    """SDMX-CSV per domain through its EDD, for the domains whose EDD checks clean."""
+    from lfs_utils.sdmx_edd import load_edd, read_grid
+    from lfs_utils.sdmx_registry import load_registry
+    from lfs_utils.sdmx_validate import LAYOUTS, PREPARED_DIR
+    from lfs_utils.sdmx_writers import write_sdmx_csv
+
+    registry = load_registry()
+    SDMX_DIR.mkdir(parents=True, exist_ok=True)
+    written, skipped = [], []
+    for name, layout in LAYOUTS.items():
+        mapping = load_edd(name, registry)
+        grid = read_grid(PREPARED_DIR / layout.file, mapping.worksheet)
+        if mapping.check(grid, registry.domain(name).dsd):
+            skipped.append(name)
+            continue
+        write_sdmx_csv(mapping.iter_extract(grid), name, SDMX_DIR / f"{name}.csv", registry=registry)
+        written.append(name)
+    return f"written {', '.join(written)}" + (f"; EDD problems in {', '.join(skipped)}" if skipped else "")
+
+NODES = [
+    *[Node(f"crawl_{d}", "pipeline:crawl", outputs=(f"assets/{d}/*.xlsx",), args=(d,)) for d in CRAWLED],
+
+    Node("mci", "strategy_mci:main", inputs=("assets/MCI/*.xlsx",), outputs=(f"{PREPARED}/MCI.xlsx",)),
+    Node("hicp", "strategy_hicp:main", inputs=("assets/HICP/*03_F_EN.xlsx", "assets/HICP/*02_F_EN.xlsx"),
+         outputs=(f"{PREPARED}/HICP.xlsx",)),
+    Node("cci", "strategy_cci:main", inputs=("assets/CCI/*04_F_EN.xlsx",), outputs=(f"{PREPARED}/CCI.xlsx",)),
+    Node("edp", "strategy_edp:main", inputs=("assets/EDP/*_06_P_EN.xlsx",), outputs=(f"{PREPARED}/EDP.xlsx",)),
+    Node("nfg", "strategy_nfg:main", inputs=("assets/NFG/*_BI.xlsx",), outputs=(f"{PREPARED}/NFG.xlsx",)),
+    Node("lfs", "strategy_LFS:main", inputs=("assets/LFS/*.xlsx",), outputs=(f"{PREPARED}/LFS.xlsx",)),
+    Node("lfs_annual", "strategy_LFS_annually:main", inputs=("assets/LFS/*.xlsx",),
+         outputs=(f"{PREPARED}/LFS_annual_CORRECTED_FINAL.xlsx",)),
+
+    Node("bla", "strategy_bla:main", inputs=("assets/BLA/*TS_MM*01_F_B*.xlsx",), outputs=(f"{PREPARED}/BLA.xlsx",)),
+    Node("bla_04", "strategy_bla_04:main", inputs=("assets/BLA/*04_F_BI.xlsx",), outputs=(f"{PREPARED}/BLA_04.xlsx",)),
+    Node("bla_16", "strategy_bla_16:main", inputs=("assets/BLA/*16_F_BI.xlsx",), outputs=(f"{PREPARED}/BLA_16.xlsx",)),
+    Node("bla_overall", "strategy_bla_overall:main",
+         inputs=(f"{PREPARED}/BLA.xlsx", f"{PREPARED}/BLA_04.xlsx", f"{PREPARED}/BLA_16.xlsx"),
+         outputs=(f"{PREPARED}/BLA.xlsx",), kwargs=(("run_strategies", False),)),
+
+    Node("vintages", "lfs_utils.vintage_store:ingest_all",
+         inputs=tuple(source.pattern for source in VINTAGE_SOURCES.values()), outputs=("assets/vintages/manifest.json",)),
+    Node("revisions", "lfs_utils.vintage_diff:report", inputs=("assets/vintages/manifest.json",),
+         outputs=("reports/vintage_diff.md",)),
+
+    Node("twins", "lfs_utils.columnar:backfill", inputs=tuple(PARSED_LFS),
+         outputs=tuple(f"{parquet_path(p)}/_meta.json" for p in PARSED_LFS), args=(tuple(PARSED_LFS),)),
+    Node("lfs_layer", "lfs_layer:run", inputs=tuple(str(Paths().file(k)) for k in Paths().inputs),
+         outputs=("test_LFS_annual.xlsx", "LFS_Annual_Report.md"), deps=("twins",)),
+
+    # bla_overall rewrites BLA.xlsx, so the checks wait for it explicitly
+    Node("validate", "pipeline:validate", inputs=tuple(DOMAIN_OUTPUTS), outputs=("reports/validation.md",),
+         deps=("bla_overall",)),
+    Node("export", "pipeline:export_sdmx", inputs=tuple(DOMAIN_OUTPUTS), outputs=("assets/sdmx/*.csv",),
+         deps=("validate", "bla_overall")),
+    Node("store", "lfs_utils.obs_store:build", inputs=tuple(DOMAIN_OUTPUTS),
+         outputs=("assets/sdmx/observations.sqlite",), deps=("bla_overall",)),
+    Node("profile", "lfs_utils.profiler:profile_all", inputs=tuple(DOMAIN_OUTPUTS),
+         outputs=("reports/profiles/*_Report.md",), deps=("bla_overall",)),
+    Node("consistency", "lfs_utils.consistency:report",
+         inputs=tuple(f"{PREPARED}/{d.source}" + (".xlsx" if d.domain else "") for d in CONSISTENCY_CATALOGUE),
+         outputs=("reports/consistency.md",), deps=("bla_overall", "twins")),
+]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the strategies as a dependency graph.")
+    parser.add_argument("targets", nargs="*", help="nodes to run with their upstream nodes (default: all)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--crawl", action="store_true", help="include the download nodes")
+    parser.add_argument("--list", action="store_true", help="print the graph and exit")
+    parser.add_argument("--dry-run", "--explain", dest="dry_run", action="store_true",
+                        help="list the nodes that would rebuild and why, then exit")
+    parser.add_argument("--force", action="store_true", help="rebuild up-to-date nodes too")
+    parser.add_argument("--trace", action="store_true",
+                        help="record per-stage timings, rows and memory (reports/trace.json, chrome://tracing)")
+    parser.add_argument("--metrics", nargs="?", const=str(REPORT_DIR / "metrics.prom"), metavar="PROM",
+                        help="write run metrics as a Prometheus textfile (default: reports/metrics.prom) plus JSON")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    nodes = [n for n in NODES if args.crawl or not n.name.startswith("crawl_")]
+    if args.list:
+        for name, upstream in build_graph(nodes).items():
+            print(f"{name:12s} ← {', '.join(sorted(upstream)) or '-'}")
+        return 0
+
+    state = BuildState()
+    plan = state.plan(nodes, targets=args.targets or None, force=args.force)
+    if args.dry_run:
+        for name, reasons in plan.items():
+            print(f"{name:12s} {'rebuild' if reasons else 'up to date'}")
+            for reason in reasons:
+                print(f"{'':12s}   - {reason}")
+        print(f"{sum(bool(r) for r in plan.values())} of {len(plan)} nodes would run")
+        return 0
+
+    if args.trace:
+        tracing.clear(REPORT_DIR / "trace")
+        tracing.enable(REPORT_DIR / "trace")
+    if args.metrics:
+        metrics.clear(REPORT_DIR / "metrics")
+        metrics.enable(REPORT_DIR / "metrics")
+
+    t0 = time.perf_counter()
+    results = run_dag(nodes, targets=args.targets or None, max_workers=args.workers,
+                      done=[name for name, reasons in plan.items() if not reasons],
+                      on_success=state.record)
+    wall = time.perf_counter() - t0
+
+    report = timing_report(results, nodes, wall)
+    REPORT_DIR.mkdir(exist_ok=True)
+    (REPORT_DIR / "pipeline_timings.md").write_text(report, encoding="utf-8")
+    (REPORT_DIR / "pipeline_timings.json").write_text(
+        json.dumps({"wall": wall, "nodes": results_to_dicts(results)}, indent=2), encoding="utf-8")
+    print(report)
+    if tracing.enabled():
+        print(f"Stage trace: {tracing.export(tracing.directory(), REPORT_DIR / 'trace.json')}")
+    if metrics.enabled():
+        for status in ("ok", "cached", "failed", "skipped"):
+            metrics.NODES.set(sum(r.status == status for r in results), status=status)
+        metrics.RUN_SECONDS.set(wall)
+        metrics.LAST_RUN.set(time.time())
+        print(f"Run metrics: {metrics.export(metrics.directory(), args.metrics)}")
+
+    failed = [r.name for r in results if r.status not in ("ok", "cached")]
+    if failed:
+        logger.error(f"❌ Not completed: {', '.join(failed)}")
+        return 1
+    logger.success(f"🎉 {len(results)} nodes completed in {wall:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
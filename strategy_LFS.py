@@ -11,6 +11,12 @@ import re
 from collections import defaultdict
 from datetime import datetime
 import numpy as np
+import sys
+
+from lfs_utils.build_cache import PartialCache
+from lfs_utils import metrics
+from lfs_utils.tracing import stage, traced
+from lfs_utils.xlsx_writer import write_excel
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -142,6 +148,7 @@ OCCUPATION_MAPPING = {
     'Other unclassified persons': 'OTHER_UNCLASSIFIED'
 }
 
+@traced("parse")
 def extract_time_periods_enhanced(sheet, file_name):
     """Extract time periods with ENHANCED logic for ALL file types."""
     logger.info(f"    ⏰ Extracting time periods with ENHANCED logic from {file_name}")
@@ -312,6 +319,7 @@ def extract_time_periods_enhanced(sheet, file_name):
     
     return time_periods
 
+@traced("parse")
 def extract_dimensions_enhanced(sheet, file_name):
     """Extract ALL dimensions with ENHANCED logic for ALL tables."""
     logger.info(f"    🔍 Extracting dimensions with ENHANCED logic from {file_name}")
@@ -436,6 +444,7 @@ def extract_dimensions_enhanced(sheet, file_name):
     
     return dimensions
 
+@traced("parse")
 def parse_data_with_enhanced_context(sheet, time_periods, dimensions, file_name, sheet_name):
     """Parse data rows with ENHANCED dimensional context linking."""
     logger.info(f"    💰 Parsing data rows with ENHANCED dimensional context")
@@ -542,50 +551,67 @@ def parse_data_with_enhanced_context(sheet, time_periods, dimensions, file_name,
     logger.info(f"      Extracted {len(records)} records with ENHANCED dimensional context")
     return records
 
-def parse_lfs_file_enhanced(file_path):
-    """Parse a single LFS file with ENHANCED structure understanding."""
+@traced("parse")
+def parse_lfs_file_records(file_path):
+    """
+    Parse a single LFS file with ENHANCED structure understanding.
+
+    A sheet that fails to parse is logged and skipped, but errors opening or
+    reading the workbook propagate: the result is cached per file content, so
+    a transient read failure must not be stored as an empty file.
+    """
     logger.info(f"\n🔍 PARSING FILE: {os.path.basename(file_path)}")
     logger.info("=" * 80)
     
-    try:
-        excel_file = pd.ExcelFile(file_path)
-        file_name = os.path.basename(file_path)
+    excel_file = pd.ExcelFile(file_path)
+    file_name = os.path.basename(file_path)
+    
+    all_records = []
+    
+    for sheet_name in excel_file.sheet_names:
+        logger.info(f"\n📋 Processing sheet: {sheet_name}")
         
-        all_records = []
+        # Read the sheet
+        with stage("read", f"{file_name}[{sheet_name}]") as s:
+            sheet = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
+            s.rows_out = len(sheet)
+        metrics.sheet_read(sheet)
+        logger.info(f"  Sheet dimensions: {sheet.shape[0]} rows × {sheet.shape[1]} columns")
         
-        for sheet_name in excel_file.sheet_names:
-            logger.info(f"\n📋 Processing sheet: {sheet_name}")
+        try:
+            # Extract time periods with ENHANCED strategy
+            time_periods = extract_time_periods_enhanced(sheet, file_name)
+            logger.info(f"  Found {len(time_periods)} time periods")
             
-            try:
-                # Read the sheet
-                sheet = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
-                logger.info(f"  Sheet dimensions: {sheet.shape[0]} rows × {sheet.shape[1]} columns")
-                
-                # Extract time periods with ENHANCED strategy
-                time_periods = extract_time_periods_enhanced(sheet, file_name)
-                logger.info(f"  Found {len(time_periods)} time periods")
-                
-                # Extract ALL dimensional context with ENHANCED logic
-                dimensions = extract_dimensions_enhanced(sheet, file_name)
-                
-                # Parse data with ENHANCED context
-                records = parse_data_with_enhanced_context(
-                    sheet, time_periods, dimensions, file_name, sheet_name
-                )
-                
-                all_records.extend(records)
-                
-            except Exception as e:
-                logger.error(f"    ❌ Error processing sheet {sheet_name}: {e}")
-                continue
-        
-        logger.info(f"  ✅ Total records extracted: {len(all_records):,}")
-        return all_records
-        
+            # Extract ALL dimensional context with ENHANCED logic
+            dimensions = extract_dimensions_enhanced(sheet, file_name)
+            
+            # Parse data with ENHANCED context
+            records = parse_data_with_enhanced_context(
+                sheet, time_periods, dimensions, file_name, sheet_name
+            )
+            
+            all_records.extend(records)
+            
+        except Exception as e:
+            logger.error(f"    ❌ Error processing sheet {sheet_name}: {e}")
+            continue
+    
+    logger.info(f"  ✅ Total records extracted: {len(all_records):,}")
+    return all_records
+
+def parse_lfs_file_enhanced(file_path):
+    """parse_lfs_file_records(), logging a failed file and returning no records."""
+    try:
+        return parse_lfs_file_records(file_path)
     except Exception as e:
         logger.error(f"❌ Error parsing file {file_path}: {e}")
         return []
 
+def parse_lfs_file_frame(file_path):
+    """parse_lfs_file_records() as a DataFrame (the unit stored in the partial cache); errors propagate."""
+    return pd.DataFrame(parse_lfs_file_records(file_path))
+
 def parse_all_lfs_files_enhanced():
     """Parse CRITICAL LFS files with ENHANCED structure understanding - IGNORE TS_AN files."""
     logger.info("🚀 STARTING ENHANCED FINAL COMPREHENSIVE LFS PARSING")
@@ -630,7 +656,12 @@ def parse_all_lfs_files_enhanced():
     else:
         logger.info(f"✅ ALL CRITICAL FILES VERIFIED: {critical_patterns}")
     
-    all_records = []
+    # Per-file records are cached; only new or changed files are parsed again
+    partials = PartialCache("lfs_records", parse_lfs_file_frame, deps=[sys.modules[__name__]])
+    for file_path, reason in partials.plan([os.path.join(lfs_folder, f) for f in sorted(critical_files)]):
+        logger.info(f"  {'♻️ ' if reason == 'cached' else '🔄'} {os.path.basename(file_path)}: {reason}")
+    
+    frames = []
     
     # Process only critical files
     for excel_file in sorted(critical_files):
@@ -638,17 +669,23 @@ def parse_all_lfs_files_enhanced():
         logger.info(f"\n🔍 PROCESSING CRITICAL FILE: {excel_file}")
         logger.info("=" * 80)
         
-        records = parse_lfs_file_enhanced(file_path)
-        all_records.extend(records)
+        try:
+            records = partials.load_or_compute(file_path)
+        except Exception as e:
+            # Not cached, so the file is parsed again on the next run
+            logger.error(f"❌ Error parsing file {file_path}: {e}")
+            continue
+        frames.append(records)
         
         logger.info(f"📊 Records from {excel_file}: {len(records):,}")
+    partials.save()
     
     # Create final dataset
-    if all_records:
+    if any(len(f) for f in frames):
         logger.info(f"\n📊 CREATING ENHANCED FINAL COMPREHENSIVE DATASET")
         logger.info("=" * 80)
         
-        df_final = pd.DataFrame(all_records)
+        df_final = pd.concat([f for f in frames if len(f)], ignore_index=True)
         
         # Remove duplicates based on meaningful dimensions
         logger.info(f"\n🔍 REMOVING DUPLICATES WITH COMPREHENSIVE DIMENSION CHECKING")
@@ -666,6 +703,7 @@ def parse_all_lfs_files_enhanced():
         df_final = df_final.drop_duplicates(subset=duplicate_dimensions, keep='first')
         final_count = len(df_final)
         duplicates_removed = initial_count - final_count
+        metrics.DUPLICATES_DROPPED.inc(duplicates_removed)
         
         logger.info(f"  Initial records: {initial_count:,}")
         logger.info(f"  Duplicates removed: {duplicates_removed:,}")
@@ -695,7 +733,8 @@ def parse_all_lfs_files_enhanced():
         
         # Save the dataset
         output_file = "assets/prepared/LFS.xlsx"
-        df_final.to_excel(output_file, index=False)
+        with stage("write", output_file, rows_in=len(df_final)):
+            write_excel(df_final, output_file)
         
         logger.info(f"\n💾 Dataset saved to: {output_file}")
         
@@ -13,6 +13,10 @@ from datetime import datetime
 import numpy as np
 from typing import List, Dict, Any, Tuple
 
+from lfs_utils import metrics
+from lfs_utils.tracing import stage, traced
+from lfs_utils.xlsx_writer import write_excel
+
 # Set up professional logging
 logging.basicConfig(
     level=logging.INFO,
@@ -424,6 +428,7 @@ class CorrectedAnnualLFSParser:
         else:
             return 'UNITS'
     
+    @traced("parse")
     def extract_all_data_from_sheet_corrected(self, sheet: pd.DataFrame, sheet_name: str, file_name: str) -> List[Dict[str, Any]]:
         """CORRECTED extraction of all data from a sheet."""
         logger.info(f"    📊 CORRECTED extraction from sheet: {sheet_name}")
@@ -443,6 +448,7 @@ class CorrectedAnnualLFSParser:
             logger.error(f"      ❌ Error extracting data from {sheet_name}: {e}")
             return []
     
+    @traced("parse")
     def parse_all_annual_lfs_files_corrected(self) -> pd.DataFrame:
         """CORRECTED parsing of all annual LFS files."""
         logger.info("🚀 STARTING CORRECTED ANNUAL LFS DATA EXTRACTION")
@@ -476,9 +482,12 @@ class CorrectedAnnualLFSParser:
                     chunk_size = 1000
                     for chunk_start in range(0, 10000, chunk_size):  # Limit to first 10k rows
                         try:
-                            chunk = pd.read_excel(file_path, sheet_name=sheet_name, 
-                                                header=None, skiprows=chunk_start, 
-                                                nrows=chunk_size)
+                            with stage("read", f"{file_name}[{sheet_name}]") as s:
+                                chunk = pd.read_excel(file_path, sheet_name=sheet_name, 
+                                                    header=None, skiprows=chunk_start, 
+                                                    nrows=chunk_size)
+                                s.rows_out = len(chunk)
+                            metrics.sheet_read(chunk)
                             
                             if chunk.empty:
                                 break
@@ -523,6 +532,7 @@ class CorrectedAnnualLFSParser:
             logger.error("❌ No data extracted from any files!")
             return pd.DataFrame()
     
+    @traced("transform")
     def remove_duplicates_smartly_corrected(self, df: pd.DataFrame) -> pd.DataFrame:
         """CORRECTED smart duplicate removal."""
         logger.info("🧹 CORRECTED smart duplicate removal")
@@ -561,7 +571,8 @@ def main():
         
         # Save to file
         output_file = "assets/prepared/LFS_annual_CORRECTED_FINAL.xlsx"
-        df.to_excel(output_file, index=False)
+        with stage("write", output_file, rows_in=len(df)):
+            write_excel(df, output_file)
         
         logger.info(f"💾 CORRECTED dataset saved to: {output_file}")
         logger.info(f"📊 Final dataset statistics:")
@@ -3,6 +3,11 @@ import pandas as pd
 import os
 import re
 
+from lfs_utils import metrics
+from lfs_utils.tracing import stage, traced
+from lfs_utils.xlsx_writer import write_excel
+
+@traced("transform")
 def create_time_period(df):
     """
     Create proper time_period column from YEAR and MONTH columns.
@@ -34,6 +39,7 @@ def create_time_period(df):
     
     return time_periods
 
+@traced("parse")
 def parse_bla_details_sheet(sheet):
     """
     Parse the BLA details sheet to extract regional building activity data.
@@ -191,8 +197,11 @@ def main():
     
     logger.info(f"Loading Excel file: {input_file}")
     try:
-        xl = pd.ExcelFile(input_file)
-        sheet = xl.parse(xl.sheet_names[0], header=None)
+        with stage("read", input_file) as s:
+            xl = pd.ExcelFile(input_file)
+            sheet = xl.parse(xl.sheet_names[0], header=None)
+            s.rows_out = len(sheet)
+        metrics.sheet_read(sheet)
         
         # Parse the sheet
         final_df = parse_bla_details_sheet(sheet)
@@ -208,7 +217,8 @@ def main():
             final_df = final_df[['YEAR', 'MONTH', 'FREQ', 'time_period', 'REGION', 'NUMBER', 'ROOMS', 'NEW_DWELLINGS_VOLUME', 'SURFACE', 'IMPROVEMENTS_VOLUME']]
             
             # Save to Excel
-            final_df.to_excel(output_file, index=False)
+            with stage("write", output_file, rows_in=len(final_df)):
+                write_excel(final_df, output_file)
             logger.success(f"Saved normalized BLA details data to {output_file}")
             logger.info(f"Final dataset shape: {final_df.shape}")
             logger.info(f"Year: {final_df['YEAR'].iloc[0]}")
@@ -19,6 +19,11 @@ import sys
 import re
 from datetime import datetime
 import warnings
+from lfs_utils import metrics
+from lfs_utils.dedup import dedup
+from lfs_utils.tracing import stage, traced
+from lfs_utils.columnar import read_table
+from lfs_utils.xlsx_writer import write_excel
 warnings.filterwarnings('ignore')
 
 def run_individual_strategies():
@@ -55,6 +60,7 @@ def run_individual_strategies():
     
     return True
 
+@traced("merge")
 def load_and_merge_data():
     """
     Load the three BLA datasets and merge them according to the exact recipe
@@ -63,9 +69,9 @@ def load_and_merge_data():
     
     try:
         # Load the three datasets
-        df_bla = pd.read_excel('assets/prepared/BLA.xlsx')
-        df_bla_04 = pd.read_excel('assets/prepared/BLA_04.xlsx')
-        df_bla_16 = pd.read_excel('assets/prepared/BLA_16.xlsx')
+        df_bla = read_table('assets/prepared/BLA.xlsx')
+        df_bla_04 = read_table('assets/prepared/BLA_04.xlsx')
+        df_bla_16 = read_table('assets/prepared/BLA_16.xlsx')
         
         print(f"✓ Loaded BLA: {df_bla.shape}")
         print(f"✓ Loaded BLA_04: {df_bla_04.shape}")
@@ -90,6 +96,7 @@ def load_and_merge_data():
         print(f"✗ Error loading/merging data: {str(e)}")
         return None
 
+@traced("transform")
 def apply_codelist_mappings(df):
     """
     Apply codelist mappings to REGION, CATEGORY columns
@@ -119,9 +126,14 @@ def apply_codelist_mappings(df):
     
     return df
 
+@traced("transform")
 def process_dataframe(df):
     """
     Process the dataframe according to the exact recipe
+
+    Returns the data rows and the SDMX header block (UNIT, DWELLINGS,
+    URBAN STATUS, MEASURE rows, one value per column) that goes between
+    the column names and the data.
     """
     print("Processing dataframe according to recipe...")
     
@@ -134,36 +146,23 @@ def process_dataframe(df):
     
     # Filter to only include columns that exist
     existing_columns = [col for col in new_order if col in df.columns]
-    df = df[existing_columns]
-    
-    df = df.astype('object')  # upcast once, no warnings later
+    df = df[existing_columns].copy()
     
-    # prepend 4 empty rows
-    empty_rows = pd.DataFrame([[pd.NA]*len(df.columns)]*4,
-                              columns=df.columns, dtype='object')
-    df = pd.concat([empty_rows, df], ignore_index=True)
-    
-    # write UNIT header row
-    df.iloc[0, 0] = 'UNIT'
+    # Header block: label in the first column, then one code per remaining column.
+    # Kept apart from the data (and written by write_excel) so no column is upcast.
     
     # list of values of the row of unit
     unit_values = ['_Z', '_Z', '_Z', 'N', 'A', 'V', 'N', 'N', 'V', 'A', 'V', 'N', 'V', 'N', 'V', 'N', 'V', 'N', 'V']
-    df.iloc[0, 1:len(unit_values)+1] = unit_values[:len(df.columns)-1]
-    
-    df.iloc[1, 0] = 'DWELLINGS'
     
     dwellings_values = ['_Z', '_Z', '_Z', '_Z', '_Z', '_Z',  'D', 'DR', 'D', 'D', 'I', '_Z', '_Z', '_Z', '_Z', '_Z', '_Z', '_Z', '_Z']
-    df.iloc[1, 1:len(dwellings_values)+1] = dwellings_values[:len(df.columns)-1]
-    
-    df.iloc[2, 0] = 'URBAN STATUS'
     
     urban_status_values = ['_Z', '_Z', '_Z', '_Z', '_Z', '_Z', '_Z', '_Z', '_Z', '_Z', '_Z', 'ALL', 'ALL', 'URBAN', 'URBAN', 'SEMI_URBAN', 'SEMI_URBAN', 'RURAL', 'RURAL']
-    df.iloc[2, 1:len(urban_status_values)+1] = urban_status_values[:len(df.columns)-1]
-    
-    df.iloc[3, 0] = 'MEASURE'
     
     measure_values = ['_Z', '_Z', '_Z', 'NR', 'M2', 'M3', 'NR', 'NR', 'M3', 'M2', 'M3', 'NR', 'M3', 'NR', 'M3', 'NR', 'M3', 'NR', 'M3']
-    df.iloc[3, 1:len(measure_values)+1] = measure_values[:len(df.columns)-1]
+    
+    header_rows = [[label] + values[:len(df.columns)-1]
+                   for label, values in [('UNIT', unit_values), ('DWELLINGS', dwellings_values),
+                                         ('URBAN STATUS', urban_status_values), ('MEASURE', measure_values)]]
     
     # 1) ensure object dtype (avoid future dtype warnings)
     df[['REGION', 'CATEGORY']] = df[['REGION', 'CATEGORY']].astype('object')
@@ -209,6 +208,7 @@ def process_dataframe(df):
     reg_idx = df.columns.get_loc('REGION')
     if 'REGIONAL_UNIT' not in df.columns:
         df.insert(reg_idx + 1, 'REGIONAL_UNIT', pd.NA)
+        header_rows = [row[:reg_idx + 1] + ['_Z'] + row[reg_idx + 1:] for row in header_rows]
     df['REGIONAL_UNIT'] = df['REGIONAL_UNIT'].astype('object')
     
     # 3) detect "regional unit" values currently living in REGION
@@ -396,19 +396,31 @@ def process_dataframe(df):
     # Apply regions mapping
     if 'REGION' in df.columns:
         df['REGION'] = df['REGION'].map(region_mapping).fillna('_Z')
+        region_idx = df.columns.get_loc('REGION')
+        for row in header_rows:
+            row[region_idx] = region_mapping.get(row[region_idx], '_Z')
         print("✓ Applied regions mapping")
     
     print("✓ Dataframe processed according to recipe")
-    return df
+    return df, header_rows
 
-def perform_data_integrity_check(df):
+@traced("validate")
+def perform_data_integrity_check(df, header_rows=None):
     """
     Perform comprehensive data integrity checks
+
+    df holds the data rows and header_rows the header block; without
+    header_rows (a frame read back from BLA.xlsx) the first 4 rows of df
+    are the header block.
     """
     print("\n" + "="*60)
     print("DATA INTEGRITY CHECK")
     print("="*60)
     
+    if header_rows is None:
+        header_rows = df.iloc[:4].values.tolist()
+        df = df.iloc[4:]
+    
     issues = []
     warnings = []
     
@@ -420,17 +432,16 @@ def perform_data_integrity_check(df):
             if missing_count > 0:
                 issues.append(f"Missing values in {col}: {missing_count}")
     
-    # Check for invalid FREQ values (skip header rows)
+    # Check for invalid FREQ values
     if 'FREQ' in df.columns:
-        data_rows = df.iloc[4:]['FREQ']
+        data_rows = df['FREQ']
         invalid_freq = data_rows[data_rows.notna()].apply(lambda x: str(x) not in ['M', 'A', '_Z'])
         if invalid_freq.any():
             issues.append(f"Invalid FREQ values found: {data_rows[invalid_freq].unique()}")
     
     # Check for invalid time_period format (more flexible for M01 format)
     if 'time_period' in df.columns:
-        # Skip header rows (first 4 rows)
-        data_rows = df.iloc[4:]['time_period']
+        data_rows = df['time_period']
         # Accept both YYYY and YYYY-M01 formats
         invalid_time = data_rows[data_rows.notna()].apply(lambda x: not re.match(r'^\d{4}(-M?\d{2})?$', str(x)))
         if invalid_time.any():
@@ -454,8 +465,7 @@ def perform_data_integrity_check(df):
     
     for col in numeric_columns:
         if col in df.columns:
-            # Skip header rows
-            data_rows = df.iloc[4:][col]
+            data_rows = df[col]
             non_numeric = data_rows[data_rows.notna()].apply(lambda x: not pd.to_numeric(x, errors='coerce') == x)
             if non_numeric.any():
                 warnings.append(f"Non-numeric values in {col}: {data_rows[non_numeric].unique()[:3]}")
@@ -463,8 +473,8 @@ def perform_data_integrity_check(df):
     # Check header row structure
     expected_headers = ['UNIT', 'DWELLINGS', 'URBAN STATUS', 'MEASURE']
     for i, expected in enumerate(expected_headers):
-        if df.iloc[i, 0] != expected:
-            issues.append(f"Header row {i} mismatch: expected '{expected}', got '{df.iloc[i, 0]}'")
+        if header_rows[i][0] != expected:
+            issues.append(f"Header row {i} mismatch: expected '{expected}', got '{header_rows[i][0]}'")
     
     # Print results
     if issues:
@@ -483,27 +493,30 @@ def perform_data_integrity_check(df):
     
     # Summary statistics
     print(f"\n📊 SUMMARY STATISTICS:")
-    print(f"  - Total rows: {len(df)}")
+    print(f"  - Total rows: {len(df) + len(header_rows)}")
     print(f"  - Total columns: {len(df.columns)}")
-    print(f"  - Data rows (excluding headers): {len(df) - 4}")
+    print(f"  - Data rows (excluding headers): {len(df)}")
     
     if 'time_period' in df.columns:
-        data_rows = df.iloc[4:]['time_period']
+        data_rows = df['time_period']
         if data_rows.notna().any():
             time_range = data_rows[data_rows.notna()].astype(str).agg(['min', 'max'])
             print(f"  - Time period range: {time_range['min']} to {time_range['max']}")
     
     if 'FREQ' in df.columns:
-        freq_counts = df.iloc[4:]['FREQ'].value_counts()
+        freq_counts = df['FREQ'].value_counts()
         print(f"  - Frequency distribution:")
         for freq, count in freq_counts.items():
             print(f"    {freq}: {count}")
     
     return len(issues) == 0
 
-def main():
+def main(run_strategies=True):
     """
     Main execution function
+
+    run_strategies=False skips Step 1, for callers (pipeline.py) that have
+    already produced BLA.xlsx, BLA_04.xlsx and BLA_16.xlsx.
     """
     print("="*60)
     print("BLA OVERALL STRATEGY EXECUTION")
@@ -515,7 +528,7 @@ def main():
     # Check if final BLA.xlsx already exists and is properly formatted
     if os.path.exists(output_file):
         try:
-            df_existing = pd.read_excel(output_file)
+            df_existing = read_table(output_file)
             # Check if it has the expected header structure
             if (len(df_existing) > 4 and 
                 df_existing.iloc[0, 0] == 'UNIT' and 
@@ -551,7 +564,7 @@ def main():
     print("⚠️  Processing data to apply regional unit mapping and deduplication")
     
     # Step 1: Run individual strategies to generate their Excel files
-    if not run_individual_strategies():
+    if run_strategies and not run_individual_strategies():
         print("❌ Failed to run individual strategies. Exiting.")
         return False
     
@@ -565,39 +578,29 @@ def main():
     df_merged = apply_codelist_mappings(df_merged)
     
     # Step 4: Process dataframe according to exact recipe
-    df_final = process_dataframe(df_merged)
+    df_final, header_rows = process_dataframe(df_merged)
     
     # Step 5: DEDUPLICATE AT THE VERY FUCKING END - AFTER ROW 6 (HEADERS)
     print("Deduplicating data rows (after header rows)...")
     
-    # Get header rows (first 4 rows) and data rows (from row 5 onwards)
-    header_rows = df_final.iloc[:4].copy()
-    data_rows = df_final.iloc[4:].copy()
-    
+    # The 4 header rows are kept apart from the data rows
     print(f"  - Header rows: {len(header_rows)}")
-    print(f"  - Data rows before deduplication: {len(data_rows)}")
+    print(f"  - Data rows before deduplication: {len(df_final)}")
     
     # Deduplicate data rows based on key dimensions
     key_columns = ['FREQ', 'time_period', 'REGION', 'REGIONAL_UNIT', 'CATEGORY']
-    existing_key_columns = [col for col in key_columns if col in data_rows.columns]
+    existing_key_columns = [col for col in key_columns if col in df_final.columns]
     
     if existing_key_columns:
         print(f"  - Deduplicating based on: {existing_key_columns}")
         
-        # Count duplicates before
-        duplicates_before = data_rows.duplicated(subset=existing_key_columns).sum()
-        print(f"  - Duplicates found: {duplicates_before}")
-        
-        # Remove duplicates, keeping first occurrence
-        data_rows_deduped = data_rows.drop_duplicates(subset=existing_key_columns, keep='first')
-        
-        # Count duplicates after
-        duplicates_after = data_rows_deduped.duplicated(subset=existing_key_columns).sum()
-        print(f"  - Duplicates after deduplication: {duplicates_after}")
-        print(f"  - Rows removed: {len(data_rows) - len(data_rows_deduped)}")
+        # One hashed pass over the data rows, keeping first occurrence
+        result = dedup(df_final, subset=existing_key_columns, keep='first')
+        metrics.DUPLICATES_DROPPED.inc(result.dropped_rows)
+        print(f"  - Duplicate key groups: {result.duplicate_groups}")
+        print(f"  - Rows removed: {result.dropped_rows}")
         
-        # Reconstruct the final dataframe
-        df_final = pd.concat([header_rows, data_rows_deduped], ignore_index=True)
+        df_final = result.df
         
         print(f"  - Final dataframe shape: {df_final.shape}")
     else:
@@ -605,7 +608,8 @@ def main():
     
     # Step 6: Save final output
     try:
-        df_final.to_excel(output_file, index=False)
+        with stage("write", output_file, rows_in=len(df_final)):
+            write_excel(df_final, output_file, header_rows=header_rows)
         print(f"✓ Final output saved to: {output_file}")
     except Exception as e:
         print(f"❌ Error saving output: {str(e)}")
@@ -616,12 +620,12 @@ def main():
     print("FINAL DATA INTEGRITY CHECK")
     print("="*60)
     
-    success = perform_data_integrity_check(df_final)
+    success = perform_data_integrity_check(df_final, header_rows)
     
     if success:
         print("\n🎉 BLA Overall Strategy completed successfully!")
         print(f"Final file: {output_file}")
-        print(f"Shape: {df_final.shape}")
+        print(f"Shape: {(len(df_final) + len(header_rows), df_final.shape[1])}")
     else:
         print("\n⚠️  BLA Overall Strategy completed with issues!")
         print("Please review the issues above before proceeding.")
@@ -3,6 +3,10 @@ import pandas as pd
 import os
 import re
 
+from lfs_utils import metrics
+from lfs_utils.tracing import stage, traced
+from lfs_utils.xlsx_writer import write_excel
+
 def get_category_names():
     return [
         "Earth-moving",
@@ -24,6 +28,7 @@ def get_category_names():
         "Special installations without appliances and accessories"
     ]
 
+@traced("parse")
 def parse_cci_sheet_dynamic(sheet):
     logger.info("Parsing CCI sheet dynamically for available quarters and annual averages...")
     data = []
@@ -145,6 +150,7 @@ def try_float(val):
     except Exception:
         return None
 
+@traced("transform")
 def add_time_period_and_freq(df):
     # TIME_PERIOD: YEAR-QN (N=1,2,3,4) for quarters, YEAR for annual average (_Z)
     # FREQ: Q for quarters, A for annual average
@@ -166,6 +172,7 @@ def add_time_period_and_freq(df):
     cols.insert(cols.index('TIME_PERIOD') + 1, 'FREQ')
     return df[cols]
 
+@traced("transform")
 def impute_overall_index_q1(df):
     # For each year, if OVERALL INDEX Q1 (A) is missing, impute it using annual average and other quarters
     logger.info("Imputing missing OVERALL INDEX Q1 values if needed...")
@@ -228,8 +235,11 @@ def main():
     os.makedirs(output_dir, exist_ok=True)
     logger.info(f"Loading Excel file: {input_file}")
     try:
-        xl = pd.ExcelFile(input_file)
-        sheet = xl.parse(xl.sheet_names[0], header=None)
+        with stage("read", input_file) as s:
+            xl = pd.ExcelFile(input_file)
+            sheet = xl.parse(xl.sheet_names[0], header=None)
+            s.rows_out = len(sheet)
+        metrics.sheet_read(sheet)
         # Forward fill for merged cells in first two columns
         sheet.iloc[:,0] = sheet.iloc[:,0].ffill()
         sheet.iloc[:,1] = sheet.iloc[:,1].ffill()
@@ -246,7 +256,8 @@ def main():
         # in column "Category" make it "K" + str(int(col))
         final_df['Category'] = "K" + final_df['Category'].astype(str)
         logger.success(f"Parsed {len(final_df)} rows of CCI data.")
-        final_df.to_excel(output_file, index=False)
+        with stage("write", output_file, rows_in=len(final_df)):
+            write_excel(final_df, output_file)
         logger.success(f"Saved normalized CCI data to {output_file}")
     except Exception as e:
         logger.error(f"Failed to process CCI file: {e}")
@@ -2,6 +2,21 @@ from loguru import logger
 import pandas as pd
 import os
 
+from lfs_utils import metrics
+from lfs_utils.sdmx_codes import CodeTransform, Drop, Move, Swap, check_key_length, join_columns
+from lfs_utils.tracing import stage, traced
+from lfs_utils.xlsx_writer import write_excel
+
+# Table codes (19 tokens, list pop/insert semantics) → 'Edp' sheet series keys in DSD order
+TABLE_CODE_TO_SERIES = CodeTransform([
+    Drop(11),                  # remove index 11
+    Move(-3, -2),              # move index -3 to -2
+    Move(11, -3),              # move new index 11 to -3
+    Move(11, -4),              # move new index 11 to -4
+    Move(-2, -4),
+    Swap(-4, -5, min_len=6),   # swap index -4 with -5
+])
+
 def main():
     file_pattern = r"assets/EDP/.*_06_P_EN\.xlsx"
     files = [os.path.join("assets/EDP", f) for f in os.listdir("assets/EDP") if f.endswith("_06_P_EN.xlsx")]
@@ -26,10 +41,12 @@ def main():
         logger.error(f"Failed to read Excel file or list sheets: {e}")
         return
 
+    @traced("parse", "strategy_edp.load_and_clean_table")
     def load_and_clean_table(file, sheet_name, col_indices, col_names, code_prefix="A.N"):
         logger.info(f"Loading and cleaning table: {sheet_name}")
         try:
             df = pd.read_excel(file, sheet_name=sheet_name)
+            metrics.sheet_read(df)
             logger.debug(f"Loaded {len(df)} rows from {sheet_name}")
             df = df.iloc[:, col_indices]
             df.columns = col_names
@@ -50,30 +67,6 @@ def main():
             logger.error(f"Error processing table '{sheet_name}': {e}")
             return pd.DataFrame(columns=col_names)
 
-    def custom_reorder(code):
-        parts = code.split(".")
-        # Step 1: Remove index 11
-        if len(parts) > 11:
-            del parts[11]
-        # Step 2: Move index -3 to -2
-        if len(parts) >= 3:
-            token = parts.pop(-3)
-            parts.insert(-2, token)
-        # Step 3: Move new index 11 to index -3
-        if len(parts) > 11:
-            token = parts.pop(11)
-            parts.insert(-3, token)
-        # Step 4: Move new index 11 to index -4
-        if len(parts) > 11:
-            token = parts.pop(11)
-            parts.insert(-4, token)
-        token = parts.pop(-2)
-        parts.insert(-4, token)
-        # swap index -4 with index -5
-        if len(parts) > 5:
-            parts[-4], parts[-5] = parts[-5], parts[-4]
-        return ".".join(parts)
-
     # Define column indices and names
     columns_indices_table1 = [1, 4, 5, 6, 7]
     columns_indices_table2 = [1, 3, 4, 5, 6]
@@ -118,6 +111,7 @@ def main():
     logger.info("Processing 'Edp' sheet for merging...")
     try:
         df = pd.read_excel(file, sheet_name="Edp")
+        metrics.sheet_read(df)
         logger.debug(f"Loaded 'Edp' sheet with {df.shape[0]} rows and {df.shape[1]} columns")
         df = df.iloc[31:]
         logger.debug(f"Trimmed to rows from 32 onwards: {df.shape}")
@@ -131,7 +125,7 @@ def main():
         df = df[1:]
         df.reset_index(drop=True, inplace=True)
         # join all columns with dot excpet first column
-        df['SDMX series'] = df.iloc[:, 1:].apply(lambda x: '.'.join(x.dropna().astype(str)), axis=1)
+        df['SDMX series'] = join_columns(df.iloc[:, 1:])
         # drop all columns excpet first and last
         logger.success(f"Processed 'Edp' DataFrame: {df.shape}")
     except Exception as e:
@@ -141,7 +135,10 @@ def main():
     logger.info(f"First cell of processed 'Edp' DataFrame: {df.iloc[0, 0]}")
 
     logger.info("Applying custom code reordering to merged table...")
-    merged_table["Code_adjusted"] = merged_table.iloc[:, 0].apply(custom_reorder)
+    merged_table["Code_adjusted"] = TABLE_CODE_TO_SERIES(merged_table.iloc[:, 0])
+    bad_keys = check_key_length(merged_table["Code_adjusted"], "EDP")
+    if len(bad_keys):
+        logger.warning(f"{len(bad_keys)} adjusted codes do not match the EDP DSD key length")
     logger.success("Custom code reordering applied.")
 
     logger.info("Checking which codes in merged_table are not present in 'Edp' DataFrame...")
@@ -154,14 +151,16 @@ def main():
         logger.success("All codes in merged_table are present in 'Edp' DataFrame.")
 
     logger.info("Merging merged_table with 'Edp' DataFrame on adjusted code...")
-    merged_df = pd.merge(
-        merged_table,
-        df,
-        left_on="Code_adjusted",
-        right_on=df.columns[0],
-        how="left",
-        suffixes=('', '_edp')
-    )
+    with stage("merge", "strategy_edp.merge_edp_sheet", rows_in=len(merged_table)) as s:
+        merged_df = pd.merge(
+            merged_table,
+            df,
+            left_on="Code_adjusted",
+            right_on=df.columns[0],
+            how="left",
+            suffixes=('', '_edp')
+        )
+        s.rows_out = len(merged_df)
     logger.success(f"Merged DataFrame shape: {merged_df.shape}")
 
     logger.info("Dropping unnecessary columns from merged DataFrame...")
@@ -179,7 +178,8 @@ def main():
     output_file = os.path.join(output_dir, "EDP.xlsx")
     logger.info(f"Saving merged DataFrame to {output_file}...")
     try:
-        merged_df.to_excel(output_file, index=False)
+        with stage("write", output_file, rows_in=len(merged_df)):
+            write_excel(merged_df, output_file)
         logger.success(f"File saved: {output_file}")
     except Exception as e:
         logger.error(f"Failed to save file: {e}")
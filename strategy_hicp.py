@@ -3,6 +3,39 @@ import pandas as pd
 import os
 import re
 
+from lfs_utils.sdmx_registry import load_registry
+from lfs_utils import metrics
+from lfs_utils.tracing import stage, traced
+from lfs_utils.xlsx_writer import write_excel
+
+# ICP_SUFFIX label of each measure column; codes are resolved from metadata/HICP
+ICP_SUFFIX_LABELS = {
+    'MONTHLY_RATE_CHANGE': 'Monthly rate of change',
+    'ANNUAL_RATE_CHANGE': 'Annual rate of change',
+    'ANNUAL_AVERAGE_INDEX': 'Annual average index',
+    'ANNUAL_AVERAGE_RATE_CHANGE': 'Annual average rate of change',
+    'HICP': 'Monthly index at constant tax rates (HICP-CT)',
+}
+
+def icp_suffix_row(columns):
+    """
+    Header row under the column names: ICP_SUFFIX code per measure column,
+    _Z elsewhere (MOR, ANR, AVX, AVR, CTX for the standard layout).
+    """
+    codelist = load_registry().domain('HICP').codelist_for('ICP_SUFFIX')
+    row = []
+    for col in columns:
+        label = ICP_SUFFIX_LABELS.get(col)
+        if label is None:
+            row.append('_Z')
+            continue
+        code = codelist.code_for(label)
+        if code is None:
+            raise ValueError(f"No ICP_SUFFIX code labelled {label!r} in {codelist.id}")
+        row.append(code)
+    return row
+
+@traced("parse")
 def parse_mci_sheet(sheet):
     """
     Parse the MCI sheet to extract Harmonized Index of Consumer Prices data.
@@ -95,6 +128,7 @@ def parse_mci_sheet(sheet):
         logger.warning("No data was parsed from the sheet")
     return df
 
+@traced("parse")
 def parse_hicp_sheet(sheet):
     """
     Parse the HICP sheet to extract Harmonized Index of Consumer Prices data.
@@ -186,6 +220,7 @@ def parse_hicp_sheet(sheet):
         logger.warning("No data was parsed from the sheet")
     return df
 
+@traced("merge")
 def merge_mci_hicp_data(mci_df, hicp_df):
     """
     Merge MCI and HICP data by YEAR and MONTH.
@@ -263,14 +298,20 @@ def main():
     try:
         # Parse MCI data
         logger.info(f"Loading MCI Excel file: {mci_input_file}")
-        mci_xl = pd.ExcelFile(mci_input_file)
-        mci_sheet = mci_xl.parse(mci_xl.sheet_names[0], header=None)
+        with stage("read", mci_input_file) as s:
+            mci_xl = pd.ExcelFile(mci_input_file)
+            mci_sheet = mci_xl.parse(mci_xl.sheet_names[0], header=None)
+            s.rows_out = len(mci_sheet)
+        metrics.sheet_read(mci_sheet)
         mci_df = parse_mci_sheet(mci_sheet)
         
         # Parse HICP data
         logger.info(f"Loading HICP Excel file: {hicp_input_file}")
-        hicp_xl = pd.ExcelFile(hicp_input_file)
-        hicp_sheet = hicp_xl.parse(hicp_xl.sheet_names[0], header=None)
+        with stage("read", hicp_input_file) as s:
+            hicp_xl = pd.ExcelFile(hicp_input_file)
+            hicp_sheet = hicp_xl.parse(hicp_xl.sheet_names[0], header=None)
+            s.rows_out = len(hicp_sheet)
+        metrics.sheet_read(hicp_sheet)
         hicp_df = parse_hicp_sheet(hicp_sheet)
         
         # Merge the datasets
@@ -286,22 +327,19 @@ def main():
             final_df = final_df.dropna(subset=essential_columns).reset_index(drop=True)
             
             # Add the required row after the header: _Z, _Z, _Z, _Z, _Z, MOR, ANR, AVX, AVR, CTX
-            # Create a new row with the specified values
-            header_row = pd.DataFrame([['_Z', '_Z', '_Z', '_Z', '_Z', 'MOR', 'ANR', 'AVX', 'AVR', 'CTX']], 
-                                    columns=final_df.columns)
-            
-            # Concatenate the header row with the existing dataframe
-            final_df = pd.concat([header_row, final_df], ignore_index=True)
+            # Codes come from the HICP ICP_SUFFIX codelist; the row is written
+            # between the column names and the data, not concatenated onto it
+            header_row = icp_suffix_row(final_df.columns)
             
             # Save to Excel
-            final_df.to_excel(output_file, index=False)
+            with stage("write", output_file, rows_in=len(final_df)):
+                write_excel(final_df, output_file, header_rows=[header_row])
             logger.success(f"Saved merged MCI and HICP data to {output_file}")
             
             # Log comprehensive statistics
-            logger.info(f"Final merged dataset shape: {final_df.shape}")
+            logger.info(f"Final merged dataset shape: {(len(final_df) + 1, final_df.shape[1])}")
             
-            # Filter out the header row for statistics (first row contains _Z values)
-            data_rows = final_df.iloc[1:].copy()
+            data_rows = final_df.copy()
             
             # Convert YEAR back to numeric for calculations
             data_rows['YEAR'] = pd.to_numeric(data_rows['YEAR'], errors='coerce')
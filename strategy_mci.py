@@ -4,11 +4,17 @@ from pathlib import Path
 from datetime import datetime
 import pandas as pd
 import os
+import sys
+
+from lfs_utils import metrics
+from lfs_utils.build_cache import PartialCache
+from lfs_utils.dedup import dedup
+from lfs_utils.tracing import stage, traced
+from lfs_utils.xlsx_writer import write_excel
 
 # ---------- Config ----------
 # Use current working directory instead of hardcoded /mnt/data
 INPUT_DIR = Path("assets/MCI")
-OUTPUT_PARQUET = Path("unified_dataset.parquet")
 OUTPUT_EXCEL = Path("assets/prepared/MCI.xlsx")
 
 TIME_CANDIDATE_COLS = {"time", "period", "date", "month", "year"}  # case-insensitive
@@ -191,6 +197,7 @@ def find_data_start_row(df: pd.DataFrame) -> int:
             return idx
     return 0
 
+@traced("transform")
 def clean_mci_dataframe_v2(df: pd.DataFrame, material_names: list) -> pd.DataFrame:
     """Clean and restructure MCI dataframes with time periods in first column."""
     # For this MCI file structure:
@@ -222,6 +229,7 @@ def clean_mci_dataframe_v2(df: pd.DataFrame, material_names: list) -> pd.DataFra
     
     return data_df
 
+@traced("transform")
 def clean_mci_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     """Clean and restructure MCI dataframes specifically.
     
@@ -337,6 +345,7 @@ def clean_mci_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     else:
         return pd.DataFrame()  # Return empty DataFrame if no data found
 
+@traced("transform")
 def clean_time_periods(df: pd.DataFrame) -> pd.DataFrame:
     """Clean and fix time periods in the dataframe."""
     # Sort by time_period to ensure proper ordering for year inference
@@ -417,6 +426,7 @@ def clean_time_periods(df: pd.DataFrame) -> pd.DataFrame:
     
     return df
 
+@traced("transform")
 def standardize_series_labels(df: pd.DataFrame) -> pd.DataFrame:
     """
     Standardize series labels by removing "(Change)" suffix and other variations
@@ -483,6 +493,7 @@ def standardize_series_labels(df: pd.DataFrame) -> pd.DataFrame:
     
     return df_standardized
 
+@traced("transform")
 def convert_index_mode(df: pd.DataFrame) -> pd.DataFrame:
     """
     Convert index_mode values based on frequency:
@@ -514,6 +525,7 @@ def convert_index_mode(df: pd.DataFrame) -> pd.DataFrame:
     
     return df_converted
 
+@traced("transform")
 def add_series_codes(df: pd.DataFrame) -> pd.DataFrame:
     """Add proper MCI series codes based on the standardized codelist."""
     # Create a mapping from series labels to proper MCI codes
@@ -567,6 +579,7 @@ def add_series_codes(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 # ---------- Main transformer ----------
+@traced("parse")
 def excel_to_tidy(path: Path) -> pd.DataFrame:
     dataset_id, vintage = extract_dataset_id_and_vintage(path.name)
     last_updated = datetime.fromtimestamp(path.stat().st_mtime)
@@ -581,6 +594,7 @@ def excel_to_tidy(path: Path) -> pd.DataFrame:
                 continue
                 
             raw = try_parse_with_multiheaders(xls, sheet)
+            metrics.sheet_read(raw)
 
             # Special handling for MCI files - do this BEFORE flattening columns
             if 'MATERIAL COST' in sheet or 'MCI' in path.name.upper():
@@ -892,11 +906,19 @@ def main():
     for f in files:
         print(f"  - {f.name}")
     
+    # Tidy frame per file, reparsed only for new/changed files or code changes
+    partials = PartialCache("mci_tidy", excel_to_tidy, deps=[sys.modules[__name__]])
+    plan = partials.plan(files)
+    print(f"Cached: {sum(r == 'cached' for _, r in plan)}/{len(plan)} files")
+    for f, reason in plan:
+        if reason != "cached":
+            print(f"  - {Path(f).name}: {reason}")
+
     frames = []
     for f in files:
         try:
             print(f"Processing {f.name}...")
-            tidy = excel_to_tidy(f)
+            tidy = partials.load_or_compute(f)
             if not tidy.empty:
                 frames.append(tidy)
                 print(f"  ✓ Extracted {len(tidy)} rows")
@@ -904,6 +926,7 @@ def main():
                 print(f"  ⚠ No data extracted")
         except Exception as e:
             print(f"[ERROR] Failed on {f.name}: {e}")
+    partials.save()
 
     if not frames:
         print("No data extracted from any files.")
@@ -934,40 +957,32 @@ def main():
     dedup_columns = [col for col in unified.columns if col != 'value']
     print(f"Columns used for deduplication: {dedup_columns}")
     
-    # Check for duplicates before deduplication
+    # One hashed pass: counts, examples, group sizes and the deduped frame.
+    # Within a duplicate group keep the first row that carries a value.
     initial_rows = len(unified)
-    duplicate_mask = unified.duplicated(subset=dedup_columns, keep=False)
-    duplicate_count = duplicate_mask.sum()
+    result = dedup(unified, subset=dedup_columns, keep='non_null', value_col='value')
+    metrics.DUPLICATES_DROPPED.inc(result.dropped_rows)
     
-    if duplicate_count > 0:
-        print(f"Found {duplicate_count} duplicate rows (same combination of columns except 'value')")
+    if result.rows_in_duplicate_groups > 0:
+        print(f"Found {result.rows_in_duplicate_groups} duplicate rows (same combination of columns except 'value')")
         
         # Show some examples of duplicates
-        duplicate_examples = unified[duplicate_mask].head(10)
         print("\nExample duplicate rows:")
-        print(duplicate_examples[dedup_columns + ['value']].to_string())
+        print(result.examples[dedup_columns + ['value']].to_string())
         
         # Show duplicate counts by combination
-        duplicate_groups = unified[duplicate_mask].groupby(dedup_columns).size().sort_values(ascending=False)
         print(f"\nDuplicate combinations (showing top 10):")
-        print(duplicate_groups.head(10).to_string())
+        print(result.group_sizes.to_string())
         
-        # Perform deduplication - keep first occurrence
-        unified = unified.drop_duplicates(subset=dedup_columns, keep='first')
+        # Perform deduplication - keep first occurrence with a non-null value
+        unified = result.df
         final_rows = len(unified)
-        removed_count = initial_rows - final_rows
         
         print(f"\nDeduplication completed:")
         print(f"  - Initial rows: {initial_rows:,}")
         print(f"  - Final rows: {final_rows:,}")
-        print(f"  - Removed duplicates: {removed_count:,}")
-        
-        # Check if there are still duplicates after deduplication
-        remaining_duplicates = unified.duplicated(subset=dedup_columns, keep=False).sum()
-        if remaining_duplicates > 0:
-            print(f"  - WARNING: {remaining_duplicates} duplicates still remain after deduplication!")
-        else:
-            print(f"  - ✓ All duplicates successfully removed")
+        print(f"  - Removed duplicates: {result.dropped_rows:,}")
+        print(f"  - Duplicate groups collapsed to one row: {result.duplicate_groups:,}")
     else:
         print("No duplicates found - all rows are unique based on the deduplication columns")
     
@@ -1051,11 +1066,11 @@ def main():
     else:
         print("Frequency column not found in the dataset")
 
-    # Persist (Excel only, do not save parquet)
+    # Persist
     try:
-        # Excel for hand-off
-        with pd.ExcelWriter(OUTPUT_EXCEL, engine="xlsxwriter") as writer:
-            unified.to_excel(writer, index=False, sheet_name="unified")
+        # Excel for hand-off, plus its typed Parquet twin (partitioned by FREQ) for the readers
+        with stage("write", OUTPUT_EXCEL, rows_in=len(unified)):
+            write_excel(unified, OUTPUT_EXCEL, sheet_name="unified")
         print(f"✓ Saved: {OUTPUT_EXCEL}")
     except Exception as e:
         print(f"⚠ Failed to save Excel: {e}")
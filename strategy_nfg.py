@@ -2,19 +2,31 @@ from loguru import logger
 import pandas as pd
 import os
 
+from lfs_utils import metrics
+from lfs_utils.tracing import stage, traced
+from lfs_utils.xlsx_writer import write_excel
+
+@traced("read")
 def load_excel_sheets(file_path):
     logger.info(f"Loading Excel file: {file_path}")
     try:
         sheet_names = pd.ExcelFile(file_path).sheet_names
         logger.success(f"Found sheets: {sheet_names}")
         dfs = {sheet: pd.read_excel(file_path, sheet_name=sheet) for sheet in sheet_names}
+        for df in dfs.values():
+            metrics.sheet_read(df)
         dfs_renamed = {f"sheet{i+1}": df for i, (sheet, df) in enumerate(dfs.items())}
         return dfs_renamed
     except Exception as e:
         logger.error(f"Failed to load Excel sheets: {e}")
         return None
 
+@traced("transform")
 def clean_df1(df1):
+    """
+    Quarterly rows of the first sheet, plus its header block (NA_ITEM,
+    INSTR_ASSET and ACCOUNT_ENTRY rows keyed by their "Date" label).
+    """
     logger.info("Cleaning first sheet (df1)...")
     try:
         df1 = df1.iloc[1:]
@@ -48,33 +60,27 @@ def clean_df1(df1):
         df1 = df1[df1["Date"].str.match(r"^\d{4}-Q[1-4]$")]
         df1.reset_index(drop=True, inplace=True)
         df1.columns = df1.columns.str.strip()
-        # Insert row with all values as "_Z"
-        df1.loc[-1] = ["_Z"] * len(df1.columns)
-        df1.index = df1.index + 1
-        df1 = df1.sort_index()
-        df1.iloc[0, 0] = "INSTR_ASSET"
-        # Insert row with column names
+        # Header rows: column names, then all "_Z"
         columns = df1.columns.tolist()
-        df1.loc[-1] = columns
-        df1.index = df1.index + 1
-        df1 = df1.sort_index()
-        df1.iloc[0, 0] = "NA_ITEM"
+        header = [["NA_ITEM"] + columns[1:], ["INSTR_ASSET"] + ["_Z"] * (len(columns) - 1)]
         logger.success("df1 cleaned successfully.")
         #drop column D995
-        df1 = df1.drop(columns=["D995"])
-        # Create a one-row DataFrame for insertion
-        row_df = pd.DataFrame([account_entry_row], columns=df1.columns)
-        # add row at the end
-        df1 = pd.concat([df1, row_df], ignore_index=True)
+        drop = columns.index("D995")
+        df1 = df1.drop(columns=["D995"]).infer_objects()
+        header = [row[:drop] + row[drop + 1:] for row in header]
+        # ACCOUNT_ENTRY row goes last (positional, one value per remaining column)
+        header.append(account_entry_row)
+        header = pd.DataFrame(header, columns=df1.columns)
 
-        
         print("DF1 FINAL\n",df1.head())
-        return df1
+        return df1, header
     except Exception as e:
         logger.error(f"Error cleaning df1: {e}")
-        return pd.DataFrame()
+        return pd.DataFrame(), pd.DataFrame()
 
+@traced("transform")
 def clean_df2(df2):
+    """Quarterly rows of the second sheet, plus its header block (as clean_df1)."""
     logger.info("Cleaning second sheet (df2)...")
     try:
         df2 = df2.iloc[1:]
@@ -96,51 +102,41 @@ def clean_df2(df2):
         df2.columns = df2.iloc[0].str.split("\n").str[0]
         df2 = df2[1:]
         df2 = df2.drop(df2.index[1])
-        df2.iloc[0, 0] = "INSTR_ASSET"
-        df2.loc[-1] = ["_Z"] * len(df2.columns)
-        df2.index = df2.index + 1
-        df2 = df2.sort_index()
-        df2.iloc[0, 0] = "NA_ITEM"
         df2.columns = df2.columns.str.strip()
         df2.rename(columns={"Quarter": "Date"}, inplace=True)
+        # Header rows: all "_Z", the instrument codes, then ACCOUNT_ENTRY
+        instr_asset = ["INSTR_ASSET"] + df2.iloc[0, 1:].tolist()
+        header = pd.DataFrame([["NA_ITEM"] + ["_Z"] * (len(df2.columns) - 1), instr_asset, account_entry_row],
+                              columns=df2.columns)
+        df2 = df2.iloc[1:]
         df2["Date"] = df2["Date"].str.replace("*", "", regex=False)
         pattern = r'^\d{4}-Q[1-4]$'
-        # Keep first two rows unchanged, then filter the rest
-        df2 = pd.concat([
-            df2.iloc[:2],
-            df2.iloc[2:][df2.iloc[2:]['Date'].str.match(pattern, na=False)]
-        ]).reset_index(drop=True)
-        df2.reset_index(drop=True, inplace=True)
+        df2 = df2[df2['Date'].str.match(pattern, na=False)].reset_index(drop=True).infer_objects()
         logger.success("df2 cleaned successfully.")
-        row_df = pd.DataFrame([account_entry_row], columns=df2.columns)
-        # add row at the end
-        df2 = pd.concat([df2, row_df], ignore_index=True)
-
-        
 
         print("DF2 FINAL\n",df2.head())
-        return df2
+        return df2, header
     except Exception as e:
         logger.error(f"Error cleaning df2: {e}")
-        return pd.DataFrame()
+        return pd.DataFrame(), pd.DataFrame()
 
-def merge_and_finalize(df1, df2):
+@traced("merge")
+def merge_and_finalize(sheet1, sheet2):
+    """
+    Outer-merge the two cleaned sheets on Date; returns the data rows and the
+    header block (MATURITY, ACCOUNT_ENTRY, INSTR_ASSET, NA_ITEM rows) that
+    is written between the column names and the data.
+    """
     logger.info("Merging cleaned DataFrames...")
     try:
+        (df1, header1), (df2, header2) = sheet1, sheet2
         merged_df = pd.merge(df1, df2, on="Date", how='outer', suffixes=('_df1', '_df2'))
-        
-        # Move the last 2 rows to the beginning
-        last_two_rows = merged_df.tail(3)
-        merged_df = merged_df.iloc[:-3]  # Remove last 2 rows
-        merged_df = pd.concat([last_two_rows, merged_df], ignore_index=True)
+        header = pd.merge(header1, header2, on="Date", how='outer', suffixes=('_df1', '_df2'))
         
         # Delete the last row
         merged_df = merged_df.iloc[:-1]
         
-        merged_df.loc[-1] = ["_Z"] * len(merged_df.columns)
-        merged_df.index = merged_df.index + 1
-        merged_df = merged_df.sort_index()
-        merged_df.iloc[0, 0] = "MATURITY"
+        maturity = ["MATURITY"] + ["_Z"] * (len(header.columns) - 1)
         # Set S/L for specific columns if present
         col_map = {
             "AF.31 Short-term debt securities": "S",
@@ -149,14 +145,16 @@ def merge_and_finalize(df1, df2):
             "AF.42 Long-term loans": "L"
         }
         for col, val in col_map.items():
-            if col in merged_df.columns:
-                merged_df.iloc[0, merged_df.columns.get_loc(col)] = val
+            if col in header.columns:
+                maturity[header.columns.get_loc(col)] = val
+        header_rows = [maturity] + header.values.tolist()
         merged_df.insert(1, "FREQ", "Q")
+        header_rows = [row[:1] + ["Q"] + row[1:] for row in header_rows]
         logger.success("Merged DataFrame finalized.")
-        return merged_df
+        return merged_df, header_rows
     except Exception as e:
         logger.error(f"Error merging DataFrames: {e}")
-        return pd.DataFrame()
+        return pd.DataFrame(), []
 
 def main():
     import glob
@@ -174,17 +172,18 @@ def main():
     if dfs_renamed is None or "sheet1" not in dfs_renamed or "sheet2" not in dfs_renamed:
         logger.error("Required sheets not found. Exiting.")
         return
-    df1 = clean_df1(dfs_renamed["sheet1"])
-    df2 = clean_df2(dfs_renamed["sheet2"])
-    if df1.empty or df2.empty:
+    sheet1 = clean_df1(dfs_renamed["sheet1"])
+    sheet2 = clean_df2(dfs_renamed["sheet2"])
+    if sheet1[0].empty or sheet2[0].empty:
         logger.error("One of the cleaned DataFrames is empty. Exiting.")
         return
-    merged_df = merge_and_finalize(df1, df2)
+    merged_df, header_rows = merge_and_finalize(sheet1, sheet2)
     if merged_df.empty:
         logger.error("Merged DataFrame is empty. Exiting.")
         return
     try:
-        merged_df.to_excel(output_file, index=False)
+        with stage("write", output_file, rows_in=len(merged_df)):
+            write_excel(merged_df, output_file, header_rows=header_rows)
         logger.success(f"Saved merged DataFrame to {output_file}")
     except Exception as e:
         logger.error(f"Failed to save merged DataFrame: {e}")
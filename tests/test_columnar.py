@@ -0,0 +1,48 @@
+"""
+read_table gives the same columns, dtypes and cells from a workbook's
+Parquet twin as from the workbook itself, with and without its header block.
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append('.')
+
+from lfs_utils.columnar import has_twin, read_table
+from lfs_utils.xlsx_writer import write_excel
+
+def workbook(tmp_path, header_rows=()):
+    df = pd.DataFrame({
+        2021: [-13044.0, -14483.0, -161.0],       # whole floats: read_excel gives int64
+        2023: [-3042.0, -3380.5, np.nan],
+        "FREQ": ["A", "A", "A"],
+        "STO": ["B9", None, "D41"],
+        "OBS_VALUE": [1.5, ":", 3],             # numbers and markers: object
+    })
+    path = tmp_path / "EDP.xlsx"
+    write_excel(df, path, header_rows=header_rows)
+    assert has_twin(path)
+    return path
+
+def both(path, monkeypatch, **kwargs):
+    twin = read_table(path, **kwargs)
+    monkeypatch.setenv("LFS_PARQUET", "0")
+    excel = read_table(path, **kwargs)
+    monkeypatch.delenv("LFS_PARQUET")
+    return twin, excel
+
+@pytest.mark.parametrize("header_rows", [(), [["PC", "PC", None, None, "PC"]]])
+@pytest.mark.parametrize("keep_header", [True, False])
+def test_twin_matches_workbook(tmp_path, monkeypatch, header_rows, keep_header):
+    twin, excel = both(workbook(tmp_path, header_rows), monkeypatch, header_rows=keep_header)
+    assert list(twin.columns) == list(excel.columns)
+    assert twin.dtypes.astype(str).to_dict() == excel.dtypes.astype(str).to_dict()
+    pd.testing.assert_frame_equal(twin, excel)
+
+def test_twin_matches_workbook_as_objects(tmp_path, monkeypatch):
+    twin, excel = both(workbook(tmp_path), monkeypatch, dtype=object)
+    assert twin.dtypes.astype(str).to_dict() == excel.dtypes.astype(str).to_dict()
+    pd.testing.assert_frame_equal(twin, excel)
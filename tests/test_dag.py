@@ -0,0 +1,47 @@
+"""
+run_dag: nodes passed as `done` are reported as cached and never run,
+also when they become ready after another node has finished; a node that
+leaves an existing output untouched still succeeds.
+"""
+
+from pathlib import Path
+import sys
+
+sys.path.append('.')
+
+from lfs_utils.dag import Node, run_dag
+
+def touch(path):
+    Path(path).write_text("ran")
+    return "wrote " + path
+
+def unchanged(path):
+    return "nothing new"
+
+def test_done_nodes_are_not_rerun(tmp_path):
+    a, b, c = (str(tmp_path / f"{n}.txt") for n in "abc")
+    target = f"{__name__}:touch"
+    nodes = [
+        Node("a", target, outputs=(a,), args=(a,)),
+        Node("b", target, inputs=(a,), outputs=(b,), args=(b,)),
+        Node("c", target, inputs=(b,), outputs=(c,), args=(c,)),
+    ]
+    Path(b).write_text("old")
+    Path(c).write_text("old")
+
+    results = {r.name: r.status for r in run_dag(nodes, max_workers=1, done=["b", "c"])}
+
+    assert results == {"a": "ok", "b": "cached", "c": "cached"}
+    assert Path(c).read_text() == "old"
+
+def test_untouched_outputs_are_not_failures(tmp_path):
+    out = tmp_path / "manifest.json"
+    out.write_text("{}")
+    nodes = [
+        Node("ingest", f"{__name__}:unchanged", outputs=(str(out),), args=(str(out),)),
+        Node("report", f"{__name__}:touch", inputs=(str(out),), args=(str(tmp_path / "report.md"),)),
+    ]
+
+    results = {r.name: r.status for r in run_dag(nodes, max_workers=1)}
+
+    assert results == {"ingest": "ok", "report": "ok"}
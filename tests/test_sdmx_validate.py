@@ -0,0 +1,34 @@
+"""
+validate_frame on LFS: rows that differ only in indicator are separate
+series, not duplicate keys; a repeated indicator still is.
+"""
+
+import sys
+
+import pandas as pd
+
+sys.path.append('.')
+
+from lfs_utils.sdmx_validate import validate_frame
+
+def lfs_frame(indicators):
+    n = len(indicators)
+    return pd.DataFrame({
+        "time_period": ["2020-Q1"] * n,
+        "freq": ["Q"] * n,
+        "value": [float(i) for i in range(n)],
+        "ref_area": ["GR"] * n,
+        "unit_measure": ["THOUSANDS"] * n,
+        "indicator": indicators,
+        "gender": ["TOTAL"] * n,
+    })
+
+def duplicates(df):
+    return [v for v in validate_frame(df, "LFS").violations if v.rule == "duplicate_key"]
+
+def test_indicators_are_part_of_the_key():
+    assert duplicates(lfs_frame(["EMPLOYED", "POPULATION", "EMPLOYMENT_STATUS"])) == []
+
+def test_repeated_indicator_is_a_duplicate():
+    found = duplicates(lfs_frame(["EMPLOYED", "EMPLOYED", "POPULATION"]))
+    assert len(found) == 1 and found[0].count == 2
@@ -0,0 +1,29 @@
+"""
+SheetAnalyzer._identify_data_area: only int/float cells mark the data
+area; numeric text such as a "2008" header cell does not.
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append('.')
+
+from lfs_utils.sheet_analyzer import SheetAnalyzer
+
+def test_numeric_text_is_not_data():
+    df = pd.DataFrame([
+        ["Table", None, None, None],
+        [None, "Sector", "2008", "2009"],
+        [None, "A", 10.5, 11],
+        [None, "B", np.nan, 12.0],
+        ["Source", None, None, None],
+    ], dtype=object)
+    area = SheetAnalyzer()._identify_data_area(df)
+    assert area == {'start_row': 2, 'start_col': 2, 'end_row': 3, 'end_col': 3}
+
+def test_no_numbers():
+    df = pd.DataFrame([["a", "1"], ["b", "2"]], dtype=object)
+    area = SheetAnalyzer()._identify_data_area(df)
+    assert area == {'start_row': None, 'start_col': None, 'end_row': None, 'end_col': None}
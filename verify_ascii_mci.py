@@ -1,37 +1,7 @@
-import pandas as pd
-import re
 import os
 from pathlib import Path
 
-def is_ascii(text):
-    """Check if a string contains only ASCII characters."""
-    if pd.isna(text):
-        return True
-    
-    # Handle numeric types (int, float)
-    if isinstance(text, (int, float)):
-        return True
-    
-    # Convert to string and check
-    try:
-        str(text).encode('ascii')
-        return True
-    except UnicodeEncodeError:
-        return False
-
-def find_non_ascii_chars(text):
-    """Find non-ASCII characters in a string."""
-    if pd.isna(text):
-        return []
-    
-    non_ascii_chars = []
-    for i, char in enumerate(str(text)):
-        try:
-            char.encode('ascii')
-        except UnicodeEncodeError:
-            non_ascii_chars.append((i, char, f"U+{ord(char):04X}"))
-    
-    return non_ascii_chars
+from lfs_utils.encoding_check import check_file
 
 def verify_excel_ascii(file_path):
     """Verify that all strings in an Excel file are ASCII."""
@@ -43,60 +13,22 @@ def verify_excel_ascii(file_path):
         return
     
     try:
-        # Read the Excel file
-        xl = pd.ExcelFile(file_path)
-        print(f"✓ Successfully opened Excel file")
-        print(f"✓ Sheets found: {xl.sheet_names}")
+        # Scan the workbook's text cells (lfs_utils.encoding_check)
+        report = check_file(file_path)
+        if report.error:
+            raise RuntimeError(report.error)
+        print(f"✓ Checked {report.sheets} sheet(s), {report.cells:,} cells in {report.seconds:.2f}s")
         print()
         
-        total_non_ascii = 0
-        all_issues = []
-        
-        for sheet_name in xl.sheet_names:
-            print(f"Checking sheet: {sheet_name}")
-            print("-" * 40)
-            
-            try:
-                # Read the sheet
-                df = pd.read_excel(file_path, sheet_name=sheet_name)
-                print(f"  ✓ Sheet loaded: {df.shape[0]} rows × {df.shape[1]} columns")
-                
-                sheet_issues = []
-                
-                # Check each cell in the dataframe
-                for row_idx, row in df.iterrows():
-                    for col_idx, value in enumerate(row):
-                        if not is_ascii(value):
-                            non_ascii_chars = find_non_ascii_chars(value)
-                            if non_ascii_chars:
-                                issue = {
-                                    'sheet': sheet_name,
-                                    'row': row_idx + 1,  # Excel is 1-indexed
-                                    'column': df.columns[col_idx],
-                                    'value': str(value),
-                                    'non_ascii_chars': non_ascii_chars
-                                }
-                                sheet_issues.append(issue)
-                                all_issues.append(issue)
-                
-                if sheet_issues:
-                    print(f"  ❌ Found {len(sheet_issues)} non-ASCII issues in this sheet")
-                    for issue in sheet_issues[:5]:  # Show first 5 issues
-                        print(f"    Row {issue['row']}, Col '{issue['column']}:")
-                        print(f"      Value: {issue['value']}")
-                        print(f"      Non-ASCII chars: {issue['non_ascii_chars']}")
-                        print()
-                    if len(sheet_issues) > 5:
-                        print(f"    ... and {len(sheet_issues) - 5} more issues")
-                else:
-                    print(f"  ✅ All strings in this sheet are ASCII")
-                
-                total_non_ascii += len(sheet_issues)
-                print()
-                
-            except Exception as e:
-                print(f"  ❌ Error reading sheet '{sheet_name}': {e}")
-                print()
+        all_issues = [{
+            'sheet': issue.sheet,
+            'row': issue.row,
+            'cell': issue.cell,
+            'column': issue.column,
+            'value': issue.value,
+            'non_ascii_chars': issue.chars
+        } for issue in report.issues]
+        total_non_ascii = len(all_issues)
         
         # Summary
         print("=" * 60)
@@ -110,7 +42,7 @@ def verify_excel_ascii(file_path):
             print()
             print("Detailed issues:")
             for i, issue in enumerate(all_issues, 1):
-                print(f"{i}. Sheet: {issue['sheet']}, Row: {issue['row']}, Column: {issue['column']}")
+                print(f"{i}. Sheet: {issue['sheet']}, Cell: {issue['cell']}, Column: {issue['column']}")
                 print(f"   Value: {issue['value']}")
                 print(f"   Non-ASCII characters: {issue['non_ascii_chars']}")
                 print()
@@ -126,7 +58,7 @@ def verify_excel_ascii(file_path):
                 
                 for i, issue in enumerate(all_issues, 1):
                     f.write(f"{i}. Sheet: {issue['sheet']}\n")
-                    f.write(f"   Row: {issue['row']}\n")
+                    f.write(f"   Cell: {issue['cell']}\n")
                     f.write(f"   Column: {issue['column']}\n")
                     f.write(f"   Value: {issue['value']}\n")
                     f.write(f"   Non-ASCII characters: {issue['non_ascii_chars']}\n\n")